@@ -0,0 +1,462 @@
+"""
+分块断点续传上传（tus 1.0 协议的子集）
+大文件在不稳定的网络上整体上传失败后需要从头重传；分块上传时客户端可以随时
+通过 HEAD 查询已接收的偏移量并从断点继续
+
+    OPTIONS /api/uploads                      协议能力（Tus-Version / Tus-Max-Size / 校验算法）
+    POST    /api/uploads                      创建上传（Upload-Length，Upload-Metadata: filename <base64>）
+    HEAD    /api/uploads/{upload_id}          查询已接收偏移量
+    PATCH   /api/uploads/{upload_id}          追加分块（Upload-Offset，可选 Upload-Checksum: sha256 <base64>）
+    POST    /api/uploads/{upload_id}/finalize 上传完成，直接对已落盘的文件开始转换
+    DELETE  /api/uploads/{upload_id}          放弃上传
+
+分块直接写入上传目录中的 .part 文件，不在内存中缓冲；整个文件的SHA-256随分块增量计算，
+完成时无需重新读取。同一节点的多个Web进程共享上传目录，偏移量以文件大小为准
+
+环境变量:
+    PDF2WORD_UPLOAD_DIR         上传目录（默认: 系统临时目录/pdf2word_uploads）
+    PDF2WORD_UPLOAD_TTL_HOURS   未完成上传的保留时间（默认 24 小时）
+"""
+
+import base64
+import binascii
+import errno
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+import uuid
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_DIR = os.getenv("PDF2WORD_UPLOAD_DIR", os.path.join(tempfile.gettempdir(), "pdf2word_uploads"))
+UPLOAD_TTL = float(os.getenv("PDF2WORD_UPLOAD_TTL_HOURS", "24")) * 3600
+
+TUS_VERSION = "1.0.0"
+CHECKSUM_ALGORITHMS = ("sha256", "sha1", "md5")
+
+# 两次过期清理之间的最小间隔（秒）
+PURGE_INTERVAL = 600
+
+# PATCH 请求体累积到该大小后写盘一次
+WRITE_BUFFER = 1024 * 1024
+
+_ID_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+
+
+class UploadError(ValueError):
+    """上传协议错误，status 为对应的HTTP状态码"""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+@dataclass
+class UploadSession:
+    """一次分块上传"""
+    id: str
+    filename: str
+    length: int
+    created: float
+    path: Path
+    client: Optional[str] = None
+    metadata: Dict[str, str] = field(default_factory=dict)
+
+    @property
+    def offset(self) -> int:
+        """已接收字节数（以磁盘上的文件大小为准，多进程一致）"""
+        try:
+            return self.path.stat().st_size
+        except FileNotFoundError:
+            return 0
+
+    @property
+    def complete(self) -> bool:
+        return self.offset == self.length
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"id": self.id, "filename": self.filename, "length": self.length, "offset": self.offset,
+                "created": self.created, "url": f"/api/uploads/{self.id}"}
+
+
+def parse_metadata(header: Optional[str]) -> Dict[str, str]:
+    """解析 Upload-Metadata: key base64,key2 base64"""
+    metadata = {}
+    for pair in (header or "").split(","):
+        key, _, value = pair.strip().partition(" ")
+        if not key:
+            continue
+        try:
+            metadata[key] = base64.b64decode(value).decode("utf-8") if value else ""
+        except (binascii.Error, UnicodeDecodeError):
+            raise UploadError(400, f"Upload-Metadata 无法解析: {key}")
+    return metadata
+
+
+def parse_checksum(header: Optional[str]) -> Optional[Tuple[str, bytes]]:
+    """解析 Upload-Checksum: <算法> <base64摘要>"""
+    if not header:
+        return None
+    algorithm, _, value = header.strip().partition(" ")
+    algorithm = algorithm.lower().replace("-", "")
+    if algorithm not in CHECKSUM_ALGORITHMS:
+        raise UploadError(400, f"不支持的校验算法: {algorithm}")
+    try:
+        return algorithm, base64.b64decode(value.strip(), validate=True)
+    except binascii.Error:
+        raise UploadError(400, "Upload-Checksum 无法解析")
+
+
+class ChunkWriter:
+    """
+    一次 PATCH 的写入器
+    分块写入 .part 文件的同时更新本分块与整个文件的摘要；校验失败时截断回起始偏移量
+    """
+
+    def __init__(self, store: "UploadStore", session: UploadSession, offset: int,
+                 checksum: Optional[Tuple[str, bytes]]):
+        self.store = store
+        self.session = session
+        self.start = offset
+        self.offset = offset
+        self.checksum = checksum
+        self._fd = os.open(session.path, os.O_WRONLY | os.O_CREAT, 0o600)
+        try:
+            # 同一上传同时只允许一个PATCH（跨进程）
+            fcntl.flock(self._fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError as e:
+            os.close(self._fd)
+            if e.errno in (errno.EAGAIN, errno.EACCES):
+                raise UploadError(423, "该上传正在写入")
+            raise
+        current = os.fstat(self._fd).st_size
+        if current != offset:
+            self._close()
+            raise UploadError(409, f"Upload-Offset 不匹配: 服务器已接收 {current} 字节")
+        self._running = store._digest_at(session, offset)
+        self._chunk = hashlib.new(checksum[0]) if checksum else None
+
+    def write(self, data: bytes) -> None:
+        if self.offset + len(data) > self.session.length:
+            raise UploadError(413, "数据超出 Upload-Length")
+        os.pwrite(self._fd, data, self.offset)
+        self.offset += len(data)
+        self._running.update(data)
+        if self._chunk is not None:
+            self._chunk.update(data)
+
+    def commit(self) -> int:
+        """校验并提交本分块，返回新的偏移量"""
+        if self._fd < 0:
+            return self.start
+        try:
+            if self._chunk is not None and self._chunk.digest() != self.checksum[1]:
+                os.ftruncate(self._fd, self.start)
+                raise UploadError(460, "分块校验失败")
+            self.store._remember_digest(self.session, self.offset, self._running)
+            return self.offset
+        finally:
+            self._close()
+
+    def abort(self) -> int:
+        """
+        连接中断时调用：没有分块校验时保留已写入的部分，客户端可从新的偏移量继续；
+        有校验时无法验证不完整的分块，截断回起始偏移量；commit 校验失败后再调用时不再处理
+        """
+        if self._fd < 0:
+            return self.start
+        try:
+            if self._chunk is not None:
+                os.ftruncate(self._fd, self.start)
+                return self.start
+            self.store._remember_digest(self.session, self.offset, self._running)
+            return self.offset
+        finally:
+            self._close()
+
+    def _close(self) -> None:
+        if self._fd >= 0:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = -1
+
+
+class UploadStore:
+    """上传目录：{id}.part 为已接收数据，{id}.json 为元数据"""
+
+    def __init__(self, root: Union[str, Path] = UPLOAD_DIR, max_bytes: int = 50 * 1024 * 1024,
+                 ttl: float = UPLOAD_TTL, on_discard: Optional[Callable[[str], None]] = None):
+        """
+        Args:
+            root: 上传目录（与暂存区位于同一文件系统时，完成后可直接重命名）
+            max_bytes: 单个上传的大小上限
+            ttl: 未完成上传的保留秒数
+            on_discard: on_discard(upload_id)，上传被删除时调用（包括过期清理）
+        """
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        # 本进程内的增量摘要: upload_id -> (偏移量, sha256对象)
+        self._digests: Dict[str, Tuple[int, Any]] = {}
+        self._last_purge = 0.0
+        self.on_discard = on_discard
+
+    def _meta_path(self, upload_id: str) -> Path:
+        return self.root / f"{upload_id}.json"
+
+    def create(self, filename: str, length: int, client: Optional[str] = None,
+               metadata: Optional[Dict[str, str]] = None) -> UploadSession:
+        if length <= 0:
+            raise UploadError(400, "Upload-Length 无效")
+        if length > self.max_bytes:
+            raise UploadError(413, f"文件大小不能超过{self.max_bytes // (1024 * 1024)}MB")
+        self._maybe_purge()
+        upload_id = uuid.uuid4().hex
+        session = UploadSession(upload_id, filename, length, time.time(), self.root / f"{upload_id}.part", client,
+                                dict(metadata or {}))
+        session.path.touch()
+        meta = asdict(session)
+        meta["path"] = str(session.path)
+        with open(self._meta_path(upload_id), "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+        return session
+
+    def get(self, upload_id: str) -> Optional[UploadSession]:
+        if not _ID_PATTERN.match(upload_id):
+            return None
+        try:
+            with open(self._meta_path(upload_id), "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+        meta["path"] = Path(meta["path"])
+        session = UploadSession(**meta)
+        if time.time() - session.created > self.ttl:
+            self.delete(session)
+            return None
+        return session
+
+    def open_chunk(self, session: UploadSession, offset: int,
+                   checksum: Optional[Tuple[str, bytes]] = None) -> ChunkWriter:
+        return ChunkWriter(self, session, offset, checksum)
+
+    def _digest_at(self, session: UploadSession, offset: int):
+        """返回偏移量处的SHA-256状态副本；本进程没有记录时（其他进程接收了之前的分块）重新计算"""
+        with self._lock:
+            known = self._digests.get(session.id)
+        if known is not None and known[0] == offset:
+            return known[1].copy()
+        digest = hashlib.sha256()
+        with open(session.path, "rb") as f:
+            remaining = offset
+            while remaining > 0:
+                block = f.read(min(WRITE_BUFFER, remaining))
+                if not block:
+                    break
+                digest.update(block)
+                remaining -= len(block)
+        return digest
+
+    def _remember_digest(self, session: UploadSession, offset: int, digest) -> None:
+        with self._lock:
+            self._digests[session.id] = (offset, digest)
+
+    def finish(self, session: UploadSession, expected_sha256: Optional[str] = None) -> str:
+        """
+        确认上传完整，返回整个文件的SHA-256；session.path 随之指向 {id}.pdf
+
+        Args:
+            expected_sha256: 客户端提供的整体摘要（十六进制），不一致时报错
+        """
+        if not session.complete:
+            raise UploadError(409, f"上传未完成: {session.offset}/{session.length}")
+        sha256 = self._digest_at(session, session.length).hexdigest()
+        if expected_sha256 and expected_sha256.lower() != sha256:
+            raise UploadError(460, "文件整体校验失败")
+        # 改为 .pdf 扩展名（同目录重命名），转换引擎按扩展名识别文件类型
+        pdf_path = session.path.with_suffix(".pdf")
+        os.replace(session.path, pdf_path)
+        session.path = pdf_path
+        return sha256
+
+    def _discarded(self, upload_id: str) -> None:
+        with self._lock:
+            self._digests.pop(upload_id, None)
+        if self.on_discard is not None:
+            try:
+                self.on_discard(upload_id)
+            except Exception as e:
+                logger.warning(f"上传 {upload_id} 的清理回调失败: {e}")
+
+    def delete(self, session: UploadSession) -> None:
+        self._discarded(session.id)
+        for path in (session.path, session.path.with_suffix(".part"), self._meta_path(session.id)):
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+
+    def _maybe_purge(self) -> None:
+        now = time.time()
+        if now - self._last_purge < PURGE_INTERVAL:
+            return
+        self._last_purge = now
+        for meta_path in self.root.glob("*.json"):
+            try:
+                if now - meta_path.stat().st_mtime <= self.ttl:
+                    continue
+                meta_path.unlink()
+                meta_path.with_suffix(".part").unlink(missing_ok=True)
+            except OSError:
+                continue
+            self._discarded(meta_path.stem)
+
+
+def install(app, on_finalize: Callable, store: Optional[UploadStore] = None,
+            max_bytes: int = 50 * 1024 * 1024, on_progress: Optional[Callable] = None,
+            on_discard: Optional[Callable] = None) -> UploadStore:
+    """
+    注册分块上传路由
+
+    Args:
+        app: FastAPI应用
+        on_finalize: async on_finalize(upload, sha256, request) -> Response；在上传完成后对
+            upload.path 直接转换，返回后上传文件即被删除
+        store: 上传目录，默认在 PDF2WORD_UPLOAD_DIR 下创建
+        max_bytes: 单个上传的大小上限
+        on_progress: on_progress(upload, offset)，每个分块提交后调用（不可阻塞）
+        on_discard: on_discard(upload_id)，上传结束、放弃或过期清理时调用（设置为 store.on_discard）
+
+    Returns:
+        UploadStore
+    """
+    from fastapi import HTTPException, Request
+    from fastapi.concurrency import run_in_threadpool
+    from fastapi.responses import JSONResponse, Response
+
+    from .job_api import client_key
+
+    store = store or UploadStore(max_bytes=max_bytes)
+    if on_discard is not None:
+        store.on_discard = on_discard
+    tus_headers = {"Tus-Resumable": TUS_VERSION}
+
+    def load(upload_id: str) -> UploadSession:
+        session = store.get(upload_id)
+        if session is None:
+            raise HTTPException(status_code=404, detail="上传不存在或已过期", headers=tus_headers)
+        return session
+
+    def error(e: UploadError) -> HTTPException:
+        return HTTPException(status_code=e.status, detail=str(e), headers=tus_headers)
+
+    @app.options("/api/uploads")
+    async def upload_options():
+        return Response(status_code=204, headers={
+            **tus_headers,
+            "Tus-Version": TUS_VERSION,
+            "Tus-Extension": "creation,checksum,termination",
+            "Tus-Max-Size": str(store.max_bytes),
+            "Tus-Checksum-Algorithm": ",".join(CHECKSUM_ALGORITHMS),
+        })
+
+    @app.post("/api/uploads", status_code=201)
+    async def create_upload(request: Request):
+        """创建分块上传"""
+        try:
+            length = int(request.headers.get("upload-length", ""))
+        except ValueError:
+            raise HTTPException(status_code=400, detail="缺少 Upload-Length", headers=tus_headers)
+        try:
+            metadata = parse_metadata(request.headers.get("upload-metadata"))
+            filename = os.path.basename(metadata.get("filename") or request.query_params.get("filename") or "")
+            if not filename.lower().endswith(".pdf"):
+                raise UploadError(400, "只支持PDF文件")
+            session = await run_in_threadpool(store.create, filename, length, client_key(request), metadata)
+        except UploadError as e:
+            raise error(e)
+        location = f"/api/uploads/{session.id}"
+        return JSONResponse(status_code=201, content=session.to_dict(),
+                            headers={**tus_headers, "Location": location, "Upload-Offset": "0"})
+
+    @app.head("/api/uploads/{upload_id}")
+    async def upload_offset(upload_id: str):
+        """查询已接收偏移量"""
+        session = await run_in_threadpool(load, upload_id)
+        return Response(status_code=200, headers={
+            **tus_headers,
+            "Upload-Offset": str(session.offset),
+            "Upload-Length": str(session.length),
+            "Cache-Control": "no-store",
+        })
+
+    @app.patch("/api/uploads/{upload_id}")
+    async def upload_chunk(upload_id: str, request: Request):
+        """追加一个分块，请求体直接写入上传文件"""
+        if request.headers.get("content-type", "").split(";")[0].strip() != "application/offset+octet-stream":
+            raise HTTPException(status_code=415, detail="Content-Type 必须为 application/offset+octet-stream",
+                                headers=tus_headers)
+        try:
+            offset = int(request.headers.get("upload-offset", ""))
+        except ValueError:
+            raise HTTPException(status_code=400, detail="缺少 Upload-Offset", headers=tus_headers)
+        session = await run_in_threadpool(load, upload_id)
+        try:
+            checksum = parse_checksum(request.headers.get("upload-checksum"))
+            writer = await run_in_threadpool(store.open_chunk, session, offset, checksum)
+        except UploadError as e:
+            raise error(e)
+
+        committed = False
+        try:
+            buffer = bytearray()
+            async for data in request.stream():
+                buffer += data
+                if len(buffer) >= WRITE_BUFFER:
+                    await run_in_threadpool(writer.write, bytes(buffer))
+                    buffer.clear()
+            if buffer:
+                await run_in_threadpool(writer.write, bytes(buffer))
+            new_offset = await run_in_threadpool(writer.commit)
+            committed = True
+        except UploadError as e:
+            raise error(e)
+        finally:
+            if not committed:
+                new_offset = await run_in_threadpool(writer.abort)
+            if on_progress is not None:
+                on_progress(session, new_offset)
+        return Response(status_code=204, headers={**tus_headers, "Upload-Offset": str(new_offset)})
+
+    @app.post("/api/uploads/{upload_id}/finalize")
+    async def finalize_upload(upload_id: str, request: Request):
+        """上传完成：校验整体摘要并对已落盘的文件开始转换"""
+        session = await run_in_threadpool(load, upload_id)
+        try:
+            sha256 = await run_in_threadpool(store.finish, session, request.query_params.get("sha256"))
+        except UploadError as e:
+            raise error(e)
+        try:
+            return await on_finalize(session, sha256, request)
+        finally:
+            await run_in_threadpool(store.delete, session)
+
+    @app.delete("/api/uploads/{upload_id}")
+    async def terminate_upload(upload_id: str):
+        """放弃上传"""
+        session = await run_in_threadpool(load, upload_id)
+        await run_in_threadpool(store.delete, session)
+        return Response(status_code=204, headers=tus_headers)
+
+    return store
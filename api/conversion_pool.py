@@ -0,0 +1,112 @@
+"""
+转换线程池
+所有转换任务（单文件与批量）共享一个有界线程池：工作线程常驻，
+重型库只在进程内导入一次，批量请求中的多个文件并行转换且总并发受控。
+任务不按提交顺序执行，而是由 scheduler.FairShareScheduler 按估计成本、
+等待时间与客户端公平分配选择（见 scheduler.py）
+
+环境变量:
+    CONVERSION_WORKERS   工作线程数（默认: min(4, CPU核数)）
+"""
+
+import asyncio
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from . import metrics, tracing
+from .scheduler import FairShareScheduler, ScheduledTask
+
+DEFAULT_WORKERS = min(4, os.cpu_count() or 1)
+
+
+class ConversionPool:
+    """有界转换线程池，排队数量通过 pdf2word_queue_depth 指标暴露"""
+
+    def __init__(self, max_workers: Optional[int] = None, scheduler: Optional[FairShareScheduler] = None):
+        self.max_workers = max_workers or int(os.getenv("CONVERSION_WORKERS", DEFAULT_WORKERS))
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="convert")
+        self._scheduler = scheduler or FairShareScheduler(self.max_workers)
+        self._lock = threading.Lock()
+        self._running = 0
+
+    def submit(self, fn: Callable, *args, cost: float = 1.0, client: Optional[str] = None) -> Future:
+        """
+        提交任务，追踪上下文随任务传入工作线程
+
+        Args:
+            fn: 在工作线程中执行的函数
+            cost: 估计成本（见 prescan.estimate_cost），决定调度顺序与通道
+            client: 客户端标识，用于公平分配
+        """
+        future: Future = Future()
+        with self._lock:
+            task = self._scheduler.push((future, fn, args, tracing.get_context()), cost, client)
+        metrics.QUEUE_DEPTH.inc()
+        # 尚未开始就被取消的任务从调度器中移除
+        future.add_done_callback(lambda f: f.cancelled() and self._cancel(task))
+        self._dispatch()
+        return future
+
+    def _cancel(self, task: ScheduledTask) -> None:
+        with self._lock:
+            removed = self._scheduler.remove(task)
+        if removed:
+            metrics.QUEUE_DEPTH.dec()
+
+    def _dispatch(self) -> None:
+        """有空闲线程时按调度策略取出任务执行"""
+        while True:
+            with self._lock:
+                if self._running >= self.max_workers:
+                    return
+                task = self._scheduler.pop()
+                if task is None:
+                    return
+                self._running += 1
+            metrics.QUEUE_DEPTH.dec()
+            self._executor.submit(self._execute, task)
+
+    def _execute(self, task: ScheduledTask) -> None:
+        future, fn, args, context = task.payload
+        try:
+            if future.set_running_or_notify_cancel():
+                try:
+                    with tracing.attach(context):
+                        result = fn(*args)
+                except BaseException as e:
+                    future.set_exception(e)
+                else:
+                    future.set_result(result)
+        finally:
+            with self._lock:
+                self._running -= 1
+                self._scheduler.finish(task)
+            self._dispatch()
+
+    async def run(self, fn: Callable, *args, cost: float = 1.0, client: Optional[str] = None) -> Any:
+        """在池中执行任务并等待结果（供异步路由使用）"""
+        return await asyncio.wrap_future(self.submit(fn, *args, cost=cost, client=client))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"workers": self.max_workers, "pending": len(self._scheduler), "running": self._running,
+                    **self._scheduler.stats()}
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._executor.shutdown(wait=wait)
+
+
+_pool: Optional[ConversionPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ConversionPool:
+    """进程级共享的转换线程池（首次使用时创建）"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConversionPool()
+    return _pool
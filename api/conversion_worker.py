@@ -0,0 +1,227 @@
+"""
+转换工作进程
+从作业队列领取作业，转换后把结果放入共享的结果存储
+
+用法:
+    python -m api.conversion_worker                 # 单个工作进程
+    python start_multiworker.py --web-workers 4 --conversion-workers 2
+
+    python -m api.conversion_worker --concurrency 4  # 每个节点按CPU容量领取
+
+多节点部署时设置 PDF2WORD_QUEUE_URL=redis://...，Web节点与工作节点共享同一个队列
+
+环境变量:
+    PDF2WORD_EMBEDDED_WORKERS   Web进程内嵌的转换线程数（默认 1；多进程部署时设为0）
+"""
+
+import argparse
+import logging
+import os
+import socket
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from . import metrics, tracing
+from .job_queue import Job, get_queue
+from .result_store import DOCX_MEDIA_TYPE, get_store
+from .staging import get_staging
+
+logger = logging.getLogger(__name__)
+
+HEARTBEAT_INTERVAL = 10.0
+
+
+class Pdf2DocxEngine:
+    """pdf2docx 的文件接口适配"""
+
+    def convert_file(self, pdf_path: str, output_path: str, filename: Optional[str] = None) -> Tuple[bool, str]:
+        from pdf2docx import Converter
+
+        cv = Converter(pdf_path)
+        try:
+            cv.convert(output_path, start=0, end=None)
+        finally:
+            cv.close()
+        return True, "pdf2docx conversion successful"
+
+
+def _pdf2docx():
+    # 子进程中执行，超出内存预算时改用快速文本引擎（见 sandbox.py）
+    from .incremental_convert import FastTextEngine
+    from .sandbox import SandboxedEngine
+    return SandboxedEngine(Pdf2DocxEngine(), fallback=FastTextEngine(), name="pdf2docx")
+
+
+def _hybrid():
+    from .libre_hybrid_converter import LibreHybridConverter
+    return LibreHybridConverter()
+
+
+def _libreoffice():
+    from .libreoffice_converter import LibreOfficeConverter
+    return LibreOfficeConverter()
+
+
+def _fast():
+    from .incremental_convert import FastTextEngine
+    return FastTextEngine()
+
+
+def _ocr():
+    from .ocr_engine import OcrEngine
+    return OcrEngine()
+
+
+def _mock():
+    from .mock_engine import MockConverter
+    return MockConverter()
+
+
+# 引擎名 -> 构造函数；引擎实例在每个工作线程内创建一次并复用
+ENGINES: Dict[str, Callable[[], Any]] = {
+    "hybrid": _hybrid,
+    "libreoffice": _libreoffice,
+    "pdf2docx": _pdf2docx,
+    "fast": _fast,
+    "ocr": _ocr,
+    "mock": _mock,
+}
+
+
+class ConversionWorker:
+    """从队列领取并执行转换作业"""
+
+    def __init__(self, queue=None, store=None, worker_id: Optional[str] = None,
+                 poll_interval: float = 0.5, heartbeat_interval: float = HEARTBEAT_INTERVAL):
+        self.queue = queue or get_queue()
+        self.store = store or get_store()
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+        self.poll_interval = poll_interval
+        self.heartbeat_interval = heartbeat_interval
+        self._engines: Dict[str, Any] = {}
+
+    def _engine(self, name: str) -> Any:
+        if name not in self._engines:
+            if name not in ENGINES:
+                raise ValueError(f"未知的转换引擎: {name}")
+            self._engines[name] = ENGINES[name]()
+        return self._engines[name]
+
+    def _heartbeat_loop(self, job: Job, done: threading.Event) -> None:
+        while not done.wait(self.heartbeat_interval):
+            if not self.queue.heartbeat(job.id, self.worker_id):
+                logger.warning(f"作业 {job.id} 已被回收，结果将被丢弃")
+                return
+
+    def process(self, job: Job) -> None:
+        """执行单个作业"""
+        done = threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeat_loop, args=(job, done), daemon=True)
+        heartbeat.start()
+        start = time.perf_counter()
+        success = False
+        try:
+            with get_staging().job(os.path.getsize(job.input_path)) as staging, \
+                    tracing.attach(job.trace_context), \
+                    tracing.span("worker.job", job_id=job.id, engine=job.engine, attempt=job.attempts), \
+                    metrics.INFLIGHT_JOBS.track(engine=job.engine):
+                self.queue.progress(job.id, self.worker_id, 0.1, "正在转换")
+                output_path = staging.path_for(f"output.{job.output_format}")
+                success, message = self._engine(job.engine).convert_file(
+                    job.input_path, str(output_path), job.filename
+                )
+                if not success:
+                    self.queue.fail(job.id, self.worker_id, message)
+                    return
+                self.queue.progress(job.id, self.worker_id, 0.9, "正在保存结果")
+                entry = self.store.put(output_path, job.output_name, DOCX_MEDIA_TYPE)
+            self.queue.publish_result(job.id, entry)
+            self.queue.complete(job.id, self.worker_id, entry.id, message)
+        except Exception as e:
+            logger.error(f"作业 {job.id} 执行出错: {e}", exc_info=True)
+            # 异常可能是临时性的（磁盘、soffice崩溃），允许重试
+            self.queue.fail(job.id, self.worker_id, f"{type(e).__name__}: {e}", retry=True)
+        finally:
+            done.set()
+            metrics.record_conversion(job.engine, success, time.perf_counter() - start,
+                                      bytes_in=_size(job.input_path))
+            self.queue.release_input(job)
+
+    def run_once(self) -> bool:
+        """领取并执行一个作业；队列为空时返回False"""
+        job = self.queue.claim(self.worker_id)
+        if job is None:
+            return False
+        logger.info(f"领取作业 {job.id} ({job.filename}, 第{job.attempts}次)")
+        self.process(job)
+        return True
+
+    def run(self, stop: Optional[threading.Event] = None) -> None:
+        """循环领取作业直到 stop 被设置"""
+        stop = stop or threading.Event()
+        logger.info(f"转换工作进程启动: {self.worker_id}")
+        while not stop.is_set():
+            try:
+                if not self.run_once():
+                    stop.wait(self.poll_interval)
+            except Exception as e:
+                # 队列暂时不可用（数据库锁、网络）时稍后重试
+                logger.error(f"领取作业失败: {e}")
+                stop.wait(self.poll_interval * 4)
+
+
+def _size(path: str) -> int:
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def start_embedded_workers(count: Optional[int] = None, store=None) -> List[threading.Thread]:
+    """
+    在Web进程内启动转换线程（单进程部署）
+
+    Args:
+        count: 线程数，默认读取 PDF2WORD_EMBEDDED_WORKERS
+        store: 结果存储，默认 result_store.get_store()
+    """
+    if count is None:
+        count = int(os.getenv("PDF2WORD_EMBEDDED_WORKERS", "1"))
+    threads = []
+    for index in range(count):
+        worker = ConversionWorker(store=store)
+        thread = threading.Thread(target=worker.run, name=f"conversion-worker-{index}", daemon=True)
+        thread.start()
+        threads.append(thread)
+    return threads
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PDF转换工作进程")
+    parser.add_argument("--poll-interval", type=float, default=0.5, help="队列为空时的轮询间隔（秒）")
+    parser.add_argument("--concurrency", type=int, default=1,
+                        help="同时执行的作业数；每个线程空闲时才领取下一个作业")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    if args.concurrency <= 1:
+        ConversionWorker(poll_interval=args.poll_interval).run()
+        return
+    stop = threading.Event()
+    threads = [
+        threading.Thread(target=ConversionWorker(poll_interval=args.poll_interval).run, args=(stop,),
+                         name=f"conversion-worker-{index}")
+        for index in range(args.concurrency)
+    ]
+    for thread in threads:
+        thread.start()
+    try:
+        for thread in threads:
+            thread.join()
+    except KeyboardInterrupt:
+        stop.set()
+
+
+if __name__ == "__main__":
+    main()
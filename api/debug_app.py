@@ -14,9 +14,13 @@ import sys
 import traceback
 from pathlib import Path
 from fastapi import FastAPI, File, UploadFile, HTTPException
-from fastapi.responses import FileResponse, JSONResponse, HTMLResponse
+from fastapi.responses import JSONResponse, HTMLResponse
 from fastapi.middleware.cors import CORSMiddleware
 
+from . import metrics, tracing, result_store
+from .file_response import RangeFileResponse
+from .result_store import get_store
+
 # 配置详细日志
 logging.basicConfig(
     level=logging.DEBUG,
@@ -31,6 +35,11 @@ app = FastAPI(
     version="2.5.1-debug"
 )
 
+# 指标: /metrics 路由与响应写出计时
+metrics.install(app)
+tracing.install(app)
+result_store.install(app)
+
 # 添加CORS中间件
 app.add_middleware(
     CORSMiddleware,
@@ -144,17 +153,26 @@ async def convert_pdf_debug(file: UploadFile = File(...)):
             
             # 步骤6: 执行转换
             logger.info("步骤6: 开始PDF转换")
+            conversion_start = time.perf_counter()
             try:
-                cv = Converter(input_path)
-                logger.info("Converter创建成功")
-                
-                cv.convert(output_path, start=0, end=None)
-                logger.info("转换完成")
-                
-                cv.close()
-                logger.info("Converter已关闭")
+                with tracing.span("engine.pdf2docx"), \
+                        metrics.INFLIGHT_JOBS.track(engine="pdf2docx"), \
+                        metrics.stage_timer(metrics.STAGE_CONVERSION, "pdf2docx"):
+                    cv = Converter(input_path)
+                    logger.info("Converter创建成功")
+                    
+                    cv.convert(output_path, start=0, end=None)
+                    logger.info("转换完成")
+                    
+                    cv.close()
+                    logger.info("Converter已关闭")
+                metrics.record_conversion(
+                    "pdf2docx", True, time.perf_counter() - conversion_start,
+                    bytes_in=file_size, bytes_out=os.path.getsize(output_path)
+                )
                 
             except Exception as convert_error:
+                metrics.record_conversion("pdf2docx", False, time.perf_counter() - conversion_start)
                 logger.error(f"转换过程出错: {str(convert_error)}")
                 logger.error(f"转换错误详情: {traceback.format_exc()}")
                 raise HTTPException(status_code=500, detail=f"转换失败: {str(convert_error)}")
@@ -177,10 +195,11 @@ async def convert_pdf_debug(file: UploadFile = File(...)):
             download_filename = f"debug_{int(time.time())}_{file.filename.replace('.pdf', '.docx')}"
             logger.info(f"下载文件名: {download_filename}")
             
-            return FileResponse(
-                path=output_path,
-                filename=download_filename,
-                media_type='application/vnd.openxmlformats-officedocument.wordprocessingml.document'
+            # 移入结果存储后再清理临时目录（直接返回临时文件会在发送前被删除）
+            entry = get_store().put(output_path, download_filename)
+            logger.info(f"结果ID: {entry.id}")
+            return RangeFileResponse.from_result(
+                entry, headers={"X-Result-Id": entry.id, "Content-Location": entry.download_url}
             )
             
         finally:
@@ -8,35 +8,39 @@
 
 import re
 from PyPDF2 import PdfReader
-from docx import Document
-from docx.shared import Inches
-from docx.enum.text import WD_ALIGN_PARAGRAPH
+
+from .streaming_docx_writer import StreamingDocxWriter
+from .table_inference import PageLayouts, TableGrid
+from .tabular_export import detect_header
 
 class EnhancedPyPDF2Converter:
     
     def convert_pdf_to_word(self, input_path: str, output_path: str) -> bool:
         try:
             reader = PdfReader(input_path)
-            doc = Document()
-            
-            # 添加标题
-            title = doc.add_heading('PDF转换文档', 0)
-            title.alignment = WD_ALIGN_PARAGRAPH.CENTER
             
-            for page_num in range(len(reader.pages)):
-                page = reader.pages[page_num]
-                text = page.extract_text()
+            # 逐页直接写入输出文件，不保留整个文档对象
+            with StreamingDocxWriter(output_path) as writer, PageLayouts(input_path) as layouts:
+                # 添加标题
+                writer.add_heading('PDF转换文档', 0, align="center")
                 
-                if text.strip():
-                    # 分析页面内容类型
-                    if self._is_table_content(text):
-                        self._add_table_content(doc, text, page_num + 1)
+                for page_num in range(len(reader.pages)):
+                    page = reader.pages[page_num]
+                    text = page.extract_text()
+                    
+                    if text.strip():
+                        # 按单词坐标推断出表格时直接使用推断结果（需要 PyMuPDF 与 NumPy）
+                        blocks = layouts.tables(page_num)
+                        if blocks:
+                            self._add_inferred_content(writer, blocks, page_num + 1)
+                        # 分析页面内容类型
+                        elif self._is_table_content(text):
+                            self._add_table_content(writer, text, page_num + 1)
+                        else:
+                            self._add_text_content(writer, text, page_num + 1)
                     else:
-                        self._add_text_content(doc, text, page_num + 1)
-                else:
-                    self._add_empty_page_notice(doc, page_num + 1)
+                        self._add_empty_page_notice(writer, page_num + 1)
             
-            doc.save(output_path)
             return True
             
         except Exception as e:
@@ -60,9 +64,21 @@ class EnhancedPyPDF2Converter:
         
         return table_indicators >= 3
     
-    def _add_table_content(self, doc: Document, text: str, page_num: int):
+    def _add_inferred_content(self, writer: StreamingDocxWriter, blocks: list, page_num: int):
+        """添加按单词坐标推断出的表格与文本行（api/table_inference.py）"""
+        writer.add_heading(f'第 {page_num} 页', level=1)
+        
+        for block in blocks:
+            if isinstance(block, TableGrid):
+                writer.add_table(block.cells, header=detect_header(block.cells))
+            elif self._is_title_line(block):
+                writer.add_heading(block, level=2)
+            else:
+                writer.add_paragraph(block)
+    
+    def _add_table_content(self, writer: StreamingDocxWriter, text: str, page_num: int):
         """添加表格内容，尝试重建表格结构"""
-        doc.add_heading(f'第 {page_num} 页', level=1)
+        writer.add_heading(f'第 {page_num} 页', level=1)
         
         lines = text.split('\n')
         table_lines = []
@@ -77,26 +93,15 @@ class EnhancedPyPDF2Converter:
                     table_lines.append(columns)
         
         if table_lines:
-            # 确定最大列数
-            max_cols = max(len(row) for row in table_lines)
-            
-            # 创建表格
-            table = doc.add_table(rows=len(table_lines), cols=max_cols)
-            table.style = 'Table Grid'
-            
-            # 填充表格数据
-            for i, row_data in enumerate(table_lines):
-                row = table.rows[i]
-                for j, cell_data in enumerate(row_data):
-                    if j < len(row.cells):
-                        row.cells[j].text = cell_data.strip()
+            # 创建表格（列数取最长的行）
+            writer.add_table(table_lines)
         else:
             # 如果无法构建表格，添加为段落
-            self._add_text_content(doc, text, page_num)
+            self._add_text_content(writer, text, page_num)
     
-    def _add_text_content(self, doc: Document, text: str, page_num: int):
+    def _add_text_content(self, writer: StreamingDocxWriter, text: str, page_num: int):
         """添加文本内容，保持段落结构"""
-        doc.add_heading(f'第 {page_num} 页', level=1)
+        writer.add_heading(f'第 {page_num} 页', level=1)
         
         # 按段落分割
         paragraphs = text.split('\n\n')
@@ -106,15 +111,14 @@ class EnhancedPyPDF2Converter:
             if para:
                 # 检测标题模式
                 if self._is_title_line(para):
-                    doc.add_heading(para, level=2)
+                    writer.add_heading(para, level=2)
                 else:
                     # 处理长段落的换行
                     clean_para = re.sub(r'\n(?!\s*$)', ' ', para)
-                    p = doc.add_paragraph(clean_para)
                     
                     # 如果是居中文本，设置居中对齐
-                    if self._should_center_align(clean_para):
-                        p.alignment = WD_ALIGN_PARAGRAPH.CENTER
+                    align = "center" if self._should_center_align(clean_para) else None
+                    writer.add_paragraph(clean_para, align=align)
     
     def _is_title_line(self, text: str) -> bool:
         """判断是否为标题行"""
@@ -132,8 +136,7 @@ class EnhancedPyPDF2Converter:
             return True
         return False
     
-    def _add_empty_page_notice(self, doc: Document, page_num: int):
+    def _add_empty_page_notice(self, writer: StreamingDocxWriter, page_num: int):
         """添加空页面提示"""
-        doc.add_heading(f'第 {page_num} 页', level=1)
-        p = doc.add_paragraph('(此页面无法提取文本，可能包含图像或特殊格式)')
-        p.alignment = WD_ALIGN_PARAGRAPH.CENTER 
\ No newline at end of file
+        writer.add_heading(f'第 {page_num} 页', level=1)
+        writer.add_paragraph('(此页面无法提取文本，可能包含图像或特殊格式)', align="center") 
\ No newline at end of file
@@ -0,0 +1,219 @@
+"""
+支持断点续传的文件响应
+- Range: 单个字节范围（206 / 416），多范围请求按完整文件返回
+- ETag / Last-Modified，If-None-Match / If-Modified-Since 返回304，If-Range 校验
+- 服务器支持 ASGI zero-copy 扩展时由服务器 sendfile 发送，否则在线程中 pread 分块发送，
+  文件内容不会整体读入内存
+"""
+
+import os
+import stat
+from email.utils import formatdate, parsedate_to_datetime
+from typing import List, Mapping, Optional, Tuple
+from urllib.parse import quote
+
+import anyio
+from starlette.background import BackgroundTask
+from starlette.datastructures import Headers
+from starlette.responses import Response
+
+CHUNK_SIZE = 256 * 1024
+
+
+def _parse_range(value: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    解析 Range 请求头
+
+    Returns:
+        (start, end) 闭区间；范围不可满足时返回 (-1, -1)；
+        无法解析或为多范围请求时返回 None（按完整文件响应）
+    """
+    unit, _, ranges = value.partition("=")
+    if unit.strip().lower() != "bytes" or "," in ranges:
+        return None
+    first, sep, last = ranges.strip().partition("-")
+    if not sep:
+        return None
+    try:
+        if first == "":
+            # 后缀范围: bytes=-500 表示最后500字节
+            length = int(last)
+            if length <= 0:
+                return -1, -1
+            return max(size - length, 0), size - 1
+        start = int(first)
+        end = int(last) if last else size - 1
+    except ValueError:
+        return None
+    if start >= size:
+        return -1, -1
+    if start > end:
+        return None
+    return start, min(end, size - 1)
+
+
+def _opaque_tag(etag: str) -> str:
+    etag = etag.strip()
+    return etag[2:] if etag.startswith("W/") else etag
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    """If-None-Match 弱比较"""
+    if header.strip() == "*":
+        return True
+    return any(_opaque_tag(candidate) == _opaque_tag(etag) for candidate in header.split(","))
+
+
+def _http_date_to_timestamp(value: str) -> Optional[float]:
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+class RangeFileResponse(Response):
+    """带Range与条件请求支持的文件响应"""
+
+    def __init__(self, path: str, etag: Optional[str] = None, filename: Optional[str] = None,
+                 media_type: Optional[str] = None, headers: Optional[Mapping[str, str]] = None,
+                 background: Optional[BackgroundTask] = None,
+                 cache_control: str = "private, max-age=3600",
+                 content_disposition_type: str = "attachment"):
+        """
+        Args:
+            path: 文件路径
+            etag: 强ETag（含引号）；为None时由文件大小和修改时间生成
+            filename: 下载文件名
+            media_type: MIME类型
+            headers: 附加响应头
+            background: 响应发送完毕后执行的任务
+            cache_control: Cache-Control 响应头
+            content_disposition_type: attachment 或 inline
+        """
+        self.path = str(path)
+        self.etag = etag
+        self.filename = filename
+        self.media_type = media_type or "application/octet-stream"
+        self.background = background
+        self.cache_control = cache_control
+        self.content_disposition_type = content_disposition_type
+        self.status_code = 200
+        self.extra_headers = dict(headers or {})
+        self.init_headers(self.extra_headers)
+
+    @classmethod
+    def from_result(cls, entry, **kwargs) -> "RangeFileResponse":
+        """由 result_store.StoredResult 构造（ETag为内容哈希）"""
+        return cls(str(entry.path), etag=entry.etag, filename=entry.filename,
+                   media_type=entry.media_type, **kwargs)
+
+    def _base_headers(self, st: os.stat_result) -> List[Tuple[str, str]]:
+        etag = self.etag or f'"{st.st_size:x}-{st.st_mtime_ns:x}"'
+        headers = [
+            ("etag", etag),
+            ("last-modified", formatdate(st.st_mtime, usegmt=True)),
+            ("cache-control", self.cache_control),
+            ("accept-ranges", "bytes"),
+        ]
+        if self.filename:
+            quoted = quote(self.filename)
+            if quoted != self.filename:
+                disposition = f"{self.content_disposition_type}; filename*=utf-8''{quoted}"
+            else:
+                disposition = f'{self.content_disposition_type}; filename="{self.filename}"'
+            headers.append(("content-disposition", disposition))
+        headers.extend((key.lower(), value) for key, value in self.extra_headers.items())
+        return headers
+
+    def _not_modified(self, request: Headers, etag: str, st: os.stat_result) -> bool:
+        if_none_match = request.get("if-none-match")
+        if if_none_match is not None:
+            return _etag_matches(if_none_match, etag)
+        if_modified_since = request.get("if-modified-since")
+        if if_modified_since:
+            since = _http_date_to_timestamp(if_modified_since)
+            return since is not None and int(st.st_mtime) <= since
+        return False
+
+    def _if_range_ok(self, request: Headers, etag: str, st: os.stat_result) -> bool:
+        """If-Range 不匹配时忽略Range，返回完整文件"""
+        if_range = request.get("if-range")
+        if if_range is None:
+            return True
+        if if_range.strip().startswith(('"', "W/")):
+            return if_range.strip() == etag and not etag.startswith("W/")
+        return _http_date_to_timestamp(if_range) == float(int(st.st_mtime))
+
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            st = await anyio.to_thread.run_sync(os.stat, self.path)
+        except FileNotFoundError:
+            raise RuntimeError(f"File at path {self.path} does not exist.")
+        if not stat.S_ISREG(st.st_mode):
+            raise RuntimeError(f"File at path {self.path} is not a file.")
+
+        request = Headers(scope=scope)
+        headers = self._base_headers(st)
+        etag = headers[0][1]
+        size = st.st_size
+        head_only = scope["method"].upper() == "HEAD"
+
+        if scope["method"].upper() in ("GET", "HEAD") and self._not_modified(request, etag, st):
+            await self._send_start(send, 304, headers)
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+
+        status, start, end = 200, 0, size - 1
+        range_header = request.get("range")
+        if range_header and size and self._if_range_ok(request, etag, st):
+            parsed = _parse_range(range_header, size)
+            if parsed == (-1, -1):
+                headers.append(("content-range", f"bytes */{size}"))
+                headers.append(("content-length", "0"))
+                await self._send_start(send, 416, headers)
+                await send({"type": "http.response.body", "body": b"", "more_body": False})
+                return
+            if parsed is not None:
+                status, (start, end) = 206, parsed
+                headers.append(("content-range", f"bytes {start}-{end}/{size}"))
+
+        length = end - start + 1 if size else 0
+        headers.append(("content-type", self.media_type))
+        headers.append(("content-length", str(length)))
+        await self._send_start(send, status, headers)
+
+        if head_only or length == 0:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+        elif "http.response.zerocopy" in scope.get("extensions", {}):
+            with open(self.path, "rb") as f:
+                await send({"type": "http.response.zerocopy", "file": f, "offset": start,
+                            "count": length, "more_body": False})
+        else:
+            await self._send_chunks(send, start, length)
+
+        if self.background is not None:
+            await self.background()
+
+    async def _send_start(self, send, status: int, headers: List[Tuple[str, str]]) -> None:
+        self.status_code = status
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(key.encode("latin-1"), value.encode("latin-1")) for key, value in headers],
+        })
+
+    async def _send_chunks(self, send, offset: int, remaining: int) -> None:
+        fd = await anyio.to_thread.run_sync(os.open, self.path, os.O_RDONLY)
+        try:
+            while remaining > 0:
+                chunk = await anyio.to_thread.run_sync(os.pread, fd, min(CHUNK_SIZE, remaining), offset)
+                if not chunk:
+                    break
+                offset += len(chunk)
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+            if remaining > 0:
+                # 文件在发送过程中被截断
+                await send({"type": "http.response.body", "body": b"", "more_body": False})
+        finally:
+            os.close(fd)
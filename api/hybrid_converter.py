@@ -8,10 +8,14 @@
 """
 
 import os
+import re
 import logging
 import asyncio
 from typing import Optional, Dict, Any, Tuple
+from docx.enum.text import WD_ALIGN_PARAGRAPH
 from .cloudconvert_converter import CloudConvertConverter
+from .table_inference import PageLayouts, TableGrid
+from .tabular_export import detect_header
 
 logger = logging.getLogger(__name__)
 
@@ -107,9 +111,7 @@ class HybridConverter:
             try:
                 from PyPDF2 import PdfReader
                 from docx import Document
-                from docx.enum.text import WD_ALIGN_PARAGRAPH
                 from docx.shared import Inches
-                import re
                 logger.info("PyPDF2转换器导入成功")
             except ImportError as e:
                 logger.error(f"库导入失败: {e}")
@@ -132,25 +134,30 @@ class HybridConverter:
             doc.add_paragraph("")  # 空行
             
             # 逐页处理
-            for page_num in range(len(reader.pages)):
-                page = reader.pages[page_num]
-                text = page.extract_text()
+            with PageLayouts(input_path) as layouts:
+                for page_num in range(len(reader.pages)):
+                    page = reader.pages[page_num]
+                    text = page.extract_text()
                 
-                if text.strip():
-                    # 添加页码标识
-                    page_header = doc.add_paragraph()
-                    page_header.add_run(f"【第 {page_num + 1} 页】").bold = True
+                    if text.strip():
+                        # 添加页码标识
+                        page_header = doc.add_paragraph()
+                        page_header.add_run(f"【第 {page_num + 1} 页】").bold = True
                     
-                    if self._is_table_content(text):
-                        self._add_table_content(doc, text, page_num + 1)
+                        # 按单词坐标推断出表格时直接使用推断结果（需要 PyMuPDF 与 NumPy）
+                        blocks = layouts.tables(page_num)
+                        if blocks:
+                            self._add_inferred_content(doc, blocks)
+                        elif self._is_table_content(text):
+                            self._add_table_content(doc, text, page_num + 1)
+                        else:
+                            self._add_text_content(doc, text, page_num + 1)
                     else:
-                        self._add_text_content(doc, text, page_num + 1)
-                else:
-                    self._add_empty_page_notice(doc, page_num + 1)
+                        self._add_empty_page_notice(doc, page_num + 1)
                 
-                # 页面分隔
-                if page_num < len(reader.pages) - 1:
-                    doc.add_page_break()
+                    # 页面分隔
+                    if page_num < len(reader.pages) - 1:
+                        doc.add_page_break()
             
             doc.save(output_path)
             logger.info(f"本地转换成功，输出文件大小: {os.path.getsize(output_path)} bytes")
@@ -170,6 +177,21 @@ class HybridConverter:
         tab_count = sum(1 for line in lines if line.count('\t') >= 2 or line.count('  ') >= 3)
         return tab_count >= len(lines) * 0.3
     
+    def _add_inferred_content(self, doc, blocks: list):
+        """添加按单词坐标推断出的表格与文本行（api/table_inference.py）"""
+        for block in blocks:
+            if not isinstance(block, TableGrid):
+                self._add_text_content(doc, block, 0)
+                continue
+            table = doc.add_table(rows=0, cols=block.columns)
+            table.style = 'Table Grid'
+            header = detect_header(block.cells)
+            for row_index, row in enumerate(block.cells):
+                cells = table.add_row().cells
+                for cell, value in zip(cells, row):
+                    run = cell.paragraphs[0].add_run(value)
+                    run.bold = header and row_index == 0
+    
     def _add_table_content(self, doc, text: str, page_num: int):
         """添加表格内容"""
         try:
@@ -179,9 +201,8 @@ class HybridConverter:
                 self._add_text_content(doc, text, page_num)
                 return
             
-            # 创建表格
-            max_cols = max(len(re.split(r'\s{2,}|\t', line)) for line in lines[:5])
-            max_cols = min(max_cols, 6)  # 限制最大列数
+            # 创建表格（列数取最长的行）
+            max_cols = max(len(re.split(r'\s{2,}|\t', line)) for line in lines)
             
             table = doc.add_table(rows=1, cols=max_cols)
             table.style = 'Table Grid'
@@ -190,8 +211,7 @@ class HybridConverter:
             header_cells = table.rows[0].cells
             header_parts = re.split(r'\s{2,}|\t', lines[0])
             for i, part in enumerate(header_parts[:max_cols]):
-                header_cells[i].text = part
-                header_cells[i].paragraphs[0].runs[0].bold = True
+                header_cells[i].paragraphs[0].add_run(part).bold = True
             
             # 添加数据行
             for line in lines[1:]:
@@ -0,0 +1,462 @@
+"""
+边上传边转换（线性化PDF）
+线性化（Fast Web View）PDF把第一页及其资源放在文件开头，后续页面按顺序排列。
+上传过程中每当暂存文件增长到一定大小，就用 PyMuPDF 打开已接收的部分，
+对已经完整的页面提前做文本提取；上传结束后只需处理剩余页面并组装DOCX，
+慢速链路上的总耗时大约减少一个上传时长。
+
+提前转换的页面在上传结束后按页面对象签名（页面、内容流、字体对象的字典与流长度）
+与完整文件核对，不一致的页面重新转换；文件长度与线性化字典中的 /L 不符
+（线性化后又追加了增量更新）时全部重新转换，结果与一次性转换相同。
+
+未提前转换的页面先按页面指纹查找页面缓存（page_cache），相同页面直接复用DOCX片段。
+
+引擎为快速本地文本引擎（fitz 文本块 + StreamingDocxWriter），也可单独使用：
+    FastTextEngine().convert_file(pdf_path, output_path)
+
+接口:
+    POST /api/convert/incremental     请求体为PDF原始字节（Content-Type: application/pdf，
+                                      文件名放在 X-Filename 头），边接收边转换
+    分块上传 (/api/uploads) 的 Upload-Metadata 中带 engine ZmFzdA== (fast) 时，
+    PATCH 期间同样提前转换
+"""
+
+import logging
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+from .lazy_imports import lazy_import
+from .page_cache import PageCache, PageFingerprinter, get_page_cache
+from .streaming_docx_writer import StreamingDocxWriter
+
+logger = logging.getLogger(__name__)
+
+# 线性化字典必须位于文件开头的1024字节内
+HEAD_BYTES = 1024
+
+# 两次尝试之间至少新增的字节数
+MIN_STEP_BYTES = 1024 * 1024
+
+# 每次尝试都要重新读取并解析已接收的全部数据：间隔随已接收大小按比例增长，
+# 总读取量保持为文件大小的常数倍（固定间隔时随文件大小平方增长）
+STEP_GROWTH = 0.5
+
+# 原始请求体累积到该大小后写盘一次
+WRITE_BUFFER = 256 * 1024
+
+# 页面缓存中快速引擎片段的版本（page_paragraphs 或段落XML变化时递增）
+PAGE_CACHE_ENGINE = "fast-v1"
+
+_LINEARIZED = re.compile(rb"<<\s*/Linearized\s+[\d.]+(.*?)>>", re.S)
+
+
+@dataclass
+class LinearizationInfo:
+    """线性化参数字典"""
+    length: int            # /L 文件总长度
+    first_page_end: int    # /E 第一页部分结束的偏移量
+    pages: int             # /N 页数
+    first_page: int = 0    # /P 第一页的页码
+
+
+def parse_linearization(head: bytes) -> Optional[LinearizationInfo]:
+    """从文件开头解析线性化字典，不是线性化文件时返回None"""
+    match = _LINEARIZED.search(head[:HEAD_BYTES])
+    if not match:
+        return None
+    values = {key.decode(): int(value) for key, value in re.findall(rb"/([LENP])\s+(\d+)", match.group(1))}
+    if not {"L", "E", "N"} <= values.keys():
+        return None
+    return LinearizationInfo(values["L"], values["E"], values["N"], values.get("P", 0))
+
+
+def page_paragraphs(page) -> List[str]:
+    """快速文本引擎：按阅读顺序提取文本块，每块一个段落"""
+    paragraphs = []
+    for block in page.get_text("blocks", sort=True):
+        if block[6] != 0:
+            continue
+        text = " ".join(line.strip() for line in block[4].splitlines() if line.strip())
+        if text:
+            paragraphs.append(text)
+    return paragraphs
+
+
+def page_signature(doc, page) -> Optional[Tuple[Any, ...]]:
+    """
+    页面对象签名：页面、内容流、字体及其ToUnicode对象的字典与流长度
+
+    Returns:
+        签名；任一对象缺失或流数据不完整（部分文件中尚未接收）时返回None
+    """
+    xrefs = [page.xref] + list(page.get_contents())
+    for font in page.get_fonts():
+        xrefs.append(font[0])
+        kind, value = doc.xref_get_key(font[0], "ToUnicode")
+        if kind == "xref":
+            xrefs.append(int(value.split()[0]))
+    signature = []
+    for xref in xrefs:
+        if xref <= 0:
+            continue
+        source = doc.xref_object(xref, compressed=True)
+        if source == "null":
+            return None
+        length = None
+        if doc.xref_is_stream(xref):
+            raw = doc.xref_stream_raw(xref) or b""
+            kind, declared = doc.xref_get_key(xref, "Length")
+            if kind == "int" and len(raw) < int(declared):
+                return None
+            length = len(raw)
+        signature.append((xref, source, length))
+    return tuple(signature)
+
+
+def write_page(writer: StreamingDocxWriter, page, cache: Optional[PageCache],
+                fingerprinter: Optional[PageFingerprinter], paragraphs: Optional[List[str]] = None) -> bool:
+    """
+    写入一页（第一页之后先写分页符）
+
+    Args:
+        writer: DOCX写入器
+        page: fitz.Page
+        cache: 页面缓存，None表示不使用
+        fingerprinter: 当前文档的指纹计算器
+        paragraphs: 已经提取好的段落（提前转换的页面），此时只写入缓存不查找
+
+    Returns:
+        是否命中页面缓存
+    """
+    if page.number:
+        writer.add_page_break()
+    fingerprint = None
+    if cache is not None:
+        try:
+            fingerprint = fingerprinter.fingerprint(page)
+        except Exception as e:
+            logger.debug(f"页面指纹计算失败 (第{page.number + 1}页): {e}")
+    if fingerprint is not None and paragraphs is None:
+        fragment = cache.get(fingerprint, PAGE_CACHE_ENGINE)
+        if fragment is not None:
+            writer.add_fragment(fragment)
+            return True
+
+    if paragraphs is None:
+        paragraphs = page_paragraphs(page)
+    writer.begin_fragment()
+    for text in paragraphs:
+        writer.add_paragraph(text)
+    fragment = writer.end_fragment()
+    if fingerprint is not None:
+        cache.put(fingerprint, PAGE_CACHE_ENGINE, fragment)
+    return False
+
+
+class FastTextEngine:
+    """快速本地文本引擎（文件接口同其他转换器）"""
+
+    def convert_file(self, pdf_path: str, output_path: str, filename: Optional[str] = None) -> Tuple[bool, str]:
+        fitz = lazy_import("fitz")
+        cache = get_page_cache()
+        hits = 0
+        with fitz.open(pdf_path) as doc, StreamingDocxWriter(output_path) as writer:
+            fingerprinter = PageFingerprinter(doc)
+            for page in doc:
+                hits += write_page(writer, page, cache, fingerprinter)
+            pages = doc.page_count
+        return True, f"快速文本转换完成: {pages} 页，其中 {hits} 页复用页面缓存"
+
+
+class IncrementalConversion:
+    """
+    一个正在上传的文件的提前转换
+    feed() 只记录已接收的字节数并唤醒后台线程，不阻塞上传
+    """
+
+    def __init__(self, pdf_path: Union[str, Path], min_step: int = MIN_STEP_BYTES):
+        self.pdf_path = str(pdf_path)
+        self.min_step = min_step
+        self.info: Optional[LinearizationInfo] = None
+        self.disabled = False
+        self._pages: Dict[int, Tuple[List[str], Tuple[Any, ...]]] = {}
+        self._received = 0
+        self._attempted_at = 0
+        self._closed = False
+        self._wakeup = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="incremental-convert", daemon=True)
+        self._thread.start()
+
+    @property
+    def pages_ready(self) -> int:
+        return len(self._pages)
+
+    def feed(self, received: int) -> None:
+        """上传进度更新（已落盘的字节数）"""
+        if received > self._received:
+            self._received = received
+            self._wakeup.set()
+
+    def _run(self) -> None:
+        while True:
+            self._wakeup.wait()
+            self._wakeup.clear()
+            if self._closed or self.disabled:
+                return
+            try:
+                self._advance(self._received)
+            except Exception as e:
+                # 部分文件无法解析属于正常情况，等待更多数据后重试
+                logger.debug(f"提前转换暂不可行 ({self._received} bytes): {e}")
+
+    def _advance(self, received: int) -> None:
+        if self.info is None:
+            if received < HEAD_BYTES:
+                return
+            with open(self.pdf_path, "rb") as f:
+                self.info = parse_linearization(f.read(HEAD_BYTES))
+            if self.info is None:
+                self.disabled = True
+                return
+            logger.info(f"检测到线性化PDF: {self.info.pages} 页, 首页结束于 {self.info.first_page_end}")
+        if received < self.info.first_page_end:
+            return
+        step = max(self.min_step, int(self._attempted_at * STEP_GROWTH))
+        if self._attempted_at and received - self._attempted_at < step:
+            return
+        self._attempted_at = received
+
+        with open(self.pdf_path, "rb") as f:
+            data = f.read(received)
+        fitz = lazy_import("fitz")
+        with fitz.open(stream=data, filetype="pdf") as doc:
+            # 只转换连续可用的页面：遇到第一个不完整的页面即停止
+            for index in range(len(self._pages), min(doc.page_count, self.info.pages)):
+                if self._closed:
+                    return
+                page = doc.load_page(index)
+                signature = page_signature(doc, page)
+                if signature is None:
+                    return
+                self._pages[index] = (page_paragraphs(page), signature)
+
+    def finish(self, output_path: Union[str, Path], pdf_path: Optional[Union[str, Path]] = None) -> Tuple[bool, str]:
+        """
+        上传结束后转换剩余页面并组装DOCX
+
+        Args:
+            output_path: 输出DOCX路径
+            pdf_path: 完整文件路径（上传完成后被重命名时传入）
+
+        Returns:
+            (是否成功, 说明)
+        """
+        self.cancel()
+        pdf_path = str(pdf_path or self.pdf_path)
+        early = dict(self._pages)
+        if self.info is None or os.path.getsize(pdf_path) != self.info.length:
+            early = {}
+
+        fitz = lazy_import("fitz")
+        cache = get_page_cache()
+        reused = hits = 0
+        with fitz.open(pdf_path) as doc, StreamingDocxWriter(str(output_path)) as writer:
+            fingerprinter = PageFingerprinter(doc)
+            for page in doc:
+                cached = early.get(page.number)
+                if cached is not None and cached[1] == page_signature(doc, page):
+                    write_page(writer, page, cache, fingerprinter, cached[0])
+                    reused += 1
+                else:
+                    hits += write_page(writer, page, cache, fingerprinter)
+            pages = doc.page_count
+        return True, f"快速文本转换完成: {pages} 页，其中 {reused} 页在上传期间完成，{hits} 页复用页面缓存"
+
+    def cancel(self) -> None:
+        """停止后台线程（上传中断或转换结束）"""
+        self._closed = True
+        self._wakeup.set()
+        if self._thread is not threading.current_thread():
+            self._thread.join()
+
+
+class IncrementalRegistry:
+    """分块上传与提前转换的对应关系（进程内；PATCH落到其他进程时退化为完整转换）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._active: Dict[str, IncrementalConversion] = {}
+
+    @staticmethod
+    def wants(upload) -> bool:
+        return upload.metadata.get("engine") == "fast"
+
+    def progress(self, upload, offset: int) -> None:
+        """chunked_upload 的 on_progress 回调"""
+        if not self.wants(upload):
+            return
+        with self._lock:
+            conversion = self._active.get(upload.id)
+            if conversion is None:
+                conversion = self._active[upload.id] = IncrementalConversion(upload.path)
+        conversion.feed(offset)
+
+    def convert(self, upload, output_path: Union[str, Path]) -> Tuple[bool, str]:
+        """上传完成后输出DOCX：复用提前转换的页面，没有时完整转换"""
+        with self._lock:
+            conversion = self._active.pop(upload.id, None)
+        if conversion is None:
+            return FastTextEngine().convert_file(str(upload.path), str(output_path), upload.filename)
+        return conversion.finish(output_path, upload.path)
+
+    def discard(self, upload_id: str) -> None:
+        with self._lock:
+            conversion = self._active.pop(upload_id, None)
+        if conversion is not None:
+            conversion.cancel()
+
+
+_registry = IncrementalRegistry()
+
+
+def run_tracked(convert: Callable[[Union[str, Path]], Tuple[bool, str]], output_path: Union[str, Path],
+                bytes_in: int, engine: str = "fast") -> Tuple[bool, str]:
+    """
+    执行快速引擎转换并记录与其他引擎相同的指标（在转换线程池中调用）
+
+    Args:
+        convert: convert(output_path) -> (是否成功, 说明)
+        output_path: 输出DOCX路径
+        bytes_in: 输入文件大小
+    """
+    from . import metrics, tracing
+
+    start = time.perf_counter()
+    success = False
+    try:
+        with tracing.span(f"engine.{engine}", bytes_in=bytes_in), \
+                metrics.INFLIGHT_JOBS.track(engine=engine), \
+                metrics.stage_timer(metrics.STAGE_CONVERSION, engine):
+            success, message = convert(output_path)
+        return success, message
+    finally:
+        metrics.record_conversion(engine, success, time.perf_counter() - start, bytes_in=bytes_in,
+                                  bytes_out=os.path.getsize(output_path) if success and os.path.exists(output_path) else 0)
+
+
+async def convert_in_pool(convert: Callable[[Union[str, Path]], Tuple[bool, str]], output_path: Union[str, Path],
+                          pdf_path: Union[str, Path], client: Optional[str] = None) -> Tuple[bool, str]:
+    """
+    经共享转换线程池执行快速引擎转换：与其他转换一样受并发上限约束，按估计成本与客户端公平调度
+
+    Args:
+        convert: convert(output_path) -> (是否成功, 说明)
+        output_path: 输出DOCX路径
+        pdf_path: 完整的输入文件（估计成本）
+        client: 客户端标识（job_api.client_key）
+    """
+    from fastapi.concurrency import run_in_threadpool
+
+    from .conversion_pool import get_pool
+    from .prescan import estimate_cost
+
+    cost = await run_in_threadpool(estimate_cost, pdf_path)
+    return await get_pool().run(run_tracked, convert, output_path, os.path.getsize(pdf_path),
+                                cost=cost, client=client)
+
+
+def get_registry() -> IncrementalRegistry:
+    return _registry
+
+
+def install(app, store=None, max_bytes: int = 50 * 1024 * 1024) -> None:
+    """
+    注册 POST /api/convert/incremental
+
+    Args:
+        app: FastAPI应用
+        store: 结果存储，默认 result_store.get_store()
+        max_bytes: 请求体大小上限
+    """
+    from fastapi import HTTPException, Request
+    from fastapi.concurrency import run_in_threadpool
+
+    from . import metrics, tracing
+    from .file_response import RangeFileResponse
+    from .job_api import client_key
+    from .result_store import get_store
+    from .staging import get_staging
+
+    store = store or get_store()
+
+    @app.post("/api/convert/incremental")
+    async def convert_incremental(request: Request):
+        """请求体为PDF原始字节，边接收边转换（快速文本引擎）"""
+        filename = os.path.basename(request.headers.get("x-filename") or "document.pdf")
+        if not filename.lower().endswith(".pdf"):
+            raise HTTPException(status_code=400, detail="只支持PDF文件")
+        expected = int(request.headers.get("content-length") or 0)
+        if expected > max_bytes:
+            raise HTTPException(status_code=413, detail=f"文件大小不能超过{max_bytes // (1024 * 1024)}MB")
+
+        job = get_staging().job(expected)
+        pdf_path = job.path_for("input.pdf")
+        conversion = IncrementalConversion(pdf_path)
+        try:
+            # 无缓冲写入，后台线程随时能读到已接收的部分
+            target = open(pdf_path, "wb", buffering=0)
+            received = 0
+            try:
+                with tracing.span("upload.spool"), metrics.stage_timer(metrics.STAGE_UPLOAD):
+                    buffer = bytearray()
+                    async for data in request.stream():
+                        buffer += data
+                        if received + len(buffer) > max_bytes:
+                            raise HTTPException(status_code=413,
+                                                detail=f"文件大小不能超过{max_bytes // (1024 * 1024)}MB")
+                        if len(buffer) >= WRITE_BUFFER:
+                            await run_in_threadpool(target.write, bytes(buffer))
+                            received += len(buffer)
+                            buffer.clear()
+                            conversion.feed(received)
+                    if buffer:
+                        await run_in_threadpool(target.write, bytes(buffer))
+                        received += len(buffer)
+            finally:
+                target.close()
+            if received == 0:
+                raise HTTPException(status_code=400, detail="文件为空")
+
+            output_path = job.path_for("output.docx")
+            try:
+                success, message = await convert_in_pool(conversion.finish, output_path, pdf_path,
+                                                         client_key(request))
+            except Exception as e:
+                logger.error(f"边上传边转换失败: {filename} - {e}")
+                # 请求体不是有效的PDF时属于客户端错误
+                fitz = lazy_import("fitz")
+                invalid = isinstance(e, getattr(fitz, "FileDataError", ()))
+                raise HTTPException(
+                    status_code=422 if invalid else 500,
+                    detail={"error": "CONVERSION_FAILED", "message": f"转换失败: {e}"}
+                )
+            if not success:
+                raise HTTPException(status_code=500, detail={"error": "CONVERSION_FAILED", "message": message})
+            logger.info(f"边上传边转换: {filename} - {message}")
+
+            output_filename = f"{os.path.splitext(filename)[0]}.docx"
+            with tracing.span("output.publish"), metrics.stage_timer(metrics.STAGE_POSTPROCESS, "fast"):
+                entry = await run_in_threadpool(store.put, output_path, output_filename)
+            return RangeFileResponse.from_result(entry, headers={
+                "X-Result-Id": entry.id,
+                "Content-Location": entry.download_url,
+                "X-Pages-Converted-During-Upload": str(conversion.pages_ready),
+            })
+        finally:
+            await run_in_threadpool(conversion.cancel)
+            job.cleanup()
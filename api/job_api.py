@@ -0,0 +1,168 @@
+"""
+异步作业API
+    POST /api/jobs                  上传PDF并入队，立即返回作业ID (202)
+    GET  /api/jobs                  队列统计
+    GET  /api/jobs/{job_id}         作业状态
+    GET  /api/jobs/{job_id}/result  下载结果（支持Range与ETag）
+
+客户端标识（调度器按它做公平分配）只采用可信的来源：X-API-Key 必须是配置的密钥之一，
+X-Forwarded-For 只在连接来自配置的反向代理时采用，否则一律使用连接的来源IP
+（客户端随意更换这两个头就能获得新的配额）。
+
+环境变量:
+    PDF2WORD_API_KEYS           有效的API密钥（逗号分隔，默认无）
+    PDF2WORD_TRUSTED_PROXIES    可信反向代理的地址或网段（逗号分隔，如 127.0.0.1,10.0.0.0/8，默认无）
+"""
+
+import ipaddress
+import logging
+import os
+from typing import Optional
+
+from . import metrics, tracing
+from .job_queue import DONE, get_queue, new_job_id
+from .prescan import estimate_cost
+
+logger = logging.getLogger(__name__)
+
+MAX_UPLOAD_BYTES = 50 * 1024 * 1024
+
+
+API_KEYS = frozenset(key.strip() for key in os.getenv("PDF2WORD_API_KEYS", "").split(",") if key.strip())
+
+
+def _parse_networks(value: str) -> tuple:
+    networks = []
+    for item in value.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        try:
+            networks.append(ipaddress.ip_network(item, strict=False))
+        except ValueError:
+            logger.warning(f"忽略无效的代理地址: {item}")
+    return tuple(networks)
+
+
+TRUSTED_PROXIES = _parse_networks(os.getenv("PDF2WORD_TRUSTED_PROXIES", ""))
+
+
+def _is_trusted_proxy(host: str) -> bool:
+    try:
+        address = ipaddress.ip_address(host)
+    except ValueError:
+        return False
+    return any(address in network for network in TRUSTED_PROXIES)
+
+
+def client_key(request) -> str:
+    """
+    客户端标识：已配置的 X-API-Key，否则为来源IP
+    经可信代理转发时取 X-Forwarded-For 中从右往左第一个不是可信代理的地址
+    """
+    api_key = request.headers.get("x-api-key")
+    if api_key and api_key in API_KEYS:
+        return f"key:{api_key}"
+    host = request.client.host if request.client else "unknown"
+    if _is_trusted_proxy(host):
+        forwarded = [part.strip() for part in request.headers.get("x-forwarded-for", "").split(",") if part.strip()]
+        for address in reversed(forwarded):
+            host = address
+            if not _is_trusted_proxy(address):
+                break
+    return f"ip:{host}"
+
+
+def install(app, engine: str, store=None, embedded_workers: Optional[int] = None) -> None:
+    """
+    注册作业API，并按配置在本进程内启动转换线程
+
+    Args:
+        app: FastAPI应用
+        engine: 作业使用的转换引擎（见 conversion_worker.ENGINES）
+        store: 结果存储，默认 result_store.get_store()；独立转换进程需通过
+            PDF2WORD_RESULT_DIR 指向同一目录
+        embedded_workers: 内嵌转换线程数，默认读取 PDF2WORD_EMBEDDED_WORKERS
+    """
+    from fastapi import File, HTTPException, Request, UploadFile
+    from fastapi.concurrency import run_in_threadpool
+    from fastapi.responses import JSONResponse
+
+    from .conversion_worker import start_embedded_workers
+    from .file_response import RangeFileResponse
+    from .result_store import get_store
+
+    store = store or get_store()
+
+    @app.on_event("startup")
+    async def start_job_workers():
+        threads = start_embedded_workers(embedded_workers, store=store)
+        if threads:
+            logger.info(f"已启动 {len(threads)} 个内嵌转换线程")
+
+    @app.post("/api/jobs", status_code=202)
+    async def submit_job(request: Request, file: UploadFile = File(...)):
+        """上传PDF并创建转换作业"""
+        if not file.filename or not file.filename.lower().endswith(".pdf"):
+            raise HTTPException(status_code=400, detail="只支持PDF文件")
+
+        queue = get_queue()
+        job_id = new_job_id()
+        input_path = queue.input_path_for(job_id)
+
+        def spool() -> int:
+            written = 0
+            with open(input_path, "wb") as target:
+                for chunk in iter(lambda: file.file.read(1024 * 1024), b""):
+                    written += len(chunk)
+                    if written > MAX_UPLOAD_BYTES:
+                        raise ValueError("文件大小不能超过50MB")
+                    target.write(chunk)
+            return written
+
+        try:
+            with tracing.span("upload.spool"), metrics.stage_timer(metrics.STAGE_UPLOAD):
+                size = await run_in_threadpool(spool)
+        except ValueError as e:
+            input_path.unlink(missing_ok=True)
+            raise HTTPException(status_code=400, detail=str(e))
+        if size == 0:
+            input_path.unlink(missing_ok=True)
+            raise HTTPException(status_code=400, detail="文件为空")
+
+        # 入队前估计成本（Redis队列入队后删除本地输入），工作进程按它决定领取顺序
+        cost = await run_in_threadpool(estimate_cost, input_path)
+        job = await run_in_threadpool(
+            queue.enqueue, job_id, engine, file.filename, input_path, "docx", client_key(request),
+            trace=tracing.get_context(), cost=cost
+        )
+        logger.info(f"作业入队: {job.id} ({file.filename}, {size} bytes)")
+        data = job.to_dict()
+        data["status_url"] = f"/api/jobs/{job.id}"
+        return JSONResponse(status_code=202, content=data, headers={"Location": data["status_url"]})
+
+    @app.get("/api/jobs")
+    async def job_stats():
+        """队列统计（所有Web进程与转换进程共享）"""
+        return await run_in_threadpool(get_queue().stats)
+
+    @app.get("/api/jobs/{job_id}")
+    async def job_status(job_id: str):
+        """查询作业状态"""
+        job = await run_in_threadpool(get_queue().get, job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail="作业不存在")
+        return job.to_dict()
+
+    @app.get("/api/jobs/{job_id}/result")
+    async def job_result(job_id: str):
+        """下载作业结果"""
+        job = await run_in_threadpool(get_queue().get, job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail="作业不存在")
+        if job.status != DONE:
+            raise HTTPException(status_code=409, detail=f"作业尚未完成: {job.status}")
+        entry = await run_in_threadpool(get_queue().fetch_result, job, store)
+        if entry is None:
+            raise HTTPException(status_code=410, detail="结果已过期")
+        return RangeFileResponse.from_result(entry, headers={"X-Job-Id": job.id})
@@ -0,0 +1,374 @@
+"""
+转换作业队列
+Web进程只负责接收上传并入队，转换工作进程按自身容量领取作业，
+两者可以独立扩展（多个uvicorn worker + 多个转换进程共享同一个队列）
+
+后端:
+    SQLiteJobQueue   单机共享：WAL模式的SQLite数据库，支持多进程并发读写
+    RedisJobQueue    多节点共享：Redis协议（见 redis_job_queue.py），输入与结果经Redis在节点间传递
+
+作业在领取后需要定期心跳；超过可见性超时未心跳的作业视为工作进程崩溃，
+重新入队重试，超过最大尝试次数后标记为失败
+
+领取顺序与进程内转换线程池相同（scheduler.wsjf_priority）：入队时保存预扫描的估计成本，
+在最早入队的 CLAIM_WINDOW 个作业中选优先级最高者——小文件优先，等待越久优先级越高，
+同一客户端运行中的作业越多优先级越低
+
+环境变量:
+    PDF2WORD_QUEUE_URL          队列地址：redis://host:6379/0 或 fakeredis://（本地测试）；未设置时使用SQLite
+    PDF2WORD_QUEUE_DIR          队列数据目录（数据库与待转换输入，默认: 系统临时目录/pdf2word_queue）
+    PDF2WORD_JOB_VISIBILITY     可见性超时秒数（默认 120）
+    PDF2WORD_JOB_MAX_ATTEMPTS   最大尝试次数（默认 3）
+"""
+
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+from dataclasses import asdict, dataclass, fields
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Tuple, Union
+
+from .scheduler import wsjf_priority
+
+QUEUE_DIR = os.getenv("PDF2WORD_QUEUE_DIR", os.path.join(tempfile.gettempdir(), "pdf2word_queue"))
+VISIBILITY_TIMEOUT = float(os.getenv("PDF2WORD_JOB_VISIBILITY", "120"))
+MAX_ATTEMPTS = int(os.getenv("PDF2WORD_JOB_MAX_ATTEMPTS", "3"))
+
+# 每次领取时参与排序的最早入队作业数（老化保证窗口外的作业最终会进入窗口）
+CLAIM_WINDOW = 256
+
+# 作业状态
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+@dataclass
+class Job:
+    """一个转换作业"""
+    id: str
+    status: str
+    engine: str
+    filename: str
+    input_path: str
+    output_format: str = "docx"
+    client: Optional[str] = None
+    created: float = 0.0
+    started: Optional[float] = None
+    finished: Optional[float] = None
+    heartbeat: Optional[float] = None
+    worker: Optional[str] = None
+    attempts: int = 0
+    result_id: Optional[str] = None
+    message: Optional[str] = None
+    error: Optional[str] = None
+    progress: float = 0.0
+    cost: float = 1.0                    # 预扫描估计的转换成本（prescan.estimate_cost）
+    trace_id: Optional[str] = None       # 入队请求的追踪上下文，工作进程中的span归入同一trace
+    trace_parent: Optional[str] = None
+
+    @property
+    def trace_context(self) -> Optional[Dict[str, Optional[str]]]:
+        """传给 tracing.attach() 的追踪上下文"""
+        if not self.trace_id:
+            return None
+        return {"trace_id": self.trace_id, "parent_id": self.trace_parent}
+
+    @property
+    def output_name(self) -> str:
+        """结果的下载文件名"""
+        return f"{os.path.splitext(self.filename)[0]}.{self.output_format}"
+
+    def to_dict(self) -> Dict[str, Any]:
+        """对外展示的作业信息（不含服务器内部路径）"""
+        data = asdict(self)
+        data.pop("input_path")
+        data.pop("trace_parent")
+        if self.status == DONE:
+            data["result_url"] = f"/api/jobs/{self.id}/result"
+        return data
+
+
+_COLUMNS = [field.name for field in fields(Job)]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    engine TEXT NOT NULL,
+    filename TEXT NOT NULL,
+    input_path TEXT NOT NULL,
+    output_format TEXT NOT NULL DEFAULT 'docx',
+    client TEXT,
+    created REAL NOT NULL,
+    started REAL,
+    finished REAL,
+    heartbeat REAL,
+    worker TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    result_id TEXT,
+    message TEXT,
+    error TEXT,
+    progress REAL NOT NULL DEFAULT 0,
+    cost REAL NOT NULL DEFAULT 1,
+    trace_id TEXT,
+    trace_parent TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_status_created ON jobs (status, created);
+"""
+
+
+def new_job_id() -> str:
+    return uuid.uuid4().hex
+
+
+def pick_next(queued: Iterable[Tuple[str, float, float, Optional[str]]],
+              running: Dict[Optional[str], int], now: float) -> str:
+    """
+    从待领取作业中选出优先级最高者（同优先级时先入队者优先）
+
+    Args:
+        queued: 按入队时间排序的 (作业ID, 入队时间, 估计成本, 客户端)
+        running: 各客户端运行中的作业数
+        now: 当前时间（与入队时间同为 time.time()）
+
+    Returns:
+        作业ID
+    """
+    best_id, best = None, None
+    for job_id, created, cost, client in queued:
+        priority = wsjf_priority(cost, now - created, running.get(client, 0))
+        if best is None or priority > best:
+            best_id, best = job_id, priority
+    return best_id
+
+
+class SQLiteJobQueue:
+    """基于SQLite WAL的作业队列，同一节点上的多个进程共享"""
+
+    def __init__(self, root: Union[str, Path] = QUEUE_DIR, visibility_timeout: float = VISIBILITY_TIMEOUT,
+                 max_attempts: int = MAX_ATTEMPTS):
+        """
+        Args:
+            root: 数据目录（queue.db 与 inputs/）
+            visibility_timeout: 心跳超时秒数
+            max_attempts: 最大尝试次数
+        """
+        self.root = Path(root)
+        self.input_dir = self.root / "inputs"
+        self.input_dir.mkdir(parents=True, exist_ok=True)
+        self.db_path = self.root / "queue.db"
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max_attempts
+        self._local = threading.local()
+        conn = self._connect()
+        conn.executescript(_SCHEMA)
+        columns = {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}
+        if "progress" not in columns:
+            conn.execute("ALTER TABLE jobs ADD COLUMN progress REAL NOT NULL DEFAULT 0")
+        if "cost" not in columns:
+            conn.execute("ALTER TABLE jobs ADD COLUMN cost REAL NOT NULL DEFAULT 1")
+        for column in ("trace_id", "trace_parent"):
+            if column not in columns:
+                conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} TEXT")
+
+    def _connect(self) -> sqlite3.Connection:
+        """每个线程一个连接；isolation_level=None 时由代码显式控制事务"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.db_path), timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def input_path_for(self, job_id: str) -> Path:
+        """作业输入文件的存放位置（所有进程可见）"""
+        return self.input_dir / f"{job_id}.pdf"
+
+    def enqueue(self, job_id: str, engine: str, filename: str, input_path: Union[str, Path],
+                output_format: str = "docx", client: Optional[str] = None,
+                trace: Optional[Dict[str, Optional[str]]] = None, cost: float = 1.0) -> Job:
+        """
+        作业入队
+
+        Args:
+            job_id: 作业ID（通常先用 new_job_id() 生成，以便把输入写到 input_path_for(job_id)）
+            engine: 转换引擎名（由工作进程解析）
+            filename: 原始文件名
+            input_path: 输入PDF路径
+            output_format: 输出格式
+            client: 客户端标识（IP或API Key）
+            trace: 入队请求的追踪上下文（tracing.get_context()）
+            cost: 估计成本（prescan.estimate_cost），决定领取顺序
+
+        Returns:
+            Job
+        """
+        trace = trace or {}
+        job = Job(id=job_id, status=QUEUED, engine=engine, filename=filename, input_path=str(input_path),
+                  output_format=output_format, client=client, created=time.time(), cost=cost,
+                  trace_id=trace.get("trace_id"), trace_parent=trace.get("parent_id"))
+        data = asdict(job)
+        self._connect().execute(
+            f"INSERT INTO jobs ({', '.join(_COLUMNS)}) VALUES ({', '.join('?' * len(_COLUMNS))})",
+            [data[name] for name in _COLUMNS]
+        )
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        row = self._connect().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return Job(**dict(row)) if row else None
+
+    def claim(self, worker_id: str) -> Optional[Job]:
+        """
+        按WSJF优先级领取作业（同时回收心跳超时的作业）
+
+        Returns:
+            领取到的作业，队列为空时返回None
+        """
+        conn = self._connect()
+        now = time.time()
+        # BEGIN IMMEDIATE 取得写锁，多个进程同时领取时不会拿到同一个作业
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._reclaim_stale(conn, now)
+            queued = conn.execute(
+                "SELECT id, created, cost, client FROM jobs WHERE status = ? ORDER BY created LIMIT ?",
+                (QUEUED, CLAIM_WINDOW)
+            ).fetchall()
+            if not queued:
+                conn.execute("COMMIT")
+                return None
+            running = dict(conn.execute(
+                "SELECT client, COUNT(*) FROM jobs WHERE status = ? GROUP BY client", (RUNNING,)
+            ).fetchall())
+            job_id = pick_next(((row["id"], row["created"], row["cost"], row["client"]) for row in queued),
+                               running, now)
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            conn.execute(
+                "UPDATE jobs SET status = ?, worker = ?, started = ?, heartbeat = ?, attempts = attempts + 1 "
+                "WHERE id = ?",
+                (RUNNING, worker_id, now, now, row["id"])
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        job = Job(**dict(row))
+        job.status, job.worker, job.started, job.heartbeat = RUNNING, worker_id, now, now
+        job.attempts += 1
+        return job
+
+    def _reclaim_stale(self, conn: sqlite3.Connection, now: float) -> None:
+        """心跳超时的作业：未超过最大尝试次数时重新入队，否则标记失败"""
+        deadline = now - self.visibility_timeout
+        conn.execute(
+            "UPDATE jobs SET status = ?, worker = NULL WHERE status = ? AND heartbeat < ? AND attempts < ?",
+            (QUEUED, RUNNING, deadline, self.max_attempts)
+        )
+        conn.execute(
+            "UPDATE jobs SET status = ?, finished = ?, error = ? WHERE status = ? AND heartbeat < ?",
+            (FAILED, now, "工作进程多次未响应，已放弃", RUNNING, deadline)
+        )
+
+    def heartbeat(self, job_id: str, worker_id: str) -> bool:
+        """续约；返回False表示作业已被回收（不再属于该工作进程）"""
+        cursor = self._connect().execute(
+            "UPDATE jobs SET heartbeat = ? WHERE id = ? AND worker = ? AND status = ?",
+            (time.time(), job_id, worker_id, RUNNING)
+        )
+        return cursor.rowcount == 1
+
+    def progress(self, job_id: str, worker_id: str, progress: float, message: Optional[str] = None) -> bool:
+        """更新作业进度（0~1）"""
+        cursor = self._connect().execute(
+            "UPDATE jobs SET progress = ?, message = COALESCE(?, message) WHERE id = ? AND worker = ? AND status = ?",
+            (progress, message, job_id, worker_id, RUNNING)
+        )
+        return cursor.rowcount == 1
+
+    def complete(self, job_id: str, worker_id: str, result_id: str, message: str = "") -> bool:
+        cursor = self._connect().execute(
+            "UPDATE jobs SET status = ?, finished = ?, result_id = ?, message = ?, error = NULL, progress = 1 "
+            "WHERE id = ? AND worker = ? AND status = ?",
+            (DONE, time.time(), result_id, message, job_id, worker_id, RUNNING)
+        )
+        return cursor.rowcount == 1
+
+    def fail(self, job_id: str, worker_id: str, error: str, retry: bool = False) -> bool:
+        """
+        标记作业失败
+
+        Args:
+            retry: 是否允许重试（临时性错误；转换本身失败时不重试）
+        """
+        conn = self._connect()
+        if retry:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = ?, worker = NULL, error = ? "
+                "WHERE id = ? AND worker = ? AND status = ? AND attempts < ?",
+                (QUEUED, error, job_id, worker_id, RUNNING, self.max_attempts)
+            )
+            if cursor.rowcount == 1:
+                return True
+        cursor = conn.execute(
+            "UPDATE jobs SET status = ?, finished = ?, error = ? WHERE id = ? AND worker = ? AND status = ?",
+            (FAILED, time.time(), error, job_id, worker_id, RUNNING)
+        )
+        return cursor.rowcount == 1
+
+    def publish_result(self, job_id: str, entry) -> None:
+        """结果存储与Web进程共享同一磁盘，无需额外发布"""
+
+    def fetch_result(self, job: Job, store):
+        """取回作业结果（StoredResult），已过期时返回None"""
+        return store.get(job.result_id, job.output_name)
+
+    def release_input(self, job: Job) -> None:
+        """作业结束（完成或最终失败）后删除输入；等待重试的作业保留输入"""
+        current = self.get(job.id)
+        if current is not None and current.status in (DONE, FAILED):
+            try:
+                os.unlink(job.input_path)
+            except OSError:
+                pass
+
+    def stats(self) -> Dict[str, int]:
+        """各状态的作业数（所有进程共享，替代各进程各自的内存统计）"""
+        rows = self._connect().execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status").fetchall()
+        counts = {QUEUED: 0, RUNNING: 0, DONE: 0, FAILED: 0}
+        counts.update({row["status"]: row["n"] for row in rows})
+        return counts
+
+    def purge(self, older_than: float) -> int:
+        """删除早于指定秒数前结束的作业记录"""
+        cursor = self._connect().execute(
+            "DELETE FROM jobs WHERE status IN (?, ?) AND finished < ?",
+            (DONE, FAILED, time.time() - older_than)
+        )
+        return cursor.rowcount
+
+
+_default = None
+_default_lock = threading.Lock()
+
+
+def get_queue():
+    """进程级默认作业队列（由 PDF2WORD_QUEUE_URL 选择后端）"""
+    global _default
+    if _default is None:
+        with _default_lock:
+            if _default is None:
+                url = os.getenv("PDF2WORD_QUEUE_URL", "")
+                if url:
+                    from .redis_job_queue import RedisJobQueue
+                    _default = RedisJobQueue.from_url(url)
+                else:
+                    _default = SQLiteJobQueue()
+    return _default
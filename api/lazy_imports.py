@@ -0,0 +1,81 @@
+"""
+重型依赖的延迟导入与预热
+服务启动时只导入FastAPI本身，pandas/pdf2docx/fitz/openpyxl 在首次使用时导入，
+或在端口绑定后由后台线程预热
+"""
+
+import importlib
+import logging
+import os
+import threading
+import time
+from types import ModuleType
+from typing import Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+# 转换路径上导入耗时最多的库
+HEAVY_MODULES = ("pdf2docx", "fitz", "pandas", "openpyxl")
+
+# 预热延迟（秒）：让uvicorn先完成端口绑定再占用CPU导入模块
+PREWARM_DELAY = float(os.getenv("PREWARM_DELAY", "1.0"))
+
+_import_times: Dict[str, float] = {}
+_lock = threading.Lock()
+
+
+def lazy_import(name: str) -> ModuleType:
+    """
+    导入模块并记录首次导入耗时
+
+    Args:
+        name: 模块名
+
+    Returns:
+        已导入的模块（重复调用直接返回 sys.modules 中的缓存）
+    """
+    start = time.perf_counter()
+    module = importlib.import_module(name)
+    with _lock:
+        if name not in _import_times:
+            _import_times[name] = time.perf_counter() - start
+    return module
+
+
+def _prewarm(modules: Iterable[str], delay: float) -> None:
+    if delay > 0:
+        time.sleep(delay)
+    for name in modules:
+        try:
+            lazy_import(name)
+            logger.info(f"预热模块完成: {name} ({_import_times.get(name, 0.0) * 1000:.0f}ms)")
+        except ImportError as e:
+            logger.warning(f"预热模块失败: {name} ({e})")
+
+
+def start_prewarm(modules: Iterable[str] = HEAVY_MODULES,
+                  delay: Optional[float] = None) -> threading.Thread:
+    """
+    在后台守护线程中预热重型模块
+
+    Args:
+        modules: 需要预热的模块名
+        delay: 开始导入前的等待时间，默认取 PREWARM_DELAY
+
+    Returns:
+        预热线程
+    """
+    thread = threading.Thread(
+        target=_prewarm,
+        args=(tuple(modules), PREWARM_DELAY if delay is None else delay),
+        name="module-prewarm",
+        daemon=True
+    )
+    thread.start()
+    return thread
+
+
+def get_import_times() -> Dict[str, float]:
+    """返回各模块首次导入耗时（秒）"""
+    with _lock:
+        return dict(_import_times)
@@ -1,15 +1,19 @@
 """
 LibreOffice混合转换器
-优先使用LibreOffice，失败时回退到PyPDF2
+扫描件使用本地OCR，其余优先使用LibreOffice，失败时回退到PyPDF2
 """
 
 import logging
-from typing import Tuple, Dict, Any
+import os
+import threading
+import time
+from typing import Tuple, Dict, Any, Optional
 from .libreoffice_converter import LibreOfficeConverter
-import PyPDF2
-from docx import Document
-from docx.shared import Inches
-import io
+from .ocr_engine import OcrEngine, should_ocr
+from .streaming_docx_writer import StreamingDocxWriter
+from . import metrics, style_dedup
+from .staging import get_staging
+from .tracing import span
 import re
 
 logger = logging.getLogger(__name__)
@@ -19,29 +23,48 @@ class LibreHybridConverter:
     
     def __init__(self):
         self.libreoffice = LibreOfficeConverter()
+        self.ocr = OcrEngine()
         self.stats = {
             "total_conversions": 0,
+            "ocr_success": 0,
             "libreoffice_success": 0,
             "pypdf2_fallback": 0,
             "total_failures": 0
         }
+        self._stats_lock = threading.Lock()
     
-    def get_status(self) -> Dict[str, Any]:
-        """获取转换器状态"""
-        libreoffice_status = self.libreoffice.check_installation()
+    def _count(self, key: str) -> None:
+        """线程安全地累加统计"""
+        with self._stats_lock:
+            self.stats[key] += 1
+    
+    def start_discovery(self) -> None:
+        """后台探测LibreOffice"""
+        self.libreoffice.start_discovery()
+    
+    def get_status(self, wait: bool = True) -> Dict[str, Any]:
+        """
+        获取转换器状态
+        
+        Args:
+            wait: LibreOffice探测未完成时是否等待
+        """
+        libreoffice_status = self.libreoffice.check_installation(wait=wait)
         
         return {
             "libreoffice": libreoffice_status,
             "pypdf2_available": True,  # PyPDF2总是可用的
             "preferred_method": "LibreOffice" if libreoffice_status["installed"] else "PyPDF2",
-            "conversion_stats": self.stats.copy()
+            "conversion_stats": self._stats_snapshot()
         }
     
+    def _stats_snapshot(self) -> Dict[str, int]:
+        with self._stats_lock:
+            return self.stats.copy()
+    
     def convert_pdf_to_docx(self, pdf_content: bytes, filename: str = "document.pdf") -> Tuple[bool, bytes, str]:
         """
-        智能PDF到DOCX转换
-        1. 优先尝试LibreOffice（高质量）
-        2. 失败时回退到PyPDF2（基础质量）
+        智能PDF到DOCX转换（字节接口，内部经暂存区调用 convert_file）
         
         Args:
             pdf_content: PDF文件字节内容
@@ -50,17 +73,57 @@ class LibreHybridConverter:
         Returns:
             (success, docx_content, message)
         """
-        self.stats["total_conversions"] += 1
+        with get_staging().job(len(pdf_content)) as job:
+            pdf_path = job.write("input.pdf", pdf_content)
+            output_path = job.path_for("output.docx")
+            success, message = self.convert_file(str(pdf_path), str(output_path), filename)
+            if not success:
+                return False, b"", message
+            return True, output_path.read_bytes(), message
+    
+    def convert_file(self, pdf_path: str, output_path: str, filename: Optional[str] = None) -> Tuple[bool, str]:
+        """
+        智能PDF到DOCX转换
+        1. 扫描件（大部分页面没有文本层）使用本地OCR
+        2. 优先尝试LibreOffice（高质量）
+        3. 失败时回退到PyPDF2（基础质量）
+        
+        Args:
+            pdf_path: 输入PDF路径
+            output_path: 输出DOCX路径
+            filename: 原始文件名
+            
+        Returns:
+            (success, message)
+        """
+        filename = filename or os.path.basename(pdf_path)
+        self._count("total_conversions")
+        
+        with span("prescan"), metrics.stage_timer(metrics.STAGE_PRESCAN):
+            page_count = self._count_pages(pdf_path)
+        
+        # 扫描件：LibreOffice与PyPDF2只能得到图片或空白页，改用OCR
+        with span("prescan.classify"), metrics.stage_timer(metrics.STAGE_PRESCAN):
+            scanned = should_ocr(pdf_path)
+        if scanned:
+            logger.info("Scanned document detected, using OCR...")
+            success, message = self._run_engine("ocr", self.ocr.convert_file, pdf_path, output_path, filename, page_count)
+            if success:
+                self._count("ocr_success")
+                return True, f"✅ OCR识别成功 (Tesseract): {message}"
+            logger.warning(f"OCR conversion failed: {message}")
         
         # 尝试LibreOffice转换
         if self.libreoffice.is_available:
             logger.info("Attempting LibreOffice conversion...")
-            success, docx_content, message = self.libreoffice.convert_pdf_to_docx(pdf_content, filename)
+            success, message = self._run_engine(
+                "libreoffice", self.libreoffice.convert_file, pdf_path, output_path, filename, page_count
+            )
             
             if success:
-                self.stats["libreoffice_success"] += 1
+                self._count("libreoffice_success")
                 logger.info("LibreOffice conversion successful")
-                return True, docx_content, f"✅ 高质量转换成功 (LibreOffice): {message}"
+                return True, f"✅ 高质量转换成功 (LibreOffice): {message}"
             else:
                 logger.warning(f"LibreOffice conversion failed: {message}")
         else:
@@ -68,87 +131,110 @@ class LibreHybridConverter:
         
         # 回退到PyPDF2转换
         logger.info("Using PyPDF2 fallback conversion...")
-        success, docx_content, message = self._convert_with_pypdf2(pdf_content, filename)
+        success, message = self._run_engine(
+            "pypdf2", self._convert_with_pypdf2, pdf_path, output_path, filename, page_count
+        )
         
         if success:
-            self.stats["pypdf2_fallback"] += 1
+            self._count("pypdf2_fallback")
             logger.info("PyPDF2 fallback conversion successful")
-            return True, docx_content, f"⚠️  基础转换成功 (PyPDF2): {message}"
+            return True, f"⚠️  基础转换成功 (PyPDF2): {message}"
         else:
-            self.stats["total_failures"] += 1
+            self._count("total_failures")
             logger.error(f"All conversion methods failed: {message}")
-            return False, b"", f"❌ 转换失败: {message}"
+            return False, f"❌ 转换失败: {message}"
+    
+    def _run_engine(self, engine: str, convert, pdf_path: str, output_path: str, filename: str,
+                    page_count: Optional[int]) -> Tuple[bool, str]:
+        """执行单个引擎并记录耗时、吞吐和字节数指标"""
+        bytes_in = os.path.getsize(pdf_path)
+        start = time.perf_counter()
+        with span(f"engine.{engine}", filename=filename, bytes_in=bytes_in, pages=page_count) as engine_span, \
+                metrics.INFLIGHT_JOBS.track(engine=engine), \
+                metrics.stage_timer(metrics.STAGE_CONVERSION, engine):
+            success, message = convert(pdf_path, output_path, filename)
+            engine_span.set_attribute("success", success)
+        if success:
+            style_dedup.postprocess(output_path, engine)
+        metrics.record_conversion(
+            engine, success, time.perf_counter() - start,
+            bytes_in=bytes_in, bytes_out=os.path.getsize(output_path) if success else 0, pages=page_count
+        )
+        return success, message
+    
+    def _count_pages(self, pdf_path: str) -> Optional[int]:
+        """预扫描页数，用于吞吐量指标；解析失败时返回None"""
+        try:
+            import PyPDF2
+            return len(PyPDF2.PdfReader(pdf_path).pages)
+        except Exception as e:
+            logger.debug(f"预扫描页数失败: {e}")
+            return None
     
-    def _convert_with_pypdf2(self, pdf_content: bytes, filename: str) -> Tuple[bool, bytes, str]:
+    def _convert_with_pypdf2(self, pdf_path: str, output_path: str, filename: str) -> Tuple[bool, str]:
         """
         使用PyPDF2进行基础PDF转换
         增强版：支持基础格式、段落识别、表格处理
+        逐页写入流式DOCX，内存占用不随页数增长
         """
         try:
-            # 读取PDF
-            pdf_stream = io.BytesIO(pdf_content)
-            pdf_reader = PyPDF2.PdfReader(pdf_stream)
-            
-            if len(pdf_reader.pages) == 0:
-                return False, b"", "PDF文件没有页面"
+            # PyPDF2只在回退路径使用，首次调用时再导入
+            import PyPDF2
             
-            # 创建Word文档
-            doc = Document()
+            # 读取PDF
+            pdf_reader = PyPDF2.PdfReader(pdf_path)
+            page_count = len(pdf_reader.pages)
             
-            # 添加标题
-            title = doc.add_heading('转换文档', 0)
-            title.alignment = 1  # 居中对齐
+            if page_count == 0:
+                return False, "PDF文件没有页面"
             
-            total_text = ""
+            total_chars = 0
             
-            # 逐页处理
-            for page_num, page in enumerate(pdf_reader.pages, 1):
-                try:
-                    # 提取文本
-                    text = page.extract_text()
-                    
-                    if text.strip():
-                        total_text += text + "\n"
+            with StreamingDocxWriter(output_path) as writer:
+                # 添加标题
+                writer.add_heading('转换文档', 0, align="center")
+                
+                # 逐页处理
+                for page_num, page in enumerate(pdf_reader.pages, 1):
+                    try:
+                        # 提取文本
+                        text = page.extract_text()
                         
-                        # 添加页面标题
-                        if len(pdf_reader.pages) > 1:
-                            page_heading = doc.add_heading(f'第 {page_num} 页', level=2)
-                            page_heading.alignment = 0  # 左对齐
+                        if text.strip():
+                            total_chars += len(text) + 1
+                            
+                            # 添加页面标题
+                            if page_count > 1:
+                                writer.add_heading(f'第 {page_num} 页', level=2, align="left")
+                            
+                            # 处理文本内容
+                            self._process_text_content(writer, text)
                         
-                        # 处理文本内容
-                        self._process_text_content(doc, text)
-                    
-                except Exception as e:
-                    logger.warning(f"处理第{page_num}页时出错: {e}")
-                    # 添加错误页面标记
-                    doc.add_paragraph(f"[第{page_num}页处理失败: {str(e)}]")
+                    except Exception as e:
+                        logger.warning(f"处理第{page_num}页时出错: {e}")
+                        # 添加错误页面标记
+                        writer.add_paragraph(f"[第{page_num}页处理失败: {str(e)}]")
+                
+                # 添加转换信息
+                writer.add_page_break()
+                writer.add_paragraph("转换信息:", bold=True)
+                writer.add_paragraph(f"• 原文件: {filename}")
+                writer.add_paragraph(f"• 页数: {page_count}")
+                writer.add_paragraph(f"• 转换方式: PyPDF2 基础转换")
+                writer.add_paragraph(f"• 字符数: {total_chars}")
+                writer.add_paragraph("• 注意: 此转换保留了文本内容，但可能丢失原始格式")
             
             # 检查是否成功提取到文本
-            if not total_text.strip():
-                return False, b"", "无法从PDF中提取文本内容"
-            
-            # 添加转换信息
-            doc.add_page_break()
-            info_para = doc.add_paragraph()
-            info_para.add_run("转换信息:").bold = True
-            doc.add_paragraph(f"• 原文件: {filename}")
-            doc.add_paragraph(f"• 页数: {len(pdf_reader.pages)}")
-            doc.add_paragraph(f"• 转换方式: PyPDF2 基础转换")
-            doc.add_paragraph(f"• 字符数: {len(total_text)}")
-            doc.add_paragraph("• 注意: 此转换保留了文本内容，但可能丢失原始格式")
-            
-            # 保存到字节流
-            docx_stream = io.BytesIO()
-            doc.save(docx_stream)
-            docx_content = docx_stream.getvalue()
+            if total_chars == 0:
+                return False, "无法从PDF中提取文本内容"
             
-            return True, docx_content, f"成功提取{len(total_text)}个字符，{len(pdf_reader.pages)}页内容"
+            return True, f"成功提取{total_chars}个字符，{page_count}页内容"
             
         except Exception as e:
             logger.error(f"PyPDF2转换失败: {e}")
-            return False, b"", f"PyPDF2转换错误: {str(e)}"
+            return False, f"PyPDF2转换错误: {str(e)}"
     
-    def _process_text_content(self, doc: Document, text: str):
+    def _process_text_content(self, writer: StreamingDocxWriter, text: str):
         """
         处理和格式化文本内容
         包括段落识别、表格检测、列表处理等
@@ -163,7 +249,7 @@ class LibreHybridConverter:
             if not line:
                 # 空行 - 结束当前段落
                 if current_paragraph:
-                    self._add_paragraph(doc, ' '.join(current_paragraph))
+                    self._add_paragraph(writer, ' '.join(current_paragraph))
                     current_paragraph = []
                 continue
             
@@ -171,35 +257,33 @@ class LibreHybridConverter:
             if self._is_likely_heading(line):
                 # 先完成当前段落
                 if current_paragraph:
-                    self._add_paragraph(doc, ' '.join(current_paragraph))
+                    self._add_paragraph(writer, ' '.join(current_paragraph))
                     current_paragraph = []
                 
                 # 添加标题
-                heading = doc.add_heading(line, level=3)
-                heading.alignment = 0
+                writer.add_heading(line, level=3, align="left")
                 continue
             
             # 检测列表项
             if self._is_list_item(line):
                 # 先完成当前段落
                 if current_paragraph:
-                    self._add_paragraph(doc, ' '.join(current_paragraph))
+                    self._add_paragraph(writer, ' '.join(current_paragraph))
                     current_paragraph = []
                 
                 # 添加列表项
-                self._add_list_item(doc, line)
+                self._add_list_item(writer, line)
                 continue
             
             # 检测表格行（简单检测）
             if self._is_table_row(line):
                 # 先完成当前段落
                 if current_paragraph:
-                    self._add_paragraph(doc, ' '.join(current_paragraph))
+                    self._add_paragraph(writer, ' '.join(current_paragraph))
                     current_paragraph = []
                 
                 # 添加表格行（作为段落，因为创建真正的表格比较复杂）
-                table_para = doc.add_paragraph(line)
-                table_para.style = 'List Bullet'
+                writer.add_list_item(line)
                 continue
             
             # 普通文本行
@@ -207,12 +291,12 @@ class LibreHybridConverter:
             
             # 如果当前段落太长，就结束它
             if len(' '.join(current_paragraph)) > 500:
-                self._add_paragraph(doc, ' '.join(current_paragraph))
+                self._add_paragraph(writer, ' '.join(current_paragraph))
                 current_paragraph = []
         
         # 处理最后的段落
         if current_paragraph:
-            self._add_paragraph(doc, ' '.join(current_paragraph))
+            self._add_paragraph(writer, ' '.join(current_paragraph))
     
     def _is_likely_heading(self, line: str) -> bool:
         """判断是否可能是标题"""
@@ -266,18 +350,17 @@ class LibreHybridConverter:
         
         return False
     
-    def _add_paragraph(self, doc: Document, text: str):
+    def _add_paragraph(self, writer: StreamingDocxWriter, text: str):
         """添加段落"""
         if text.strip():
-            para = doc.add_paragraph(text.strip())
-            para.alignment = 0  # 左对齐
+            writer.add_paragraph(text.strip(), align="left")
     
-    def _add_list_item(self, doc: Document, text: str):
+    def _add_list_item(self, writer: StreamingDocxWriter, text: str):
         """添加列表项"""
         # 移除原有的项目符号
         clean_text = re.sub(r'^[\d+\w\)\.\-\*\+•·◦▪▫\(\)]+\s*', '', text).strip()
         if clean_text:
-            para = doc.add_paragraph(clean_text, style='List Bullet')
+            writer.add_list_item(clean_text)
     
     def get_installation_guide(self) -> Dict[str, Any]:
         """获取安装指南"""
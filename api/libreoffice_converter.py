@@ -4,25 +4,125 @@ LibreOffice PDF转Word转换器
 """
 
 import os
+import json
 import subprocess
 import tempfile
 import shutil
 import logging
+import threading
 from pathlib import Path
 from typing import Optional, Tuple, Dict, Any
 import platform
 
+from . import metrics, sandbox
+from .staging import get_staging
+from .tracing import span
+
 logger = logging.getLogger(__name__)
 
+# 探测结果缓存文件，进程重启后可直接复用，避免重复执行 soffice --version
+PROBE_CACHE_PATH = os.getenv(
+    "LIBREOFFICE_PROBE_CACHE",
+    os.path.join(tempfile.gettempdir(), "pdf2word_libreoffice_probe.json")
+)
+
 class LibreOfficeConverter:
     """LibreOffice命令行转换器"""
     
-    def __init__(self):
-        self.libreoffice_path = self._find_libreoffice()
-        self.is_available = self.libreoffice_path is not None
+    def __init__(self, probe_cache_path: Optional[str] = PROBE_CACHE_PATH):
+        """
+        创建转换器，不在构造时探测LibreOffice
+        
+        Args:
+            probe_cache_path: 探测结果缓存文件路径，None表示不持久化
+        """
+        self.probe_cache_path = probe_cache_path
+        self._libreoffice_path: Optional[str] = None
+        self._version: Optional[str] = None
+        self._probed = False
+        self._probe_lock = threading.Lock()
+        self._probe_thread: Optional[threading.Thread] = None
+    
+    @property
+    def libreoffice_path(self) -> Optional[str]:
+        """LibreOffice可执行文件路径（首次访问时探测）"""
+        self._ensure_probed()
+        return self._libreoffice_path
+    
+    @property
+    def is_available(self) -> bool:
+        """LibreOffice是否可用（首次访问时探测）"""
+        return self.libreoffice_path is not None
+    
+    @property
+    def is_probed(self) -> bool:
+        """探测是否已经完成"""
+        return self._probed
+    
+    def start_discovery(self) -> None:
+        """在后台线程中探测LibreOffice，不阻塞服务启动"""
+        if self._probed or self._probe_thread is not None:
+            return
+        self._probe_thread = threading.Thread(
+            target=self._ensure_probed,
+            name="libreoffice-discovery",
+            daemon=True
+        )
+        self._probe_thread.start()
+    
+    def _ensure_probed(self) -> None:
+        """确保探测只执行一次，并发调用者等待同一结果"""
+        if self._probed:
+            return
+        with self._probe_lock:
+            if self._probed:
+                return
+            cached = self._load_probe_cache()
+            if cached is not None:
+                self._libreoffice_path, self._version = cached
+                logger.info(f"Using cached LibreOffice probe: {self._libreoffice_path}")
+            else:
+                self._libreoffice_path, self._version = self._find_libreoffice()
+                self._save_probe_cache()
+            self._probed = True
+    
+    def _load_probe_cache(self) -> Optional[Tuple[Optional[str], Optional[str]]]:
+        """读取探测缓存，可执行文件被替换或删除时缓存失效"""
+        if not self.probe_cache_path or not os.path.exists(self.probe_cache_path):
+            return None
+        try:
+            with open(self.probe_cache_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("platform") != platform.system().lower():
+                return None
+            # 未找到的结果不缓存：没有候选路径时重新探测不需要启动子进程
+            path = data.get("path")
+            if path and os.path.exists(path) and os.path.getmtime(path) == data.get("mtime"):
+                return path, data.get("version")
+        except Exception as e:
+            logger.debug(f"Ignoring unreadable LibreOffice probe cache: {e}")
+        return None
+    
+    def _save_probe_cache(self) -> None:
+        """持久化探测结果（原子替换）"""
+        if not self.probe_cache_path or not self._libreoffice_path:
+            return
+        data = {
+            "platform": platform.system().lower(),
+            "path": self._libreoffice_path,
+            "version": self._version,
+            "mtime": os.path.getmtime(self._libreoffice_path)
+        }
+        try:
+            tmp_path = f"{self.probe_cache_path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.probe_cache_path)
+        except Exception as e:
+            logger.debug(f"Failed to write LibreOffice probe cache: {e}")
         
-    def _find_libreoffice(self) -> Optional[str]:
-        """查找LibreOffice可执行文件路径"""
+    def _find_libreoffice(self) -> Tuple[Optional[str], Optional[str]]:
+        """查找LibreOffice可执行文件路径，返回 (路径, 版本)"""
         possible_paths = []
         
         system = platform.system().lower()
@@ -48,17 +148,9 @@ class LibreOfficeConverter:
         
         # 检查PATH中的命令
         for cmd in ["libreoffice", "soffice"]:
-            try:
-                result = subprocess.run(
-                    ["which", cmd] if system != "windows" else ["where", cmd],
-                    capture_output=True,
-                    text=True,
-                    timeout=5
-                )
-                if result.returncode == 0 and result.stdout.strip():
-                    possible_paths.insert(0, result.stdout.strip())
-            except:
-                pass
+            found = shutil.which(cmd)
+            if found:
+                possible_paths.insert(0, found)
         
         # 测试每个可能的路径
         for path in possible_paths:
@@ -73,47 +165,45 @@ class LibreOfficeConverter:
                     )
                     if result.returncode == 0:
                         logger.info(f"Found LibreOffice at: {path}")
-                        return path
+                        return path, result.stdout.strip() or "Unknown"
                 except Exception as e:
                     logger.debug(f"Failed to test LibreOffice at {path}: {e}")
                     continue
         
         logger.warning("LibreOffice not found on system")
-        return None
+        return None, None
     
-    def check_installation(self) -> Dict[str, Any]:
-        """检查LibreOffice安装状态"""
-        if not self.is_available:
+    def check_installation(self, wait: bool = True) -> Dict[str, Any]:
+        """
+        检查LibreOffice安装状态
+        
+        Args:
+            wait: 探测未完成时是否等待；为False时立即返回 discovering 状态
+        """
+        if not wait and not self._probed:
+            self.start_discovery()
             return {
                 "installed": False,
                 "path": None,
                 "version": None,
-                "error": "LibreOffice not found"
+                "error": None,
+                "discovering": True
             }
         
-        try:
-            result = subprocess.run(
-                [self.libreoffice_path, "--version"],
-                capture_output=True,
-                text=True,
-                timeout=10
-            )
-            
-            version = result.stdout.strip() if result.returncode == 0 else "Unknown"
-            
-            return {
-                "installed": True,
-                "path": self.libreoffice_path,
-                "version": version,
-                "error": None
-            }
-        except Exception as e:
+        if not self.is_available:
             return {
                 "installed": False,
-                "path": self.libreoffice_path,
+                "path": None,
                 "version": None,
-                "error": str(e)
+                "error": "LibreOffice not found"
             }
+        
+        return {
+            "installed": True,
+            "path": self.libreoffice_path,
+            "version": self._version,
+            "error": None
+        }
     
     def convert_pdf_to_docx(self, pdf_content: bytes, filename: str = "document.pdf") -> Tuple[bool, bytes, str]:
         """
@@ -126,22 +216,33 @@ class LibreOfficeConverter:
         Returns:
             (success, docx_content, message)
         """
+        with get_staging().job(len(pdf_content)) as job:
+            pdf_path = job.write("input.pdf", pdf_content)
+            output_path = job.path_for("output.docx")
+            success, message = self.convert_file(str(pdf_path), str(output_path), filename)
+            if not success:
+                return False, b"", message
+            return True, output_path.read_bytes(), message
+    
+    def convert_file(self, pdf_path: str, output_path: str, filename: Optional[str] = None) -> Tuple[bool, str]:
+        """
+        使用LibreOffice将PDF文件转换为DOCX文件（不经过Python内存）
+        
+        Args:
+            pdf_path: 输入PDF路径
+            output_path: 输出DOCX路径
+            filename: 原始文件名（仅用于日志）
+            
+        Returns:
+            (success, message)
+        """
         if not self.is_available:
-            return False, b"", "LibreOffice not available on system"
+            return False, "LibreOffice not available on system"
         
-        temp_dir = None
+        # soffice按输入文件名命名输出，先写到输出路径旁的临时目录再重命名（同一文件系统）
+        output_dir = None
         try:
-            # 创建临时目录
-            temp_dir = tempfile.mkdtemp(prefix="pdf2word_")
-            
-            # 保存PDF文件
-            pdf_path = os.path.join(temp_dir, "input.pdf")
-            with open(pdf_path, "wb") as f:
-                f.write(pdf_content)
-            
-            # 输出目录
-            output_dir = os.path.join(temp_dir, "output")
-            os.makedirs(output_dir, exist_ok=True)
+            output_dir = tempfile.mkdtemp(prefix=".soffice_", dir=os.path.dirname(os.path.abspath(output_path)))
             
             # LibreOffice转换命令
             cmd = [
@@ -155,50 +256,52 @@ class LibreOfficeConverter:
             logger.info(f"Running LibreOffice command: {' '.join(cmd)}")
             
             # 执行转换
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                timeout=300,  # 5分钟超时
-                cwd=temp_dir
-            )
+            with span("libreoffice.subprocess", input_bytes=os.path.getsize(pdf_path)), \
+                    metrics.SOFFICE_PROCESSES.track(state="busy"):
+                # 内存受限的进程组：超出RSS预算时整组杀掉，由调用方回退到其他引擎
+                result = sandbox.run_command(
+                    cmd,
+                    timeout=300,  # 5分钟超时
+                    engine="libreoffice",
+                    cwd=output_dir
+                )
             
             if result.returncode != 0:
                 error_msg = f"LibreOffice conversion failed: {result.stderr}"
                 logger.error(error_msg)
-                return False, b"", error_msg
+                return False, error_msg
             
             # 查找输出的docx文件
-            expected_docx = os.path.join(output_dir, "input.docx")
+            expected_docx = os.path.join(output_dir, Path(pdf_path).stem + ".docx")
             
             if not os.path.exists(expected_docx):
                 # 查找任何.docx文件
                 docx_files = [f for f in os.listdir(output_dir) if f.endswith('.docx')]
                 if not docx_files:
-                    return False, b"", "No DOCX file generated by LibreOffice"
+                    return False, "No DOCX file generated by LibreOffice"
                 expected_docx = os.path.join(output_dir, docx_files[0])
             
-            # 读取转换后的docx文件
-            with open(expected_docx, "rb") as f:
-                docx_content = f.read()
+            os.replace(expected_docx, output_path)
             
-            logger.info(f"LibreOffice conversion successful. Output size: {len(docx_content)} bytes")
-            return True, docx_content, "LibreOffice conversion successful"
+            logger.info(f"LibreOffice conversion successful. Output size: {os.path.getsize(output_path)} bytes")
+            return True, "LibreOffice conversion successful"
             
         except subprocess.TimeoutExpired:
-            return False, b"", "LibreOffice conversion timeout (5 minutes)"
+            return False, "LibreOffice conversion timeout (5 minutes)"
+        except sandbox.MemoryLimitExceeded as e:
+            return False, f"LibreOffice conversion aborted: {e}"
         except Exception as e:
             error_msg = f"LibreOffice conversion error: {str(e)}"
             logger.error(error_msg)
-            return False, b"", error_msg
+            return False, error_msg
         finally:
             # 清理临时文件
-            if temp_dir and os.path.exists(temp_dir):
+            if output_dir and os.path.exists(output_dir):
                 try:
-                    shutil.rmtree(temp_dir)
+                    shutil.rmtree(output_dir)
                 except Exception as e:
                     logger.warning(f"Failed to cleanup temp directory: {e}")
-
+    
     def get_installation_instructions(self) -> Dict[str, str]:
         """获取不同平台的LibreOffice安装说明"""
         system = platform.system().lower()
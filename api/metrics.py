@@ -0,0 +1,353 @@
+"""
+转换服务指标
+线程安全的计数器/仪表/直方图，以Prometheus文本格式在 /metrics 暴露
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# 转换阶段名称（各应用统一使用）
+STAGE_UPLOAD = "upload_spool"
+STAGE_PRESCAN = "prescan"
+STAGE_CONVERSION = "conversion"
+STAGE_POSTPROCESS = "postprocess"
+STAGE_RESPONSE = "response_write"
+
+# 秒级延迟桶：覆盖毫秒级的上传落盘到分钟级的大文件转换
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+PAGES_PER_SECOND_BUCKETS = (0.1, 0.5, 1, 2, 5, 10, 25, 50, 100, 250, 500)
+
+LabelValues = Tuple[str, ...]
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    """指标基类：按标签值保存子序列"""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} 需要标签 {self.labelnames}，实际为 {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def collect(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """单调递增计数器"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        if amount < 0:
+            raise ValueError("计数器只能递增")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def snapshot(self) -> Dict[LabelValues, float]:
+        """返回所有子序列的当前值"""
+        with self._lock:
+            return dict(self._values)
+
+    def collect(self) -> List[str]:
+        items = self.snapshot().items()
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in items]
+
+
+class Gauge(_Metric):
+    """可增可减的仪表，也可以通过回调在采集时取值"""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 callback: Optional[Callable[[], Dict[LabelValues, float]]] = None):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+        self._callback = callback
+
+    def set(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def value(self, **labels: str) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    @contextmanager
+    def track(self, **labels: str) -> Iterator[None]:
+        """在代码块执行期间把仪表加一"""
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+    def collect(self) -> List[str]:
+        if self._callback is not None:
+            items = list(self._callback().items())
+        else:
+            with self._lock:
+                items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in items]
+
+
+class Histogram(_Metric):
+    """累积分桶直方图"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        # 每个子序列: [各桶计数..., 总和, 总数]
+        self._values: Dict[LabelValues, List[float]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                series = self._values[key] = [0.0] * (len(self.buckets) + 2)
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[index] += 1
+                    break
+            series[-2] += value
+            series[-1] += 1
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        """测量代码块耗时（秒），异常时同样记录"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def collect(self) -> List[str]:
+        with self._lock:
+            items = [(key, list(series)) for key, series in self._values.items()]
+        lines = []
+        for key, series in items:
+            cumulative = 0.0
+            for index, bound in enumerate(self.buckets):
+                cumulative += series[index]
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {_format_value(cumulative)}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(series[-2])}")
+            lines.append(f"{self.name}_count{labels} {_format_value(series[-1])}")
+        return lines
+
+
+class MetricsRegistry:
+    """指标注册表"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"指标已注册: {metric.name}")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = (), callback=None) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames, callback))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        """生成Prometheus文本格式 (version 0.0.4)"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.collect())
+        return "\n".join(lines) + "\n"
+
+
+def _resident_memory() -> Dict[LabelValues, float]:
+    """读取当前进程RSS（Linux /proc），其他平台回退到 ru_maxrss"""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            pages = int(f.read().split()[1])
+        return {(): float(pages * os.sysconf("SC_PAGE_SIZE"))}
+    except (OSError, ValueError, IndexError):
+        try:
+            import resource
+            return {(): float(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024)}
+        except ImportError:
+            return {}
+
+
+def _cache_hit_ratio() -> Dict[LabelValues, float]:
+    totals: Dict[str, List[float]] = {}
+    for (cache, result), value in CACHE_REQUESTS.snapshot().items():
+        entry = totals.setdefault(cache, [0.0, 0.0])
+        entry[0 if result == "hit" else 1] += value
+    return {(cache,): hits / (hits + misses) for cache, (hits, misses) in totals.items() if hits + misses > 0}
+
+
+REGISTRY = MetricsRegistry()
+
+STAGE_DURATION = REGISTRY.histogram(
+    "pdf2word_stage_duration_seconds", "Duration of each conversion pipeline stage", ("engine", "stage"))
+CONVERSIONS = REGISTRY.counter(
+    "pdf2word_conversions_total", "Finished conversions by engine and result", ("engine", "result"))
+QUEUE_DEPTH = REGISTRY.gauge(
+    "pdf2word_queue_depth", "Conversion jobs waiting for a worker")
+INFLIGHT_JOBS = REGISTRY.gauge(
+    "pdf2word_inflight_jobs", "Conversion jobs currently executing", ("engine",))
+SOFFICE_PROCESSES = REGISTRY.gauge(
+    "pdf2word_soffice_processes", "LibreOffice processes by state", ("state",))
+CACHE_REQUESTS = REGISTRY.counter(
+    "pdf2word_cache_requests_total", "Cache lookups by cache and result (hit/miss)", ("cache", "result"))
+CACHE_HIT_RATIO = REGISTRY.gauge(
+    "pdf2word_cache_hit_ratio", "Cache hit ratio since process start", ("cache",), callback=_cache_hit_ratio)
+BYTES_IN = REGISTRY.counter(
+    "pdf2word_bytes_in_total", "Input PDF bytes accepted", ("engine",))
+BYTES_OUT = REGISTRY.counter(
+    "pdf2word_bytes_out_total", "Output document bytes produced", ("engine",))
+PAGES = REGISTRY.counter(
+    "pdf2word_pages_total", "PDF pages converted", ("engine",))
+PAGES_PER_SECOND = REGISTRY.histogram(
+    "pdf2word_pages_per_second", "Conversion throughput per job", ("engine",), buckets=PAGES_PER_SECOND_BUCKETS)
+SANDBOX_KILLS = REGISTRY.counter(
+    "pdf2word_sandbox_kills_total", "Conversions terminated for exceeding the memory budget", ("engine", "reason"))
+STYLE_DEDUP_SAVED_BYTES = REGISTRY.counter(
+    "pdf2word_style_dedup_saved_bytes_total", "Uncompressed document.xml bytes removed by style deduplication",
+    ("engine",))
+PROCESS_RSS = REGISTRY.gauge(
+    "process_resident_memory_bytes", "Resident memory size in bytes", callback=_resident_memory)
+
+
+def stage_timer(stage: str, engine: str = "all"):
+    """测量单个流水线阶段耗时的上下文管理器"""
+    return STAGE_DURATION.time(engine=engine, stage=stage)
+
+
+def record_conversion(engine: str, success: bool, seconds: float, bytes_in: int = 0,
+                      bytes_out: int = 0, pages: Optional[int] = None) -> None:
+    """
+    记录一次完整转换的结果
+
+    Args:
+        engine: 引擎名（pdf2docx / libreoffice / pypdf2 / cloudconvert ...）
+        success: 是否成功
+        seconds: 转换阶段耗时
+        bytes_in: 输入字节数
+        bytes_out: 输出字节数
+        pages: 页数（未知时为None）
+    """
+    CONVERSIONS.inc(engine=engine, result="success" if success else "failure")
+    if bytes_in:
+        BYTES_IN.inc(bytes_in, engine=engine)
+    if bytes_out:
+        BYTES_OUT.inc(bytes_out, engine=engine)
+    if success and pages:
+        PAGES.inc(pages, engine=engine)
+        if seconds > 0:
+            PAGES_PER_SECOND.observe(pages / seconds, engine=engine)
+
+
+def record_cache(cache: str, hit: bool) -> None:
+    """记录一次缓存查找"""
+    CACHE_REQUESTS.inc(cache=cache, result="hit" if hit else "miss")
+
+
+class ResponseTimingMiddleware:
+    """
+    ASGI中间件：记录响应体写出阶段耗时
+
+    从 http.response.start 到最后一个 body 消息发送完成，覆盖 FileResponse 的文件读取和网络写出
+    """
+
+    def __init__(self, app, paths: Sequence[str] = ("/api/",)):
+        self.app = app
+        self.paths = tuple(paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith(self.paths):
+            await self.app(scope, receive, send)
+            return
+
+        started: List[float] = []
+
+        async def timed_send(message):
+            if message["type"] == "http.response.start":
+                started.append(time.perf_counter())
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False) and started:
+                STAGE_DURATION.observe(time.perf_counter() - started[0], engine="http", stage=STAGE_RESPONSE)
+
+        await self.app(scope, receive, timed_send)
+
+
+def install(app) -> None:
+    """为FastAPI应用注册 /metrics 路由和响应计时中间件"""
+    from fastapi.responses import PlainTextResponse
+
+    async def metrics_endpoint():
+        """Prometheus指标"""
+        return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+    app.add_api_route("/metrics", metrics_endpoint, methods=["GET"], include_in_schema=False)
+    app.add_middleware(ResponseTimingMiddleware)
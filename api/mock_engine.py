@@ -0,0 +1,88 @@
+"""
+模拟转换引擎
+用于压测时替换真实引擎，单独测量Web层开销
+
+通过环境变量启用:
+    PDF2WORD_MOCK_ENGINE=1                      # 默认 200ms 延迟
+    PDF2WORD_MOCK_LATENCY_MS=500                # 平均延迟
+    PDF2WORD_MOCK_JITTER=0.3                    # 对数正态抖动系数，0表示固定延迟
+    PDF2WORD_MOCK_CPU=1                         # 以忙等代替sleep，模拟CPU密集型引擎
+"""
+
+import io
+import math
+import os
+import random
+import time
+from typing import Any, Dict, Tuple
+
+from .streaming_docx_writer import StreamingDocxWriter
+
+
+def is_enabled() -> bool:
+    """是否启用模拟引擎"""
+    return os.getenv("PDF2WORD_MOCK_ENGINE", "").lower() in ("1", "true", "yes")
+
+
+class MockConverter:
+    """模拟转换器：按配置的延迟分布等待后输出一个极小的DOCX"""
+
+    def __init__(self, latency_ms: float = None, jitter: float = None, cpu_bound: bool = None):
+        self.latency_ms = float(os.getenv("PDF2WORD_MOCK_LATENCY_MS", "200")) if latency_ms is None else latency_ms
+        self.jitter = float(os.getenv("PDF2WORD_MOCK_JITTER", "0")) if jitter is None else jitter
+        self.cpu_bound = (os.getenv("PDF2WORD_MOCK_CPU", "") in ("1", "true")) if cpu_bound is None else cpu_bound
+        self._random = random.Random()
+        self.stats = {"total_conversions": 0}
+
+    def _delay(self) -> float:
+        """对数正态分布的延迟（秒），均值等于 latency_ms"""
+        mean = self.latency_ms / 1000
+        if self.jitter <= 0:
+            return mean
+        sigma = self.jitter
+        return self._random.lognormvariate(math.log(mean) - sigma ** 2 / 2, sigma)
+
+    def _wait(self) -> None:
+        delay = self._delay()
+        if not self.cpu_bound:
+            time.sleep(delay)
+            return
+        deadline = time.perf_counter() + delay
+        while time.perf_counter() < deadline:
+            pass
+
+    def _render(self, filename: str, size: int) -> bytes:
+        buffer = io.BytesIO()
+        with StreamingDocxWriter(buffer) as writer:
+            writer.add_heading("Mock conversion", 0)
+            writer.add_paragraph(f"{filename}: {size} bytes")
+        return buffer.getvalue()
+
+    def convert_pdf_to_docx(self, pdf_content: bytes, filename: str = "document.pdf") -> Tuple[bool, bytes, str]:
+        """与 LibreHybridConverter.convert_pdf_to_docx 相同的接口"""
+        self.stats["total_conversions"] += 1
+        self._wait()
+        return True, self._render(filename, len(pdf_content)), "mock conversion"
+
+    def convert_file(self, pdf_path: str, output_path: str, filename: str = None) -> Tuple[bool, str]:
+        """与 LibreHybridConverter.convert_file 相同的文件接口"""
+        self.stats["total_conversions"] += 1
+        self._wait()
+        with open(output_path, "wb") as f:
+            f.write(self._render(filename or os.path.basename(pdf_path), os.path.getsize(pdf_path)))
+        return True, "mock conversion"
+
+    def start_discovery(self) -> None:
+        pass
+
+    def get_status(self, wait: bool = True) -> Dict[str, Any]:
+        return {
+            "libreoffice": {"installed": False, "path": None, "version": None, "error": "mock engine"},
+            "pypdf2_available": False,
+            "preferred_method": "Mock",
+            "mock": {"latency_ms": self.latency_ms, "jitter": self.jitter, "cpu_bound": self.cpu_bound},
+            "conversion_stats": dict(self.stats)
+        }
+
+    def get_installation_guide(self) -> Dict[str, Any]:
+        return {"status": "mock", "message": "模拟引擎已启用 (PDF2WORD_MOCK_ENGINE)"}
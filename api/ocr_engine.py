@@ -0,0 +1,187 @@
+"""
+本地OCR引擎（Tesseract）
+扫描件页面没有文本层：回退转换器只能输出"此页面无法提取文本"，LibreOffice 与
+pdf2docx 则花时间生成只含图片的DOCX。OCR引擎按 prescan.classify_page 逐页分类：
+
+- 文本页按快速文本引擎提取（同样使用页面缓存）
+- 扫描页在进程池中并行渲染并调用本地 tesseract 识别，结果按页序与文本页合并
+- 识别不出文字的扫描页（插图、照片）嵌入渲染好的页面图片，不再重复渲染
+
+扫描页占比达到 PDF2WORD_OCR_MIN_RATIO 的文档由 should_ocr() 判定改用本引擎。
+
+环境变量:
+    PDF2WORD_TESSERACT          tesseract 可执行文件（默认在PATH中查找）
+    PDF2WORD_OCR_LANG           识别语言（默认 chi_sim+eng）
+    PDF2WORD_OCR_DPI            渲染分辨率（默认 300）
+    PDF2WORD_OCR_WORKERS        并行识别的进程数（默认 CPU核数）
+    PDF2WORD_OCR_MIN_RATIO      扫描页占比阈值（默认 0.5）
+"""
+
+import logging
+import os
+import re
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
+
+from . import sandbox, tracing
+from .incremental_convert import write_page
+from .lazy_imports import lazy_import
+from .page_cache import PageFingerprinter, get_page_cache
+from .prescan import PAGE_SCANNED, classify_pages, prescan
+from .raster import render_uncached
+from .streaming_docx_writer import StreamingDocxWriter
+
+logger = logging.getLogger(__name__)
+
+TESSERACT = os.getenv("PDF2WORD_TESSERACT", "tesseract")
+OCR_LANG = os.getenv("PDF2WORD_OCR_LANG", "chi_sim+eng")
+OCR_DPI = int(os.getenv("PDF2WORD_OCR_DPI", "300"))
+OCR_WORKERS = int(os.getenv("PDF2WORD_OCR_WORKERS", str(os.cpu_count() or 1)))
+OCR_MIN_RATIO = float(os.getenv("PDF2WORD_OCR_MIN_RATIO", "0.5"))
+
+# 单页识别超时（秒）
+PAGE_TIMEOUT = 120
+
+_CJK = r"　-〿㐀-䶿一-鿿＀-￯"
+# tesseract 的中文结果常在汉字之间插入空格
+_CJK_SPACE = re.compile(rf"(?<=[{_CJK}])[ \t]+(?=[{_CJK}])")
+_CJK_CHAR = re.compile(rf"[{_CJK}]")
+
+
+def tesseract_path() -> Optional[str]:
+    """tesseract 可执行文件路径，未安装时返回None"""
+    return shutil.which(TESSERACT)
+
+
+def is_available() -> bool:
+    """OCR引擎是否可用（需要 tesseract 与 PyMuPDF）"""
+    if tesseract_path() is None:
+        return False
+    try:
+        lazy_import("fitz")
+        return True
+    except ImportError:
+        return False
+
+
+def should_ocr(pdf_path: str) -> bool:
+    """文档是否应该改用OCR引擎（扫描页占比达到阈值且OCR可用）"""
+    if not is_available():
+        return False
+    result = prescan(pdf_path)
+    return result.exact and result.scanned_ratio >= OCR_MIN_RATIO
+
+
+def ocr_paragraphs(text: str) -> List[str]:
+    """把 tesseract 的输出整理为段落：空行分段，段内按行拼接（中文之间不加空格）"""
+    paragraphs = []
+    for block in re.split(r"\n\s*\n", text):
+        merged = ""
+        for line in block.splitlines():
+            line = _CJK_SPACE.sub("", line.strip())
+            if not line:
+                continue
+            if merged and not (_CJK_CHAR.match(merged[-1]) and _CJK_CHAR.match(line[0])):
+                merged += " "
+            merged += line
+        if merged:
+            paragraphs.append(merged)
+    return paragraphs
+
+
+def render_page(pdf_path: str, index: int, dpi: int, image_path: str) -> Tuple[float, float]:
+    """
+    渲染一页为PNG
+    不经过光栅化服务的缓存：每页只识别一次，缓存在每个工作进程中各占一份内存却不会命中
+
+    Returns:
+        页面尺寸 (宽pt, 高pt)，嵌入图片时按原尺寸显示
+    """
+    bitmap = render_uncached(pdf_path, index, dpi)
+    bitmap.save(image_path)
+    return bitmap.page_size
+
+
+def _ocr_page(pdf_path: str, index: int, dpi: int, lang: str, image_dir: str,
+              trace: Optional[dict] = None) -> Tuple[str, List[str], float, float]:
+    """进程池任务：渲染并识别一页，渲染结果留在 image_dir 中供嵌入复用"""
+    image_path = os.path.join(image_dir, f"page-{index:05d}.png")
+    with tracing.attach(trace), tracing.span("ocr.page", page=index + 1, dpi=dpi):
+        width, height = render_page(pdf_path, index, dpi, image_path)
+        result = sandbox.run_command(
+            [tesseract_path() or TESSERACT, image_path, "stdout", "-l", lang, "--dpi", str(dpi)],
+            timeout=PAGE_TIMEOUT, engine="tesseract"
+        )
+    if result.returncode != 0:
+        raise RuntimeError(f"tesseract 失败: {result.stderr.strip()[:200]}")
+    return image_path, ocr_paragraphs(result.stdout), width, height
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def get_ocr_pool() -> ProcessPoolExecutor:
+    """进程级共享的OCR进程池（多个转换并发时总进程数仍受 PDF2WORD_OCR_WORKERS 限制）"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=max(1, OCR_WORKERS), mp_context=sandbox.process_context())
+        return _pool
+
+
+class OcrEngine:
+    """扫描件OCR引擎（文件接口同其他转换器）"""
+
+    def __init__(self, lang: str = OCR_LANG, dpi: int = OCR_DPI):
+        self.lang = lang
+        self.dpi = dpi
+
+    def convert_file(self, pdf_path: str, output_path: str, filename: Optional[str] = None) -> Tuple[bool, str]:
+        if tesseract_path() is None:
+            return False, "未安装 tesseract，无法进行OCR"
+        fitz = lazy_import("fitz")
+        kinds = classify_pages(pdf_path)
+        scanned = [index for index, kind in enumerate(kinds) if kind == PAGE_SCANNED]
+
+        # 渲染图片放在输出文件旁（同一暂存目录），写入DOCX后删除
+        image_dir = tempfile.mkdtemp(prefix=".ocr_", dir=os.path.dirname(os.path.abspath(output_path)))
+        pool = get_ocr_pool()
+        trace = tracing.get_context()
+        futures = {index: pool.submit(_ocr_page, pdf_path, index, self.dpi, self.lang, image_dir, trace)
+                   for index in scanned}
+        recognized = failed = 0
+        try:
+            cache = get_page_cache()
+            with fitz.open(pdf_path) as doc, StreamingDocxWriter(output_path) as writer:
+                fingerprinter = PageFingerprinter(doc)
+                for page in doc:
+                    future = futures.get(page.number)
+                    if future is None:
+                        write_page(writer, page, cache, fingerprinter)
+                        continue
+                    if page.number:
+                        writer.add_page_break()
+                    try:
+                        image_path, paragraphs, width, height = future.result()
+                    except Exception as e:
+                        logger.warning(f"第{page.number + 1}页OCR失败: {e}")
+                        writer.add_paragraph(f"[第{page.number + 1}页识别失败: {e}]")
+                        failed += 1
+                        continue
+                    if paragraphs:
+                        for text in paragraphs:
+                            writer.add_paragraph(text)
+                        recognized += 1
+                    else:
+                        writer.add_image(image_path, width, height)
+        finally:
+            for future in futures.values():
+                future.cancel()
+            shutil.rmtree(image_dir, ignore_errors=True)
+        if scanned and failed == len(scanned):
+            return False, f"OCR全部失败: {len(scanned)} 页"
+        return True, f"OCR转换完成: {len(kinds)} 页，其中 {len(scanned)} 页为扫描页（识别 {recognized} 页）"
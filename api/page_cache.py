@@ -0,0 +1,225 @@
+"""
+页面级转换缓存
+同一文档内和不同文档之间经常出现完全相同的页面（模板页、附录、扫描件中的空白页、
+反复提交的同一份合同）。按页面内容计算指纹，把该页转换出的DOCX正文片段缓存下来，
+组装时直接复用，不再重新提取文本。
+
+指纹覆盖决定页面输出的全部输入：
+- 解压后的内容流、页面尺寸与旋转
+- 引用的字体（资源名 + 内嵌字体数据或字体字典）
+- 图片与表单XObject（资源名 + 原始流数据）
+对象编号不计入指纹，因此不同文件中的相同页面得到相同指纹。
+
+环境变量:
+    PDF2WORD_PAGE_CACHE          设为 0 关闭页面缓存
+    PDF2WORD_PAGE_CACHE_DIR      缓存目录（默认 <tmp>/pdf2word_page_cache）
+    PDF2WORD_PAGE_CACHE_MB       磁盘缓存上限（默认 256MB，超过后按最近使用时间淘汰）
+"""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional, Union
+
+from . import metrics
+from .streaming_docx_writer import DocxFragment
+
+logger = logging.getLogger(__name__)
+
+PAGE_CACHE_ENABLED = os.getenv("PDF2WORD_PAGE_CACHE", "1") != "0"
+PAGE_CACHE_DIR = os.getenv("PDF2WORD_PAGE_CACHE_DIR", os.path.join(tempfile.gettempdir(), "pdf2word_page_cache"))
+PAGE_CACHE_MAX_BYTES = int(os.getenv("PDF2WORD_PAGE_CACHE_MB", "256")) * 1024 * 1024
+
+# 进程内保留的片段数（同一文档内的重复页面无需读盘）
+MEMORY_ENTRIES = 256
+
+
+class PageFingerprinter:
+    """
+    页面指纹计算器（每个打开的文档一个）
+    字体、图片等共享资源按xref只哈希一次
+    """
+
+    def __init__(self, doc):
+        self.doc = doc
+        self._resources: Dict[int, bytes] = {}
+
+    def _resource_digest(self, xref: int, font: bool = False) -> bytes:
+        if xref <= 0:
+            return b""
+        digest = self._resources.get(xref)
+        if digest is None:
+            h = hashlib.sha256()
+            if font:
+                # 内嵌字体取字体文件数据；未内嵌时字体名与编码已经决定了字形
+                basename, _, _, buffer = self.doc.extract_font(xref)
+                h.update(basename.encode("utf-8", "replace"))
+                h.update(buffer or b"")
+                kind, value = self.doc.xref_get_key(xref, "ToUnicode")
+                if kind == "xref":
+                    h.update(self.doc.xref_stream(int(value.split()[0])) or b"")
+            elif self.doc.xref_is_stream(xref):
+                h.update(self.doc.xref_stream_raw(xref) or b"")
+            else:
+                h.update(self.doc.xref_object(xref, compressed=True).encode("utf-8", "replace"))
+            digest = self._resources[xref] = h.digest()
+        return digest
+
+    def fingerprint(self, page) -> str:
+        """
+        计算页面指纹
+
+        Args:
+            page: fitz.Page
+
+        Returns:
+            sha256 十六进制字符串
+        """
+        h = hashlib.sha256()
+        rect = page.rect
+        h.update(f"{rect.width:.2f}x{rect.height:.2f}r{page.rotation}".encode())
+        h.update(page.read_contents())
+        for font in page.get_fonts(full=True):
+            # (xref, ext, type, basefont, name, encoding, referencer)
+            h.update(f"F:{font[4]}:{font[3]}:{font[5]}".encode("utf-8", "replace"))
+            h.update(self._resource_digest(font[0], font=True))
+        for image in page.get_images(full=True):
+            # (xref, smask, width, height, bpc, colorspace, alt, name, filter, referencer)
+            h.update(f"I:{image[7]}".encode("utf-8", "replace"))
+            h.update(self._resource_digest(image[0]))
+            h.update(self._resource_digest(image[1]))
+        for xobject in page.get_xobjects():
+            # (xref, name, invoker, bbox)
+            h.update(f"X:{xobject[1]}".encode("utf-8", "replace"))
+            h.update(self._resource_digest(xobject[0]))
+        return h.hexdigest()
+
+
+class PageCache:
+    """页面片段缓存：进程内LRU + 磁盘目录（可由多个进程共享）"""
+
+    def __init__(self, root: Union[str, Path] = PAGE_CACHE_DIR, max_bytes: int = PAGE_CACHE_MAX_BYTES,
+                 memory_entries: int = MEMORY_ENTRIES):
+        """
+        Args:
+            root: 缓存目录
+            max_bytes: 磁盘缓存上限
+            memory_entries: 进程内保留的片段数
+        """
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.memory_entries = memory_entries
+        self._memory: "OrderedDict[str, DocxFragment]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk_bytes: Optional[int] = None
+
+    @staticmethod
+    def key(fingerprint: str, engine: str) -> str:
+        """缓存键：页面指纹 + 引擎版本（引擎输出变化时修改版本号即可失效）"""
+        return hashlib.sha256(f"{engine}:{fingerprint}".encode()).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}.json"
+
+    def _remember(self, key: str, fragment: DocxFragment) -> None:
+        with self._lock:
+            self._memory[key] = fragment
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+    def get(self, fingerprint: str, engine: str) -> Optional[DocxFragment]:
+        """查找页面片段，未命中返回None"""
+        key = self.key(fingerprint, engine)
+        with self._lock:
+            fragment = self._memory.get(key)
+            if fragment is not None:
+                self._memory.move_to_end(key)
+        if fragment is None:
+            path = self._path(key)
+            try:
+                data = json.loads(path.read_text(encoding="utf-8"))
+                fragment = DocxFragment(data["xml"], data["paragraphs"])
+                os.utime(path)  # 按访问时间淘汰
+                self._remember(key, fragment)
+            except (OSError, ValueError, KeyError):
+                fragment = None
+        metrics.record_cache("page_cache", fragment is not None)
+        return fragment
+
+    def put(self, fingerprint: str, engine: str, fragment: DocxFragment) -> None:
+        """保存页面片段（先写临时文件再重命名，并发写入同一键是安全的）"""
+        key = self.key(fingerprint, engine)
+        self._remember(key, fragment)
+        path = self._path(key)
+        data = json.dumps({"xml": fragment.xml, "paragraphs": fragment.paragraphs}, ensure_ascii=False)
+        try:
+            path.parent.mkdir(exist_ok=True)
+            tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+            tmp.write_text(data, encoding="utf-8")
+            os.replace(tmp, path)
+        except OSError as e:
+            logger.debug(f"页面缓存写入失败: {e}")
+            return
+        self._maybe_evict(len(data.encode("utf-8")))
+
+    def _maybe_evict(self, added: int) -> None:
+        with self._lock:
+            if self._disk_bytes is None:
+                self._disk_bytes = sum(p.stat().st_size for p in self.root.glob("*/*.json"))
+            else:
+                self._disk_bytes += added
+            if self._disk_bytes <= self.max_bytes:
+                return
+            # 淘汰到上限的80%，避免每次写入都扫描目录
+            entries = []
+            for path in self.root.glob("*/*.json"):
+                try:
+                    stat = path.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+            entries.sort()
+            total = sum(size for _, size, _ in entries)
+            target = self.max_bytes * 0.8
+            for _, size, path in entries:
+                if total <= target:
+                    break
+                try:
+                    path.unlink()
+                    total -= size
+                except OSError:
+                    pass
+            self._disk_bytes = total
+
+    def clear(self) -> None:
+        """清空缓存"""
+        with self._lock:
+            self._memory.clear()
+            for path in self.root.glob("*/*.json"):
+                try:
+                    path.unlink()
+                except OSError:
+                    pass
+            self._disk_bytes = 0
+
+
+_default: Optional[PageCache] = None
+_default_lock = threading.Lock()
+
+
+def get_page_cache() -> Optional[PageCache]:
+    """进程级默认页面缓存；PDF2WORD_PAGE_CACHE=0 时返回None"""
+    global _default
+    if not PAGE_CACHE_ENABLED:
+        return None
+    with _default_lock:
+        if _default is None:
+            _default = PageCache()
+        return _default
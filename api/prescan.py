@@ -0,0 +1,151 @@
+"""
+PDF预扫描与转换成本估计
+在排队前快速读取页数与图片密度（只读取文档结构，不渲染页面），
+供调度器估计作业耗时；fitz不可用时回退到PyPDF2，再回退到按文件大小估计
+
+同时按文本覆盖率与图片面积把页面分为文本页、扫描页与空白页（classify_page），
+扫描页占比高的文档改走本地OCR引擎（见 ocr_engine.py）
+"""
+
+import logging
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+# 抽样统计图片密度的最大页数
+SAMPLE_PAGES = int(os.getenv("PDF2WORD_PRESCAN_SAMPLE_PAGES", "16"))
+
+# 每张图片相对一页纯文本的转换成本
+IMAGE_WEIGHT = 0.5
+
+# 每个扫描页的OCR成本（相对一页纯文本）
+OCR_WEIGHT = 8.0
+
+# 扫描页判定：图片覆盖页面面积的比例不低于该值，且可提取的文字少于 SCANNED_MAX_CHARS
+SCANNED_IMAGE_COVERAGE = 0.5
+SCANNED_MAX_CHARS = 16
+
+PAGE_TEXT = "text"
+PAGE_SCANNED = "scanned"
+PAGE_BLANK = "blank"
+
+# 无法解析页数时，按每页约100KB估计
+BYTES_PER_PAGE_GUESS = 100 * 1024
+
+
+@dataclass
+class PrescanResult:
+    """预扫描结果"""
+    pages: int
+    images_per_page: float
+    size_bytes: int
+    exact: bool = True
+    scanned_ratio: float = 0.0
+
+    @property
+    def cost(self) -> float:
+        """估计转换成本（单位：相当于多少页纯文本）"""
+        per_page = 1.0 + IMAGE_WEIGHT * self.images_per_page + OCR_WEIGHT * self.scanned_ratio
+        return max(1.0, self.pages * per_page)
+
+
+def _clipped_area(bbox, rect) -> float:
+    width = min(bbox[2], rect[2]) - max(bbox[0], rect[0])
+    height = min(bbox[3], rect[3]) - max(bbox[1], rect[1])
+    return width * height if width > 0 and height > 0 else 0.0
+
+
+def classify_page(page) -> str:
+    """
+    按文本覆盖率与图片面积判断页面类型
+
+    Args:
+        page: fitz.Page
+
+    Returns:
+        PAGE_TEXT / PAGE_SCANNED（图片铺满页面且几乎没有文本层）/ PAGE_BLANK
+    """
+    rect = tuple(page.rect)
+    page_area = _clipped_area(rect, rect) or 1.0
+    chars = sum(len(block[4].strip()) for block in page.get_text("blocks") if block[6] == 0)
+    if chars >= SCANNED_MAX_CHARS:
+        return PAGE_TEXT
+    # 重叠的图片（扫描件常见的分条图片）面积可能重复计算，比例封顶为1
+    coverage = min(1.0, sum(_clipped_area(info["bbox"], rect) for info in page.get_image_info()) / page_area)
+    if coverage >= SCANNED_IMAGE_COVERAGE:
+        return PAGE_SCANNED
+    return PAGE_TEXT if chars else PAGE_BLANK
+
+
+def classify_pages(pdf_path: Union[str, Path]) -> List[str]:
+    """逐页分类（OCR引擎据此决定哪些页面需要识别）"""
+    import fitz
+
+    with fitz.open(str(pdf_path)) as doc:
+        return [classify_page(page) for page in doc]
+
+
+def _scan_fitz(pdf_path: str, size: int) -> PrescanResult:
+    import fitz
+
+    with fitz.open(pdf_path) as doc:
+        pages = doc.page_count
+        if pages == 0:
+            return PrescanResult(0, 0.0, size)
+        # 均匀抽样，避免大文档逐页读取
+        step = max(1, pages // SAMPLE_PAGES)
+        sampled = range(0, pages, step)
+        images = sum(len(doc.get_page_images(index)) for index in sampled)
+        scanned = sum(classify_page(doc.load_page(index)) == PAGE_SCANNED for index in sampled)
+        return PrescanResult(pages, images / len(sampled), size, scanned_ratio=scanned / len(sampled))
+
+
+def _scan_pypdf2(pdf_path: str, size: int) -> PrescanResult:
+    import PyPDF2
+
+    reader = PyPDF2.PdfReader(pdf_path)
+    pages = len(reader.pages)
+    step = max(1, pages // SAMPLE_PAGES)
+    sampled = range(0, pages, step)
+    images = 0
+    for index in sampled:
+        resources = reader.pages[index].get("/Resources") or {}
+        xobjects = resources.get("/XObject") if hasattr(resources, "get") else None
+        if xobjects:
+            xobjects = xobjects.get_object()
+            images += sum(1 for name in xobjects if xobjects[name].get_object().get("/Subtype") == "/Image")
+    return PrescanResult(pages, images / len(sampled) if pages else 0.0, size)
+
+
+def prescan(pdf_path: Union[str, Path]) -> PrescanResult:
+    """
+    预扫描PDF
+
+    Args:
+        pdf_path: PDF文件路径
+
+    Returns:
+        PrescanResult；文件无法解析时按大小估计（exact=False）
+    """
+    pdf_path = str(pdf_path)
+    size = os.path.getsize(pdf_path)
+    for scan in (_scan_fitz, _scan_pypdf2):
+        try:
+            return scan(pdf_path, size)
+        except ImportError:
+            continue
+        except Exception as e:
+            logger.debug(f"预扫描失败 ({scan.__name__}): {e}")
+            break
+    return PrescanResult(max(1, size // BYTES_PER_PAGE_GUESS), 0.0, size, exact=False)
+
+
+def estimate_cost(pdf_path: Union[str, Path], default: Optional[float] = None) -> float:
+    """估计转换成本；文件不存在时返回 default（未指定则为1）"""
+    try:
+        return prescan(pdf_path).cost
+    except OSError:
+        return default if default is not None else 1.0
@@ -0,0 +1,238 @@
+"""
+上传文件的页面缩略图预览
+用户上传后立即看到页面缩略图，确认传对了文件再转换，而不是等转换完成下载后才发现。
+
+    GET /api/preview/{upload_id}?page=1&width=256&format=png
+
+- 直接从分块上传目录中的文件渲染（经 raster.RasterService，位图与OCR共享缓存）
+- 宽度按固定档位取整，编码后的图片放入按字节封顶的LRU，重复请求不再编码
+- 渲染在独立线程池中执行，不与转换任务排队
+- 上传的最后一个分块提交时即在后台渲染首页缩略图（prerender），前端随后请求时直接命中缓存
+- 上传未完成时也尝试渲染（线性化PDF的首页位于文件开头），无法解析时返回409
+
+format 为 webp 时需要 Pillow；未安装时回退为 PNG。
+
+环境变量:
+    PDF2WORD_PREVIEW_WORKERS      渲染线程数（默认 2）
+    PDF2WORD_PREVIEW_CACHE_MB     缩略图缓存上限（默认 32）
+"""
+
+import asyncio
+import io
+import logging
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from . import metrics
+from .lazy_imports import lazy_import
+from .raster import RasterService, get_raster_service
+
+logger = logging.getLogger(__name__)
+
+PREVIEW_WORKERS = int(os.getenv("PDF2WORD_PREVIEW_WORKERS", "2"))
+PREVIEW_CACHE_BYTES = int(os.getenv("PDF2WORD_PREVIEW_CACHE_MB", "32")) * 1024 * 1024
+
+# 宽度档位（像素）：请求宽度向上取整到档位，提高缓存命中率并限制渲染开销
+WIDTH_STEPS = (96, 160, 256, 384, 512, 768, 1024)
+DEFAULT_WIDTH = 256
+
+# 渲染上限：极窄极高的页面按宽度换算出的DPI与像素数会非常大
+MAX_DPI = 300
+MAX_PIXELS = 1024 * 4096
+
+MEDIA_TYPES = {"png": "image/png", "webp": "image/webp"}
+
+
+class PreviewError(Exception):
+    """预览失败，status 为对应的HTTP状态码"""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+@dataclass
+class Thumbnail:
+    """编码好的缩略图"""
+    data: bytes
+    media_type: str
+    page_count: int
+    final: bool = True  # 上传已完成（内容不会再变化，可以让浏览器缓存）
+
+
+def snap_width(width: int) -> int:
+    """把请求宽度取整到档位"""
+    for step in WIDTH_STEPS:
+        if width <= step:
+            return step
+    return WIDTH_STEPS[-1]
+
+
+def _source_path(session) -> Path:
+    # finalize 后文件已改名为 .pdf（元数据中记录的仍是 .part）
+    if not session.path.exists():
+        return session.path.with_suffix(".pdf")
+    return session.path
+
+
+def _encode_webp(bitmap) -> Optional[bytes]:
+    try:
+        image_module = lazy_import("PIL.Image")
+    except ImportError:
+        return None
+    mode = "RGB" if bitmap.channels == 3 else "L"
+    image = image_module.frombuffer(mode, (bitmap.width, bitmap.height), bitmap.buffer, "raw", mode, 0, 1)
+    output = io.BytesIO()
+    image.save(output, "WEBP", quality=80, method=0)
+    return output.getvalue()
+
+
+class PreviewService:
+    """上传文件的缩略图渲染与缓存（线程安全）"""
+
+    def __init__(self, store, workers: int = PREVIEW_WORKERS, cache_bytes: int = PREVIEW_CACHE_BYTES,
+                 raster: Optional[RasterService] = None):
+        """
+        Args:
+            store: chunked_upload.UploadStore
+            workers: 渲染线程数
+            cache_bytes: 编码后缩略图的缓存上限
+            raster: 光栅化服务，默认 raster.get_raster_service()
+        """
+        self.store = store
+        self.cache_bytes = cache_bytes
+        self.raster = raster or get_raster_service()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="preview")
+        self._cache: "OrderedDict[Tuple, Thumbnail]" = OrderedDict()
+        self._cache_used = 0
+        self._pages: Dict[str, Tuple[int, Tuple[Tuple[float, float], ...]]] = {}
+        self._lock = threading.Lock()
+
+    def _page_sizes(self, doc_key: str, pdf_path: Path) -> Tuple[int, Tuple[Tuple[float, float], ...]]:
+        info = self._pages.get(doc_key)
+        if info is None:
+            fitz = lazy_import("fitz")
+            with fitz.open(str(pdf_path)) as doc:
+                info = (doc.page_count, tuple((page.rect.width, page.rect.height) for page in doc))
+            with self._lock:
+                if len(self._pages) > 256:
+                    self._pages.clear()
+                self._pages[doc_key] = info
+        return info
+
+    def render(self, session, page: int = 1, width: int = DEFAULT_WIDTH, fmt: str = "png") -> Thumbnail:
+        """
+        渲染缩略图
+
+        Args:
+            session: chunked_upload.UploadSession
+            page: 页码（从1开始）
+            width: 期望宽度（像素），按档位取整
+            fmt: png 或 webp
+
+        Raises:
+            PreviewError: 页码越界、文件无法解析、页面渲染后的像素数超过 MAX_PIXELS
+        """
+        if fmt not in MEDIA_TYPES:
+            raise PreviewError(400, f"不支持的图片格式: {fmt}")
+        width = snap_width(width)
+        pdf_path = _source_path(session)
+        offset = session.offset if pdf_path == session.path else session.length
+        # 上传完成后文件不再变化，上传ID + 已接收长度即可唯一标识内容，无需计算哈希
+        doc_key = f"upload-{session.id}-{offset}"
+        cache_key = (doc_key, page, width, fmt)
+        with self._lock:
+            cached = self._cache.get(cache_key)
+            if cached is not None:
+                self._cache.move_to_end(cache_key)
+        metrics.record_cache("preview", cached is not None)
+        if cached is not None:
+            return cached
+
+        try:
+            page_count, sizes = self._page_sizes(doc_key, pdf_path)
+        except Exception as e:
+            if offset < session.length:
+                raise PreviewError(409, f"上传未完成，暂时无法预览 ({offset}/{session.length})")
+            raise PreviewError(422, f"无法解析PDF: {e}")
+        if not 1 <= page <= page_count:
+            raise PreviewError(404, f"页码超出范围 (共 {page_count} 页)")
+
+        page_width, page_height = sizes[page - 1]
+        dpi = min(MAX_DPI, max(1, round(width * 72 / (page_width or 1.0))))
+        if (page_width * dpi / 72) * (page_height * dpi / 72) > MAX_PIXELS:
+            raise PreviewError(422, f"页面尺寸异常 ({page_width:.0f}×{page_height:.0f}pt)，无法预览")
+        try:
+            bitmap = self.raster.render(pdf_path, page - 1, dpi, doc_hash=doc_key)
+        except Exception as e:
+            raise PreviewError(409 if offset < session.length else 422, f"页面渲染失败: {e}")
+
+        data = _encode_webp(bitmap) if fmt == "webp" else None
+        if data is None:
+            fmt, data = "png", bitmap.encode("png")
+        thumbnail = Thumbnail(data, MEDIA_TYPES[fmt], page_count, offset >= session.length)
+        with self._lock:
+            if cache_key not in self._cache:
+                self._cache[cache_key] = thumbnail
+                self._cache_used += len(data)
+            while self._cache_used > self.cache_bytes and len(self._cache) > 1:
+                _, old = self._cache.popitem(last=False)
+                self._cache_used -= len(old.data)
+        return thumbnail
+
+    async def thumbnail(self, session, page: int = 1, width: int = DEFAULT_WIDTH, fmt: str = "png") -> Thumbnail:
+        """在预览线程池中渲染"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self.render, session, page, width, fmt)
+
+    def prerender(self, session, offset: int) -> None:
+        """chunked_upload 的 on_progress 回调：上传完成时在后台渲染首页缩略图"""
+        if offset >= session.length:
+            self._executor.submit(self._prerender, session)
+
+    def _prerender(self, session) -> None:
+        try:
+            self.render(session, 1, DEFAULT_WIDTH, "png")
+        except Exception as e:
+            logger.debug(f"预渲染缩略图失败 ({session.id}): {e}")
+
+
+def install(app, store, service: Optional[PreviewService] = None) -> PreviewService:
+    """
+    注册 GET /api/preview/{upload_id}
+
+    Args:
+        app: FastAPI应用
+        store: chunked_upload.UploadStore
+        service: 预览服务，默认新建
+
+    Returns:
+        PreviewService（其 prerender 可作为分块上传的 on_progress 回调）
+    """
+    from fastapi import HTTPException
+    from fastapi.concurrency import run_in_threadpool
+    from fastapi.responses import Response
+
+    service = service or PreviewService(store)
+
+    @app.get("/api/preview/{upload_id}")
+    async def preview_page(upload_id: str, page: int = 1, width: int = DEFAULT_WIDTH, format: str = "png"):
+        """上传文件的页面缩略图"""
+        session = await run_in_threadpool(store.get, upload_id)
+        if session is None:
+            raise HTTPException(status_code=404, detail="上传不存在或已过期")
+        try:
+            thumbnail = await service.thumbnail(session, page, width, format)
+        except PreviewError as e:
+            raise HTTPException(status_code=e.status, detail=str(e))
+        return Response(content=thumbnail.data, media_type=thumbnail.media_type, headers={
+            "X-Page-Count": str(thumbnail.page_count),
+            "Cache-Control": "private, max-age=3600" if thumbnail.final else "no-store",
+        })
+
+    return service
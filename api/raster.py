@@ -0,0 +1,303 @@
+"""
+页面光栅化服务
+OCR、缩略图预览与图片回退都需要把页面渲染成位图，各自渲染会重复光栅化同一页。
+本服务统一用 PyMuPDF page.get_pixmap 渲染（不再启动 pdftoppm 写临时文件），
+结果按 (文档内容哈希, 页码, DPI, 色彩空间) 缓存：
+
+- 内存LRU按字节数封顶，淘汰的位图溢出到磁盘目录（原始像素 + 固定长度头）
+- 磁盘上的位图用 mmap 读取，调用方拿到的 memoryview / NumPy 数组不复制像素数据
+- 同一页面并发请求只渲染一次
+
+环境变量:
+    PDF2WORD_RASTER_CACHE_MB    内存缓存上限（默认 256）
+    PDF2WORD_RASTER_SPILL_MB    磁盘溢出上限（默认 1024，0 表示不溢出）
+    PDF2WORD_RASTER_DIR         溢出目录（默认 <tmp>/pdf2word_raster）
+"""
+
+import hashlib
+import logging
+import mmap
+import os
+import struct
+import tempfile
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple, Union
+
+from . import metrics
+from .lazy_imports import lazy_import
+
+logger = logging.getLogger(__name__)
+
+MB = 1024 * 1024
+
+RASTER_CACHE_BYTES = int(os.getenv("PDF2WORD_RASTER_CACHE_MB", "256")) * MB
+RASTER_SPILL_BYTES = int(os.getenv("PDF2WORD_RASTER_SPILL_MB", "1024")) * MB
+RASTER_DIR = os.getenv("PDF2WORD_RASTER_DIR", os.path.join(tempfile.gettempdir(), "pdf2word_raster"))
+
+COLORSPACES = ("rgb", "gray")
+
+# 溢出文件头: 魔数, 宽, 高, 通道数, 页面宽pt, 页面高pt
+_HEADER = struct.Struct("<4sIIIdd")
+_MAGIC = b"PRB1"
+
+RenderKey = Tuple[str, int, int, str]
+
+# 文档哈希记忆的条目数上限（每个上传路径/修改时间一条）
+HASH_MEMO_ENTRIES = 1024
+
+
+@dataclass
+class PageBitmap:
+    """渲染好的页面位图（行优先、无行填充、无alpha通道的8位像素）"""
+    width: int
+    height: int
+    channels: int
+    colorspace: str
+    dpi: int
+    page_size: Tuple[float, float]  # 页面尺寸(pt)，嵌入图片时按原尺寸显示
+    buffer: memoryview
+    _owner: Any = field(default=None, repr=False)  # 保持底层Pixmap或mmap存活
+
+    @property
+    def nbytes(self) -> int:
+        return self.buffer.nbytes
+
+    def as_array(self):
+        """零拷贝的 NumPy 数组视图，形状 (height, width, channels)，只读"""
+        np = lazy_import("numpy")
+        return np.frombuffer(self.buffer, dtype=np.uint8).reshape(self.height, self.width, self.channels)
+
+    def pixmap(self):
+        """转换为 fitz.Pixmap（用于编码）"""
+        fitz = lazy_import("fitz")
+        space = fitz.csRGB if self.colorspace == "rgb" else fitz.csGRAY
+        return fitz.Pixmap(space, self.width, self.height, bytes(self.buffer), False)
+
+    def encode(self, fmt: str = "png") -> bytes:
+        """编码为图片数据（png / pnm / pam，PyMuPDF较新版本支持 jpg）"""
+        return self.pixmap().tobytes(fmt)
+
+    def save(self, path: Union[str, Path]) -> None:
+        """按扩展名保存为图片文件"""
+        self.pixmap().save(str(path))
+
+
+def _render(pdf_path: str, page_index: int, dpi: int, colorspace: str) -> PageBitmap:
+    fitz = lazy_import("fitz")
+    with fitz.open(pdf_path) as doc:
+        page = doc.load_page(page_index)
+        space = fitz.csRGB if colorspace == "rgb" else fitz.csGRAY
+        pix = page.get_pixmap(dpi=dpi, colorspace=space, alpha=False)
+        page_size = (page.rect.width, page.rect.height)
+    # samples_mv 直接引用Pixmap内部缓冲区；旧版本只有 samples（复制一次）
+    samples = getattr(pix, "samples_mv", None)
+    if samples is None:
+        samples = memoryview(pix.samples)
+    return PageBitmap(pix.width, pix.height, pix.n, colorspace, dpi, page_size, samples, _owner=pix)
+
+
+def render_uncached(pdf_path: Union[str, Path], page: int, dpi: int = 150, colorspace: str = "rgb") -> PageBitmap:
+    """
+    直接渲染，不经过缓存
+    每页只渲染一次的调用方（如OCR进程池中的工作进程）使用：缓存不会命中，
+    只会在每个进程中各占一份内存并把淘汰的位图写到磁盘
+    """
+    if colorspace not in COLORSPACES:
+        raise ValueError(f"不支持的色彩空间: {colorspace}")
+    return _render(str(pdf_path), page, dpi, colorspace)
+
+
+class RasterService:
+    """带内存LRU与磁盘溢出的页面光栅化服务（线程安全）"""
+
+    def __init__(self, memory_bytes: int = RASTER_CACHE_BYTES, spill_dir: Union[str, Path] = RASTER_DIR,
+                 spill_bytes: int = RASTER_SPILL_BYTES):
+        """
+        Args:
+            memory_bytes: 内存中位图的总字节数上限
+            spill_dir: 淘汰位图的溢出目录
+            spill_bytes: 溢出目录的字节数上限，0 表示淘汰即丢弃
+        """
+        self.memory_bytes = memory_bytes
+        self.spill_bytes = spill_bytes
+        self.spill_dir = Path(spill_dir)
+        if spill_bytes > 0:
+            self.spill_dir.mkdir(parents=True, exist_ok=True)
+        self._memory: "OrderedDict[RenderKey, PageBitmap]" = OrderedDict()
+        self._memory_used = 0
+        self._spill_used: Optional[int] = None
+        self._lock = threading.Lock()
+        self._inflight: Dict[RenderKey, threading.Lock] = {}
+        self._hashes: "OrderedDict[Tuple[str, int, int], str]" = OrderedDict()
+        self.renders = 0
+
+    def document_hash(self, pdf_path: Union[str, Path]) -> str:
+        """文档内容哈希（按路径、大小与修改时间记忆最近 HASH_MEMO_ENTRIES 个文件，同一文件只读一遍）"""
+        path = os.path.realpath(str(pdf_path))
+        stat = os.stat(path)
+        memo_key = (path, stat.st_size, stat.st_mtime_ns)
+        with self._lock:
+            digest = self._hashes.get(memo_key)
+            if digest is not None:
+                self._hashes.move_to_end(memo_key)
+                return digest
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                h.update(chunk)
+        digest = h.hexdigest()
+        with self._lock:
+            self._hashes[memo_key] = digest
+            while len(self._hashes) > HASH_MEMO_ENTRIES:
+                self._hashes.popitem(last=False)
+        return digest
+
+    def render(self, pdf_path: Union[str, Path], page: int, dpi: int = 150, colorspace: str = "rgb",
+               doc_hash: Optional[str] = None) -> PageBitmap:
+        """
+        渲染页面（命中缓存时直接返回）
+
+        Args:
+            pdf_path: PDF文件路径
+            page: 页码（从0开始）
+            dpi: 分辨率
+            colorspace: rgb 或 gray
+            doc_hash: 文档内容哈希，调用方已知时传入可省去哈希计算（如上传时已校验的sha256）
+
+        Returns:
+            PageBitmap；buffer 为只读视图，调用方不应修改
+        """
+        if colorspace not in COLORSPACES:
+            raise ValueError(f"不支持的色彩空间: {colorspace}")
+        key: RenderKey = (doc_hash or self.document_hash(pdf_path), page, dpi, colorspace)
+        bitmap = self._lookup(key)
+        if bitmap is not None:
+            return bitmap
+
+        # 同一页面只渲染一次，其余请求等待后命中缓存
+        with self._lock:
+            inflight = self._inflight.setdefault(key, threading.Lock())
+        with inflight:
+            bitmap = self._lookup(key, record=False)
+            if bitmap is None:
+                bitmap = _render(str(pdf_path), page, dpi, colorspace)
+                self.renders += 1
+                self._insert(key, bitmap)
+        with self._lock:
+            self._inflight.pop(key, None)
+        return bitmap
+
+    def _lookup(self, key: RenderKey, record: bool = True) -> Optional[PageBitmap]:
+        with self._lock:
+            bitmap = self._memory.get(key)
+            if bitmap is not None:
+                self._memory.move_to_end(key)
+        if bitmap is None and self.spill_bytes > 0:
+            bitmap = self._load_spilled(key)
+        if record:
+            metrics.record_cache("raster", bitmap is not None)
+        return bitmap
+
+    def _insert(self, key: RenderKey, bitmap: PageBitmap) -> None:
+        evicted = []
+        with self._lock:
+            self._memory[key] = bitmap
+            self._memory_used += bitmap.nbytes
+            while self._memory_used > self.memory_bytes and len(self._memory) > 1:
+                old_key, old = self._memory.popitem(last=False)
+                self._memory_used -= old.nbytes
+                evicted.append((old_key, old))
+        # 磁盘写入不持有锁
+        for old_key, old in evicted:
+            if self.spill_bytes > 0 and old.nbytes <= self.spill_bytes:
+                self._spill(old_key, old)
+
+    def _spill_path(self, key: RenderKey) -> Path:
+        doc_hash, page, dpi, colorspace = key
+        return self.spill_dir / doc_hash[:2] / f"{doc_hash}-{page}-{dpi}-{colorspace}.raw"
+
+    def _spill(self, key: RenderKey, bitmap: PageBitmap) -> None:
+        path = self._spill_path(key)
+        if path.exists():
+            return
+        try:
+            path.parent.mkdir(exist_ok=True)
+            tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+            with open(tmp, "wb") as f:
+                f.write(_HEADER.pack(_MAGIC, bitmap.width, bitmap.height, bitmap.channels, *bitmap.page_size))
+                f.write(bitmap.buffer)
+            os.replace(tmp, path)
+        except OSError as e:
+            logger.debug(f"位图溢出写入失败: {e}")
+            return
+        self._trim_spill(_HEADER.size + bitmap.nbytes)
+
+    def _load_spilled(self, key: RenderKey) -> Optional[PageBitmap]:
+        path = self._spill_path(key)
+        try:
+            with open(path, "rb") as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            os.utime(path)  # 按访问时间淘汰
+        except (OSError, ValueError):
+            return None
+        magic, width, height, channels, page_width, page_height = _HEADER.unpack_from(mapped)
+        if magic != _MAGIC or len(mapped) != _HEADER.size + width * height * channels:
+            return None
+        _, _, dpi, colorspace = key
+        view = memoryview(mapped)[_HEADER.size:]
+        return PageBitmap(width, height, channels, colorspace, dpi, (page_width, page_height), view, _owner=mapped)
+
+    def _trim_spill(self, added: int) -> None:
+        with self._lock:
+            if self._spill_used is None:
+                self._spill_used = sum(p.stat().st_size for p in self.spill_dir.glob("*/*.raw"))
+            else:
+                self._spill_used += added
+            if self._spill_used <= self.spill_bytes:
+                return
+            entries = []
+            for path in self.spill_dir.glob("*/*.raw"):
+                try:
+                    stat = path.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+            entries.sort()
+            total = sum(size for _, size, _ in entries)
+            # 淘汰到上限的80%，避免每次写入都扫描目录（已映射的文件删除后仍可读）
+            for _, size, path in entries:
+                if total <= self.spill_bytes * 0.8:
+                    break
+                try:
+                    path.unlink()
+                    total -= size
+                except OSError:
+                    pass
+            self._spill_used = total
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_used,
+                "memory_limit": self.memory_bytes,
+                "spill_bytes": self._spill_used,
+                "spill_limit": self.spill_bytes,
+                "renders": self.renders,
+            }
+
+
+_default: Optional[RasterService] = None
+_default_lock = threading.Lock()
+
+
+def get_raster_service() -> RasterService:
+    """进程级默认光栅化服务"""
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = RasterService()
+        return _default
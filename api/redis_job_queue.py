@@ -0,0 +1,374 @@
+"""
+基于Redis协议的分布式作业队列
+多个Render实例共享同一个队列：Web节点只负责入队，工作节点按自身容量领取，
+负载不再取决于请求落在哪个实例上。接口与 SQLiteJobQueue 相同，job_api 与
+conversion_worker 无需区分后端
+
+键布局（前缀默认 pdf2word）:
+    {prefix}:job:{id}        作业JSON
+    {prefix}:queued          有序集合，待领取作业（分数为入队时间）
+    {prefix}:running         有序集合，运行中作业（分数为心跳截止时间）
+    {prefix}:sched           哈希，未结束作业的调度信息（估计成本与客户端，领取时按WSJF排序）
+    {prefix}:input:{id}      输入PDF内容（节点间不共享磁盘）
+    {prefix}:result:{rid}    结果内容（按内容哈希寻址，过期时间同结果存储）
+    {prefix}:events          进度与状态变更的发布频道
+    {prefix}:count:{status}  完成/失败计数
+
+状态变更均使用 WATCH/MULTI 乐观事务，不依赖Lua脚本，fakeredis 同样可用
+
+依赖（可选）:
+    pip install redis          # 连接 redis-server
+    pip install fakeredis      # 本地测试：PDF2WORD_QUEUE_URL=fakeredis://
+"""
+
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from dataclasses import asdict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+from .job_queue import (CLAIM_WINDOW, DONE, FAILED, MAX_ATTEMPTS, QUEUED, RUNNING, VISIBILITY_TIMEOUT, Job,
+                        pick_next)
+from .result_store import RESULT_TTL
+
+logger = logging.getLogger(__name__)
+
+# 本节点上作业输入的落盘目录
+LOCAL_INPUT_DIR = os.path.join(tempfile.gettempdir(), "pdf2word_queue_inputs")
+
+# 已结束作业记录的保留时间（秒）
+FINISHED_JOB_TTL = 24 * 3600
+
+# 乐观事务冲突时的最大重试次数
+_MAX_TX_RETRIES = 16
+
+
+def _text(value: Union[bytes, str]) -> str:
+    return value.decode() if isinstance(value, bytes) else value
+
+
+def connect(url: str):
+    """
+    按URL创建Redis客户端
+
+    Args:
+        url: redis://、rediss://、unix:// 或 fakeredis://
+    """
+    if url.startswith("fakeredis://"):
+        try:
+            import fakeredis
+        except ImportError:
+            raise RuntimeError("使用 fakeredis:// 需要安装 fakeredis: pip install fakeredis")
+        return fakeredis.FakeRedis()
+    try:
+        import redis
+    except ImportError:
+        raise RuntimeError("使用Redis队列需要安装 redis: pip install redis")
+    return redis.Redis.from_url(url)
+
+
+class RedisJobQueue:
+    """Redis作业队列（接口同 SQLiteJobQueue）"""
+
+    def __init__(self, client, prefix: str = "pdf2word", visibility_timeout: float = VISIBILITY_TIMEOUT,
+                 max_attempts: int = MAX_ATTEMPTS, input_dir: Union[str, Path] = LOCAL_INPUT_DIR,
+                 result_ttl: float = RESULT_TTL):
+        """
+        Args:
+            client: redis.Redis 或 fakeredis.FakeRedis 实例
+            prefix: 键前缀（多套部署共用一个Redis时区分）
+            visibility_timeout: 心跳超时秒数
+            max_attempts: 最大尝试次数
+            input_dir: 本节点输入文件目录
+            result_ttl: 结果在Redis中的保留秒数
+        """
+        from redis.exceptions import WatchError
+
+        self.client = client
+        self.prefix = prefix
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max_attempts
+        self.result_ttl = int(result_ttl)
+        self.input_dir = Path(input_dir)
+        self.input_dir.mkdir(parents=True, exist_ok=True)
+        self._watch_error = WatchError
+        self._fetch_lock = threading.Lock()
+
+    @classmethod
+    def from_url(cls, url: str, **kwargs) -> "RedisJobQueue":
+        return cls(connect(url), prefix=os.getenv("PDF2WORD_QUEUE_PREFIX", "pdf2word"), **kwargs)
+
+    def _key(self, *parts: str) -> str:
+        return ":".join((self.prefix,) + parts)
+
+    def _load(self, raw: Optional[bytes]) -> Optional[Job]:
+        return Job(**json.loads(raw)) if raw else None
+
+    def _dump(self, job: Job) -> str:
+        return json.dumps(asdict(job), ensure_ascii=False)
+
+    def _publish(self, pipe, job: Job) -> None:
+        pipe.publish(self._key("events"), json.dumps(
+            {"id": job.id, "status": job.status, "progress": job.progress, "message": job.message},
+            ensure_ascii=False
+        ))
+
+    def _update(self, job_id: str, mutate, watch_running: bool = False) -> Optional[Job]:
+        """
+        以乐观事务修改作业
+
+        Args:
+            job_id: 作业ID
+            mutate: mutate(job, pipe) -> bool；返回False时放弃修改。pipe已进入MULTI，
+                可追加其他命令
+            watch_running: 是否同时监视运行集合（领取/回收时需要）
+
+        Returns:
+            修改后的作业；作业不存在或 mutate 放弃时返回None
+        """
+        job_key = self._key("job", job_id)
+        watched = [job_key, self._key("running")] if watch_running else [job_key]
+        for _ in range(_MAX_TX_RETRIES):
+            with self.client.pipeline() as pipe:
+                try:
+                    pipe.watch(*watched)
+                    job = self._load(pipe.get(job_key))
+                    if job is None:
+                        return None
+                    pipe.multi()
+                    if not mutate(job, pipe):
+                        return None
+                    pipe.set(job_key, self._dump(job))
+                    if job.status in (DONE, FAILED):
+                        pipe.expire(job_key, FINISHED_JOB_TTL)
+                    self._publish(pipe, job)
+                    pipe.execute()
+                    return job
+                except self._watch_error:
+                    continue
+        raise RuntimeError(f"作业 {job_id} 更新冲突次数过多")
+
+    def input_path_for(self, job_id: str) -> Path:
+        """本节点上作业输入的落盘位置"""
+        return self.input_dir / f"{job_id}.pdf"
+
+    def enqueue(self, job_id: str, engine: str, filename: str, input_path: Union[str, Path],
+                output_format: str = "docx", client: Optional[str] = None,
+                trace: Optional[Dict[str, Optional[str]]] = None, cost: float = 1.0) -> Job:
+        """作业入队：输入内容写入Redis，本地文件随即删除"""
+        trace = trace or {}
+        job = Job(id=job_id, status=QUEUED, engine=engine, filename=filename,
+                  input_path=str(self.input_path_for(job_id)), output_format=output_format,
+                  client=client, created=time.time(), cost=cost,
+                  trace_id=trace.get("trace_id"), trace_parent=trace.get("parent_id"))
+        with open(input_path, "rb") as f:
+            data = f.read()
+        pipe = self.client.pipeline()
+        pipe.set(self._key("input", job_id), data)
+        pipe.set(self._key("job", job_id), self._dump(job))
+        pipe.hset(self._key("sched"), job_id, json.dumps({"cost": cost, "client": client}))
+        pipe.zadd(self._key("queued"), {job_id: job.created})
+        self._publish(pipe, job)
+        pipe.execute()
+        try:
+            os.unlink(input_path)
+        except OSError:
+            pass
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._load(self.client.get(self._key("job", job_id)))
+
+    def claim(self, worker_id: str) -> Optional[Job]:
+        """
+        按WSJF优先级领取作业（同 SQLiteJobQueue.claim），并把输入下载到本节点
+
+        Returns:
+            领取到的作业，队列为空时返回None
+        """
+        self._reclaim_stale()
+        queued_key, running_key = self._key("queued"), self._key("running")
+        for _ in range(_MAX_TX_RETRIES):
+            with self.client.pipeline() as pipe:
+                try:
+                    pipe.watch(queued_key)
+                    queued = pipe.zrange(queued_key, 0, CLAIM_WINDOW - 1, withscores=True)
+                    if not queued:
+                        return None
+                    queued = [(_text(raw_id), created) for raw_id, created in queued]
+                    # 运行中的作业数只影响排序，不需要监视运行集合（心跳会频繁修改它）
+                    running_ids = [_text(raw_id) for raw_id in pipe.zrange(running_key, 0, -1)]
+                    sched = self._sched(pipe, [job_id for job_id, _ in queued] + running_ids)
+                    running: Dict[Optional[str], int] = {}
+                    for running_id in running_ids:
+                        client = sched.get(running_id, {}).get("client")
+                        running[client] = running.get(client, 0) + 1
+                    candidates = [(job_id, created, sched.get(job_id, {}).get("cost", 1.0),
+                                   sched.get(job_id, {}).get("client")) for job_id, created in queued]
+                    job_id = pick_next(candidates, running, time.time())
+                    job = self._load(pipe.get(self._key("job", job_id)))
+                    pipe.multi()
+                    pipe.zrem(queued_key, job_id)
+                    if job is None:
+                        # 作业记录已过期，丢弃残留的队列项
+                        pipe.hdel(self._key("sched"), job_id)
+                        pipe.execute()
+                        continue
+                    now = time.time()
+                    job.status, job.worker, job.started, job.heartbeat = RUNNING, worker_id, now, now
+                    job.attempts += 1
+                    pipe.zadd(running_key, {job_id: now + self.visibility_timeout})
+                    pipe.set(self._key("job", job_id), self._dump(job))
+                    self._publish(pipe, job)
+                    pipe.execute()
+                except self._watch_error:
+                    continue
+            data = self.client.get(self._key("input", job_id))
+            if data is None:
+                self.fail(job_id, worker_id, "作业输入已丢失")
+                continue
+            path = self.input_path_for(job_id)
+            with open(path, "wb") as f:
+                f.write(data)
+            job.input_path = str(path)
+            return job
+        return None
+
+    def _sched(self, pipe, job_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """作业的调度信息 {作业ID: {"cost", "client"}}"""
+        if not job_ids:
+            return {}
+        values = pipe.hmget(self._key("sched"), job_ids)
+        return {job_id: json.loads(value) for job_id, value in zip(job_ids, values) if value}
+
+    def _reclaim_stale(self) -> None:
+        """心跳超时的作业：未超过最大尝试次数时重新入队，否则标记失败"""
+        running_key = self._key("running")
+        for raw_id in self.client.zrangebyscore(running_key, "-inf", time.time()):
+            job_id = _text(raw_id)
+
+            def reclaim(job: Job, pipe) -> bool:
+                score = self.client.zscore(running_key, job_id)
+                if job.status != RUNNING or score is None or score > time.time():
+                    return False
+                pipe.zrem(running_key, job_id)
+                if job.attempts < self.max_attempts:
+                    job.status, job.worker = QUEUED, None
+                    pipe.zadd(self._key("queued"), {job_id: job.created})
+                else:
+                    self._finish(job, pipe, FAILED, error="工作进程多次未响应，已放弃")
+                return True
+
+            if self._update(job_id, reclaim, watch_running=True):
+                logger.warning(f"回收心跳超时的作业 {job_id}")
+
+    def _finish(self, job: Job, pipe, status: str, **changes: Any) -> None:
+        job.status, job.finished = status, time.time()
+        for name, value in changes.items():
+            setattr(job, name, value)
+        pipe.zrem(self._key("running"), job.id)
+        pipe.hdel(self._key("sched"), job.id)
+        pipe.delete(self._key("input", job.id))
+        pipe.incr(self._key("count", status))
+
+    def heartbeat(self, job_id: str, worker_id: str) -> bool:
+        """续约；返回False表示作业已被回收（不再属于该工作进程）"""
+        job = self.get(job_id)
+        if job is None or job.status != RUNNING or job.worker != worker_id:
+            return False
+        # xx=True：作业已被回收（不在运行集合中）时不会重新加入
+        self.client.zadd(self._key("running"), {job_id: time.time() + self.visibility_timeout}, xx=True)
+        return self.client.zscore(self._key("running"), job_id) is not None
+
+    def progress(self, job_id: str, worker_id: str, progress: float, message: Optional[str] = None) -> bool:
+        """更新作业进度（0~1）并发布到事件频道"""
+        def mutate(job: Job, pipe) -> bool:
+            if job.status != RUNNING or job.worker != worker_id:
+                return False
+            job.progress = progress
+            if message is not None:
+                job.message = message
+            return True
+
+        return self._update(job_id, mutate) is not None
+
+    def complete(self, job_id: str, worker_id: str, result_id: str, message: str = "") -> bool:
+        def mutate(job: Job, pipe) -> bool:
+            if job.status != RUNNING or job.worker != worker_id:
+                return False
+            self._finish(job, pipe, DONE, result_id=result_id, message=message, error=None, progress=1.0)
+            return True
+
+        return self._update(job_id, mutate) is not None
+
+    def fail(self, job_id: str, worker_id: str, error: str, retry: bool = False) -> bool:
+        """
+        标记作业失败
+
+        Args:
+            retry: 是否允许重试（临时性错误；转换本身失败时不重试）
+        """
+        def mutate(job: Job, pipe) -> bool:
+            if job.status != RUNNING or job.worker != worker_id:
+                return False
+            if retry and job.attempts < self.max_attempts:
+                job.status, job.worker, job.error = QUEUED, None, error
+                pipe.zrem(self._key("running"), job_id)
+                pipe.zadd(self._key("queued"), {job_id: job.created})
+            else:
+                self._finish(job, pipe, FAILED, error=error)
+            return True
+
+        return self._update(job_id, mutate) is not None
+
+    def publish_result(self, job_id: str, entry) -> None:
+        """把结果内容写入Redis，供其他节点的Web进程下载"""
+        with open(entry.path, "rb") as f:
+            self.client.set(self._key("result", entry.id), f.read(), ex=self.result_ttl)
+
+    def fetch_result(self, job: Job, store):
+        """
+        取回作业结果：本节点结果存储中没有时从Redis下载并放入存储
+
+        Returns:
+            StoredResult，已过期时返回None
+        """
+        entry = store.get(job.result_id, job.output_name)
+        if entry is not None:
+            return entry
+        with self._fetch_lock:
+            entry = store.get(job.result_id, job.output_name)
+            if entry is not None:
+                return entry
+            data = self.client.get(self._key("result", job.result_id))
+            if data is None:
+                return None
+            fd, tmp_path = tempfile.mkstemp(prefix=".fetch_", dir=str(store.root))
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            return store.put(tmp_path, job.output_name)
+
+    def release_input(self, job: Job) -> None:
+        """输入内容保存在Redis中，本节点的副本在作业结束或交还队列后即可删除"""
+        try:
+            os.unlink(job.input_path)
+        except OSError:
+            pass
+
+    def stats(self) -> Dict[str, int]:
+        """各状态的作业数（done/failed 为累计数）"""
+        pipe = self.client.pipeline()
+        pipe.zcard(self._key("queued"))
+        pipe.zcard(self._key("running"))
+        pipe.get(self._key("count", DONE))
+        pipe.get(self._key("count", FAILED))
+        queued, running, done, failed = pipe.execute()
+        return {QUEUED: queued, RUNNING: running, DONE: int(done or 0), FAILED: int(failed or 0)}
+
+    def purge(self, older_than: float) -> int:
+        """已结束作业的记录由Redis过期时间自动清理"""
+        return 0
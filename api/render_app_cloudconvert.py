@@ -6,17 +6,21 @@ PDF转Word服务 - CloudConvert高质量版本
 """
 
 import os
-import tempfile
 import logging
 import asyncio
+import time
 from datetime import datetime
 from typing import Dict, Any
 
 from fastapi import FastAPI, UploadFile, File, HTTPException
-from fastapi.responses import FileResponse, HTMLResponse
+from fastapi.responses import HTMLResponse
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.concurrency import run_in_threadpool
 
 from .hybrid_converter import HybridConverter
+from .result_store import get_store
+from .staging import get_staging
+from . import metrics, tracing, result_store, chunked_upload
 
 # 配置日志
 logging.basicConfig(
@@ -44,6 +48,11 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 指标: /metrics 路由与响应写出计时
+metrics.install(app)
+tracing.install(app)
+result_store.install(app)
+
 # 初始化混合转换器
 converter = HybridConverter(CLOUDCONVERT_API_KEY)
 
@@ -441,60 +450,24 @@ async def convert_pdf_to_word(file: UploadFile = File(...)):
         if not file.filename.lower().endswith('.pdf'):
             raise HTTPException(status_code=400, detail="只支持PDF文件")
         
-        # 验证文件大小 (限制100MB)
-        file_content = await file.read()
-        file_size = len(file_content)
-        
-        if file_size > 100 * 1024 * 1024:  # 100MB
+        # 上传内容分块写入暂存区（内存充足时位于 /dev/shm），同时验证文件大小 (限制100MB)
+        job = get_staging().job(file.size or 0)
+        try:
+            with metrics.stage_timer(metrics.STAGE_UPLOAD):
+                input_path = str(await run_in_threadpool(job.spool, "input.pdf", file.file, 100 * 1024 * 1024))
+        except ValueError:
+            job.cleanup()
             raise HTTPException(status_code=400, detail="文件大小不能超过100MB")
+        file_size = os.path.getsize(input_path)
         
         logger.info(f"文件验证通过: {file.filename} ({file_size} bytes)")
         
-        # 创建临时文件
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as temp_input:
-            temp_input.write(file_content)
-            input_path = temp_input.name
-        
-        # 生成输出文件名
-        base_name = os.path.splitext(file.filename)[0]
-        output_filename = f"{base_name}_converted.docx"
-        
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.docx') as temp_output:
-            output_path = temp_output.name
-        
         try:
-            # 使用混合转换器进行转换
-            logger.info("开始混合转换处理")
-            success, method, conversion_info = await converter.convert_pdf_to_word(input_path, output_path)
-            
-            if not success:
-                raise HTTPException(status_code=500, detail=f"转换失败: {conversion_info.get('error', '未知错误')}")
-            
-            # 验证输出文件
-            if not os.path.exists(output_path) or os.path.getsize(output_path) == 0:
-                raise HTTPException(status_code=500, detail="转换输出文件无效")
-            
-            # 计算处理时间
-            processing_time = (datetime.now() - start_time).total_seconds()
-            
-            logger.info(f"转换成功: {method} - {conversion_info}")
-            
-            # 准备响应
-            return {
-                "message": "转换成功",
-                "filename": output_filename,
-                "conversion_method": method,
-                "conversion_info": conversion_info,
-                "processing_time": f"{processing_time:.2f}秒",
-                "download_url": f"/api/download/{os.path.basename(output_path)}"
-            }
-            
+            return await _convert_staged(input_path, file.filename, file_size, str(job.path_for("output.docx")),
+                                         start_time)
         finally:
             # 清理输入文件
-            try:
-                os.unlink(input_path)
-            except:
-                pass
+            job.cleanup()
                 
     except HTTPException:
         raise
@@ -502,20 +475,65 @@ async def convert_pdf_to_word(file: UploadFile = File(...)):
         logger.error(f"转换异常: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"转换失败: {str(e)}")
 
-@app.get("/api/download/{filename}")
-async def download_file(filename: str):
-    """下载转换后的文件"""
-    file_path = os.path.join(tempfile.gettempdir(), filename)
-    
-    if not os.path.exists(file_path):
-        raise HTTPException(status_code=404, detail="文件不存在或已过期")
-    
-    return FileResponse(
-        path=file_path,
-        filename=filename,
-        media_type='application/vnd.openxmlformats-officedocument.wordprocessingml.document'
+async def _convert_staged(input_path: str, filename: str, file_size: int, output_path: str,
+                          start_time: datetime) -> Dict[str, Any]:
+    """转换已落盘的PDF（普通上传或分块上传），结果移入结果存储"""
+    # 生成输出文件名
+    base_name = os.path.splitext(filename)[0]
+    output_filename = f"{base_name}_converted.docx"
+
+    # 使用混合转换器进行转换
+    logger.info("开始混合转换处理")
+    conversion_start = time.perf_counter()
+    with tracing.span("engine.hybrid", filename=filename), \
+            metrics.INFLIGHT_JOBS.track(engine="hybrid"):
+        success, method, conversion_info = await converter.convert_pdf_to_word(input_path, output_path)
+    conversion_seconds = time.perf_counter() - conversion_start
+    metrics.STAGE_DURATION.observe(conversion_seconds, engine=method, stage=metrics.STAGE_CONVERSION)
+    metrics.record_conversion(
+        method, success, conversion_seconds,
+        bytes_in=file_size,
+        bytes_out=conversion_info.get("output_size", 0) if success else 0
     )
 
+    if not success:
+        raise HTTPException(status_code=500, detail=f"转换失败: {conversion_info.get('error', '未知错误')}")
+
+    # 验证输出文件
+    if not os.path.exists(output_path) or os.path.getsize(output_path) == 0:
+        raise HTTPException(status_code=500, detail="转换输出文件无效")
+
+    # 移入结果存储，下载接口支持Range续传和条件请求
+    entry = await run_in_threadpool(get_store().put, output_path, output_filename)
+
+    # 计算处理时间
+    processing_time = (datetime.now() - start_time).total_seconds()
+
+    logger.info(f"转换成功: {method} - {conversion_info}")
+
+    # 准备响应
+    return {
+        "message": "转换成功",
+        "filename": output_filename,
+        "conversion_method": method,
+        "conversion_info": conversion_info,
+        "processing_time": f"{processing_time:.2f}秒",
+        "download_url": entry.download_url
+    }
+
+async def convert_upload(upload, sha256: str, request):
+    """分块上传完成后直接转换上传目录中的文件，不再复制"""
+    logger.info(f"分块上传完成: {upload.filename} ({upload.length} bytes, sha256={sha256[:12]})")
+    job = get_staging().job(0)
+    try:
+        return await _convert_staged(str(upload.path), upload.filename, upload.length,
+                                     str(job.path_for("output.docx")), datetime.now())
+    finally:
+        job.cleanup()
+
+# 分块断点续传上传：/api/uploads，完成后直接转换
+chunked_upload.install(app, convert_upload, max_bytes=100 * 1024 * 1024)
+
 @app.get("/api/stats")
 async def get_stats():
     """获取转换统计信息"""
@@ -529,7 +547,11 @@ async def get_stats():
             "智能备用转换"
         ],
         "file_size_limit": "100MB",
-        "supported_formats": ["PDF → DOCX"]
+        "supported_formats": ["PDF → DOCX"],
+        "conversion_stats": {
+            f"{engine}_{result}": int(count)
+            for (engine, result), count in metrics.CONVERSIONS.snapshot().items()
+        }
     }
 
 if __name__ == "__main__":
@@ -3,9 +3,10 @@ LibreOffice PDF转Word服务 - Render部署版
 免费、高质量的PDF到Word转换服务
 """
 
-from fastapi import FastAPI, File, UploadFile, HTTPException
+from fastapi import FastAPI, File, UploadFile, HTTPException, Request
 from fastapi.responses import Response, JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.concurrency import run_in_threadpool
 import logging
 import os
 import sys
@@ -15,15 +16,26 @@ import uvicorn
 # 添加当前目录到Python路径
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
+from api.lazy_imports import start_prewarm
+from api.file_response import RangeFileResponse
+from api.result_store import get_store
+from api.staging import get_staging
+from api import metrics, tracing, mock_engine, result_store, job_api, chunked_upload, incremental_convert, preview
+from api.job_queue import get_queue
+
 try:
-    from api.libreoffice_converter import LibreOfficeConverter
+    from api.libre_hybrid_converter import LibreHybridConverter
 except ImportError as e:
     logging.error(f"Import error: {e}")
     # 创建一个占位转换器
     class LibreHybridConverter:
         def convert_pdf_to_docx(self, pdf_content, filename):
             return False, b"", "LibreHybridConverter import failed"
-        def get_status(self):
+        def convert_file(self, pdf_path, output_path, filename=None):
+            return False, "LibreHybridConverter import failed"
+        def start_discovery(self):
+            pass
+        def get_status(self, wait=True):
             return {"error": "Import failed"}
         def get_installation_guide(self):
             return {"error": "Import failed"}
@@ -51,8 +63,26 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# 初始化转换器
-converter = LibreHybridConverter()
+# 指标: /metrics 路由与响应写出计时
+metrics.install(app)
+tracing.install(app)
+result_store.install(app)
+
+# 初始化转换器（LibreOffice探测延迟到启动后的后台线程）
+if mock_engine.is_enabled():
+    # 压测模式：用模拟引擎测量Web层自身开销
+    converter = mock_engine.MockConverter()
+else:
+    converter = LibreHybridConverter()
+
+# 异步作业API：多进程部署时由独立的转换进程消费队列
+job_api.install(app, "mock" if mock_engine.is_enabled() else "hybrid")
+
+@app.on_event("startup")
+async def start_background_init():
+    """启动后台初始化：不阻塞端口绑定和健康检查"""
+    converter.start_discovery()
+    start_prewarm(("PyPDF2", "fitz"))
 
 @app.get("/")
 async def root():
@@ -497,7 +527,10 @@ async def root():
 async def get_status():
     """获取转换器状态"""
     try:
-        status = converter.get_status()
+        # 首次调用可能需要等待LibreOffice探测，放到线程池避免阻塞事件循环
+        status = await run_in_threadpool(converter.get_status)
+        # converter.stats 仅为本进程统计；队列统计由所有进程共享
+        status["job_queue"] = await run_in_threadpool(get_queue().stats)
         return JSONResponse(content=status)
     except Exception as e:
         logger.error(f"获取状态失败: {e}")
@@ -530,38 +563,43 @@ async def convert_pdf(file: UploadFile = File(...)):
     # 验证文件大小 (50MB限制)
     max_size = 50 * 1024 * 1024  # 50MB
     
+    # 暂存目录（内存充足时位于 /dev/shm），响应发送完毕后删除
+    job = get_staging().job(file.size or 0)
     try:
-        # 读取文件内容
-        pdf_content = await file.read()
-        
-        if len(pdf_content) > max_size:
-            raise HTTPException(status_code=400, detail="文件大小不能超过50MB")
-        
-        if len(pdf_content) == 0:
+        # 上传内容分块写入暂存区，不在内存中保留完整文件
+        with tracing.span("upload.spool"), metrics.stage_timer(metrics.STAGE_UPLOAD):
+            try:
+                pdf_path = await run_in_threadpool(job.spool, "input.pdf", file.file, max_size)
+            except ValueError:
+                raise HTTPException(status_code=400, detail="文件大小不能超过50MB")
+        
+        pdf_size = pdf_path.stat().st_size
+        if pdf_size == 0:
             raise HTTPException(status_code=400, detail="文件为空")
         
-        logger.info(f"开始转换文件: {file.filename}, 大小: {len(pdf_content)} bytes")
+        logger.info(f"开始转换文件: {file.filename}, 大小: {pdf_size} bytes")
         
-        # 执行转换
-        success, docx_content, message = converter.convert_pdf_to_docx(pdf_content, file.filename)
+        # 执行转换（阻塞调用放到线程池）
+        output_path = job.path_for("output.docx")
+        success, message = await run_in_threadpool(
+            converter.convert_file, str(pdf_path), str(output_path), file.filename
+        )
         
         if not success:
             logger.error(f"转换失败: {message}")
             raise HTTPException(status_code=500, detail=f"转换失败: {message}")
         
-        logger.info(f"转换成功: {message}, 输出大小: {len(docx_content)} bytes")
+        logger.info(f"转换成功: {message}, 输出大小: {output_path.stat().st_size} bytes")
         
         # 生成输出文件名
         output_filename = file.filename.rsplit('.', 1)[0] + '.docx'
         
-        # 返回DOCX文件
-        return Response(
-            content=docx_content,
-            media_type="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
-            headers={
-                "Content-Disposition": f"attachment; filename=\"{output_filename}\"",
-                "Content-Length": str(len(docx_content))
-            }
+        # 移入结果存储，中断的下载可通过 /api/download/{id} 按Range续传
+        with tracing.span("output.publish"), metrics.stage_timer(metrics.STAGE_POSTPROCESS):
+            entry = await run_in_threadpool(get_store().put, output_path, output_filename)
+        
+        return RangeFileResponse.from_result(
+            entry, headers={"X-Result-Id": entry.id, "Content-Location": entry.download_url}
         )
         
     except HTTPException:
@@ -569,11 +607,55 @@ async def convert_pdf(file: UploadFile = File(...)):
     except Exception as e:
         logger.error(f"转换过程中发生错误: {e}")
         raise HTTPException(status_code=500, detail=f"服务器内部错误: {str(e)}")
+    finally:
+        job.cleanup()
+
+async def convert_upload(upload, sha256: str, request: Request):
+    """分块上传完成后直接转换上传目录中的文件，不再复制"""
+    logger.info(f"分块上传完成: {upload.filename} ({upload.length} bytes, sha256={sha256[:12]})")
+    job = get_staging().job(0)
+    try:
+        output_path = job.path_for("output.docx")
+        if incremental_convert.IncrementalRegistry.wants(upload):
+            # 快速文本引擎：复用上传期间已转换的页面
+            success, message = await run_in_threadpool(
+                incremental_convert.get_registry().convert, upload, output_path
+            )
+        else:
+            success, message = await run_in_threadpool(
+                converter.convert_file, str(upload.path), str(output_path), upload.filename
+            )
+        if not success:
+            logger.error(f"转换失败: {message}")
+            raise HTTPException(status_code=500, detail=f"转换失败: {message}")
+        
+        output_filename = upload.filename.rsplit('.', 1)[0] + '.docx'
+        with tracing.span("output.publish"), metrics.stage_timer(metrics.STAGE_POSTPROCESS):
+            entry = await run_in_threadpool(get_store().put, output_path, output_filename)
+        
+        return RangeFileResponse.from_result(
+            entry, headers={"X-Result-Id": entry.id, "Content-Location": entry.download_url}
+        )
+    finally:
+        job.cleanup()
+
+def upload_progress(upload, offset: int) -> None:
+    """分块提交后：线性化PDF提前转换；上传完成时预先渲染首页缩略图"""
+    incremental_convert.get_registry().progress(upload, offset)
+    previews.prerender(upload, offset)
+
+# 分块断点续传上传：/api/uploads，完成后直接转换；engine=fast 时上传期间提前转换线性化PDF
+uploads = chunked_upload.install(app, convert_upload, max_bytes=50 * 1024 * 1024,
+                                 on_progress=upload_progress,
+                                 on_discard=incremental_convert.get_registry().discard)
+# 上传文件的缩略图预览：/api/preview/{upload_id}
+previews = preview.install(app, uploads)
+incremental_convert.install(app)
 
 @app.get("/healthz")
 async def health_check():
     """健康检查"""
-    status = converter.get_status()
+    status = converter.get_status(wait=False)
     
     return {
         "status": "healthy",
@@ -0,0 +1,196 @@
+"""
+转换结果存储
+以内容SHA-256为键保存转换结果，相同内容只存一份；键同时用作下载ID和HTTP ETag。
+结果通过重命名/硬链接从暂存区移入，过期文件在写入时顺带清理。
+相同内容可能来自不同用户，下载文件名不写入共享的元数据，而是随每次请求的下载链接传递
+
+环境变量:
+    PDF2WORD_RESULT_DIR         结果目录（默认: 系统临时目录/pdf2word_results）
+    PDF2WORD_RESULT_TTL_HOURS   结果保留时间（默认 24 小时）
+"""
+
+import hashlib
+import json
+import logging
+import mimetypes
+import os
+import re
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional, Union
+from urllib.parse import quote
+
+from . import metrics
+from .staging import publish
+
+logger = logging.getLogger(__name__)
+
+RESULT_DIR = os.getenv("PDF2WORD_RESULT_DIR", os.path.join(tempfile.gettempdir(), "pdf2word_results"))
+RESULT_TTL = float(os.getenv("PDF2WORD_RESULT_TTL_HOURS", "24")) * 3600
+
+# 两次过期清理之间的最小间隔（秒）
+PURGE_INTERVAL = 600
+
+_ID_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+
+DOCX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+
+
+@dataclass
+class StoredResult:
+    """结果存储中的一个条目"""
+    id: str
+    path: Path
+    size: int
+    filename: str
+    media_type: str
+    mtime: float
+
+    @property
+    def etag(self) -> str:
+        return f'"{self.id}"'
+
+    @property
+    def download_url(self) -> str:
+        return f"/api/download/{self.id}?filename={quote(self.filename)}"
+
+
+def file_sha256(path: Union[str, Path]) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ResultStore:
+    """内容寻址的结果目录: <root>/<sha256前两位>/<sha256>（数据）与 <sha256>.json（元数据）"""
+
+    def __init__(self, root: Union[str, Path] = RESULT_DIR, ttl: float = RESULT_TTL):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._last_purge = 0.0
+
+    def _paths(self, result_id: str):
+        base = self.root / result_id[:2] / result_id
+        return base, base.with_suffix(".json")
+
+    def put(self, src: Union[str, Path], filename: str, media_type: str = DOCX_MEDIA_TYPE,
+            keep_source: bool = False) -> StoredResult:
+        """
+        把转换结果移入存储
+
+        Args:
+            src: 结果文件（通常位于暂存区）
+            filename: 本次请求下载时使用的文件名（只写入返回的条目和下载链接）
+            media_type: MIME类型
+            keep_source: 是否保留源文件（为True时硬链接）
+
+        Returns:
+            StoredResult
+        """
+        result_id = file_sha256(src)
+        data_path, meta_path = self._paths(result_id)
+        data_path.parent.mkdir(exist_ok=True)
+
+        with self._lock:
+            hit = data_path.exists()
+            if hit:
+                # 内容相同的结果已存在：刷新过期时间，丢弃新文件
+                os.utime(data_path)
+                if not keep_source:
+                    os.unlink(src)
+            else:
+                meta_tmp = meta_path.with_suffix(".json.tmp")
+                with open(meta_tmp, "w", encoding="utf-8") as f:
+                    json.dump({"media_type": media_type}, f, ensure_ascii=False)
+                os.replace(meta_tmp, meta_path)
+                publish(src, data_path, keep_source=keep_source)
+        metrics.record_cache("result_store", hit)
+
+        self._maybe_purge()
+        stat = data_path.stat()
+        return StoredResult(result_id, data_path, stat.st_size, filename, media_type, stat.st_mtime)
+
+    def get(self, result_id: str, filename: Optional[str] = None) -> Optional[StoredResult]:
+        """
+        按ID查找结果，ID非法或已过期时返回None
+
+        Args:
+            result_id: 结果ID
+            filename: 下载文件名（来自下载链接，缺省时为 <ID>.<扩展名>）
+        """
+        if not _ID_PATTERN.match(result_id):
+            return None
+        data_path, meta_path = self._paths(result_id)
+        try:
+            stat = data_path.stat()
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if self.ttl and time.time() - stat.st_mtime > self.ttl:
+            return None
+        media_type = meta.get("media_type", DOCX_MEDIA_TYPE)
+        if not filename:
+            extension = ".docx" if media_type == DOCX_MEDIA_TYPE else mimetypes.guess_extension(media_type) or ""
+            filename = f"{result_id}{extension}"
+        return StoredResult(result_id, data_path, stat.st_size, filename, media_type, stat.st_mtime)
+
+    def _maybe_purge(self) -> None:
+        now = time.time()
+        if not self.ttl or now - self._last_purge < PURGE_INTERVAL:
+            return
+        self._last_purge = now
+        removed = 0
+        for data_path in self.root.glob("??/*"):
+            if data_path.suffix:
+                continue
+            try:
+                if now - data_path.stat().st_mtime > self.ttl:
+                    data_path.unlink()
+                    data_path.with_suffix(".json").unlink(missing_ok=True)
+                    removed += 1
+            except OSError:
+                continue
+        if removed:
+            logger.info(f"清理过期结果: {removed} 个")
+
+
+_default: Optional[ResultStore] = None
+
+
+def get_store() -> ResultStore:
+    """进程级默认结果存储"""
+    global _default
+    if _default is None:
+        _default = ResultStore()
+    return _default
+
+
+def install(app, store: Optional[ResultStore] = None) -> None:
+    """
+    注册下载路由 GET /api/download/{result_id}（支持Range、ETag和条件请求）
+
+    Args:
+        app: FastAPI应用
+        store: 结果存储（默认进程级存储）
+    """
+    from fastapi import HTTPException
+
+    from .file_response import RangeFileResponse
+
+    @app.get("/api/download/{result_id}")
+    async def download_result(result_id: str, filename: Optional[str] = None):
+        """下载转换结果（filename 为转换响应中下载链接携带的文件名）"""
+        if filename:
+            filename = os.path.basename(filename.replace("\\", "/"))
+        entry = (store or get_store()).get(result_id, filename)
+        if entry is None:
+            raise HTTPException(status_code=404, detail="文件不存在或已过期")
+        return RangeFileResponse.from_result(entry)
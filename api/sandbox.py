@@ -0,0 +1,348 @@
+"""
+内存受限的转换沙箱
+个别异常PDF（超大图片、深层嵌套的XObject）会让 pdf2docx 或 soffice 的内存膨胀到
+超过容器上限，整个服务被OOM杀掉。每次转换在子进程中执行：
+
+- RLIMIT_AS 限制子进程地址空间，超限时分配失败（MemoryError）而不是拖垮宿主
+- 看门狗按间隔读取子进程树的RSS（/proc），超过预算立即杀掉整个进程组
+- 超出预算的作业记入 pdf2word_sandbox_kills_total，并按回退策略改用更省内存的引擎
+
+Python转换函数通过 forkserver 启动（服务端进程有多个线程，直接fork不安全），
+预加载 pdf2docx 等重型库，每次转换只需fork；soffice 等外部命令用 run_command()。
+非Linux平台（没有 resource 模块或 /proc）时退化为直接在当前进程执行。
+
+环境变量:
+    PDF2WORD_SANDBOX              设为 0 关闭沙箱
+    PDF2WORD_SANDBOX_AS_MB        子进程地址空间上限（默认 3072，含共享库映射，应大于RSS预算）
+    PDF2WORD_SANDBOX_RSS_MB       子进程树RSS预算（默认 1536）
+    PDF2WORD_SANDBOX_TIMEOUT      单次转换超时秒数（默认 600）
+"""
+
+import logging
+import multiprocessing
+import os
+import signal
+import subprocess
+import time
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+
+from . import metrics, tracing
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+MB = 1024 * 1024
+
+SANDBOX_ENABLED = os.getenv("PDF2WORD_SANDBOX", "1") != "0"
+ADDRESS_SPACE_LIMIT = int(os.getenv("PDF2WORD_SANDBOX_AS_MB", "3072")) * MB
+RSS_LIMIT = int(os.getenv("PDF2WORD_SANDBOX_RSS_MB", "1536")) * MB
+SANDBOX_TIMEOUT = float(os.getenv("PDF2WORD_SANDBOX_TIMEOUT", "600"))
+
+# 看门狗采样间隔（秒）
+POLL_INTERVAL = 0.2
+
+# forkserver 启动时预先导入的模块，子进程fork后无需再次导入
+PRELOAD_MODULES = ["api.conversion_worker", "pdf2docx", "fitz"]
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+class MemoryLimitExceeded(RuntimeError):
+    """转换超出内存预算被终止"""
+
+    def __init__(self, reason: str, limit: int, peak: int = 0):
+        """
+        Args:
+            reason: rss（看门狗杀掉）/ address_space（分配失败）/ killed（被系统OOM杀掉）
+            limit: 触发的上限（字节）
+            peak: 观测到的峰值RSS（字节）
+        """
+        self.reason = reason
+        self.limit = limit
+        self.peak = peak
+        super().__init__(f"转换超出内存预算 ({reason}, 上限 {limit // MB}MB, 峰值 {peak // MB}MB)")
+
+
+class SandboxError(RuntimeError):
+    """子进程异常退出"""
+
+
+def is_supported() -> bool:
+    """当前平台是否支持沙箱（需要 resource 模块与 /proc）"""
+    return SANDBOX_ENABLED and resource is not None and os.path.isdir("/proc/self")
+
+
+def _rss(pid: int) -> int:
+    with open(f"/proc/{pid}/statm", "r") as f:
+        return int(f.read().split()[1]) * _PAGE_SIZE
+
+
+def _children(pid: int) -> List[int]:
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children", "r") as f:
+            return [int(child) for child in f.read().split()]
+    except OSError:
+        return []
+
+
+def process_tree_rss(pid: int) -> Optional[int]:
+    """
+    进程及其所有子孙进程的RSS之和（soffice 包装脚本会再启动 soffice.bin）
+
+    Returns:
+        字节数；进程已退出时返回None
+    """
+    total = 0
+    stack = [pid]
+    seen = set()
+    while stack:
+        current = stack.pop()
+        if current in seen:
+            continue
+        seen.add(current)
+        try:
+            total += _rss(current)
+        except (OSError, ValueError, IndexError):
+            if current == pid:
+                return None
+            continue
+        stack.extend(_children(current))
+    return total
+
+
+def _limit_address_space(limit: int) -> None:
+    if resource is not None and limit > 0:
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+
+def _kill_group(pid: int) -> None:
+    """杀掉尚未回收的进程及其进程组"""
+    try:
+        os.killpg(pid, signal.SIGKILL)
+    except OSError:
+        try:
+            os.kill(pid, signal.SIGKILL)
+        except OSError:
+            pass
+
+
+def _kill_leftovers(pgid: int) -> None:
+    """
+    组长已退出并被回收后清理同组的残留进程
+    只能用 killpg：组内没有进程时返回 ESRCH，而组长的PID可能已被无关进程复用，不能再 os.kill
+    """
+    try:
+        os.killpg(pgid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+    except OSError as e:
+        logger.debug(f"清理进程组 {pgid} 失败: {e}")
+
+
+def _caused_by_memory_error(error: BaseException) -> bool:
+    """转换器常把原始异常包装成 Exception(...)，沿异常链查找 MemoryError"""
+    while error is not None:
+        if isinstance(error, MemoryError):
+            return True
+        error = error.__cause__ or error.__context__
+    return False
+
+
+def _record_kill(engine: str, error: MemoryLimitExceeded) -> None:
+    metrics.SANDBOX_KILLS.inc(engine=engine, reason=error.reason)
+    logger.warning(f"沙箱终止转换 [{engine}]: {error}")
+
+
+def run_command(cmd: Sequence[str], timeout: float = SANDBOX_TIMEOUT, rss_limit: int = RSS_LIMIT,
+                as_limit: int = ADDRESS_SPACE_LIMIT, engine: str = "subprocess",
+                **kwargs: Any) -> subprocess.CompletedProcess:
+    """
+    在内存受限的进程组中执行外部命令（subprocess.run 的替代，输出以文本捕获）
+
+    Raises:
+        MemoryLimitExceeded: 进程树RSS超过预算
+        subprocess.TimeoutExpired: 超时
+    """
+    if not is_supported():
+        return subprocess.run(cmd, capture_output=True, text=True, timeout=timeout, **kwargs)
+
+    proc = subprocess.Popen(
+        cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, start_new_session=True, **kwargs
+    )
+    # 多线程进程中不能使用 preexec_fn，启动后用 prlimit 设置（后续exec的子进程继承）
+    if as_limit > 0:
+        try:
+            resource.prlimit(proc.pid, resource.RLIMIT_AS, (as_limit, as_limit))
+        except (OSError, AttributeError) as e:
+            logger.debug(f"无法设置地址空间上限: {e}")
+    deadline = time.monotonic() + timeout
+    peak = 0
+    try:
+        while True:
+            try:
+                stdout, stderr = proc.communicate(timeout=POLL_INTERVAL)
+                break
+            except subprocess.TimeoutExpired:
+                pass
+            rss = process_tree_rss(proc.pid) or 0
+            peak = max(peak, rss)
+            if rss_limit and rss > rss_limit:
+                _kill_group(proc.pid)
+                proc.communicate()
+                error = MemoryLimitExceeded("rss", rss_limit, peak)
+                _record_kill(engine, error)
+                raise error
+            if time.monotonic() > deadline:
+                _kill_group(proc.pid)
+                proc.communicate()
+                raise subprocess.TimeoutExpired(cmd, timeout)
+    except BaseException:
+        if proc.poll() is None:
+            _kill_group(proc.pid)
+            proc.wait()
+        raise
+    # 同一进程组内残留的子进程（soffice.bin）一并清理
+    _kill_leftovers(proc.pid)
+    return subprocess.CompletedProcess(cmd, proc.returncode, stdout, stderr)
+
+
+def _child_main(conn, fn: Callable, args: Tuple[Any, ...], as_limit: int,
+                trace: Optional[dict] = None) -> None:
+    # 独立进程组，看门狗可以连同孙进程一起杀掉
+    os.setsid()
+    _limit_address_space(as_limit)
+    try:
+        # 子进程中的span归入父进程请求的trace
+        with tracing.attach(trace):
+            result = ("ok", fn(*args))
+    except BaseException as e:
+        if _caused_by_memory_error(e):
+            result = ("memory", str(e))
+        else:
+            result = ("error", f"{type(e).__name__}: {e}")
+    try:
+        conn.send(result)
+    except Exception as e:
+        conn.send(("error", f"结果无法传回父进程: {e}"))
+    finally:
+        conn.close()
+
+
+_context = None
+
+
+def process_context():
+    """预加载重型库的 forkserver 上下文（其他进程池也可复用）"""
+    global _context
+    if _context is None:
+        _context = multiprocessing.get_context("forkserver")
+        _context.set_forkserver_preload(PRELOAD_MODULES)
+    return _context
+
+
+def run_in_sandbox(fn: Callable, *args: Any, timeout: float = SANDBOX_TIMEOUT, rss_limit: int = RSS_LIMIT,
+                   as_limit: int = ADDRESS_SPACE_LIMIT, engine: str = "python") -> Any:
+    """
+    在内存受限的子进程中执行 fn(*args) 并返回结果
+
+    Args:
+        fn: 可pickle的函数或绑定方法（模块级定义），参数与返回值同样需要可pickle
+        timeout: 超时秒数
+        rss_limit: 子进程树RSS预算（字节）
+        as_limit: 地址空间上限（字节）
+        engine: 指标中的引擎名
+
+    Raises:
+        MemoryLimitExceeded: 超出内存预算
+        TimeoutError: 超时
+        SandboxError: 子进程中抛出异常或异常退出
+    """
+    if not is_supported():
+        return fn(*args)
+
+    ctx = process_context()
+    parent_conn, child_conn = ctx.Pipe(duplex=False)
+    process = ctx.Process(target=_child_main, args=(child_conn, fn, args, as_limit, tracing.get_context()),
+                          daemon=True)
+    process.start()
+    child_conn.close()
+    deadline = time.monotonic() + timeout
+    peak = 0
+    try:
+        while True:
+            if parent_conn.poll(POLL_INTERVAL):
+                try:
+                    status, value = parent_conn.recv()
+                except EOFError:
+                    status, value = "exit", None
+                break
+            if not process.is_alive():
+                status, value = "exit", None
+                break
+            rss = process_tree_rss(process.pid) or 0
+            peak = max(peak, rss)
+            if rss_limit and rss > rss_limit:
+                _kill_group(process.pid)
+                error = MemoryLimitExceeded("rss", rss_limit, peak)
+                _record_kill(engine, error)
+                raise error
+            if time.monotonic() > deadline:
+                _kill_group(process.pid)
+                raise TimeoutError(f"转换超时 ({timeout:.0f}秒)")
+    finally:
+        parent_conn.close()
+        process.join(timeout=5)
+        if process.is_alive():
+            _kill_group(process.pid)
+            process.join()
+
+    if status == "ok":
+        return value
+    if status == "memory":
+        error = MemoryLimitExceeded("address_space", as_limit, peak)
+        _record_kill(engine, error)
+        raise error
+    if status == "exit":
+        if process.exitcode == -signal.SIGKILL:
+            # 没有传回结果就被SIGKILL：通常是系统OOM killer
+            error = MemoryLimitExceeded("killed", rss_limit, peak)
+            _record_kill(engine, error)
+            raise error
+        raise SandboxError(f"转换进程异常退出 (exit code {process.exitcode})")
+    raise SandboxError(value)
+
+
+class SandboxedEngine:
+    """
+    在沙箱中执行文件接口转换器（convert_file），超出内存预算时改用回退引擎
+
+    回退引擎应当是逐页处理、内存占用与页数无关的引擎（如快速文本引擎），
+    在当前进程中直接执行。
+    """
+
+    def __init__(self, engine: Any, fallback: Any = None, name: str = "engine"):
+        """
+        Args:
+            engine: 可pickle的转换器实例
+            fallback: 回退转换器，None表示超出预算时直接失败
+            name: 指标与日志中的引擎名
+        """
+        self.engine = engine
+        self.fallback = fallback
+        self.name = name
+
+    def convert_file(self, pdf_path: str, output_path: str, filename: Optional[str] = None) -> Tuple[bool, str]:
+        try:
+            return run_in_sandbox(self.engine.convert_file, pdf_path, output_path, filename, engine=self.name)
+        except MemoryLimitExceeded as e:
+            if self.fallback is None:
+                return False, str(e)
+            logger.info(f"{filename or pdf_path}: {self.name} 超出内存预算，改用回退引擎重试")
+            success, message = self.fallback.convert_file(pdf_path, output_path, filename)
+            return success, f"{message}（{self.name} {e}，已使用回退引擎）"
+        except (TimeoutError, SandboxError) as e:
+            return False, f"{self.name} 转换失败: {e}"
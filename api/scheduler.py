@@ -0,0 +1,155 @@
+"""
+转换任务调度策略
+FIFO队列中一个900页的大文件会让后面所有1页的小文件一起等待。调度器按以下规则
+从待执行任务中选出下一个：
+
+- 加权最短作业优先（WSJF）: 优先级 = (1 + 等待秒数 × 老化系数) / 估计成本，
+  小任务优先，大任务随等待时间增长优先级，不会饿死
+- 按客户端公平分配: 同一客户端（IP或API Key）运行中的任务越多优先级越低，
+  且运行数不超过配额；没有其他客户端排队时不受配额限制（不浪费空闲线程）
+- 交互通道: 估计成本不超过阈值的小任务为交互任务，可以使用任意空闲线程；
+  批量任务最多占用 (总线程数 - 预留线程数)，保证小文件总有线程可用
+
+作业队列（job_queue / redis_job_queue）的领取顺序使用同一个优先级公式 wsjf_priority()；
+队列由各自独立的工作进程消费，没有统一的线程总数，因此不划分通道、不设客户端配额
+
+环境变量:
+    PDF2WORD_SCHED_INTERACTIVE_COST   交互任务的成本上限（默认 10，约10页纯文本）
+    PDF2WORD_SCHED_RESERVED           为交互任务预留的线程数（默认 1）
+    PDF2WORD_SCHED_AGING              老化系数（每秒，默认 0.5）
+    PDF2WORD_SCHED_CLIENT_SHARE       单个客户端最多占用的线程比例（默认 0.5）
+"""
+
+import itertools
+import math
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+INTERACTIVE_COST = float(os.getenv("PDF2WORD_SCHED_INTERACTIVE_COST", "10"))
+RESERVED_WORKERS = int(os.getenv("PDF2WORD_SCHED_RESERVED", "1"))
+AGING_RATE = float(os.getenv("PDF2WORD_SCHED_AGING", "0.5"))
+CLIENT_SHARE = float(os.getenv("PDF2WORD_SCHED_CLIENT_SHARE", "0.5"))
+
+LANE_INTERACTIVE = "interactive"
+LANE_BATCH = "batch"
+
+_sequence = itertools.count()
+
+
+def wsjf_priority(cost: float, waited: float, running: int = 0, aging_rate: float = AGING_RATE) -> float:
+    """
+    加权最短作业优先的优先级
+
+    Args:
+        cost: 估计成本
+        waited: 已等待秒数
+        running: 同一客户端运行中的任务数
+        aging_rate: 老化系数
+    """
+    return (1.0 + waited * aging_rate) / max(cost, 1e-3) / (1 + running)
+
+
+@dataclass
+class ScheduledTask:
+    """待调度的任务"""
+    payload: Any
+    cost: float = 1.0
+    client: Optional[str] = None
+    lane: str = LANE_INTERACTIVE
+    enqueued: float = field(default_factory=time.monotonic)
+    seq: int = field(default_factory=lambda: next(_sequence))
+
+
+class FairShareScheduler:
+    """WSJF + 老化 + 客户端公平分配 + 交互通道（非线程安全，由调用方加锁）"""
+
+    def __init__(self, workers: int, interactive_cost: float = INTERACTIVE_COST,
+                 reserved: int = RESERVED_WORKERS, aging_rate: float = AGING_RATE,
+                 client_share: float = CLIENT_SHARE):
+        """
+        Args:
+            workers: 工作线程总数
+            interactive_cost: 交互任务的成本上限
+            reserved: 为交互任务预留的线程数（至少保留一个线程给批量任务）
+            aging_rate: 老化系数，每等待一秒增加的"价值"
+            client_share: 单个客户端最多占用的线程比例
+        """
+        self.workers = workers
+        self.interactive_cost = interactive_cost
+        self.reserved = max(0, min(reserved, workers - 1))
+        self.aging_rate = aging_rate
+        self.client_quota = max(1, math.ceil(workers * client_share))
+        self._pending: List[ScheduledTask] = []
+        self._running_by_lane: Dict[str, int] = {LANE_INTERACTIVE: 0, LANE_BATCH: 0}
+        self._running_by_client: Dict[Optional[str], int] = {}
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def push(self, payload: Any, cost: float = 1.0, client: Optional[str] = None) -> ScheduledTask:
+        """加入待调度任务，按成本划分通道"""
+        cost = max(cost, 1e-3)
+        lane = LANE_INTERACTIVE if cost <= self.interactive_cost else LANE_BATCH
+        task = ScheduledTask(payload, cost, client, lane)
+        self._pending.append(task)
+        return task
+
+    def priority(self, task: ScheduledTask, now: float) -> float:
+        return wsjf_priority(task.cost, now - task.enqueued, self._running_by_client.get(task.client, 0),
+                             self.aging_rate)
+
+    def _lane_open(self, lane: str) -> bool:
+        if lane == LANE_INTERACTIVE:
+            return True
+        return self._running_by_lane[LANE_BATCH] < self.workers - self.reserved
+
+    def pop(self) -> Optional[ScheduledTask]:
+        """
+        选出下一个要执行的任务并计为运行中
+
+        Returns:
+            任务；没有可执行的任务（队列为空或只剩受通道限制的批量任务）时返回None
+        """
+        now = time.monotonic()
+        eligible = [task for task in self._pending if self._lane_open(task.lane)]
+        if not eligible:
+            return None
+        # 有其他客户端排队时，已达到配额的客户端暂停调度
+        within_quota = [task for task in eligible
+                        if self._running_by_client.get(task.client, 0) < self.client_quota]
+        candidates = within_quota or eligible
+        task = max(candidates, key=lambda t: (self.priority(t, now), -t.seq))
+        self._pending.remove(task)
+        self._running_by_lane[task.lane] += 1
+        self._running_by_client[task.client] = self._running_by_client.get(task.client, 0) + 1
+        return task
+
+    def remove(self, task: ScheduledTask) -> bool:
+        """移除尚未开始的任务（已取消）"""
+        try:
+            self._pending.remove(task)
+            return True
+        except ValueError:
+            return False
+
+    def finish(self, task: ScheduledTask) -> None:
+        """任务执行结束，释放通道与客户端配额"""
+        self._running_by_lane[task.lane] -= 1
+        remaining = self._running_by_client.get(task.client, 1) - 1
+        if remaining > 0:
+            self._running_by_client[task.client] = remaining
+        else:
+            self._running_by_client.pop(task.client, None)
+
+    def stats(self) -> Dict[str, Any]:
+        pending = {LANE_INTERACTIVE: 0, LANE_BATCH: 0}
+        for task in self._pending:
+            pending[task.lane] += 1
+        return {
+            "pending_by_lane": pending,
+            "running_by_lane": dict(self._running_by_lane),
+            "clients": len(self._running_by_client),
+            "client_quota": self.client_quota,
+        }
@@ -0,0 +1,204 @@
+"""
+转换暂存区
+上传文件、引擎中间文件和输出文件都放在同一个暂存目录中：可用内存充足时使用内存盘
+(/dev/shm)，否则使用磁盘临时目录。结果通过重命名/硬链接交付，同一文件系统内不再复制数据
+
+环境变量:
+    PDF2WORD_STAGING_RAM_DIR       内存盘目录（默认 /dev/shm，设为空字符串可禁用）
+    PDF2WORD_STAGING_DIR           磁盘暂存目录（默认系统临时目录）
+    PDF2WORD_STAGING_MIN_FREE_MB   使用内存盘后系统至少保留的可用内存（默认 1024MB）
+"""
+
+import contextlib
+import errno
+import logging
+import os
+import shutil
+import tempfile
+import threading
+from pathlib import Path
+from typing import BinaryIO, Callable, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+RAM_ROOT = os.getenv("PDF2WORD_STAGING_RAM_DIR", "/dev/shm")
+DISK_ROOT = os.getenv("PDF2WORD_STAGING_DIR", tempfile.gettempdir())
+MIN_FREE_BYTES = int(os.getenv("PDF2WORD_STAGING_MIN_FREE_MB", "1024")) * 1024 * 1024
+
+# 一次转换在暂存区占用的空间约为输入大小的倍数（输入 + 中间文件 + 输出）
+SIZE_FACTOR = 4
+
+COPY_CHUNK = 1024 * 1024
+
+
+def available_memory() -> Optional[int]:
+    """系统可用内存（/proc/meminfo 的 MemAvailable），无法读取时返回None"""
+    try:
+        with open("/proc/meminfo", "r") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+def publish(src: Union[str, Path], dest: Union[str, Path], keep_source: bool = False) -> str:
+    """
+    把暂存文件交付到目标路径，优先使用不复制数据的方式
+
+    Args:
+        src: 源文件
+        dest: 目标路径
+        keep_source: 是否保留源文件（为True时使用硬链接）
+
+    Returns:
+        实际使用的方式: "rename" / "link" / "copy"
+
+    硬链接和复制都先写到目标目录中的临时文件再 os.replace，其他进程看到的 dest 总是完整的文件
+    """
+    dest = Path(dest)
+    tmp = dest.with_name(f".{dest.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        if keep_source:
+            os.link(src, tmp)
+            os.replace(tmp, dest)
+            return "link"
+        os.replace(src, dest)
+        return "rename"
+    except OSError as e:
+        # 跨文件系统（如 /dev/shm -> 磁盘）或文件系统不支持硬链接时才复制
+        if e.errno not in (errno.EXDEV, errno.EPERM, errno.EMLINK, errno.ENOTSUP):
+            raise
+    try:
+        shutil.copyfile(src, tmp)
+        os.replace(tmp, dest)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.unlink(tmp)
+        raise
+    if not keep_source:
+        os.unlink(src)
+    return "copy"
+
+
+class StagingJob:
+    """单次转换的暂存目录，退出上下文时删除"""
+
+    def __init__(self, path: Path, in_memory: bool, release: Optional[Callable[[], None]] = None):
+        self.path = path
+        self.in_memory = in_memory
+        self._release = release
+
+    def path_for(self, name: str) -> Path:
+        return self.path / name
+
+    def write(self, name: str, data: bytes) -> Path:
+        """写入内存中已有的内容"""
+        path = self.path_for(name)
+        with open(path, "wb") as f:
+            f.write(data)
+        return path
+
+    def spool(self, name: str, source: BinaryIO, limit: Optional[int] = None) -> Path:
+        """
+        把上传流分块写入暂存区，不在Python内存中保留完整文件
+
+        Args:
+            name: 暂存文件名
+            source: 可读的二进制流（如 UploadFile.file）
+            limit: 最大字节数，超过时抛出 ValueError
+
+        Returns:
+            暂存文件路径
+        """
+        path = self.path_for(name)
+        written = 0
+        with open(path, "wb") as f:
+            for chunk in iter(lambda: source.read(COPY_CHUNK), b""):
+                written += len(chunk)
+                if limit is not None and written > limit:
+                    raise ValueError(f"文件超过大小限制({limit / 1024 / 1024:.0f}MB)")
+                f.write(chunk)
+        return path
+
+    def cleanup(self) -> None:
+        """删除暂存目录（可重复调用）"""
+        shutil.rmtree(self.path, ignore_errors=True)
+        release, self._release = self._release, None
+        if release is not None:
+            release()
+
+    def __enter__(self) -> "StagingJob":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.cleanup()
+
+
+class StagingArea:
+    """按可用内存在内存盘与磁盘之间选择暂存位置"""
+
+    def __init__(self, disk_root: Union[str, Path] = DISK_ROOT, ram_root: Optional[str] = RAM_ROOT,
+                 min_free_bytes: int = MIN_FREE_BYTES):
+        """
+        Args:
+            disk_root: 磁盘暂存目录；与最终输出目录位于同一文件系统时，交付只需重命名
+            ram_root: 内存盘目录，None或空字符串表示禁用
+            min_free_bytes: 使用内存盘后系统至少保留的可用内存
+        """
+        self.disk_root = Path(disk_root)
+        self.ram_root = Path(ram_root) if ram_root else None
+        self.min_free_bytes = min_free_bytes
+        self._lock = threading.Lock()
+        # 正在使用内存盘的作业预计占用的字节数，尚未写入的部分也要计入
+        self._ram_reserved = 0
+
+    def _ram_fits(self, needed: int) -> bool:
+        if self.ram_root is None or not os.access(self.ram_root, os.W_OK):
+            return False
+        available = available_memory()
+        if available is None:
+            return False
+        stat = os.statvfs(self.ram_root)
+        free = stat.f_bavail * stat.f_frsize
+        return (available - self._ram_reserved - needed >= self.min_free_bytes
+                and free - self._ram_reserved >= needed)
+
+    def job(self, expected_bytes: int = 0, prefix: str = "pdf2word_") -> StagingJob:
+        """
+        创建暂存目录
+
+        Args:
+            expected_bytes: 预计输入大小（未知时传0，按最小占用估算）
+            prefix: 目录名前缀
+
+        Returns:
+            StagingJob
+        """
+        needed = max(expected_bytes, COPY_CHUNK) * SIZE_FACTOR
+        with self._lock:
+            in_memory = self._ram_fits(needed)
+            if in_memory:
+                self._ram_reserved += needed
+        root = self.ram_root if in_memory else self.disk_root
+        root.mkdir(parents=True, exist_ok=True)
+        job = StagingJob(Path(tempfile.mkdtemp(prefix=prefix, dir=root)), in_memory,
+                         release=(lambda: self._release(needed)) if in_memory else None)
+        logger.debug(f"暂存目录: {job.path} ({'内存盘' if in_memory else '磁盘'})")
+        return job
+
+    def _release(self, reserved: int) -> None:
+        with self._lock:
+            self._ram_reserved -= reserved
+
+
+_default: Optional[StagingArea] = None
+
+
+def get_staging() -> StagingArea:
+    """进程级默认暂存区"""
+    global _default
+    if _default is None:
+        _default = StagingArea()
+    return _default
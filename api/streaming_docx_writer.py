@@ -0,0 +1,383 @@
+"""
+流式DOCX写入器
+逐段生成 word/document.xml 并直接写入zip流，不在内存中构建python-docx文档树
+"""
+
+import re
+import zipfile
+from dataclasses import dataclass
+from typing import Any, BinaryIO, List, Optional, Sequence, Tuple, Union
+from xml.sax.saxutils import escape
+
+W_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+R_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+WP_NS = "http://schemas.openxmlformats.org/drawingml/2006/wordprocessingDrawing"
+A_NS = "http://schemas.openxmlformats.org/drawingml/2006/main"
+PIC_NS = "http://schemas.openxmlformats.org/drawingml/2006/picture"
+
+# 1pt = 12700 EMU
+_EMU_PER_PT = 12700
+
+# XML 1.0 不允许的控制字符（PDF提取的文本中经常出现）
+_ILLEGAL_XML_CHARS = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]")
+
+_ALIGNMENTS = {"left": "left", "center": "center", "right": "right", "both": "both"}
+
+# 页面宽度 A4 (twips) 减去左右页边距
+_TEXT_WIDTH_TWIPS = 11906 - 1800 * 2
+
+_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Default Extension="png" ContentType="image/png"/>'
+    '<Default Extension="jpeg" ContentType="image/jpeg"/>'
+    '<Override PartName="/word/document.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+    '<Override PartName="/word/styles.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.styles+xml"/>'
+    '<Override PartName="/word/numbering.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.numbering+xml"/>'
+    '</Types>'
+)
+
+_PACKAGE_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="word/document.xml"/>'
+    '</Relationships>'
+)
+
+_DOCUMENT_RELS_HEAD = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" '
+    'Target="styles.xml"/>'
+    '<Relationship Id="rId2" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/numbering" '
+    'Target="numbering.xml"/>'
+)
+
+_IMAGE_REL = (
+    '<Relationship Id="{rid}" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/image" '
+    'Target="media/{name}"/>'
+)
+
+
+def _heading_style(style_id: str, name: str, size: int, level: Optional[int]) -> str:
+    outline = f'<w:outlineLvl w:val="{level}"/>' if level is not None else ""
+    return (
+        f'<w:style w:type="paragraph" w:styleId="{style_id}">'
+        f'<w:name w:val="{name}"/><w:basedOn w:val="Normal"/><w:next w:val="Normal"/><w:qFormat/>'
+        f'<w:pPr><w:keepNext/><w:spacing w:before="240" w:after="120"/>{outline}</w:pPr>'
+        f'<w:rPr><w:b/><w:sz w:val="{size}"/><w:szCs w:val="{size}"/></w:rPr>'
+        '</w:style>'
+    )
+
+
+# 固定样式表：正文、标题、一到三级标题、项目符号列表、网格表格
+_STYLES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    f'<w:styles xmlns:w="{W_NS}">'
+    '<w:docDefaults><w:rPrDefault><w:rPr>'
+    '<w:rFonts w:ascii="Calibri" w:hAnsi="Calibri" w:eastAsia="Microsoft YaHei" w:cs="Calibri"/>'
+    '<w:sz w:val="22"/><w:szCs w:val="22"/><w:lang w:val="en-US" w:eastAsia="zh-CN"/>'
+    '</w:rPr></w:rPrDefault>'
+    '<w:pPrDefault><w:pPr><w:spacing w:after="120" w:line="276" w:lineRule="auto"/></w:pPr></w:pPrDefault>'
+    '</w:docDefaults>'
+    '<w:style w:type="paragraph" w:default="1" w:styleId="Normal"><w:name w:val="Normal"/><w:qFormat/></w:style>'
+    + _heading_style("Title", "Title", 52, None)
+    + _heading_style("Heading1", "heading 1", 32, 0)
+    + _heading_style("Heading2", "heading 2", 28, 1)
+    + _heading_style("Heading3", "heading 3", 24, 2)
+    + '<w:style w:type="paragraph" w:styleId="ListBullet">'
+    '<w:name w:val="List Bullet"/><w:basedOn w:val="Normal"/><w:qFormat/>'
+    '<w:pPr><w:numPr><w:numId w:val="1"/></w:numPr><w:spacing w:after="60"/></w:pPr>'
+    '</w:style>'
+    '<w:style w:type="table" w:default="1" w:styleId="TableNormal"><w:name w:val="Normal Table"/>'
+    '<w:tblPr><w:tblInd w:w="0" w:type="dxa"/><w:tblCellMar>'
+    '<w:left w:w="108" w:type="dxa"/><w:right w:w="108" w:type="dxa"/>'
+    '</w:tblCellMar></w:tblPr></w:style>'
+    '<w:style w:type="table" w:styleId="TableGrid"><w:name w:val="Table Grid"/>'
+    '<w:basedOn w:val="TableNormal"/><w:pPr><w:spacing w:after="0" w:line="240" w:lineRule="auto"/></w:pPr>'
+    '<w:tblPr><w:tblBorders>'
+    '<w:top w:val="single" w:sz="4" w:space="0" w:color="auto"/>'
+    '<w:left w:val="single" w:sz="4" w:space="0" w:color="auto"/>'
+    '<w:bottom w:val="single" w:sz="4" w:space="0" w:color="auto"/>'
+    '<w:right w:val="single" w:sz="4" w:space="0" w:color="auto"/>'
+    '<w:insideH w:val="single" w:sz="4" w:space="0" w:color="auto"/>'
+    '<w:insideV w:val="single" w:sz="4" w:space="0" w:color="auto"/>'
+    '</w:tblBorders></w:tblPr></w:style>'
+    '</w:styles>'
+)
+
+_NUMBERING = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    f'<w:numbering xmlns:w="{W_NS}">'
+    '<w:abstractNum w:abstractNumId="0"><w:multiLevelType w:val="singleLevel"/>'
+    '<w:lvl w:ilvl="0"><w:start w:val="1"/><w:numFmt w:val="bullet"/><w:lvlText w:val="•"/>'
+    '<w:lvlJc w:val="left"/><w:pPr><w:ind w:left="420" w:hanging="420"/></w:pPr></w:lvl>'
+    '</w:abstractNum>'
+    '<w:num w:numId="1"><w:abstractNumId w:val="0"/></w:num>'
+    '</w:numbering>'
+)
+
+_DOCUMENT_HEAD = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    f'<w:document xmlns:w="{W_NS}" xmlns:r="{R_NS}" xmlns:wp="{WP_NS}" xmlns:a="{A_NS}" '
+    f'xmlns:pic="{PIC_NS}"><w:body>'
+)
+
+_DOCUMENT_TAIL = (
+    '<w:sectPr><w:pgSz w:w="11906" w:h="16838"/>'
+    '<w:pgMar w:top="1440" w:right="1800" w:bottom="1440" w:left="1800" '
+    'w:header="851" w:footer="992" w:gutter="0"/></w:sectPr>'
+    '</w:body></w:document>'
+)
+
+
+def xml_text(text: str) -> str:
+    """转义文本并移除XML非法字符"""
+    return escape(_ILLEGAL_XML_CHARS.sub("", text))
+
+
+@dataclass
+class DocxFragment:
+    """一段已生成的正文XML（页面缓存的单位）"""
+    xml: str
+    paragraphs: int = 0
+
+
+class StreamingDocxWriter:
+    """
+    流式WordprocessingML写入器
+
+    固定部件（样式、编号）在打开时一次性写入，正文按块追加到
+    word/document.xml 的zip条目中，内存占用只取决于缓冲区大小而非文档长度。
+
+    用法:
+        with StreamingDocxWriter(output_path) as writer:
+            writer.add_heading("标题", level=0)
+            writer.add_paragraph("正文")
+    """
+
+    def __init__(self, target: Union[str, BinaryIO], flush_threshold: int = 64 * 1024):
+        """
+        Args:
+            target: 输出文件路径或可写的二进制流（可以是不可seek的流）
+            flush_threshold: 缓冲的XML字符数超过该值时写入zip流
+        """
+        self._zip = zipfile.ZipFile(target, "w", compression=zipfile.ZIP_DEFLATED)
+        self._zip.writestr("[Content_Types].xml", _CONTENT_TYPES)
+        self._zip.writestr("_rels/.rels", _PACKAGE_RELS)
+        self._zip.writestr("word/styles.xml", _STYLES)
+        self._zip.writestr("word/numbering.xml", _NUMBERING)
+
+        # zipfile同一时间只允许一个写句柄：正文打开期间添加的图片与文档关系在关闭正文后写入
+        self._media: List[Tuple[str, Union[str, bytes]]] = []
+        self._body = self._zip.open("word/document.xml", "w", force_zip64=True)
+        self._buffer: List[str] = []
+        self._buffered = 0
+        self._flush_threshold = flush_threshold
+        self._closed = False
+        self._capture: Optional[List[str]] = None
+        self._capture_start = 0
+        self.paragraph_count = 0
+
+        self._write(_DOCUMENT_HEAD)
+
+    def __enter__(self) -> "StreamingDocxWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    def _write(self, xml: str) -> None:
+        if self._capture is not None:
+            self._capture.append(xml)
+        self._buffer.append(xml)
+        self._buffered += len(xml)
+        if self._buffered >= self._flush_threshold:
+            self.flush()
+
+    def flush(self) -> None:
+        """把缓冲的XML写入zip流"""
+        if self._buffer:
+            self._body.write("".join(self._buffer).encode("utf-8"))
+            self._buffer = []
+            self._buffered = 0
+
+    def begin_fragment(self) -> None:
+        """开始记录之后写入的正文XML"""
+        self._capture = []
+        self._capture_start = self.paragraph_count
+
+    def end_fragment(self) -> DocxFragment:
+        """结束记录，返回 begin_fragment() 之后写入的片段"""
+        if self._capture is None:
+            raise RuntimeError("end_fragment() 之前没有调用 begin_fragment()")
+        fragment = DocxFragment("".join(self._capture), self.paragraph_count - self._capture_start)
+        self._capture = None
+        return fragment
+
+    def add_fragment(self, fragment: DocxFragment) -> None:
+        """原样写入之前记录的片段"""
+        self._write(fragment.xml)
+        self.paragraph_count += fragment.paragraphs
+
+    @staticmethod
+    def _run_xml(text: str, bold: bool = False, italic: bool = False) -> str:
+        props = ""
+        if bold or italic:
+            props = "<w:rPr>" + ("<w:b/>" if bold else "") + ("<w:i/>" if italic else "") + "</w:rPr>"
+        parts = text.split("\n")
+        body = "<w:br/>".join(
+            f'<w:t xml:space="preserve">{xml_text(part)}</w:t>' for part in parts
+        )
+        return f"<w:r>{props}{body}</w:r>"
+
+    @staticmethod
+    def _paragraph_xml(runs_xml: str, style: Optional[str] = None, align: Optional[str] = None) -> str:
+        props = ""
+        if style:
+            props += f'<w:pStyle w:val="{style}"/>'
+        if align:
+            if align not in _ALIGNMENTS:
+                raise ValueError(f"不支持的对齐方式: {align}")
+            props += f'<w:jc w:val="{_ALIGNMENTS[align]}"/>'
+        if props:
+            props = f"<w:pPr>{props}</w:pPr>"
+        return f"<w:p>{props}{runs_xml}</w:p>"
+
+    def add_paragraph(self, text: str = "", style: Optional[str] = None, align: Optional[str] = None,
+                      bold: bool = False, italic: bool = False) -> None:
+        """
+        添加段落
+
+        Args:
+            text: 段落文本，换行符转换为软换行
+            style: 样式ID（Normal、ListBullet、Heading1等）
+            align: left / center / right / both
+            bold: 是否粗体
+            italic: 是否斜体
+        """
+        runs = self._run_xml(text, bold, italic) if text else ""
+        self._write(self._paragraph_xml(runs, style, align))
+        self.paragraph_count += 1
+
+    def add_heading(self, text: str, level: int = 1, align: Optional[str] = None) -> None:
+        """添加标题，level=0 为文档标题，1-3 为各级标题"""
+        if level == 0:
+            style = "Title"
+        else:
+            style = f"Heading{min(max(level, 1), 3)}"
+        self.add_paragraph(text, style=style, align=align)
+
+    def add_list_item(self, text: str) -> None:
+        """添加项目符号列表项"""
+        self.add_paragraph(text, style="ListBullet")
+
+    def add_page_break(self) -> None:
+        """添加分页符"""
+        self._write('<w:p><w:r><w:br w:type="page"/></w:r></w:p>')
+
+    def add_image(self, image: Union[str, bytes], width_pt: float, height_pt: float, ext: str = "png",
+                  align: Optional[str] = "center") -> None:
+        """
+        添加内嵌图片（单独成段，宽度超过版心时等比缩小）
+
+        Args:
+            image: 图片文件路径（关闭时才读取，不占用内存）或图片数据
+            width_pt: 显示宽度(pt)
+            height_pt: 显示高度(pt)
+            ext: png 或 jpeg
+            align: 段落对齐方式
+        """
+        if self._capture is not None:
+            # 片段会在其他文档中复用，图片关系ID无法跨文档
+            raise RuntimeError("页面片段中不支持图片")
+        if ext not in ("png", "jpeg"):
+            raise ValueError(f"不支持的图片格式: {ext}")
+        max_width = _TEXT_WIDTH_TWIPS / 20
+        if width_pt > max_width:
+            height_pt, width_pt = height_pt * max_width / width_pt, max_width
+        index = len(self._media) + 1
+        name = f"image{index}.{ext}"
+        self._media.append((name, image))
+        cx, cy = int(width_pt * _EMU_PER_PT), int(height_pt * _EMU_PER_PT)
+        drawing = (
+            f'<w:r><w:drawing><wp:inline distT="0" distB="0" distL="0" distR="0">'
+            f'<wp:extent cx="{cx}" cy="{cy}"/><wp:docPr id="{index}" name="Picture {index}"/>'
+            f'<a:graphic><a:graphicData uri="{PIC_NS}"><pic:pic>'
+            f'<pic:nvPicPr><pic:cNvPr id="{index}" name="{name}"/><pic:cNvPicPr/></pic:nvPicPr>'
+            f'<pic:blipFill><a:blip r:embed="rIdImg{index}"/><a:stretch><a:fillRect/></a:stretch></pic:blipFill>'
+            f'<pic:spPr><a:xfrm><a:off x="0" y="0"/><a:ext cx="{cx}" cy="{cy}"/></a:xfrm>'
+            f'<a:prstGeom prst="rect"><a:avLst/></a:prstGeom></pic:spPr>'
+            f'</pic:pic></a:graphicData></a:graphic></wp:inline></w:drawing></w:r>'
+        )
+        self._write(self._paragraph_xml(drawing, align=align))
+        self.paragraph_count += 1
+
+    def add_table(self, rows: Sequence[Sequence[Any]], header: bool = False) -> None:
+        """
+        添加简单网格表格
+
+        Args:
+            rows: 二维单元格数据，行长度不足的部分补空单元格
+            header: 首行是否作为表头（粗体并在跨页时重复）
+        """
+        rows = [list(row) for row in rows if row is not None]
+        if not rows:
+            return
+        cols = max(len(row) for row in rows)
+        if cols == 0:
+            return
+        col_width = _TEXT_WIDTH_TWIPS // cols
+
+        parts = [
+            '<w:tbl><w:tblPr><w:tblStyle w:val="TableGrid"/>'
+            '<w:tblW w:w="0" w:type="auto"/><w:tblLook w:val="04A0"/></w:tblPr><w:tblGrid>',
+            f'<w:gridCol w:w="{col_width}"/>' * cols,
+            '</w:tblGrid>',
+        ]
+        for row_index, row in enumerate(rows):
+            is_header = header and row_index == 0
+            parts.append("<w:tr><w:trPr><w:tblHeader/></w:trPr>" if is_header else "<w:tr>")
+            for col_index in range(cols):
+                value = row[col_index] if col_index < len(row) else ""
+                text = "" if value is None else str(value).strip()
+                runs = self._run_xml(text, bold=is_header) if text else ""
+                parts.append(
+                    f'<w:tc><w:tcPr><w:tcW w:w="{col_width}" w:type="dxa"/></w:tcPr>'
+                    f'{self._paragraph_xml(runs)}</w:tc>'
+                )
+            parts.append("</w:tr>")
+        parts.append("</w:tbl>")
+        self._write("".join(parts))
+        # Word要求表格后跟一个段落，避免连续表格被合并
+        self._write("<w:p/>")
+
+    def close(self) -> None:
+        """写入节属性并关闭zip流"""
+        if self._closed:
+            return
+        self._closed = True
+        self._write(_DOCUMENT_TAIL)
+        self.flush()
+        self._body.close()
+        rels = [_DOCUMENT_RELS_HEAD]
+        for index, (name, image) in enumerate(self._media, 1):
+            if isinstance(image, bytes):
+                self._zip.writestr(f"word/media/{name}", image, compress_type=zipfile.ZIP_STORED)
+            else:
+                # PNG/JPEG 已经压缩过，直接存储
+                self._zip.write(image, f"word/media/{name}", compress_type=zipfile.ZIP_STORED)
+            rels.append(_IMAGE_REL.format(rid=f"rIdImg{index}", name=name))
+        rels.append("</Relationships>")
+        self._zip.writestr("word/_rels/document.xml.rels", "".join(rels))
+        self._zip.close()
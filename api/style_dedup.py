@@ -0,0 +1,482 @@
+"""
+DOCX样式去重
+pdf2docx 与 LibreOffice 的输出在成千上万个run上重复同一组 <w:rPr>（字体、字号、颜色），
+document.xml 因此膨胀，后处理与Word打开文件都变慢。本模块作为任意引擎之后的后处理阶段：
+
+- 用 lxml iterparse 流式读取 document.xml（正文的顶层元素处理完即释放）
+- 第一遍统计完全相同的run/段落属性集合，出现次数达到阈值的生成命名样式写入 styles.xml
+- 第二遍把这些属性替换为样式引用（w:rStyle / w:pStyle），并合并格式相同的相邻纯文本run
+- 输出按第一遍的方式重新解析一遍校验，两次耗时即解析时间的对比；任何一步失败都保留原文件
+
+开关型属性（粗体、斜体等）在样式中与段落样式按异或叠加，与直接格式语义不同，
+因此保留为直接格式；修订记录、编号、分节符同样不移入样式。
+
+环境变量:
+    PDF2WORD_STYLE_DEDUP          设为 0 关闭样式去重
+    PDF2WORD_STYLE_DEDUP_MIN      属性集合至少出现的次数（默认 3）
+"""
+
+import copy
+import logging
+import os
+import re
+import time
+import zipfile
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, IO, Iterator, List, Optional, Tuple
+from xml.sax.saxutils import quoteattr
+
+from . import metrics
+from .lazy_imports import lazy_import
+from .streaming_docx_writer import W_NS
+from .tracing import span
+
+logger = logging.getLogger(__name__)
+
+STYLE_DEDUP_ENABLED = os.getenv("PDF2WORD_STYLE_DEDUP", "1") != "0"
+MIN_COUNT = int(os.getenv("PDF2WORD_STYLE_DEDUP_MIN", "3"))
+
+# 每类样式的数量上限（按出现次数取最多的），避免病态文档把 styles.xml 撑大
+MAX_STYLES = 1000
+
+DOCUMENT_PART = "word/document.xml"
+STYLES_PART = "word/styles.xml"
+
+CHARACTER_STYLE_PREFIX = "PDFText"
+PARAGRAPH_STYLE_PREFIX = "PDFPara"
+
+
+def _w(tag: str) -> str:
+    return f"{{{W_NS}}}{tag}"
+
+
+W_BODY, W_P, W_R, W_T = _w("body"), _w("p"), _w("r"), _w("t")
+W_PPR, W_RPR, W_PSTYLE, W_RSTYLE = _w("pPr"), _w("rPr"), _w("pStyle"), _w("rStyle")
+W_HYPERLINK, W_STYLE, W_VAL = _w("hyperlink"), _w("style"), _w("val")
+XML_SPACE = "{http://www.w3.org/XML/1998/namespace}space"
+
+# 保留为直接格式的run属性：开关型属性与修订记录
+_RUN_KEEP = {_w(tag) for tag in (
+    "rStyle", "b", "bCs", "i", "iCs", "caps", "smallCaps", "strike", "dstrike", "outline", "shadow",
+    "emboss", "imprint", "vanish", "specVanish", "rPrChange", "ins", "del", "moveFrom", "moveTo",
+)}
+# 保留为直接格式的段落属性：编号、分节符、段落标记的run属性与修订记录
+_PARAGRAPH_KEEP = {_w(tag) for tag in (
+    "pStyle", "numPr", "framePr", "cnfStyle", "divId", "rPr", "sectPr", "pPrChange",
+)}
+
+_BODY_TAG = re.compile(rb"<([\w.-]+:)?body(\s[^>]*)?(/?)>")
+_ROOT_TAG = re.compile(rb"<([\w.:-]+)[\s>/]")
+
+# (基础样式ID, 属性的规范化表示)
+PropertyKey = Tuple[str, tuple]
+
+
+@dataclass
+class DedupReport:
+    """一次样式去重的结果"""
+    document_bytes_before: int      # document.xml 未压缩大小
+    document_bytes_after: int
+    file_bytes_before: int          # DOCX文件大小
+    file_bytes_after: int
+    parse_seconds_before: float     # 流式解析 document.xml 的耗时
+    parse_seconds_after: float
+    character_styles: int
+    paragraph_styles: int
+    runs_restyled: int
+    paragraphs_restyled: int
+    runs_merged: int
+
+    @property
+    def saved_ratio(self) -> float:
+        """document.xml 减小的比例"""
+        if not self.document_bytes_before:
+            return 0.0
+        return 1 - self.document_bytes_after / self.document_bytes_before
+
+    def summary(self) -> str:
+        return (
+            f"document.xml {self.document_bytes_before // 1024}KB -> {self.document_bytes_after // 1024}KB "
+            f"(-{self.saved_ratio:.0%}), 解析 {self.parse_seconds_before * 1000:.0f}ms -> "
+            f"{self.parse_seconds_after * 1000:.0f}ms, 新增 {self.character_styles} 个字符样式 / "
+            f"{self.paragraph_styles} 个段落样式, 合并 {self.runs_merged} 个run"
+        )
+
+
+def _etree():
+    return lazy_import("lxml.etree")
+
+
+def iter_body_elements(stream: IO[bytes]) -> Iterator:
+    """流式产出 w:body 的顶层元素；调用方处理完后元素即被清空释放"""
+    etree = _etree()
+    for _, element in etree.iterparse(stream, events=("end",), huge_tree=True, resolve_entities=False):
+        parent = element.getparent()
+        if parent is None or parent.tag != W_BODY:
+            continue
+        yield element
+        element.clear()
+        while element.getprevious() is not None:
+            del parent[0]
+
+
+def _split(properties, keep) -> Tuple[Optional[str], list]:
+    """拆分属性：(原样式ID, 可移入样式的子元素)"""
+    base = None
+    movable = []
+    for child in properties:
+        if not isinstance(child.tag, str) or child.tag in keep:
+            if child.tag in (W_PSTYLE, W_RSTYLE):
+                base = child.get(W_VAL)
+            continue
+        movable.append(child)
+    return base, movable
+
+
+def _canonical(element) -> tuple:
+    """元素的可哈希表示（比序列化快，也不受继承的命名空间声明影响）"""
+    return element.tag, tuple(sorted(element.attrib.items())), element.text, tuple(
+        _canonical(child) for child in element
+    )
+
+
+def _key(base: Optional[str], movable: list) -> Optional[PropertyKey]:
+    if not movable:
+        return None
+    return base or "", tuple(_canonical(child) for child in movable)
+
+
+def _run_properties(element) -> Iterator:
+    for run in element.iter(W_R):
+        properties = run.find(W_RPR)
+        if properties is not None:
+            yield properties
+
+
+def _paragraph_properties(element) -> Iterator:
+    for paragraph in element.iter(W_P):
+        properties = paragraph.find(W_PPR)
+        if properties is not None:
+            yield properties
+
+
+class _Collector:
+    """第一遍：统计属性集合的出现次数，并保留每个集合的一份副本用于生成样式"""
+
+    def __init__(self, default_paragraph: Optional[str]):
+        self.default_paragraph = default_paragraph
+        self.runs: Counter = Counter()
+        self.paragraphs: Counter = Counter()
+        self.samples: Dict[PropertyKey, list] = {}
+
+    def _add(self, counts: Counter, key: Optional[PropertyKey], movable: list) -> None:
+        if key is None:
+            return
+        counts[key] += 1
+        if key not in self.samples:
+            self.samples[key] = [copy.deepcopy(child) for child in movable]
+
+    def __call__(self, element) -> None:
+        for properties in _run_properties(element):
+            base, movable = _split(properties, _RUN_KEEP)
+            self._add(self.runs, _key(base, movable), movable)
+        for properties in _paragraph_properties(element):
+            base, movable = _split(properties, _PARAGRAPH_KEEP)
+            self._add(self.paragraphs, _key(base or self.default_paragraph, movable), movable)
+
+
+def _scan(zf: zipfile.ZipFile, visit=None) -> float:
+    """流式解析 document.xml，返回耗时（秒）"""
+    start = time.perf_counter()
+    with zf.open(DOCUMENT_PART) as stream:
+        for element in iter_body_elements(stream):
+            if visit is not None:
+                visit(element)
+    return time.perf_counter() - start
+
+
+def _read_head(zf: zipfile.ZipFile) -> Optional[Tuple[bytes, bytes, bytes]]:
+    """
+    读取 w:body 开始标签及之前的原始字节（根元素的命名空间声明、mc:Ignorable、w:background 原样保留）
+
+    Returns:
+        (头部字节, 根元素限定名, body限定名)；正文为空时返回None
+    """
+    head = b""
+    with zf.open(DOCUMENT_PART) as stream:
+        while True:
+            chunk = stream.read(64 * 1024)
+            if not chunk:
+                return None
+            head += chunk
+            match = _BODY_TAG.search(head)
+            if match:
+                break
+    if match.group(3):  # <w:body/>
+        return None
+    root = None
+    for candidate in _ROOT_TAG.finditer(head, 0, match.start()):
+        name = candidate.group(1)
+        if not name.startswith((b"?", b"!")):
+            root = name
+            break
+    if root is None:
+        return None
+    return head[:match.end()], root, (match.group(1) or b"") + b"body"
+
+
+def _make_style(etree, kind: str, style_id: str, name: str, based_on: Optional[str], movable: list):
+    style = etree.Element(W_STYLE, nsmap={"w": W_NS})
+    style.set(_w("type"), kind)
+    style.set(_w("customStyle"), "1")
+    style.set(_w("styleId"), style_id)
+    etree.SubElement(style, _w("name")).set(W_VAL, name)
+    if based_on:
+        etree.SubElement(style, _w("basedOn")).set(W_VAL, based_on)
+    etree.SubElement(style, _w("uiPriority")).set(W_VAL, "99")
+    properties = etree.SubElement(style, W_PPR if kind == "paragraph" else W_RPR)
+    for child in movable:
+        properties.append(child)
+    return style
+
+
+def _build_styles(etree, styles, counts: Counter, samples: Dict[PropertyKey, list], kind: str, prefix: str,
+                  existing: set, min_count: int, max_styles: int) -> Dict[PropertyKey, str]:
+    """为出现次数达到阈值的属性集合生成样式，返回 属性集合 -> 样式ID"""
+    assigned: Dict[PropertyKey, str] = {}
+    number = 0
+    for key, count in counts.most_common(max_styles):
+        if count < min_count:
+            break
+        number += 1
+        style_id = f"{prefix}{number}"
+        while style_id in existing:
+            number += 1
+            style_id = f"{prefix}{number}"
+        existing.add(style_id)
+        base = key[0] or None
+        label = "PDF Paragraph" if kind == "paragraph" else "PDF Text"
+        styles.append(_make_style(etree, kind, style_id, f"{label} {number}", base, samples[key]))
+        assigned[key] = style_id
+    return assigned
+
+
+def _set_style(properties, tag: str, style_id: str) -> None:
+    reference = properties.find(tag)
+    if reference is None:
+        reference = _etree().Element(tag)
+        properties.insert(0, reference)
+    reference.set(W_VAL, style_id)
+
+
+def _text_run(run) -> Optional[Tuple[tuple, object]]:
+    """只含属性与一个 w:t 的run：返回 (属性的规范化表示, w:t)"""
+    children = list(run)
+    properties = ()
+    if children and children[0].tag == W_RPR:
+        properties = _canonical(children[0])
+        children = children[1:]
+    if len(children) != 1 or children[0].tag != W_T:
+        return None
+    return properties, children[0]
+
+
+def _merge_runs(container) -> int:
+    """合并格式相同的相邻纯文本run（书签、域等其他元素会中断合并）"""
+    merged = 0
+    previous_props = previous_text = None
+    for child in list(container):
+        info = _text_run(child) if child.tag == W_R else None
+        if info is None:
+            previous_props = previous_text = None
+            continue
+        properties, text = info
+        if previous_text is not None and properties == previous_props:
+            previous_text.text = (previous_text.text or "") + (text.text or "")
+            previous_text.set(XML_SPACE, "preserve")
+            container.remove(child)
+            merged += 1
+        else:
+            previous_props, previous_text = properties, text
+    return merged
+
+
+class _Rewriter:
+    """第二遍：把属性替换为样式引用并合并相邻run"""
+
+    def __init__(self, run_styles: Dict[PropertyKey, str], paragraph_styles: Dict[PropertyKey, str],
+                 default_paragraph: Optional[str]):
+        self.run_styles = run_styles
+        self.paragraph_styles = paragraph_styles
+        self.default_paragraph = default_paragraph
+        self.runs_restyled = 0
+        self.paragraphs_restyled = 0
+        self.runs_merged = 0
+
+    def __call__(self, element) -> None:
+        if self.run_styles:
+            for properties in _run_properties(element):
+                base, movable = _split(properties, _RUN_KEEP)
+                style_id = self.run_styles.get(_key(base, movable))
+                if style_id is not None:
+                    for child in movable:
+                        properties.remove(child)
+                    _set_style(properties, W_RSTYLE, style_id)
+                    self.runs_restyled += 1
+        if self.paragraph_styles:
+            for properties in _paragraph_properties(element):
+                base, movable = _split(properties, _PARAGRAPH_KEEP)
+                style_id = self.paragraph_styles.get(_key(base or self.default_paragraph, movable))
+                if style_id is not None:
+                    for child in movable:
+                        properties.remove(child)
+                    _set_style(properties, W_PSTYLE, style_id)
+                    self.paragraphs_restyled += 1
+        for container in element.iter(W_P, W_HYPERLINK):
+            self.runs_merged += _merge_runs(container)
+
+
+def _strip_declarations(data: bytes, declarations: List[bytes]) -> bytes:
+    """去掉顶层元素上与根元素重复的命名空间声明（lxml 单独序列化子元素时会重新声明）"""
+    end = data.find(b">")
+    head = data[:end]
+    for declaration in declarations:
+        head = head.replace(declaration, b"")
+    return head + data[end:]
+
+
+def _write_document(zin: zipfile.ZipFile, out: IO[bytes], head: bytes, root: bytes, body: bytes,
+                    rewrite: _Rewriter) -> None:
+    etree = _etree()
+    out.write(head)
+    declarations = None
+    with zin.open(DOCUMENT_PART) as stream:
+        for element in iter_body_elements(stream):
+            if declarations is None:
+                nsmap = element.getparent().getparent().nsmap
+                declarations = [
+                    (f" xmlns:{prefix}=" if prefix else " xmlns=").encode() + quoteattr(uri).encode()
+                    for prefix, uri in nsmap.items()
+                ]
+            rewrite(element)
+            data = etree.tostring(element, encoding="UTF-8", with_tail=False)
+            out.write(_strip_declarations(data, declarations))
+    out.write(b"</" + body + b"></" + root + b">")
+
+
+def dedupe_styles(docx_path: str, min_count: int = MIN_COUNT, max_styles: int = MAX_STYLES) -> Optional[DedupReport]:
+    """
+    对DOCX文件做样式去重（原地替换）
+
+    Args:
+        docx_path: DOCX文件路径
+        min_count: 属性集合至少出现多少次才生成样式
+        max_styles: 每类样式的数量上限
+
+    Returns:
+        DedupReport；没有可去重的内容（或文档缺少 styles.xml）时返回None，文件不变
+    """
+    etree = _etree()
+    with zipfile.ZipFile(docx_path) as zin:
+        names = set(zin.namelist())
+        if DOCUMENT_PART not in names or STYLES_PART not in names:
+            return None
+        head = _read_head(zin)
+        if head is None:
+            return None
+
+        styles = etree.fromstring(zin.read(STYLES_PART))
+        default_paragraph = None
+        existing = set()
+        for style in styles.iter(W_STYLE):
+            existing.add(style.get(_w("styleId")))
+            if style.get(_w("type")) == "paragraph" and style.get(_w("default")) in ("1", "true", "on"):
+                default_paragraph = style.get(_w("styleId"))
+
+        collector = _Collector(default_paragraph)
+        parse_before = _scan(zin, collector)
+        run_styles = _build_styles(etree, styles, collector.runs, collector.samples, "character",
+                                   CHARACTER_STYLE_PREFIX, existing, min_count, max_styles)
+        paragraph_styles = _build_styles(etree, styles, collector.paragraphs, collector.samples, "paragraph",
+                                         PARAGRAPH_STYLE_PREFIX, existing, min_count, max_styles)
+        collector.samples.clear()
+        if not run_styles and not paragraph_styles:
+            return None
+        etree.cleanup_namespaces(styles)
+
+        document_before = zin.getinfo(DOCUMENT_PART).file_size
+        rewrite = _Rewriter(run_styles, paragraph_styles, default_paragraph)
+        tmp_path = f"{docx_path}.dedup.tmp"
+        try:
+            with zipfile.ZipFile(tmp_path, "w", zipfile.ZIP_DEFLATED) as zout:
+                for info in zin.infolist():
+                    target = zipfile.ZipInfo(info.filename, info.date_time)
+                    target.compress_type = info.compress_type
+                    target.external_attr = info.external_attr
+                    if info.filename == DOCUMENT_PART:
+                        target.compress_type = zipfile.ZIP_DEFLATED
+                        with zout.open(target, "w", force_zip64=True) as out:
+                            _write_document(zin, out, *head, rewrite)
+                    elif info.filename == STYLES_PART:
+                        zout.writestr(target, etree.tostring(styles, xml_declaration=True,
+                                                             encoding="UTF-8", standalone=True))
+                    else:
+                        with zin.open(info) as source, zout.open(target, "w", force_zip64=True) as out:
+                            while True:
+                                chunk = source.read(1024 * 1024)
+                                if not chunk:
+                                    break
+                                out.write(chunk)
+            # 校验输出仍是完整的XML；按与第一遍相同的工作量测量去重后的解析耗时
+            with zipfile.ZipFile(tmp_path) as check:
+                parse_after = _scan(check, _Collector(default_paragraph))
+                document_after = check.getinfo(DOCUMENT_PART).file_size
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    file_before = os.path.getsize(docx_path)
+    os.replace(tmp_path, docx_path)
+    return DedupReport(
+        document_bytes_before=document_before,
+        document_bytes_after=document_after,
+        file_bytes_before=file_before,
+        file_bytes_after=os.path.getsize(docx_path),
+        parse_seconds_before=parse_before,
+        parse_seconds_after=parse_after,
+        character_styles=len(run_styles),
+        paragraph_styles=len(paragraph_styles),
+        runs_restyled=rewrite.runs_restyled,
+        paragraphs_restyled=rewrite.paragraphs_restyled,
+        runs_merged=rewrite.runs_merged,
+    )
+
+
+def postprocess(docx_path: str, engine: str = "all") -> Optional[DedupReport]:
+    """
+    转换后的后处理阶段：样式去重，失败时保留原文件并只记录日志
+
+    Args:
+        docx_path: 引擎输出的DOCX
+        engine: 指标中的引擎名
+    """
+    if not STYLE_DEDUP_ENABLED:
+        return None
+    try:
+        with span("postprocess.style_dedup", engine=engine), \
+                metrics.stage_timer(metrics.STAGE_POSTPROCESS, engine):
+            report = dedupe_styles(docx_path)
+    except ImportError:
+        logger.debug("未安装lxml，跳过样式去重")
+        return None
+    except Exception as e:
+        logger.warning(f"样式去重失败，保留原文件: {e}")
+        return None
+    if report is not None:
+        metrics.STYLE_DEDUP_SAVED_BYTES.inc(
+            max(0, report.document_bytes_before - report.document_bytes_after), engine=engine
+        )
+        logger.info(f"样式去重 [{engine}]: {report.summary()}")
+    return report
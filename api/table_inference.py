@@ -0,0 +1,267 @@
+"""
+无框线表格结构推断
+PyPDF2 回退转换器只能从提取出的文本里按连续空格（\\s{2,} / \\s{3,}）切分列：PDF 文本层里列间
+往往只有一个空格甚至没有空格，切出来的列数逐行不同，混合转换器还把列数截断为 6。
+本模块直接使用 PyMuPDF 的单词坐标（page.get_text("words")），全部以 NumPy 数组向量化计算：
+
+- 行带：单词按纵向中心排序，相邻中心的间距超过 行高 × ROW_TOLERANCE 即开始新的一行
+- 表格区域：行内相邻单词的间隔超过 行高 × GAP_RATIO 视为列分隔，至少有两段的行为"表格行"，
+  连续的表格行（允许夹一行普通行，如换行的单元格）至少 MIN_ROWS 行时构成一个表格
+- 列分隔：区域内单词在横轴上的投影直方图（1pt 一格，差分 + 累加求覆盖数），
+  覆盖数为零（允许 SPAN_TOLERANCE 比例的跨列表头/标题穿过）的连续空白即列间隙
+- 单元格：单词中心按列间隙中点 searchsorted 分列，不限制列数
+
+一页数千个单词的推断耗时在毫秒级。需要 PyMuPDF 与 NumPy，未安装或 PDF2WORD_TABLE_INFERENCE=0 时
+is_available() 为 False，调用方回退到原来的文本切分。
+
+环境变量:
+    PDF2WORD_TABLE_INFERENCE    1 启用（默认），0 关闭
+"""
+
+import logging
+import os
+import time
+from dataclasses import dataclass
+from typing import List, Optional, Sequence, Tuple, Union
+
+from .lazy_imports import lazy_import
+
+logger = logging.getLogger(__name__)
+
+TABLE_INFERENCE_ENABLED = os.getenv("PDF2WORD_TABLE_INFERENCE", "1") != "0"
+
+# 同一行：纵向中心之差不超过 行高 × ROW_TOLERANCE
+ROW_TOLERANCE = 0.5
+# 行内列分隔：相邻单词的间隔超过 行高 × GAP_RATIO（普通词间空格约为 0.25~0.35 行高）
+GAP_RATIO = 0.9
+# 列间隙的最小宽度：行高 × GUTTER_RATIO（右对齐的数字列与左对齐的文字列之间的空白可能较窄）
+GUTTER_RATIO = 0.5
+# 表格至少包含的表格行数
+MIN_ROWS = 3
+# 表格区域内允许夹杂的连续普通行数
+MAX_PLAIN_ROWS = 1
+# 列间隙允许被穿过的行比例（跨列的表头、小计标题）
+SPAN_TOLERANCE = 0.15
+# 单元格文字长度的中位数超过该值时视为分栏排版的正文而非表格
+MAX_MEDIAN_CELL_CHARS = 30
+
+
+@dataclass
+class TableGrid:
+    """推断出的表格"""
+    cells: List[List[str]]
+    bbox: Tuple[float, float, float, float]     # 表格区域 (x0, y0, x1, y1)，单位pt
+
+    @property
+    def columns(self) -> int:
+        return len(self.cells[0]) if self.cells else 0
+
+
+# 页面内容块：表格或一行普通文本（按从上到下的顺序）
+Block = Union[TableGrid, str]
+
+
+def is_available() -> bool:
+    """表格推断是否可用（需要 PyMuPDF 与 NumPy）"""
+    if not TABLE_INFERENCE_ENABLED:
+        return False
+    try:
+        lazy_import("numpy")
+        lazy_import("fitz")
+        return True
+    except ImportError:
+        return False
+
+
+def page_words(page) -> Tuple["object", List[str]]:
+    """
+    页面单词的坐标与文字
+
+    Returns:
+        (N×4 float32 数组 [x0, y0, x1, y1], 单词列表)
+    """
+    np = lazy_import("numpy")
+    words = page.get_text("words")
+    if not words:
+        return np.empty((0, 4), dtype=np.float32), []
+    boxes = np.array([word[:4] for word in words], dtype=np.float32)
+    return boxes, [word[4] for word in words]
+
+
+def _gutters(boxes, height: float, allowed: int):
+    """区域内单词投影直方图中的列间隙中点（升序）"""
+    np = lazy_import("numpy")
+    origin = int(np.floor(boxes[:, 0].min()))
+    start = np.floor(boxes[:, 0]).astype(np.int64) - origin
+    end = np.ceil(boxes[:, 2]).astype(np.int64) - origin
+    bins = int(end.max()) + 1
+    # 差分数组：单词覆盖 [start, end)，累加后即每个 1pt 格子上的单词数
+    coverage = np.cumsum(np.bincount(start, minlength=bins) - np.bincount(end, minlength=bins))
+    empty = np.concatenate(([False], coverage <= allowed, [False]))
+    edges = np.diff(empty.astype(np.int8))
+    run_start = np.flatnonzero(edges == 1)
+    run_end = np.flatnonzero(edges == -1)
+    wide = (run_end - run_start) >= max(2.0, height * GUTTER_RATIO)
+    # 贴着区域左右边缘的空白不是列间隙
+    inner = (run_start > 0) & (run_end < bins)
+    keep = wide & inner
+    return (run_start[keep] + run_end[keep]) / 2.0 + origin
+
+
+def _build_grid(boxes, words: Sequence[str], rows, row_ids, height: float) -> Optional[TableGrid]:
+    """
+    把一个表格区域的单词排成单元格网格
+
+    Args:
+        boxes: 区域内单词坐标（已按行、横坐标排序）
+        words: 对应的单词
+        rows: 区域内的行数
+        row_ids: 每个单词在区域内的行号（从0开始）
+        height: 行高中位数
+    """
+    np = lazy_import("numpy")
+    boundaries = _gutters(boxes, height, int(rows * SPAN_TOLERANCE))
+    if not len(boundaries):
+        return None
+    centers = (boxes[:, 0] + boxes[:, 2]) / 2.0
+    col_ids = np.searchsorted(boundaries, centers)
+    cols = len(boundaries) + 1
+
+    cells = [[[] for _ in range(cols)] for _ in range(rows)]
+    for word, row, col in zip(words, row_ids.tolist(), col_ids.tolist()):
+        cells[row][col].append(word)
+    grid = [[" ".join(parts) for parts in row] for row in cells]
+
+    # 去掉全空的列（容许穿过的跨列文字所在的空白）
+    used = [col for col in range(cols) if any(row[col] for row in grid)]
+    if len(used) < 2:
+        return None
+    grid = [[row[col] for col in used] for row in grid]
+
+    filled = [cell for row in grid for cell in row if cell]
+    multi = sum(1 for row in grid if sum(1 for cell in row if cell) >= 2)
+    if multi * 2 < rows or float(np.median([len(cell) for cell in filled])) > MAX_MEDIAN_CELL_CHARS:
+        return None
+    bbox = (float(boxes[:, 0].min()), float(boxes[:, 1].min()),
+            float(boxes[:, 2].max()), float(boxes[:, 3].max()))
+    return TableGrid(grid, bbox)
+
+
+def _regions(tabular) -> List[Tuple[int, int]]:
+    """连续的表格行（允许夹 MAX_PLAIN_ROWS 行普通行），返回 [(首行, 末行)]"""
+    regions = []
+    first = last = None
+    for row in tabular.nonzero()[0].tolist():
+        if last is not None and row - last <= MAX_PLAIN_ROWS + 1:
+            last = row
+            continue
+        if first is not None:
+            regions.append((first, last))
+        first = last = row
+    if first is not None:
+        regions.append((first, last))
+    return [(first, last) for first, last in regions if int(tabular[first:last + 1].sum()) >= MIN_ROWS]
+
+
+def analyze_words(boxes, words: Sequence[str]) -> List[Block]:
+    """
+    由单词坐标推断页面上的表格
+
+    Args:
+        boxes: N×4 数组 [x0, y0, x1, y1]
+        words: 对应的单词
+
+    Returns:
+        按从上到下顺序的内容块：TableGrid 或一行普通文本
+    """
+    np = lazy_import("numpy")
+    count = len(words)
+    if count == 0:
+        return []
+    height = float(np.median(boxes[:, 3] - boxes[:, 1])) or 1.0
+
+    # 行带：按纵向中心排序后在间距较大处断开
+    middle = (boxes[:, 1] + boxes[:, 3]) / 2.0
+    by_y = np.argsort(middle, kind="stable")
+    row_sorted = np.concatenate(([0], np.cumsum(np.diff(middle[by_y]) > height * ROW_TOLERANCE)))
+    row_of = np.empty(count, dtype=np.int64)
+    row_of[by_y] = row_sorted
+    rows = int(row_sorted[-1]) + 1
+
+    # 行内按横坐标排序，统计每行被大间隔分成几段
+    order = np.lexsort((boxes[:, 0], row_of))
+    ordered_rows = row_of[order]
+    gaps = boxes[order[1:], 0] - boxes[order[:-1], 2]
+    split = (ordered_rows[1:] == ordered_rows[:-1]) & (gaps > height * GAP_RATIO)
+    segments = 1 + np.bincount(ordered_rows[1:][split], minlength=rows)
+    # 每行的单词下标（行号连续，每行至少一个单词）
+    row_words = np.split(order, np.flatnonzero(np.diff(ordered_rows)) + 1)
+
+    tables = {}
+    for first, last in _regions(segments >= 2):
+        indices = np.concatenate(row_words[first:last + 1])
+        grid = _build_grid(boxes[indices], [words[i] for i in indices.tolist()],
+                           last - first + 1, row_of[indices] - first, height)
+        if grid is not None:
+            tables[first] = (last, grid)
+
+    blocks: List[Block] = []
+    row = 0
+    while row < rows:
+        if row in tables:
+            row, grid = tables[row]
+            blocks.append(grid)
+        else:
+            blocks.append(" ".join(words[i] for i in row_words[row].tolist()))
+        row += 1
+    return blocks
+
+
+def analyze_page(page) -> List[Block]:
+    """推断一页（fitz.Page）上的表格，返回按从上到下顺序的内容块"""
+    start = time.perf_counter()
+    boxes, words = page_words(page)
+    blocks = analyze_words(boxes, words)
+    logger.debug(f"第{page.number + 1}页表格推断: {len(words)} 个单词, "
+                 f"{sum(isinstance(block, TableGrid) for block in blocks)} 个表格, "
+                 f"{(time.perf_counter() - start) * 1000:.1f}ms")
+    return blocks
+
+
+class PageLayouts:
+    """
+    按页推断表格（供逐页处理的转换器使用，PDF只打开一次）
+
+        with PageLayouts(pdf_path) as layouts:
+            blocks = layouts.tables(page_index)   # 无表格或不可用时为 None
+    """
+
+    def __init__(self, pdf_path: str):
+        self._doc = None
+        if is_available():
+            try:
+                self._doc = lazy_import("fitz").open(pdf_path)
+            except Exception as e:
+                logger.warning(f"表格推断无法打开PDF，回退到文本切分: {e}")
+
+    def tables(self, index: int) -> Optional[List[Block]]:
+        """第 index 页（从0开始）的内容块；页面上没有推断出表格时返回None"""
+        if self._doc is None:
+            return None
+        try:
+            blocks = analyze_page(self._doc[index])
+        except Exception as e:
+            logger.warning(f"第{index + 1}页表格推断失败: {e}")
+            return None
+        return blocks if any(isinstance(block, TableGrid) for block in blocks) else None
+
+    def close(self) -> None:
+        if self._doc is not None:
+            self._doc.close()
+            self._doc = None
+
+    def __enter__(self) -> "PageLayouts":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
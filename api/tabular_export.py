@@ -0,0 +1,446 @@
+"""
+表格数据导出
+原先每个表格建一个 pandas DataFrame，第一行强制作为列名，再一起交给 pd.ExcelWriter：
+表格多时又慢又占内存，列名重复时直接出错。本模块逐个表格流式写出，内存只与最大的单个表格有关：
+
+- xlsx     openpyxl 只写模式；多个表格依次排在同一工作表中（layout="stacked"），
+           超过行数上限时续到下一个工作表；也可每个表格一个工作表（layout="sheets"）
+- csv      ZIP 包，每个表格一个 CSV（UTF-8 BOM，Excel 可直接打开）
+- parquet  单个 Parquet 文件，每行一条记录：页码、表格序号、行号、是否表头、单元格列表
+- arrow    同上，Arrow IPC 文件格式（需要 pyarrow）
+
+表格来源：默认直接按单词坐标推断PDF中的表格（api/table_inference.py，无框线表格也能识别，
+不需要先整篇转换为DOCX）；PyMuPDF/NumPy 不可用或 PDF2WORD_TABLE_SOURCE=pdf2docx 时读取 pdf2docx 转出的DOCX。
+
+表头识别可选：auto（首行填满且不含数字时视为表头）、first（总是首行）、none。
+重复或空白的列名自动改为 "名称_2"、"列3"。
+
+环境变量:
+    PDF2WORD_TABLE_HEADER       默认表头识别方式（auto / first / none，默认 auto）
+    PDF2WORD_XLSX_LAYOUT        默认XLSX布局（stacked / sheets，默认 stacked）
+    PDF2WORD_TABLE_SOURCE       表格来源（infer / pdf2docx，默认 infer）
+"""
+
+import csv
+import io
+import logging
+import os
+import re
+import zipfile
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from . import table_inference
+from .lazy_imports import lazy_import
+from .streaming_docx_writer import W_NS
+from .style_dedup import DOCUMENT_PART, iter_body_elements
+
+logger = logging.getLogger(__name__)
+
+HEADER_MODES = ("auto", "first", "none")
+XLSX_LAYOUTS = ("stacked", "sheets")
+
+TABLE_HEADER = os.getenv("PDF2WORD_TABLE_HEADER", "auto")
+XLSX_LAYOUT = os.getenv("PDF2WORD_XLSX_LAYOUT", "stacked")
+TABLE_SOURCE = os.getenv("PDF2WORD_TABLE_SOURCE", "infer")
+
+# 输出格式 -> (扩展名, MIME类型)
+FORMATS: Dict[str, Tuple[str, str]] = {
+    "xlsx": ("xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    "csv": ("zip", "application/zip"),
+    "parquet": ("parquet", "application/vnd.apache.parquet"),
+    "arrow": ("arrow", "application/vnd.apache.arrow.file"),
+}
+
+# Excel 限制
+XLSX_MAX_ROWS = 1048576
+XLSX_MAX_CELL_CHARS = 32767
+
+# Parquet/Arrow 累积到这么多行再写出一个行组（小表格不会各自成为一个行组）
+ROW_GROUP_ROWS = 65536
+
+_NUMBER = re.compile(r"^[-+(]?[¥$€£]?\d[\d,]*(\.\d+)?%?\)?$")
+
+
+@dataclass
+class Table:
+    """一个表格"""
+    rows: List[List[str]]
+    index: int                      # 文档内序号（从1开始）
+    page: Optional[int] = None      # 所在页码（从1开始），未知时为None
+
+
+@dataclass
+class ExportSummary:
+    """导出结果"""
+    tables: int = 0
+    rows: int = 0
+    texts: int = 0
+    sheets: List[str] = field(default_factory=list)
+
+
+def _w(tag: str) -> str:
+    return f"{{{W_NS}}}{tag}"
+
+
+W_P, W_T, W_TAB, W_BR, W_TBL, W_TR, W_TC = (_w(tag) for tag in ("p", "t", "tab", "br", "tbl", "tr", "tc"))
+W_PPR, W_SECTPR, W_TCPR, W_GRIDSPAN, W_VAL, W_TYPE = (
+    _w(tag) for tag in ("pPr", "sectPr", "tcPr", "gridSpan", "val", "type"))
+
+
+def is_available(fmt: str) -> bool:
+    """输出格式所需的库是否已安装"""
+    module = {"xlsx": "openpyxl", "parquet": "pyarrow.parquet", "arrow": "pyarrow"}.get(fmt)
+    if fmt not in FORMATS:
+        return False
+    if module is None:
+        return True
+    try:
+        lazy_import(module)
+        return True
+    except ImportError:
+        return False
+
+
+def infers_tables() -> bool:
+    """表格是否直接从PDF推断（否则需要先用 pdf2docx 转换，再读取 docx_content）"""
+    return TABLE_SOURCE == "infer" and table_inference.is_available()
+
+
+def _is_number(text: str) -> bool:
+    return bool(_NUMBER.match(text.replace(" ", "")))
+
+
+def detect_header(rows: List[List[str]], mode: str = "auto") -> bool:
+    """
+    首行是否为表头
+
+    Args:
+        rows: 表格行
+        mode: auto / first / none
+    """
+    if mode == "none" or len(rows) < 2:
+        return False
+    if mode == "first":
+        return True
+    first = [cell.strip() for cell in rows[0]]
+    filled = [cell for cell in first if cell]
+    # 大部分单元格有内容，且都不是数字（数据行通常含数字）
+    return len(filled) * 2 >= len(first) and not any(_is_number(cell) for cell in filled)
+
+
+def unique_headers(cells: List[str]) -> List[str]:
+    """空白列名改为 "列N"，重复列名加序号后缀"""
+    used = set()
+    headers = []
+    for position, cell in enumerate(cells, 1):
+        base = name = cell.strip() or f"列{position}"
+        count = 1
+        while name in used:
+            count += 1
+            name = f"{base}_{count}"
+        used.add(name)
+        headers.append(name)
+    return headers
+
+
+def _normalize(table: Table) -> List[List[str]]:
+    """补齐各行列数"""
+    width = max((len(row) for row in table.rows), default=0)
+    return [row + [""] * (width - len(row)) for row in table.rows]
+
+
+def _paragraph_text(paragraph) -> str:
+    parts = []
+    for node in paragraph.iter(W_T, W_TAB, W_BR):
+        if node.tag == W_T:
+            parts.append(node.text or "")
+        elif node.tag == W_TAB:
+            parts.append("\t")
+        else:
+            parts.append("\n")
+    return "".join(parts)
+
+
+def _table_rows(table) -> List[List[str]]:
+    rows = []
+    for tr in table.iterchildren(W_TR):
+        row = []
+        for tc in tr.iterchildren(W_TC):
+            row.append("\n".join(_paragraph_text(p) for p in tc.iter(W_P)).strip())
+            span = tc.find(f"{W_TCPR}/{W_GRIDSPAN}")
+            if span is not None:
+                row.extend([""] * (int(span.get(W_VAL, "1")) - 1))
+        if any(row):
+            rows.append(row)
+    return rows
+
+
+def _page_breaks(element) -> int:
+    """元素内的分页：分页符与段落中的分节符（pdf2docx 每页一个分节）"""
+    breaks = sum(1 for br in element.iter(W_BR) if br.get(W_TYPE) == "page")
+    if element.tag == W_P:
+        properties = element.find(W_PPR)
+        if properties is not None and properties.find(W_SECTPR) is not None:
+            breaks += 1
+    return breaks
+
+
+def docx_content(docx_path: str) -> Iterator[Union[Table, str]]:
+    """
+    流式读取DOCX正文中的表格与段落文本（按文档顺序，一次只在内存中保留一个顶层元素）
+
+    Yields:
+        Table（页码按分页符/分节符推算）或非空段落文本
+    """
+    page = 1
+    index = 0
+    with zipfile.ZipFile(docx_path) as zf, zf.open(DOCUMENT_PART) as stream:
+        for element in iter_body_elements(stream):
+            if element.tag == W_TBL:
+                rows = _table_rows(element)
+                if rows:
+                    index += 1
+                    yield Table(rows, index, page)
+            elif element.tag == W_P:
+                text = _paragraph_text(element).strip()
+                if text:
+                    yield text
+            page += _page_breaks(element)
+
+
+def pdf_content(pdf_path: str) -> Iterator[Union[Table, str]]:
+    """
+    按单词坐标逐页推断PDF中的表格（api/table_inference.py），一次只在内存中保留一页
+
+    Yields:
+        Table（页码准确）或表格以外的文本行
+    """
+    fitz = lazy_import("fitz")
+    index = 0
+    with fitz.open(pdf_path) as doc:
+        for page in doc:
+            for block in table_inference.analyze_page(page):
+                if isinstance(block, table_inference.TableGrid):
+                    index += 1
+                    yield Table(block.cells, index, page.number + 1)
+                else:
+                    yield block
+
+
+def _table_title(table: Table) -> str:
+    if table.page is not None:
+        return f"第{table.page}页 表格{table.index}"
+    return f"表格{table.index}"
+
+
+class _XlsxWriter:
+    """openpyxl 只写模式的工作簿：表格依次写入，行数达到上限时续到新工作表"""
+
+    def __init__(self, output_path: str, layout: str, header: str):
+        openpyxl = lazy_import("openpyxl")
+        self._cell_module = lazy_import("openpyxl.cell.cell")
+        self._font = lazy_import("openpyxl.styles").Font(bold=True)
+        self.output_path = output_path
+        self.layout = layout
+        self.header = header
+        self.workbook = openpyxl.Workbook(write_only=True)
+        self.summary = ExportSummary()
+        self._sheet = None
+        self._sheet_rows = 0
+        self._table_sheets = 0
+        self._text_sheet = None
+        self._names: Dict[str, int] = {}
+
+    def _new_sheet(self, title: str):
+        # 工作表名最长31个字符且不能重复
+        title = re.sub(r"[\[\]:*?/\\]", "_", title)[:28]
+        count = self._names.get(title, 0) + 1
+        self._names[title] = count
+        name = title if count == 1 else f"{title}_{count}"
+        self.summary.sheets.append(name)
+        return self.workbook.create_sheet(name)
+
+    def _clean(self, value: str) -> str:
+        value = self._cell_module.ILLEGAL_CHARACTERS_RE.sub("", value)
+        return value[:XLSX_MAX_CELL_CHARS]
+
+    def _bold(self, sheet, values: List[str]) -> list:
+        cells = []
+        for value in values:
+            cell = self._cell_module.WriteOnlyCell(sheet, value=self._clean(value))
+            cell.font = self._font
+            cells.append(cell)
+        return cells
+
+    def _append(self, values: list, bold: bool = False) -> None:
+        if self._sheet is None or self._sheet_rows >= XLSX_MAX_ROWS:
+            self._table_sheets += 1
+            self._sheet = self._new_sheet("表格" if self._table_sheets == 1 else f"表格{self._table_sheets}")
+            self._sheet_rows = 0
+        self._sheet.append(self._bold(self._sheet, values) if bold else [self._clean(v) for v in values])
+        self._sheet_rows += 1
+
+    def add_table(self, table: Table) -> None:
+        rows = _normalize(table)
+        has_header = detect_header(rows, self.header)
+        if self.layout == "sheets":
+            self._sheet = self._new_sheet(_table_title(table).replace(" ", "-"))
+            self._sheet_rows = 0
+        else:
+            if self._sheet_rows:
+                self._append([])
+            self._append([_table_title(table)], bold=True)
+        if has_header:
+            self._append(unique_headers(rows[0]), bold=True)
+            rows = rows[1:]
+        for row in rows:
+            self._append(row)
+        self.summary.tables += 1
+        self.summary.rows += len(rows)
+
+    def add_text(self, text: str) -> None:
+        if self._text_sheet is None:
+            self._text_sheet = self._new_sheet("文本内容")
+            self._text_sheet.append(self._bold(self._text_sheet, ["内容"]))
+        self._text_sheet.append([self._clean(text)])
+        self.summary.texts += 1
+
+    def close(self, source_name: str) -> None:
+        if self._text_sheet is not None:
+            # 只写模式按创建顺序排列工作表，文本内容移到表格之后
+            sheets = self.workbook.worksheets
+            self.workbook.move_sheet(self._text_sheet.title, len(sheets) - 1 - sheets.index(self._text_sheet))
+            self.summary.sheets.remove(self._text_sheet.title)
+            self.summary.sheets.append(self._text_sheet.title)
+        if not self.summary.sheets:
+            sheet = self._new_sheet("转换信息")
+            sheet.append(self._bold(sheet, ["说明", "文件名"]))
+            sheet.append(["PDF中没有识别到表格或文本", source_name])
+        self.workbook.save(self.output_path)
+
+
+class _CsvZipWriter:
+    """每个表格一个CSV，直接写入ZIP条目"""
+
+    def __init__(self, output_path: str, header: str):
+        self.header = header
+        self.zip = zipfile.ZipFile(output_path, "w", compression=zipfile.ZIP_DEFLATED)
+        self.summary = ExportSummary()
+
+    def add_table(self, table: Table) -> None:
+        rows = _normalize(table)
+        has_header = detect_header(rows, self.header)
+        if has_header:
+            rows = [unique_headers(rows[0])] + rows[1:]
+        name = f"page{table.page:03d}_table{table.index:03d}.csv" if table.page else f"table{table.index:03d}.csv"
+        with self.zip.open(name, "w") as raw:
+            text = io.TextIOWrapper(raw, encoding="utf-8-sig", newline="")
+            csv.writer(text).writerows(rows)
+            text.flush()
+            text.detach()
+        self.summary.tables += 1
+        self.summary.rows += len(rows) - has_header
+
+    def add_text(self, text: str) -> None:
+        self.summary.texts += 1
+
+    def close(self, source_name: str) -> None:
+        if not self.summary.tables:
+            self.zip.writestr("README.txt", f"{source_name}: PDF中没有识别到表格\n".encode("utf-8"))
+        self.zip.close()
+
+
+class _ArrowWriter:
+    """Parquet / Arrow IPC：固定结构的长表，按行组写出"""
+
+    def __init__(self, output_path: str, fmt: str, header: str):
+        self.pa = lazy_import("pyarrow")
+        self.header = header
+        self.schema = self.pa.schema([
+            ("page", self.pa.int32()),
+            ("table", self.pa.int32()),
+            ("row", self.pa.int32()),
+            ("header", self.pa.bool_()),
+            ("cells", self.pa.list_(self.pa.string())),
+        ])
+        if fmt == "parquet":
+            self.writer = lazy_import("pyarrow.parquet").ParquetWriter(output_path, self.schema, compression="zstd")
+        else:
+            self.writer = self.pa.ipc.new_file(output_path, self.schema)
+        self.fmt = fmt
+        self.summary = ExportSummary()
+        self._columns: Dict[str, list] = {name: [] for name in self.schema.names}
+
+    def _flush(self) -> None:
+        if not self._columns["row"]:
+            return
+        batch = self.pa.RecordBatch.from_pydict(self._columns, schema=self.schema)
+        if self.fmt == "parquet":
+            self.writer.write_table(self.pa.Table.from_batches([batch]))
+        else:
+            self.writer.write_batch(batch)
+        for values in self._columns.values():
+            values.clear()
+
+    def add_table(self, table: Table) -> None:
+        rows = _normalize(table)
+        has_header = detect_header(rows, self.header)
+        if has_header:
+            rows = [unique_headers(rows[0])] + rows[1:]
+        columns = self._columns
+        for number, row in enumerate(rows):
+            columns["page"].append(table.page)
+            columns["table"].append(table.index)
+            columns["row"].append(number)
+            columns["header"].append(has_header and number == 0)
+            columns["cells"].append(row)
+        if len(columns["row"]) >= ROW_GROUP_ROWS:
+            self._flush()
+        self.summary.tables += 1
+        self.summary.rows += len(rows) - has_header
+
+    def add_text(self, text: str) -> None:
+        self.summary.texts += 1
+
+    def close(self, source_name: str) -> None:
+        self._flush()
+        self.writer.close()
+
+
+def export(items: Iterable[Union[Table, str]], output_path: str, fmt: str = "xlsx",
+           header: str = TABLE_HEADER, layout: str = XLSX_LAYOUT, source_name: str = "") -> ExportSummary:
+    """
+    流式导出表格
+
+    Args:
+        items: Table 与段落文本的序列（如 docx_content() 的输出）；文本只写入XLSX的"文本内容"工作表
+        output_path: 输出文件路径
+        fmt: xlsx / csv / parquet / arrow
+        header: 表头识别方式 auto / first / none
+        layout: XLSX布局 stacked / sheets
+        source_name: 源文件名（写入说明信息）
+
+    Returns:
+        ExportSummary
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"不支持的表格格式: {fmt}")
+    if header not in HEADER_MODES:
+        raise ValueError(f"表头识别方式应为 {HEADER_MODES} 之一: {header}")
+    if layout not in XLSX_LAYOUTS:
+        raise ValueError(f"XLSX布局应为 {XLSX_LAYOUTS} 之一: {layout}")
+
+    if fmt == "xlsx":
+        writer = _XlsxWriter(output_path, layout, header)
+    elif fmt == "csv":
+        writer = _CsvZipWriter(output_path, header)
+    else:
+        writer = _ArrowWriter(output_path, fmt, header)
+    for item in items:
+        if isinstance(item, Table):
+            writer.add_table(item)
+        else:
+            writer.add_text(item)
+    writer.close(source_name)
+    return writer.summary
@@ -0,0 +1,322 @@
+"""
+轻量级流水线追踪
+请求级trace ID + 嵌套span计时，导出为JSON Lines文件或OTLP/HTTP(JSON)到本地collector
+
+通过环境变量 PDF2WORD_TRACE 启用:
+    PDF2WORD_TRACE=jsonl:/var/log/pdf2word/traces.jsonl
+    PDF2WORD_TRACE=otlp:http://localhost:4318/v1/traces
+未设置时 span() 返回共享的空上下文，只有一次全局布尔判断的开销
+"""
+
+import atexit
+import json
+import logging
+import os
+import queue
+import re
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+TRACE_HEADER = "x-trace-id"
+
+# 只沿用W3C格式的trace ID（32位小写十六进制），其他值一律重新生成
+_TRACE_ID_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+
+_trace_id: ContextVar[Optional[str]] = ContextVar("pdf2word_trace_id", default=None)
+_parent_span: ContextVar[Optional[str]] = ContextVar("pdf2word_parent_span", default=None)
+
+
+class _NoopSpan:
+    """追踪关闭时使用的空span"""
+
+    __slots__ = ()
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        return None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+class Span:
+    """一次计时区间，退出时交给导出器"""
+
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "attributes", "start_ns", "_start", "_tokens")
+
+    def __init__(self, name: str, attributes: Dict[str, Any]):
+        self.name = name
+        self.trace_id = _trace_id.get() or new_trace_id()
+        self.parent_id = _parent_span.get()
+        self.span_id = uuid.uuid4().hex[:16]
+        self.attributes = attributes
+        self.start_ns = 0
+        self._start = 0.0
+        self._tokens = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def __enter__(self) -> "Span":
+        self._tokens = (_trace_id.set(self.trace_id), _parent_span.set(self.span_id))
+        self.start_ns = time.time_ns()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        duration = time.perf_counter() - self._start
+        trace_token, parent_token = self._tokens
+        _parent_span.reset(parent_token)
+        _trace_id.reset(trace_token)
+        record = {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start_ns": self.start_ns,
+            "duration_ms": round(duration * 1000, 3),
+            "status": "error" if exc_type else "ok",
+            "pid": os.getpid(),
+            "attributes": self.attributes,
+        }
+        if exc_type is not None:
+            record["error"] = f"{exc_type.__name__}: {exc}"
+        _exporter.export(record)
+
+
+class _JsonLinesExporter:
+    """追加写入JSON Lines文件，多进程共享同一文件（O_APPEND保证单行原子）"""
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def export(self, record: Dict[str, Any]) -> None:
+        line = json.dumps(record, ensure_ascii=False, default=str) + "\n"
+        with self._lock:
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, line.encode("utf-8"))
+            finally:
+                os.close(fd)
+
+    def shutdown(self) -> None:
+        pass
+
+
+class _OtlpExporter:
+    """后台线程批量推送 OTLP/HTTP JSON，collector不可用时丢弃数据而不影响转换"""
+
+    def __init__(self, endpoint: str, batch_size: int = 128, interval: float = 2.0):
+        self.endpoint = endpoint
+        self.batch_size = batch_size
+        self.interval = interval
+        self._queue: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue(maxsize=10000)
+        self._thread = threading.Thread(target=self._run, name="otlp-exporter", daemon=True)
+        self._thread.start()
+
+    def export(self, record: Dict[str, Any]) -> None:
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            pass
+
+    def _run(self) -> None:
+        batch: List[Dict[str, Any]] = []
+        deadline = time.monotonic() + self.interval
+        while True:
+            try:
+                record = self._queue.get(timeout=max(deadline - time.monotonic(), 0.01))
+                if record is None:
+                    self._send(batch)
+                    return
+                batch.append(record)
+            except queue.Empty:
+                pass
+            if len(batch) >= self.batch_size or time.monotonic() >= deadline:
+                self._send(batch)
+                batch = []
+                deadline = time.monotonic() + self.interval
+
+    def _send(self, batch: List[Dict[str, Any]]) -> None:
+        if not batch:
+            return
+        import urllib.request
+
+        spans = []
+        for record in batch:
+            span = {
+                "traceId": record["trace_id"],
+                "spanId": record["span_id"],
+                "name": record["name"],
+                "kind": 1,
+                "startTimeUnixNano": str(record["start_ns"]),
+                "endTimeUnixNano": str(record["start_ns"] + int(record["duration_ms"] * 1e6)),
+                "attributes": [
+                    {"key": str(key), "value": {"stringValue": str(value)}}
+                    for key, value in record["attributes"].items()
+                ] + [{"key": "process.pid", "value": {"intValue": str(record["pid"])}}],
+                "status": {"code": 2 if record["status"] == "error" else 1},
+            }
+            if record["parent_id"]:
+                span["parentSpanId"] = record["parent_id"]
+            spans.append(span)
+        payload = {
+            "resourceSpans": [{
+                "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": "pdf2word"}}]},
+                "scopeSpans": [{"scope": {"name": "pdf2word.tracing"}, "spans": spans}],
+            }]
+        }
+        request = urllib.request.Request(
+            self.endpoint,
+            data=json.dumps(payload).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+            method="POST",
+        )
+        try:
+            urllib.request.urlopen(request, timeout=2).close()
+        except Exception as e:
+            logger.debug(f"OTLP导出失败，丢弃 {len(spans)} 个span: {e}")
+
+    def shutdown(self) -> None:
+        self._queue.put(None)
+        self._thread.join(timeout=5)
+
+
+class _NullExporter:
+    def export(self, record: Dict[str, Any]) -> None:
+        pass
+
+    def shutdown(self) -> None:
+        pass
+
+
+_exporter = _NullExporter()
+_enabled = False
+
+
+def configure(spec: Optional[str]) -> None:
+    """
+    配置导出目标
+
+    Args:
+        spec: "jsonl:<path>" / "otlp:<url>"，为空时关闭追踪
+    """
+    global _exporter, _enabled
+    _exporter.shutdown()
+    if not spec:
+        _exporter, _enabled = _NullExporter(), False
+        return
+    kind, _, target = spec.partition(":")
+    if kind == "jsonl":
+        _exporter = _JsonLinesExporter(target or "traces.jsonl")
+    elif kind == "otlp":
+        _exporter = _OtlpExporter(target or "http://localhost:4318/v1/traces")
+    else:
+        raise ValueError(f"不支持的追踪导出方式: {spec}")
+    _enabled = True
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def new_trace_id() -> str:
+    return uuid.uuid4().hex
+
+
+def current_trace_id() -> Optional[str]:
+    """当前请求的trace ID（未在请求上下文中时为None）"""
+    return _trace_id.get()
+
+
+def span(name: str, **attributes: Any):
+    """
+    创建计时span
+
+    用法:
+        with span("libreoffice.convert", pages=10):
+            ...
+    """
+    if not _enabled:
+        return _NOOP
+    return Span(name, attributes)
+
+
+def get_context() -> Dict[str, Optional[str]]:
+    """导出当前追踪上下文，用于传递到工作进程"""
+    return {"trace_id": _trace_id.get(), "parent_id": _parent_span.get()}
+
+
+@contextmanager
+def attach(context: Optional[Dict[str, Optional[str]]]) -> Iterator[None]:
+    """在工作进程中恢复父进程传来的追踪上下文"""
+    if not context:
+        yield
+        return
+    trace_token = _trace_id.set(context.get("trace_id"))
+    parent_token = _parent_span.set(context.get("parent_id"))
+    try:
+        yield
+    finally:
+        _parent_span.reset(parent_token)
+        _trace_id.reset(trace_token)
+
+
+class TraceMiddleware:
+    """
+    ASGI中间件：为每个请求建立trace ID（沿用格式合法的请求头 X-Trace-Id），
+    创建根span并在响应头中返回trace ID
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        trace_id = None
+        for key, value in scope.get("headers", []):
+            if key == TRACE_HEADER.encode():
+                trace_id = value.decode("latin-1")
+                break
+        if trace_id is None or not _TRACE_ID_PATTERN.match(trace_id):
+            trace_id = new_trace_id()
+
+        async def send_with_trace(message):
+            if message["type"] == "http.response.start":
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [(TRACE_HEADER.encode(), trace_id.encode("latin-1"))]
+            await send(message)
+
+        token = _trace_id.set(trace_id)
+        try:
+            with span("http.request", method=scope["method"], path=scope["path"]):
+                await self.app(scope, receive, send_with_trace)
+        finally:
+            _trace_id.reset(token)
+
+
+def install(app) -> None:
+    """为FastAPI应用注册追踪中间件"""
+    app.add_middleware(TraceMiddleware)
+
+
+configure(os.getenv("PDF2WORD_TRACE"))
+atexit.register(lambda: _exporter.shutdown())
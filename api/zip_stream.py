@@ -0,0 +1,103 @@
+"""
+流式ZIP写出
+边写边产出字节块，整个压缩包不会在内存或磁盘中完整缓存；
+输出流不可seek，zipfile 会自动为每个条目写入数据描述符(data descriptor)
+"""
+
+import os
+import time
+import zipfile
+from typing import Iterator, List, Optional
+
+CHUNK_SIZE = 64 * 1024
+
+
+class _ChunkSink:
+    """只支持 write/flush 的输出对象，收集 zipfile 写出的字节供调用方取走"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def write(self, data) -> int:
+        if data:
+            self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+class ZipStream:
+    """
+    流式ZIP写出器
+
+    用法:
+        stream = ZipStream()
+        for chunk in stream.write_file("a.docx", "/tmp/a.docx"):
+            send(chunk)
+        send(stream.close())
+
+    同名条目会被改名（"a (1).docx"），写入后 last_arcname 为实际使用的条目名
+    """
+
+    def __init__(self, chunk_size: int = CHUNK_SIZE):
+        self.chunk_size = chunk_size
+        self._sink = _ChunkSink()
+        self._zip = zipfile.ZipFile(self._sink, "w")
+        self._names = set()
+        self.last_arcname: Optional[str] = None
+
+    def _unique_name(self, arcname: str) -> str:
+        """同名条目追加序号，避免解压时相互覆盖"""
+        name, index = arcname, 1
+        while name in self._names:
+            stem, dot, ext = arcname.rpartition(".")
+            name = f"{stem} ({index}).{ext}" if dot else f"{arcname} ({index})"
+            index += 1
+        self._names.add(name)
+        return name
+
+    def _entry(self, arcname: str, size: int, compress: bool) -> zipfile.ZipInfo:
+        info = zipfile.ZipInfo(self._unique_name(arcname), time.localtime()[:6])
+        self.last_arcname = info.filename
+        info.compress_type = zipfile.ZIP_DEFLATED if compress else zipfile.ZIP_STORED
+        info.file_size = size
+        return info
+
+    def write_file(self, arcname: str, path: str, compress: bool = False) -> Iterator[bytes]:
+        """
+        逐块写入磁盘文件
+
+        Args:
+            arcname: 压缩包内的文件名
+            path: 源文件路径
+            compress: 是否压缩（docx/xlsx 本身已是ZIP，默认直接存储）
+
+        Yields:
+            可立即发送的ZIP字节块
+        """
+        info = self._entry(arcname, os.path.getsize(path), compress)
+        with open(path, "rb") as source, self._zip.open(info, "w") as target:
+            for block in iter(lambda: source.read(self.chunk_size), b""):
+                target.write(block)
+                data = self._sink.drain()
+                if data:
+                    yield data
+        yield self._sink.drain()
+
+    def write_bytes(self, arcname: str, data: bytes, compress: bool = True) -> bytes:
+        """写入内存中的小文件（如清单），返回对应的ZIP字节"""
+        info = self._entry(arcname, len(data), compress)
+        with self._zip.open(info, "w") as target:
+            target.write(data)
+        return self._sink.drain()
+
+    def close(self) -> bytes:
+        """写出中央目录，返回剩余字节"""
+        self._zip.close()
+        return self._sink.drain()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+比较两次基准测试结果并标记性能回退
+
+用法:
+    python benchmarks/compare.py baseline.json current.json
+    python benchmarks/compare.py baseline.json current.json --latency-threshold 0.15 --rss-threshold 0.2
+
+存在回退时退出码为1，便于在CI中使用
+"""
+
+import argparse
+import json
+import sys
+from typing import Dict, List, Optional, Tuple
+
+# 指标名 -> 阈值类别（所有指标都是越小越好）
+METRICS = {
+    "p50_s": "latency",
+    "p95_s": "latency",
+    "peak_rss_mb": "rss",
+    "output_bytes": "size",
+}
+
+
+def _load(path: str) -> Dict[Tuple[str, str], Dict]:
+    with open(path, "r", encoding="utf-8") as f:
+        report = json.load(f)
+    return {(entry["engine"], entry["document"]): entry for entry in report["results"]}
+
+
+def _change(old: Optional[float], new: Optional[float]) -> Optional[float]:
+    if old is None or new is None or old == 0:
+        return None
+    return (new - old) / old
+
+
+def compare(baseline: Dict, current: Dict, thresholds: Dict[str, float],
+            min_seconds: float) -> Tuple[List[Dict], List[str]]:
+    """
+    逐项比较
+
+    Returns:
+        (比较行, 回退描述列表)
+    """
+    rows, regressions = [], []
+    for key in sorted(set(baseline) | set(current)):
+        engine, document = key
+        old, new = baseline.get(key), current.get(key)
+        if old is None or new is None:
+            rows.append({"engine": engine, "document": document, "status": "added" if old is None else "removed"})
+            continue
+        if new.get("errors", 0) > old.get("errors", 0):
+            regressions.append(f"{engine}/{document}: 失败次数 {old.get('errors', 0)} -> {new['errors']}")
+        row = {"engine": engine, "document": document, "status": "ok"}
+        for metric, kind in METRICS.items():
+            change = _change(old.get(metric), new.get(metric))
+            row[metric] = change
+            if change is None or change <= thresholds[kind]:
+                continue
+            # 极短的耗时抖动较大，绝对差值低于下限时不算回退
+            if kind == "latency" and new[metric] - old[metric] < min_seconds:
+                continue
+            row["status"] = "regression"
+            regressions.append(
+                f"{engine}/{document}: {metric} {old[metric]} -> {new[metric]} (+{change * 100:.1f}%)"
+            )
+        rows.append(row)
+    return rows, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="比较两次基准测试结果")
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument("--latency-threshold", type=float, default=0.10, help="延迟允许的相对增长")
+    parser.add_argument("--rss-threshold", type=float, default=0.15, help="峰值RSS允许的相对增长")
+    parser.add_argument("--size-threshold", type=float, default=0.05, help="输出大小允许的相对增长")
+    parser.add_argument("--min-seconds", type=float, default=0.05, help="延迟回退的最小绝对差值")
+    args = parser.parse_args()
+
+    thresholds = {"latency": args.latency_threshold, "rss": args.rss_threshold, "size": args.size_threshold}
+    rows, regressions = compare(_load(args.baseline), _load(args.current), thresholds, args.min_seconds)
+
+    print(f"{'engine':>16}  {'document':<22} {'p50':>8} {'p95':>8} {'rss':>8} {'size':>8}  status")
+    for row in rows:
+        cells = []
+        for metric in METRICS:
+            change = row.get(metric)
+            cells.append(f"{change * 100:+7.1f}%" if change is not None else f"{'-':>8}")
+        print(f"{row['engine']:>16}  {row['document']:<22} {' '.join(cells)}  {row['status']}")
+
+    if regressions:
+        print("\n性能回退:")
+        for line in regressions:
+            print(f"  - {line}")
+        sys.exit(1)
+    print("\n未发现性能回退")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+基准测试语料生成器
+使用reportlab生成可复现的合成PDF：相同的种子和参数生成逐字节相同的文件
+
+语料类型:
+    text         纯文本段落
+    multicolumn  双栏排版
+    tables       带边框的表格
+    images       内嵌栅格图片
+    scanned      整页图片（模拟扫描件，无文本层）
+    cjk          中文文本（CID字体）
+
+用法:
+    python benchmarks/corpus.py benchmarks/corpus
+    python benchmarks/corpus.py benchmarks/corpus --preset full
+"""
+
+import argparse
+import hashlib
+import io
+import json
+import os
+import random
+from typing import Callable, Dict, List, Tuple
+
+PAGE_WIDTH, PAGE_HEIGHT = 595.27, 841.89  # A4 (pt)
+MARGIN = 56
+
+_WORDS = (
+    "invoice amount total payment account balance report quarter revenue cost "
+    "customer order delivery service contract period summary detail item price "
+    "quantity tax discount schedule review approval department budget forecast"
+).split()
+
+_CJK_TEXT = (
+    "本报告汇总了本季度的经营情况，包括收入、成本、利润以及主要业务指标。"
+    "各部门按照年度计划推进工作，整体进度符合预期。客户订单数量稳步增长，"
+    "交付周期进一步缩短，服务质量持续提升。财务部门完成了预算执行情况的复核，"
+    "并对下一阶段的资金安排提出了建议。"
+)
+
+# 预设语料集: (类型, 页数)
+PRESETS: Dict[str, List[Tuple[str, int]]] = {
+    "quick": [
+        ("text", 1), ("text", 10), ("multicolumn", 5), ("tables", 5),
+        ("images", 5), ("scanned", 2), ("cjk", 5),
+    ],
+    "standard": [
+        ("text", 1), ("text", 10), ("text", 100), ("multicolumn", 20), ("tables", 20),
+        ("images", 20), ("scanned", 10), ("cjk", 20),
+    ],
+    "full": [
+        ("text", 1), ("text", 10), ("text", 100), ("text", 1000), ("multicolumn", 100),
+        ("tables", 100), ("images", 100), ("scanned", 50), ("cjk", 100), ("cjk", 1000),
+    ],
+}
+
+
+def _sentence(rng: random.Random, words: int) -> str:
+    text = " ".join(rng.choice(_WORDS) for _ in range(words))
+    return text[0].upper() + text[1:] + "."
+
+
+def _wrap(text: str, width: int) -> List[str]:
+    lines, current = [], ""
+    for word in text.split():
+        if current and len(current) + len(word) + 1 > width:
+            lines.append(current)
+            current = word
+        else:
+            current = f"{current} {word}" if current else word
+    if current:
+        lines.append(current)
+    return lines
+
+
+def _draw_text_page(c, rng: random.Random, page_num: int) -> None:
+    c.setFont("Helvetica-Bold", 16)
+    c.drawString(MARGIN, PAGE_HEIGHT - MARGIN, f"Section {page_num}: {_sentence(rng, 4)}")
+    c.setFont("Helvetica", 10.5)
+    y = PAGE_HEIGHT - MARGIN - 32
+    while y > MARGIN + 20:
+        for line in _wrap(_sentence(rng, rng.randint(25, 60)), 95):
+            if y <= MARGIN + 20:
+                break
+            c.drawString(MARGIN, y, line)
+            y -= 14
+        y -= 10
+    c.setFont("Helvetica", 8)
+    c.drawCentredString(PAGE_WIDTH / 2, MARGIN / 2, f"Page {page_num}")
+
+
+def _draw_multicolumn_page(c, rng: random.Random, page_num: int) -> None:
+    c.setFont("Helvetica-Bold", 14)
+    c.drawString(MARGIN, PAGE_HEIGHT - MARGIN, f"Newsletter {page_num}")
+    c.setFont("Helvetica", 9.5)
+    column_width = (PAGE_WIDTH - 2 * MARGIN - 20) / 2
+    for column in range(2):
+        x = MARGIN + column * (column_width + 20)
+        y = PAGE_HEIGHT - MARGIN - 28
+        while y > MARGIN:
+            for line in _wrap(_sentence(rng, rng.randint(20, 45)), 48):
+                if y <= MARGIN:
+                    break
+                c.drawString(x, y, line)
+                y -= 12
+            y -= 8
+
+
+def _draw_table_page(c, rng: random.Random, page_num: int) -> None:
+    c.setFont("Helvetica-Bold", 14)
+    c.drawString(MARGIN, PAGE_HEIGHT - MARGIN, f"Statement {page_num}")
+    columns = ["No.", "Item", "Qty", "Price", "Tax", "Total"]
+    widths = [40, 190, 50, 70, 60, 73]
+    row_height = 18
+    top = PAGE_HEIGHT - MARGIN - 30
+    rows = int((top - MARGIN) // row_height)
+    c.setLineWidth(0.5)
+    for row in range(rows + 1):
+        y = top - row * row_height
+        c.line(MARGIN, y, MARGIN + sum(widths), y)
+    x = MARGIN
+    for width in widths + [0]:
+        c.line(x, top, x, top - rows * row_height)
+        x += width
+    for row in range(rows):
+        y = top - (row + 1) * row_height + 5
+        if row == 0:
+            c.setFont("Helvetica-Bold", 9)
+            values = columns
+        else:
+            c.setFont("Helvetica", 9)
+            qty = rng.randint(1, 50)
+            price = rng.randint(100, 99999) / 100
+            values = [str(row), _sentence(rng, 3)[:34], str(qty), f"{price:.2f}",
+                      f"{qty * price * 0.13:.2f}", f"{qty * price * 1.13:.2f}"]
+        x = MARGIN
+        for value, width in zip(values, widths):
+            c.drawString(x + 3, y, value)
+            x += width
+
+
+def _noise_image(rng: random.Random, width: int, height: int):
+    from PIL import Image
+
+    # 低频色块 + 噪声：既不是纯色（可被极限压缩），也不会过大
+    block = 8
+    small = bytes(rng.randrange(256) for _ in range((width // block) * (height // block) * 3))
+    image = Image.frombytes("RGB", (width // block, height // block), small)
+    return image.resize((width, height))
+
+
+def _draw_image_page(c, rng: random.Random, page_num: int) -> None:
+    from reportlab.lib.utils import ImageReader
+
+    c.setFont("Helvetica-Bold", 14)
+    c.drawString(MARGIN, PAGE_HEIGHT - MARGIN, f"Gallery {page_num}")
+    c.setFont("Helvetica", 9)
+    # 每页 2 x 3 张图片，每张 230 x 172 pt，下方留出图注
+    for index in range(6):
+        x = MARGIN + (index % 2) * 245
+        y = PAGE_HEIGHT - MARGIN - 30 - (index // 2 + 1) * 220
+        image = _noise_image(rng, 480, 360)
+        c.drawImage(ImageReader(image), x, y, width=230, height=172)
+        c.drawString(x, y - 12, f"Figure {page_num}.{index + 1}: {_sentence(rng, 5)}")
+
+
+def _draw_scanned_page(c, rng: random.Random, page_num: int) -> None:
+    from PIL import Image, ImageDraw
+    from reportlab.lib.utils import ImageReader
+
+    # 150 DPI 灰度整页图片，文字只存在于像素中
+    width, height = int(PAGE_WIDTH / 72 * 150), int(PAGE_HEIGHT / 72 * 150)
+    image = Image.new("L", (width, height), 250)
+    draw = ImageDraw.Draw(image)
+    y = 120
+    draw.text((120, 60), f"Scanned page {page_num}", fill=0)
+    while y < height - 120:
+        draw.text((120, y), " ".join(rng.choice(_WORDS) for _ in range(14)), fill=rng.randint(0, 60))
+        y += 28
+    c.drawImage(ImageReader(image), 0, 0, width=PAGE_WIDTH, height=PAGE_HEIGHT)
+
+
+def _draw_cjk_page(c, rng: random.Random, page_num: int) -> None:
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.cidfonts import UnicodeCIDFont
+
+    if "STSong-Light" not in pdfmetrics.getRegisteredFontNames():
+        pdfmetrics.registerFont(UnicodeCIDFont("STSong-Light"))
+    c.setFont("STSong-Light", 16)
+    c.drawString(MARGIN, PAGE_HEIGHT - MARGIN, f"第{page_num}章 经营情况说明")
+    c.setFont("STSong-Light", 10.5)
+    y = PAGE_HEIGHT - MARGIN - 32
+    chars_per_line = 44
+    while y > MARGIN:
+        start = rng.randrange(len(_CJK_TEXT))
+        text = (_CJK_TEXT * 3)[start:start + rng.randint(80, 200)]
+        for offset in range(0, len(text), chars_per_line):
+            if y <= MARGIN:
+                break
+            c.drawString(MARGIN, y, text[offset:offset + chars_per_line])
+            y -= 16
+        y -= 8
+
+
+GENERATORS: Dict[str, Callable] = {
+    "text": _draw_text_page,
+    "multicolumn": _draw_multicolumn_page,
+    "tables": _draw_table_page,
+    "images": _draw_image_page,
+    "scanned": _draw_scanned_page,
+    "cjk": _draw_cjk_page,
+}
+
+
+def generate_pdf(kind: str, pages: int, seed: int = 0) -> bytes:
+    """
+    生成单个合成PDF
+
+    Args:
+        kind: 语料类型（见 GENERATORS）
+        pages: 页数
+        seed: 随机种子
+
+    Returns:
+        PDF字节内容（invariant模式，不含时间戳和随机文档ID）
+    """
+    from reportlab.pdfgen import canvas
+
+    if kind not in GENERATORS:
+        raise ValueError(f"未知的语料类型: {kind}")
+    rng = random.Random(f"{kind}:{pages}:{seed}")
+    buffer = io.BytesIO()
+    c = canvas.Canvas(buffer, pagesize=(PAGE_WIDTH, PAGE_HEIGHT), invariant=1)
+    c.setTitle(f"benchmark {kind} {pages}p")
+    draw = GENERATORS[kind]
+    for page_num in range(1, pages + 1):
+        draw(c, rng, page_num)
+        c.showPage()
+    c.save()
+    return buffer.getvalue()
+
+
+def generate_corpus(output_dir: str, preset: str = "standard", seed: int = 0) -> List[Dict]:
+    """
+    生成语料目录和 manifest.json，已存在且哈希一致的文件不会重新生成
+
+    Returns:
+        manifest 条目列表
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    manifest_path = os.path.join(output_dir, "manifest.json")
+    previous = {}
+    if os.path.exists(manifest_path):
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            previous = {entry["file"]: entry for entry in json.load(f)["documents"]}
+
+    documents = []
+    for kind, pages in PRESETS[preset]:
+        name = f"{kind}_{pages}p.pdf"
+        path = os.path.join(output_dir, name)
+        entry = previous.get(name)
+        if (entry and entry.get("seed") == seed and os.path.exists(path)
+                and _sha256(path) == entry["sha256"]):
+            documents.append(entry)
+            continue
+        data = generate_pdf(kind, pages, seed)
+        with open(path, "wb") as f:
+            f.write(data)
+        documents.append({
+            "file": name,
+            "kind": kind,
+            "pages": pages,
+            "seed": seed,
+            "bytes": len(data),
+            "sha256": hashlib.sha256(data).hexdigest(),
+        })
+        print(f"生成 {name} ({len(data) / 1024:.0f} KB)")
+
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump({"preset": preset, "seed": seed, "documents": documents}, f, ensure_ascii=False, indent=2)
+    return documents
+
+
+def _sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="生成基准测试PDF语料")
+    parser.add_argument("output_dir", nargs="?", default=os.path.join(os.path.dirname(__file__), "corpus"))
+    parser.add_argument("--preset", choices=sorted(PRESETS), default="standard")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    documents = generate_corpus(args.output_dir, args.preset, args.seed)
+    print(f"语料就绪: {len(documents)} 个文件 -> {args.output_dir}")
+
+
+if __name__ == "__main__":
+    main()
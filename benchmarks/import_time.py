@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+导入耗时基准测试
+在全新的子进程中测量应用模块和重型依赖的导入时间，以及服务冷启动到健康检查可用的时间
+
+用法:
+    python benchmarks/import_time.py
+    python benchmarks/import_time.py --repeat 5 --serve api.render_app_libreoffice:app --health /healthz
+"""
+
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_MODULES = [
+    "server",
+    "api.render_app_libreoffice",
+    "api.libreoffice_converter",
+    "api.libre_hybrid_converter",
+    "pdf2docx",
+    "fitz",
+    "pandas",
+    "openpyxl",
+    "docx",
+    "PyPDF2",
+]
+
+_MEASURE_SNIPPET = (
+    "import time, importlib; s = time.perf_counter(); "
+    "importlib.import_module({name!r}); print(time.perf_counter() - s)"
+)
+
+
+def measure_import(module: str, repeat: int) -> Dict:
+    """在独立进程中导入模块 repeat 次，返回耗时统计（毫秒）"""
+    samples: List[float] = []
+    error = None
+    for _ in range(repeat):
+        result = subprocess.run(
+            [sys.executable, "-c", _MEASURE_SNIPPET.format(name=module)],
+            capture_output=True, text=True, cwd=REPO_ROOT
+        )
+        if result.returncode != 0:
+            error = result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "import failed"
+            break
+        samples.append(float(result.stdout.strip().splitlines()[-1]) * 1000)
+
+    if not samples:
+        return {"module": module, "error": error}
+    return {
+        "module": module,
+        "median_ms": round(statistics.median(samples), 1),
+        "min_ms": round(min(samples), 1),
+        "max_ms": round(max(samples), 1),
+    }
+
+
+def top_importtime(module: str, limit: int = 10) -> List[Dict]:
+    """使用 -X importtime 找出累计耗时最多的子模块"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, cwd=REPO_ROOT
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        # 格式: "import time:  self_us | cumulative_us | module"
+        try:
+            self_us, cumulative_us, name = line.split(":", 1)[1].split("|")
+            rows.append({
+                "module": name.strip(),
+                "self_ms": int(self_us) / 1000,
+                "cumulative_ms": int(cumulative_us) / 1000
+            })
+        except ValueError:
+            continue
+    rows.sort(key=lambda row: row["cumulative_ms"], reverse=True)
+    return rows[:limit]
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def time_to_healthy(app: str, health_path: str, timeout: float = 60.0) -> Optional[float]:
+    """启动uvicorn并轮询健康检查，返回从启动到首次200响应的秒数"""
+    import requests
+
+    port = _free_port()
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", app, "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=REPO_ROOT
+    )
+    try:
+        while time.perf_counter() - start < timeout:
+            try:
+                response = requests.get(f"http://127.0.0.1:{port}{health_path}", timeout=1)
+                if response.status_code == 200:
+                    return time.perf_counter() - start
+            except requests.RequestException:
+                pass
+            if proc.poll() is not None:
+                return None
+            time.sleep(0.05)
+        return None
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="导入耗时基准测试")
+    parser.add_argument("modules", nargs="*", default=DEFAULT_MODULES, help="需要测量的模块")
+    parser.add_argument("--repeat", type=int, default=3, help="每个模块的重复次数")
+    parser.add_argument("--breakdown", action="store_true", help="输出 -X importtime 耗时最多的子模块")
+    parser.add_argument("--serve", help="测量冷启动时间的ASGI应用，例如 server:app")
+    parser.add_argument("--health", default="/health", help="冷启动测量使用的健康检查路径")
+    args = parser.parse_args()
+
+    report = {"python": sys.version.split()[0], "imports": []}
+    for module in args.modules:
+        entry = measure_import(module, args.repeat)
+        if args.breakdown and "error" not in entry:
+            entry["top"] = top_importtime(module)
+        report["imports"].append(entry)
+
+    if args.serve:
+        elapsed = time_to_healthy(args.serve, args.health)
+        report["time_to_healthy_s"] = round(elapsed, 3) if elapsed is not None else None
+
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
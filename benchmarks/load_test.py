@@ -0,0 +1,358 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+HTTP压测工具
+对 /api/convert 发起开环（泊松到达）或闭环（固定并发）负载，文件取自基准语料，
+报告吞吐量、延迟百分位、错误率以及服务端RSS随时间的变化
+
+用法:
+    # 压测已运行的服务
+    python benchmarks/load_test.py --url http://localhost:8000 --rate 5 --duration 60
+
+    # 自动启动服务并使用模拟引擎（200ms），只测Web层开销
+    python benchmarks/load_test.py --spawn api.render_app_libreoffice:app --mock-latency-ms 200 \\
+        --concurrency 16 --duration 30
+
+    # 指定文件混合比例
+    python benchmarks/load_test.py --url http://localhost:3001 --mix text_1p.pdf:8,tables_5p.pdf:2 \\
+        --field output_format=docx
+"""
+
+import argparse
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from benchmarks.corpus import PRESETS, generate_corpus  # noqa: E402
+from benchmarks.run_benchmarks import percentile  # noqa: E402
+
+
+class FileMix:
+    """按权重随机选择上传文件，文件内容预先读入内存，避免压测端磁盘IO干扰"""
+
+    def __init__(self, corpus_dir: str, spec: Optional[str], seed: int):
+        manifest_names = [entry["file"] for entry in _read_manifest(corpus_dir)]
+        weights: Dict[str, float] = {}
+        if spec:
+            for item in spec.split(","):
+                name, _, weight = item.partition(":")
+                weights[name.strip()] = float(weight or 1)
+        else:
+            weights = {name: 1.0 for name in manifest_names}
+        self.names = list(weights)
+        self.weights = [weights[name] for name in self.names]
+        self.contents = {}
+        for name in self.names:
+            with open(os.path.join(corpus_dir, name), "rb") as f:
+                self.contents[name] = f.read()
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def pick(self) -> Tuple[str, bytes]:
+        with self._lock:
+            name = self._random.choices(self.names, self.weights)[0]
+        return name, self.contents[name]
+
+
+def _read_manifest(corpus_dir: str) -> List[Dict]:
+    with open(os.path.join(corpus_dir, "manifest.json"), "r", encoding="utf-8") as f:
+        return json.load(f)["documents"]
+
+
+class RssSampler:
+    """后台采样服务端RSS：优先读取 /proc/<pid>（含子进程），否则解析 /metrics"""
+
+    def __init__(self, base_url: str, pid: Optional[int], interval: float):
+        self.base_url = base_url
+        self.pid = pid
+        self.interval = interval
+        self.samples: List[Tuple[float, float]] = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._start = time.perf_counter()
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join(timeout=5)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            rss = self._read_proc() if self.pid else self._read_metrics()
+            if rss is not None:
+                self.samples.append((round(time.perf_counter() - self._start, 2), round(rss / 1024 / 1024, 1)))
+            self._stop.wait(self.interval)
+
+    def _read_proc(self) -> Optional[float]:
+        total = 0.0
+        for pid in [self.pid] + _descendants(self.pid):
+            try:
+                with open(f"/proc/{pid}/status", "r") as f:
+                    for line in f:
+                        if line.startswith("VmRSS:"):
+                            total += int(line.split()[1]) * 1024
+                            break
+            except OSError:
+                continue
+        return total or None
+
+    def _read_metrics(self) -> Optional[float]:
+        import requests
+
+        try:
+            text = requests.get(f"{self.base_url}/metrics", timeout=2).text
+        except requests.RequestException:
+            return None
+        for line in text.splitlines():
+            if line.startswith("process_resident_memory_bytes "):
+                return float(line.split()[1])
+        return None
+
+
+def _descendants(pid: int) -> List[int]:
+    """返回进程的所有子孙进程（uvicorn多worker、soffice）"""
+    children = []
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children", "r") as f:
+            direct = [int(child) for child in f.read().split()]
+    except OSError:
+        return children
+    for child in direct:
+        children.append(child)
+        children.extend(_descendants(child))
+    return children
+
+
+class LoadTest:
+    """压测执行器"""
+
+    def __init__(self, url: str, path: str, mix: FileMix, fields: Dict[str, str], timeout: float):
+        import requests
+
+        self.endpoint = url.rstrip("/") + path
+        self.mix = mix
+        self.fields = fields
+        self.timeout = timeout
+        self.results: List[Dict] = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._requests = requests
+
+    def _session(self):
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self._local.session = self._requests.Session()
+        return session
+
+    def _send(self, scheduled_at: float) -> None:
+        name, content = self.mix.pick()
+        started = time.perf_counter()
+        status, error, size = None, None, 0
+        try:
+            response = self._session().post(
+                self.endpoint,
+                files={"file": (name, content, "application/pdf")},
+                data=self.fields,
+                timeout=self.timeout,
+            )
+            status = response.status_code
+            size = len(response.content)
+            if status >= 400:
+                error = f"HTTP {status}"
+        except self._requests.RequestException as e:
+            error = type(e).__name__
+        finished = time.perf_counter()
+        with self._lock:
+            self.results.append({
+                "file": name,
+                "status": status,
+                "error": error,
+                # 开环模式从计划到达时间算起，避免协调遗漏(coordinated omission)
+                "latency": finished - scheduled_at,
+                "service_time": finished - started,
+                "bytes": size,
+                "finished": finished,
+            })
+
+    def run_open_loop(self, rate: float, duration: float, max_inflight: int, seed: int) -> float:
+        """泊松到达：平均每秒 rate 个请求，客户端最多 max_inflight 个并发连接"""
+        arrivals = random.Random(seed)
+        start = time.perf_counter()
+        next_arrival = start
+        with ThreadPoolExecutor(max_workers=max_inflight) as pool:
+            while True:
+                next_arrival += arrivals.expovariate(rate)
+                if next_arrival - start > duration:
+                    break
+                delay = next_arrival - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                pool.submit(self._send, next_arrival)
+        return time.perf_counter() - start
+
+    def run_closed_loop(self, concurrency: int, duration: float) -> float:
+        """固定并发：每个虚拟用户收到响应后立即发送下一个请求"""
+        start = time.perf_counter()
+        deadline = start + duration
+
+        def user():
+            while time.perf_counter() < deadline:
+                self._send(time.perf_counter())
+
+        threads = [threading.Thread(target=user, daemon=True) for _ in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return time.perf_counter() - start
+
+
+def summarize(results: List[Dict], elapsed: float) -> Dict:
+    ok = [r for r in results if r["error"] is None]
+    latencies = [r["latency"] for r in ok]
+    errors: Dict[str, int] = {}
+    for r in results:
+        if r["error"]:
+            errors[r["error"]] = errors.get(r["error"], 0) + 1
+    summary = {
+        "requests": len(results),
+        "succeeded": len(ok),
+        "error_rate": round(1 - len(ok) / len(results), 4) if results else 0.0,
+        "errors": errors,
+        "elapsed_s": round(elapsed, 2),
+        "throughput_rps": round(len(ok) / elapsed, 3) if elapsed else 0.0,
+        "bytes_received": sum(r["bytes"] for r in ok),
+    }
+    if latencies:
+        summary["latency_s"] = {
+            f"p{q}": round(percentile(latencies, q), 4) for q in (50, 90, 95, 99)
+        }
+        summary["latency_s"]["max"] = round(max(latencies), 4)
+        summary["latency_s"]["mean"] = round(sum(latencies) / len(latencies), 4)
+    return summary
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def spawn_server(app: str, workers: int, mock_latency_ms: Optional[float],
+                 mock_jitter: float) -> Tuple[subprocess.Popen, str]:
+    """启动被测服务，返回 (进程, base_url)"""
+    import requests
+
+    port = _free_port()
+    env = dict(os.environ)
+    if mock_latency_ms is not None:
+        env.update({
+            "PDF2WORD_MOCK_ENGINE": "1",
+            "PDF2WORD_MOCK_LATENCY_MS": str(mock_latency_ms),
+            "PDF2WORD_MOCK_JITTER": str(mock_jitter),
+        })
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", app, "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning"],
+        cwd=REPO_ROOT, env=env
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.perf_counter() + 60
+    while time.perf_counter() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"服务启动失败，退出码 {proc.returncode}")
+        try:
+            requests.get(f"{base_url}/metrics", timeout=1)
+            return proc, base_url
+        except requests.RequestException:
+            time.sleep(0.1)
+    proc.terminate()
+    raise RuntimeError("服务启动超时")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PDF转换服务HTTP压测")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--url", help="被测服务地址，例如 http://localhost:8000")
+    target.add_argument("--spawn", help="自动启动的ASGI应用，例如 api.render_app_libreoffice:app")
+    parser.add_argument("--workers", type=int, default=1, help="--spawn 时的uvicorn worker数")
+    parser.add_argument("--mock-latency-ms", type=float, help="--spawn 时启用模拟引擎并设置平均延迟")
+    parser.add_argument("--mock-jitter", type=float, default=0.3, help="模拟引擎延迟的对数正态抖动")
+    parser.add_argument("--path", default="/api/convert", help="上传接口路径")
+    parser.add_argument("--field", action="append", default=[], help="附加表单字段 key=value，可重复")
+    parser.add_argument("--rate", type=float, help="开环模式：平均到达率（请求/秒，泊松分布）")
+    parser.add_argument("--concurrency", type=int, default=4, help="闭环并发数 / 开环最大在途请求数")
+    parser.add_argument("--duration", type=float, default=30, help="压测时长（秒）")
+    parser.add_argument("--timeout", type=float, default=300, help="单个请求超时（秒）")
+    parser.add_argument("--corpus", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "corpus"))
+    parser.add_argument("--preset", choices=sorted(PRESETS), default="quick")
+    parser.add_argument("--mix", help="文件混合，格式 name:weight,name:weight（默认语料中所有文件等权重）")
+    parser.add_argument("--server-pid", type=int, help="服务进程PID，用于读取 /proc RSS（否则读取 /metrics）")
+    parser.add_argument("--rss-interval", type=float, default=1.0, help="RSS采样间隔（秒）")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-o", "--output", help="结果JSON输出路径")
+    args = parser.parse_args()
+
+    generate_corpus(args.corpus, args.preset, args.seed)
+    mix = FileMix(args.corpus, args.mix, args.seed)
+    fields = dict(item.split("=", 1) for item in args.field)
+
+    proc = None
+    base_url, server_pid = args.url, args.server_pid
+    if args.spawn:
+        proc, base_url = spawn_server(args.spawn, args.workers, args.mock_latency_ms, args.mock_jitter)
+        server_pid = proc.pid
+
+    sampler = RssSampler(base_url, server_pid, args.rss_interval)
+    sampler.start()
+    test = LoadTest(base_url, args.path, mix, fields, args.timeout)
+    try:
+        if args.rate:
+            mode = {"mode": "open", "rate": args.rate, "max_inflight": args.concurrency}
+            elapsed = test.run_open_loop(args.rate, args.duration, args.concurrency, args.seed)
+        else:
+            mode = {"mode": "closed", "concurrency": args.concurrency}
+            elapsed = test.run_closed_loop(args.concurrency, args.duration)
+    finally:
+        sampler.stop()
+        if proc is not None:
+            proc.terminate()
+            try:
+                proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+
+    report = {
+        "target": base_url + args.path,
+        "load": mode,
+        "mock_latency_ms": args.mock_latency_ms if args.spawn else None,
+        "files": dict(zip(mix.names, mix.weights)),
+        "summary": summarize(test.results, elapsed),
+        "server_rss_mb": {
+            "peak": max((rss for _, rss in sampler.samples), default=None),
+            "timeline": sampler.samples,
+        },
+    }
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+本地转换引擎基准测试
+每次转换都在独立子进程中执行，以便准确测量峰值RSS（含soffice等子进程）
+
+用法:
+    python benchmarks/run_benchmarks.py --preset quick -o results.json
+    python benchmarks/run_benchmarks.py --engines pdf2docx,pypdf2_streaming --repeat 5
+    python benchmarks/compare.py baseline.json results.json
+"""
+
+import argparse
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List, Optional
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from benchmarks.corpus import PRESETS, generate_corpus  # noqa: E402
+
+
+def _engine_pdf2docx(pdf_path: str, work_dir: str) -> str:
+    from pdf2docx import Converter
+
+    output = os.path.join(work_dir, "out.docx")
+    cv = Converter(pdf_path)
+    try:
+        cv.convert(output, start=0, end=None)
+    finally:
+        cv.close()
+    return output
+
+
+def _engine_libreoffice(pdf_path: str, work_dir: str) -> str:
+    from api.libreoffice_converter import LibreOfficeConverter
+
+    converter = LibreOfficeConverter()
+    if not converter.is_available:
+        raise RuntimeError("LibreOffice not available")
+    output = os.path.join(work_dir, "out.docx")
+    success, message = converter.convert_file(pdf_path, output)
+    if not success:
+        raise RuntimeError(message)
+    return output
+
+
+def _engine_pdfconverter(pdf_path: str, work_dir: str) -> str:
+    sys.path.insert(0, os.path.join(REPO_ROOT, "pdf2word", "src"))
+    from pdf2word import PDFConverter
+
+    try:
+        return str(PDFConverter(pdf_path, work_dir).convert())
+    except SystemExit:
+        raise RuntimeError("PDFConverter environment check failed (LibreOffice missing?)")
+
+
+def _engine_pypdf2_streaming(pdf_path: str, work_dir: str) -> str:
+    from api.libre_hybrid_converter import LibreHybridConverter
+
+    output = os.path.join(work_dir, "out.docx")
+    success, message = LibreHybridConverter()._convert_with_pypdf2(pdf_path, output, os.path.basename(pdf_path))
+    if not success:
+        raise RuntimeError(message)
+    return output
+
+
+def _engine_pypdf2_enhanced(pdf_path: str, work_dir: str) -> str:
+    from api.enhanced_pypdf2_converter import EnhancedPyPDF2Converter
+
+    output = os.path.join(work_dir, "out.docx")
+    if not EnhancedPyPDF2Converter().convert_pdf_to_word(pdf_path, output):
+        raise RuntimeError("EnhancedPyPDF2Converter failed")
+    return output
+
+
+def _engine_pypdf2_hybrid(pdf_path: str, work_dir: str) -> str:
+    import asyncio
+    from api.hybrid_converter import HybridConverter
+
+    output = os.path.join(work_dir, "out.docx")
+    # 只测本地回退路径，不访问CloudConvert
+    converter = HybridConverter(cloudconvert_api_key="")
+    if not asyncio.run(converter._convert_pdf_to_word_nopillow(pdf_path, output)):
+        raise RuntimeError("HybridConverter local conversion failed")
+    return output
+
+
+ENGINES: Dict[str, Callable[[str, str], str]] = {
+    "pdf2docx": _engine_pdf2docx,
+    "libreoffice": _engine_libreoffice,
+    "pdfconverter": _engine_pdfconverter,
+    "pypdf2_streaming": _engine_pypdf2_streaming,
+    "pypdf2_enhanced": _engine_pypdf2_enhanced,
+    "pypdf2_hybrid": _engine_pypdf2_hybrid,
+}
+
+
+def _peak_rss_bytes() -> int:
+    """本进程与已回收子进程的峰值RSS之和（Linux下ru_maxrss单位为KB，macOS为字节）"""
+    import resource
+
+    scale = 1 if sys.platform == "darwin" else 1024
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return (own + children) * scale
+
+
+def run_single(engine: str, pdf_path: str) -> Dict:
+    """在当前进程中执行一次转换（由子进程调用）"""
+    with tempfile.TemporaryDirectory(prefix="pdf2word_bench_") as work_dir:
+        start = time.perf_counter()
+        try:
+            output = ENGINES[engine](pdf_path, work_dir)
+            elapsed = time.perf_counter() - start
+            return {
+                "ok": True,
+                "seconds": elapsed,
+                "output_bytes": os.path.getsize(output),
+                "peak_rss_bytes": _peak_rss_bytes(),
+            }
+        except Exception as e:
+            return {"ok": False, "error": f"{type(e).__name__}: {e}", "seconds": time.perf_counter() - start}
+
+
+def _run_in_child(engine: str, pdf_path: str, timeout: float) -> Dict:
+    cmd = [sys.executable, os.path.abspath(__file__), "--worker", engine, pdf_path]
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout, cwd=REPO_ROOT)
+    except subprocess.TimeoutExpired:
+        return {"ok": False, "error": f"timeout after {timeout}s"}
+    for line in reversed(result.stdout.splitlines()):
+        if line.startswith("{"):
+            return json.loads(line)
+    return {"ok": False, "error": (result.stderr.strip().splitlines() or ["no output"])[-1]}
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    """最近秩百分位数"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(math.ceil(q / 100 * len(ordered)) - 1, 0)
+    return ordered[min(rank, len(ordered) - 1)]
+
+
+def benchmark(corpus_dir: str, documents: List[Dict], engines: List[str], repeat: int,
+              warmup: int, timeout: float) -> List[Dict]:
+    results = []
+    for document in documents:
+        pdf_path = os.path.join(corpus_dir, document["file"])
+        for engine in engines:
+            for _ in range(warmup):
+                _run_in_child(engine, pdf_path, timeout)
+            runs = [_run_in_child(engine, pdf_path, timeout) for _ in range(repeat)]
+            ok_runs = [run for run in runs if run.get("ok")]
+            latencies = [run["seconds"] for run in ok_runs]
+            entry = {
+                "engine": engine,
+                "document": document["file"],
+                "kind": document["kind"],
+                "pages": document["pages"],
+                "input_bytes": document["bytes"],
+                "runs": len(runs),
+                "errors": len(runs) - len(ok_runs),
+            }
+            if ok_runs:
+                p50 = percentile(latencies, 50)
+                entry.update({
+                    "p50_s": round(p50, 4),
+                    "p95_s": round(percentile(latencies, 95), 4),
+                    "pages_per_s": round(document["pages"] / p50, 3) if p50 else None,
+                    "peak_rss_mb": round(max(run["peak_rss_bytes"] for run in ok_runs) / 1024 / 1024, 1),
+                    "output_bytes": ok_runs[-1]["output_bytes"],
+                })
+            else:
+                entry["error"] = runs[-1].get("error") if runs else "not run"
+            status = f"p50={entry['p50_s']:.3f}s" if ok_runs else f"失败: {entry['error']}"
+            print(f"[{engine:>16}] {document['file']:<22} {status}", file=sys.stderr)
+            results.append(entry)
+    return results
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, cwd=REPO_ROOT).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def main():
+    if len(sys.argv) == 4 and sys.argv[1] == "--worker":
+        print(json.dumps(run_single(sys.argv[2], sys.argv[3])))
+        return
+
+    parser = argparse.ArgumentParser(description="本地转换引擎基准测试")
+    parser.add_argument("--corpus", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "corpus"))
+    parser.add_argument("--preset", choices=sorted(PRESETS), default="quick")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--engines", default=",".join(ENGINES), help="逗号分隔的引擎列表")
+    parser.add_argument("--kinds", help="只测试指定的语料类型（逗号分隔）")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--timeout", type=float, default=900)
+    parser.add_argument("-o", "--output", help="结果JSON输出路径（默认输出到stdout）")
+    args = parser.parse_args()
+
+    engines = [name.strip() for name in args.engines.split(",") if name.strip()]
+    unknown = set(engines) - set(ENGINES)
+    if unknown:
+        parser.error(f"未知引擎: {', '.join(sorted(unknown))}")
+
+    documents = generate_corpus(args.corpus, args.preset, args.seed)
+    if args.kinds:
+        kinds = set(args.kinds.split(","))
+        documents = [doc for doc in documents if doc["kind"] in kinds]
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "git_revision": _git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "preset": args.preset,
+            "seed": args.seed,
+            "repeat": args.repeat,
+        },
+        "results": benchmark(args.corpus, documents, engines, args.repeat, args.warmup, args.timeout),
+    }
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+        print(f"结果已写入 {args.output}", file=sys.stderr)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+字体解析模块
+PDF中的字体名形如 "ABCDEF+SimSun-Bold"：子集前缀、PostScript名、样式后缀混在一起，
+直接写入DOCX时Word找不到该字体，只能在显示时回退。本模块：
+
+- 去掉子集前缀，把样式后缀（Bold/Italic/Oblique…）解析为粗体、斜体，字重后缀（Regular/Light/Medium…）直接去掉
+- 按映射表把PDF字体族对应到Word常用字体，中文字体同时设置东亚字体（w:eastAsia）
+- 映射表中没有、但本机已安装的字体保留原名；其余按衬线/等宽/中文归入默认字体
+- 每个字体名只解析一次；相同的字符格式共用一个命名字符样式，不再逐run直接设置格式
+"""
+
+import re
+import subprocess
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, Optional, Tuple
+
+from docx.enum.style import WD_STYLE_TYPE
+from docx.oxml.ns import qn
+from docx.shared import Pt, RGBColor
+
+_SUBSET_PREFIX = re.compile(r"^[A-Z]{6}\+")
+# 分隔符后的样式后缀：SimSun-Bold / Arial,BoldItalic / TimesNewRomanPS-BoldMT / DengXian-Regular /
+# Helvetica-LightOblique / Times-Roman（字重名只在分隔符之后去掉，TimesNewRoman 中的 Roman 是字体族名）
+_STYLE_TOKEN = re.compile(
+    r"^(?:(Bold|Black|Heavy|Semibold|Demibold|ExtraBold|UltraBold)"
+    r"|Thin|Hairline|ExtraLight|UltraLight|Light|SemiLight|DemiLight|Regular|Normal|Book|Roman|Medium|Plain)?"
+    r"(Italic|Oblique|It)?(?:MT|PS)?$",
+    re.IGNORECASE,
+)
+# 没有分隔符的样式后缀：ArialBold / VerdanaItalic
+_STYLE_SUFFIX = re.compile(
+    r"(?:(Bold|Black|Heavy|Semibold|Demibold)?(Italic|Oblique)?)(?:MT|PS)?$",
+    re.IGNORECASE,
+)
+_PS_SUFFIX = re.compile(r"(?:PS)?MT$|PS$")
+_NON_ALNUM = re.compile(r"[^0-9a-z一-鿿]")
+_CJK_CHAR = re.compile(r"[㐀-鿿]")
+
+# PyMuPDF span flags
+FLAG_ITALIC = 2
+FLAG_SERIF = 4
+FLAG_MONO = 8
+FLAG_BOLD = 16
+
+DEFAULT_SANS = "Arial"
+DEFAULT_SERIF = "Times New Roman"
+DEFAULT_MONO = "Courier New"
+DEFAULT_CJK_SANS = "Microsoft YaHei"
+DEFAULT_CJK_SERIF = "SimSun"
+
+# 规范化字体族名（小写、去掉分隔符）-> (西文字体, 东亚字体)；东亚字体为None表示西文字体
+FONT_MAP: Dict[str, Tuple[str, Optional[str]]] = {
+    # 中文
+    "simsun": ("SimSun", "SimSun"),
+    "宋体": ("SimSun", "SimSun"),
+    "nsimsun": ("NSimSun", "NSimSun"),
+    "stsong": ("SimSun", "SimSun"),
+    "songti": ("SimSun", "SimSun"),
+    "stsongstd": ("SimSun", "SimSun"),
+    "stsongstdlight": ("SimSun", "SimSun"),
+    "adobesongstd": ("SimSun", "SimSun"),
+    "adobesongstdlight": ("SimSun", "SimSun"),
+    "simhei": ("SimHei", "SimHei"),
+    "黑体": ("SimHei", "SimHei"),
+    "stheiti": ("SimHei", "SimHei"),
+    "adobeheitistd": ("SimHei", "SimHei"),
+    "kaiti": ("KaiTi", "KaiTi"),
+    "楷体": ("KaiTi", "KaiTi"),
+    "kaitigb2312": ("KaiTi", "KaiTi"),
+    "stkaiti": ("KaiTi", "KaiTi"),
+    "adobekaitistd": ("KaiTi", "KaiTi"),
+    "fangsong": ("FangSong", "FangSong"),
+    "仿宋": ("FangSong", "FangSong"),
+    "fangsonggb2312": ("FangSong", "FangSong"),
+    "stfangsong": ("FangSong", "FangSong"),
+    "adobefangsongstd": ("FangSong", "FangSong"),
+    "microsoftyahei": ("Microsoft YaHei", "Microsoft YaHei"),
+    "微软雅黑": ("Microsoft YaHei", "Microsoft YaHei"),
+    "microsoftyaheiui": ("Microsoft YaHei", "Microsoft YaHei"),
+    "dengxian": ("DengXian", "DengXian"),
+    "等线": ("DengXian", "DengXian"),
+    "pingfangsc": ("Microsoft YaHei", "Microsoft YaHei"),
+    "notosanscjksc": ("Microsoft YaHei", "Microsoft YaHei"),
+    "notoserifcjksc": ("SimSun", "SimSun"),
+    "sourcehansanssc": ("Microsoft YaHei", "Microsoft YaHei"),
+    "sourcehanserifsc": ("SimSun", "SimSun"),
+    "mingliu": ("MingLiU", "MingLiU"),
+    "pmingliu": ("PMingLiU", "PMingLiU"),
+    "msmincho": ("MS Mincho", "MS Mincho"),
+    "msgothic": ("MS Gothic", "MS Gothic"),
+    # 西文
+    "arial": ("Arial", None),
+    "arialmt": ("Arial", None),
+    "helvetica": ("Arial", None),
+    "helveticaneue": ("Arial", None),
+    "liberationsans": ("Arial", None),
+    "dejavusans": ("Arial", None),
+    "times": ("Times New Roman", None),
+    "timesroman": ("Times New Roman", None),
+    "timesnewroman": ("Times New Roman", None),
+    "liberationserif": ("Times New Roman", None),
+    "nimbusromno9l": ("Times New Roman", None),
+    "courier": ("Courier New", None),
+    "couriernew": ("Courier New", None),
+    "liberationmono": ("Courier New", None),
+    "calibri": ("Calibri", None),
+    "cambria": ("Cambria", None),
+    "cambriamath": ("Cambria Math", None),
+    "georgia": ("Georgia", None),
+    "verdana": ("Verdana", None),
+    "tahoma": ("Tahoma", None),
+    "garamond": ("Garamond", None),
+    "symbol": ("Symbol", None),
+    "zapfdingbats": ("Wingdings", None),
+    "wingdings": ("Wingdings", None),
+}
+
+# 字体族名中出现这些片段时视为中文字体
+_CJK_HINTS = ("song", "hei", "kai", "fang", "ming", "yahei", "mincho", "cjk", "gb2312", "gbk", "hansans", "hanserif")
+_SERIF_HINTS = ("song", "ming", "mincho", "serif", "roman", "times")
+
+
+@dataclass(frozen=True)
+class ResolvedFont:
+    """解析后的字体"""
+    name: str                  # 西文字体（w:ascii / w:hAnsi）
+    east_asia: Optional[str]   # 东亚字体（w:eastAsia），None表示不设置
+    bold: bool
+    italic: bool
+
+
+def strip_subset_prefix(name: str) -> str:
+    """去掉子集前缀：ABCDEF+SimSun -> SimSun"""
+    return _SUBSET_PREFIX.sub("", name)
+
+
+def split_style(name: str) -> Tuple[str, bool, bool]:
+    """
+    拆分字体族与样式后缀
+
+    Returns:
+        (字体族, 是否粗体, 是否斜体)
+    """
+    base = strip_subset_prefix(name).strip()
+    bold = italic = False
+    separator = max(base.rfind("-"), base.rfind(","))
+    token = base[separator + 1:]
+    match = _STYLE_TOKEN.match(token) if separator > 0 and token else None
+    if match is None:
+        match = _STYLE_SUFFIX.search(base)
+        if not (match and match.group(0) and match.start() > 0):
+            match = None
+    if match is not None:
+        bold = match.group(1) is not None
+        italic = match.group(2) is not None
+        base = base[:separator] if match.re is _STYLE_TOKEN else base[:match.start()]
+    return _PS_SUFFIX.sub("", base).rstrip("-,"), bold, italic
+
+
+def normalize_family(family: str) -> str:
+    """映射表键：小写并去掉空格、连字符等分隔符"""
+    return _NON_ALNUM.sub("", family.lower())
+
+
+_installed: Optional[FrozenSet[str]] = None
+
+
+def installed_families() -> FrozenSet[str]:
+    """本机已安装的字体族（fc-list，规范化后的名字）；没有 fontconfig 时为空"""
+    global _installed
+    if _installed is None:
+        try:
+            result = subprocess.run(['fc-list', ':', 'family'], capture_output=True, text=True, timeout=10)
+            names = set()
+            for line in result.stdout.splitlines():
+                for family in line.split(','):
+                    if family.strip():
+                        names.add(normalize_family(family))
+            _installed = frozenset(names)
+        except (OSError, subprocess.SubprocessError):
+            _installed = frozenset()
+    return _installed
+
+
+class FontResolver:
+    """PDF字体名解析器（结果按字体名与flags缓存）"""
+
+    def __init__(self, font_map: Optional[Dict[str, Tuple[str, Optional[str]]]] = None,
+                 installed: Optional[FrozenSet[str]] = None):
+        """
+        初始化字体解析器
+
+        Args:
+            font_map: 字体族映射表，默认 FONT_MAP
+            installed: 已安装的字体族（规范化名），默认由 fc-list 检测
+        """
+        self.font_map = font_map if font_map is not None else FONT_MAP
+        self.installed = installed if installed is not None else installed_families()
+        self._cache: Dict[Tuple[str, int], ResolvedFont] = {}
+
+    def resolve(self, pdf_font: str, flags: int = 0) -> ResolvedFont:
+        """
+        解析PDF字体名
+
+        Args:
+            pdf_font: span["font"]
+            flags: span["flags"]（粗体、斜体、衬线、等宽）
+
+        Returns:
+            ResolvedFont
+        """
+        key = (pdf_font, flags)
+        resolved = self._cache.get(key)
+        if resolved is None:
+            resolved = self._cache[key] = self._resolve(pdf_font, flags)
+        return resolved
+
+    def _resolve(self, pdf_font: str, flags: int) -> ResolvedFont:
+        family, bold, italic = split_style(pdf_font)
+        bold = bold or bool(flags & FLAG_BOLD)
+        italic = italic or bool(flags & FLAG_ITALIC)
+        normalized = normalize_family(family)
+        cjk = bool(_CJK_CHAR.search(family)) or any(hint in normalized for hint in _CJK_HINTS)
+
+        mapped = self.font_map.get(normalized)
+        if mapped is not None:
+            name, east_asia = mapped
+        elif normalized and normalized in self.installed:
+            name, east_asia = family, (family if cjk else None)
+        elif cjk:
+            serif = bool(flags & FLAG_SERIF) or any(hint in normalized for hint in _SERIF_HINTS)
+            name = east_asia = DEFAULT_CJK_SERIF if serif else DEFAULT_CJK_SANS
+        elif flags & FLAG_MONO:
+            name, east_asia = DEFAULT_MONO, None
+        elif flags & FLAG_SERIF:
+            name, east_asia = DEFAULT_SERIF, None
+        else:
+            name, east_asia = DEFAULT_SANS, None
+        return ResolvedFont(name, east_asia, bold, italic)
+
+
+def _rgb(color) -> Optional[Tuple[int, int, int]]:
+    """span["color"] 为 sRGB 整数，也接受 (r, g, b)"""
+    if color is None:
+        return None
+    if isinstance(color, int):
+        return (color >> 16) & 0xFF, (color >> 8) & 0xFF, color & 0xFF
+    return tuple(color[:3])
+
+
+class CharacterStyles:
+    """
+    命名字符样式表
+    相同的 (字体, 字号, 颜色, 粗体, 斜体) 只在 styles.xml 中定义一次，
+    各run只引用样式名（w:rStyle），document.xml 不再重复完整的格式属性
+    """
+
+    def __init__(self, doc, resolver: Optional[FontResolver] = None, default_font: str = DEFAULT_CJK_SANS):
+        """
+        初始化样式表
+
+        Args:
+            doc: python-docx Document
+            resolver: 字体解析器
+            default_font: 样式信息中没有字体时使用的字体
+        """
+        self.doc = doc
+        self.resolver = resolver or FontResolver()
+        self.default_font = default_font
+        self._styles: Dict[Tuple, object] = {}
+        self._names: Optional[set] = None
+
+    def style_for(self, style_info: Dict):
+        """
+        取得（必要时创建）与样式信息对应的字符样式
+
+        Args:
+            style_info: _extract_pdf_styles 输出的段落样式（font/size/color/flags）
+        """
+        font = self.resolver.resolve(style_info.get('font') or self.default_font, style_info.get('flags', 0))
+        # 字号按0.5pt取整，避免浮点误差产生大量几乎相同的样式
+        size = round(style_info.get('size', 12) * 2) / 2
+        color = _rgb(style_info.get('color'))
+        key = (font, size, color)
+        style = self._styles.get(key)
+        if style is None:
+            style = self._styles[key] = self._create(font, size, color)
+        return style
+
+    def _create(self, font: ResolvedFont, size: float, color: Optional[Tuple[int, int, int]]):
+        parts = [font.name.replace(' ', ''), f"{size:g}"]
+        if font.bold:
+            parts.append('B')
+        if font.italic:
+            parts.append('I')
+        if color:
+            parts.append('%02X%02X%02X' % color)
+        base = name = 'PDF ' + ' '.join(parts)
+        # 初步转换的文档中可能已有同名样式
+        if self._names is None:
+            self._names = {style.name for style in self.doc.styles}
+        suffix = 1
+        while name in self._names:
+            suffix += 1
+            name = f"{base} {suffix}"
+        self._names.add(name)
+        style = self.doc.styles.add_style(name, WD_STYLE_TYPE.CHARACTER)
+        style.hidden = False
+        style.quick_style = False
+        style.font.name = font.name
+        if font.east_asia:
+            style.element.get_or_add_rPr().get_or_add_rFonts().set(qn('w:eastAsia'), font.east_asia)
+        style.font.size = Pt(size)
+        style.font.bold = font.bold
+        style.font.italic = font.italic
+        if color:
+            style.font.color.rgb = RGBColor(*color)
+        return style
+
+    @property
+    def count(self) -> int:
+        return len(self._styles)
+
+
+# 由字符样式提供、应用样式时从run上清除的直接格式
+_DIRECT_PROPERTIES = ('w:rFonts', 'w:b', 'w:bCs', 'w:i', 'w:iCs', 'w:color', 'w:sz', 'w:szCs')
+
+
+def apply_character_style(run, style) -> None:
+    """给run设置字符样式，并清除会覆盖样式的直接格式"""
+    rPr = run._r.rPr
+    if rPr is not None:
+        for tag in _DIRECT_PROPERTIES:
+            for element in rPr.findall(qn(tag)):
+                rPr.remove(element)
+    run.style = style
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+页眉页脚检测模块
+对每页顶部和底部区域的文本块，按"规范化文本 + 量化位置"计算哈希，
+一次遍历所有页面统计重复出现的块；页码等数字不同的变体通过屏蔽数字归为同一类
+"""
+
+import math
+import re
+from collections import defaultdict
+from typing import Dict, List, Optional, Set, Tuple
+
+_DIGITS = re.compile(r"\d+")
+_SPACES = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """合并空白字符"""
+    return _SPACES.sub(" ", text).strip()
+
+
+def mask_digits(text: str) -> str:
+    """把数字串替换为 #，"第 3 页" 与 "第 12 页" 得到相同的模板"""
+    return _DIGITS.sub("#", normalize_text(text))
+
+
+class HeaderFooterDetector:
+    """页眉页脚检测器"""
+
+    def __init__(self, band_ratio: float = 0.1, min_ratio: float = 0.3, grid: float = 6.0):
+        """
+        初始化页眉页脚检测器
+
+        Args:
+            band_ratio: 顶部/底部区域占页面高度的比例
+            min_ratio: 至少在多少比例的页面上重复出现才视为页眉页脚（至少2页）
+            grid: 纵向位置的量化步长(pt)，吸收页面间的微小偏移
+        """
+        self.band_ratio = band_ratio
+        self.min_ratio = min_ratio
+        self.grid = grid
+        self.page_count = 0
+        # 键 -> 出现过的页码
+        self._pages: Dict[Tuple, Set[int]] = defaultdict(set)
+        # 键 -> 每次出现的 (页码, 文本, bbox, 字体, 字号)
+        self._occurrences: Dict[Tuple, List[Tuple]] = defaultdict(list)
+        # (页码, 块序号) -> 键
+        self._block_keys: Dict[Tuple[int, int], Tuple] = {}
+        self._repeated: Optional[Set[Tuple]] = None
+
+    def _align(self, bbox, page_width: float) -> str:
+        """按块中心把水平位置归为左/中/右三类（页码位数变化不影响分类）"""
+        center = (bbox[0] + bbox[2]) / 2
+        if center < page_width / 3:
+            return 'left'
+        if center > page_width * 2 / 3:
+            return 'right'
+        return 'center'
+
+    def add_page(self, page_num: int, page_rect, blocks: List[Dict]) -> None:
+        """
+        登记一页的文本块（只处理顶部和底部区域）
+
+        Args:
+            page_num: 页码（从0开始）
+            page_rect: 页面矩形（x0, y0, x1, y1）
+            blocks: page.get_text("dict")["blocks"]
+        """
+        self.page_count += 1
+        self._repeated = None
+        width = page_rect[2] - page_rect[0]
+        height = page_rect[3] - page_rect[1]
+        top_limit = page_rect[1] + height * self.band_ratio
+        bottom_limit = page_rect[3] - height * self.band_ratio
+
+        for index, block in enumerate(blocks):
+            if block.get("type") != 0:
+                continue
+            x0, y0, x1, y1 = block["bbox"]
+            if y1 <= top_limit:
+                band, offset = 'header', y0 - page_rect[1]
+            elif y0 >= bottom_limit:
+                band, offset = 'footer', page_rect[3] - y1
+            else:
+                continue
+            spans = [span for line in block["lines"] for span in line["spans"]]
+            text = normalize_text(" ".join(span["text"] for span in spans))
+            if not text:
+                continue
+            key = (band, round(offset / self.grid), self._align(block["bbox"], width), mask_digits(text))
+            self._pages[key].add(page_num)
+            self._occurrences[key].append(
+                (page_num, text, tuple(block["bbox"]), spans[0]["font"], spans[0]["size"])
+            )
+            self._block_keys[(page_num, index)] = key
+
+    def _repeated_keys(self) -> Set[Tuple]:
+        if self._repeated is None:
+            threshold = max(2, math.ceil(self.page_count * self.min_ratio))
+            self._repeated = {key for key, pages in self._pages.items() if len(pages) >= threshold}
+        return self._repeated
+
+    def is_repeated(self, page_num: int, block_index: int) -> bool:
+        """该文本块是否属于页眉页脚（应从正文中移除）"""
+        key = self._block_keys.get((page_num, block_index))
+        return key is not None and key in self._repeated_keys()
+
+    def _record(self, key: Tuple) -> Dict:
+        band, _, align, template = key
+        occurrences = self._occurrences[key]
+        page_num, text, bbox, font, size = occurrences[0]
+        # 各数字串在不同页面上是否变化：变化的是页码，不变的是固定文本（如 "共 10 页"）
+        groups = [_DIGITS.findall(item[1]) for item in occurrences]
+        varying = [len({g[i] for g in groups}) > 1 for i in range(len(groups[0]))]
+        parts = []
+        literals = _DIGITS.split(text)
+        digits = groups[0]
+        for i, literal in enumerate(literals):
+            if literal:
+                parts.append(('text', literal))
+            if i < len(digits):
+                parts.append(('page', digits[i]) if varying[i] else ('text', digits[i]))
+        return {
+            'text': text,
+            'template': template,
+            'parts': parts,
+            'page_number': any(varying),
+            'align': align,
+            'bbox': bbox,
+            'font': font,
+            'size': size,
+            'pages': len(self._pages[key]),
+        }
+
+    def detect(self) -> Tuple[List[Dict], List[Dict]]:
+        """
+        输出页眉与页脚记录（按距页边的距离排序）
+
+        Returns:
+            (headers, footers)
+        """
+        headers, footers = [], []
+        for key in sorted(self._repeated_keys(), key=lambda k: (k[1], k[2])):
+            (headers if key[0] == 'header' else footers).append(self._record(key))
+        return headers, footers
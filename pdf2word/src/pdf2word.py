@@ -16,24 +16,55 @@ PDF to Word Converter
 
 import os
 import sys
+import json
+import time
+import hashlib
+import argparse
 import logging
 import subprocess
 import tempfile
+import threading
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
 from pathlib import Path
 from datetime import datetime
 from typing import Optional, List, Dict, Tuple
 
 import fitz  # PyMuPDF
 from docx import Document
-from docx.shared import Pt, Inches, RGBColor
+from docx.shared import Pt, Inches
 from docx.enum.text import WD_ALIGN_PARAGRAPH
 from docx.enum.table import WD_ALIGN_VERTICAL
 from docx.oxml import parse_xml
 from docx.oxml.ns import nsdecls
-from pdf2image import convert_from_path
 from tqdm import tqdm
 from PIL import Image
 
+from header_footer import HeaderFooterDetector, mask_digits
+from font_resolver import CharacterStyles, apply_character_style
+
+try:
+    # 从仓库根目录运行时复用服务端的追踪层（PDF2WORD_TRACE 控制导出）
+    from api.tracing import attach, get_context, span
+except ImportError:
+    from contextlib import nullcontext
+
+    def span(name, **attributes):
+        return nullcontext()
+
+    def attach(context):
+        return nullcontext()
+
+    def get_context():
+        return None
+
+try:
+    # 页面指纹：文档内完全相同的页面（模板页、重复附录）只提取一次
+    from api.page_cache import PageFingerprinter
+except ImportError:
+    PageFingerprinter = None
+
 # 配置日志
 logging.basicConfig(
     level=logging.INFO,
@@ -47,33 +78,51 @@ logging.basicConfig(
 class PDFConverter:
     """PDF转Word转换器"""
     
-    def __init__(self, input_pdf: str, output_dir: str = "output"):
+    # LibreOffice检测结果在进程内共享，批量转换时只执行一次 soffice --version
+    _libreoffice_available: Optional[bool] = None
+    _probe_lock = threading.Lock()
+    
+    def __init__(self, input_pdf: str, output_dir: str = "output",
+                 check_libreoffice: bool = True, user_installation: Optional[str] = None):
         """
         初始化转换器
         
         Args:
             input_pdf: PDF文件路径
             output_dir: 输出目录
+            check_libreoffice: 是否检测LibreOffice（调用方已检测过时可跳过）
+            user_installation: LibreOffice配置目录，并行运行多个soffice时每个进程需独立目录
         """
         self.input_pdf = Path(input_pdf)
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.user_installation = user_installation
         
         self.doc = None  # Word文档对象
         self.pdf_doc = None  # PDF文档对象
         self.temp_dir = None  # 临时目录
         
-        self._check_environment()
+        self._check_environment(check_libreoffice)
     
-    def _check_environment(self) -> None:
+    @classmethod
+    def probe_libreoffice(cls) -> bool:
+        """检测LibreOffice是否可用（结果缓存在类上）"""
+        with cls._probe_lock:
+            if cls._libreoffice_available is None:
+                try:
+                    subprocess.run(['soffice', '--version'], 
+                                 capture_output=True, 
+                                 check=True)
+                    logging.info("LibreOffice 检测成功")
+                    cls._libreoffice_available = True
+                except (subprocess.CalledProcessError, FileNotFoundError):
+                    cls._libreoffice_available = False
+            return cls._libreoffice_available
+    
+    def _check_environment(self, check_libreoffice: bool = True) -> None:
         """检查运行环境"""
         # 检查LibreOffice
-        try:
-            subprocess.run(['soffice', '--version'], 
-                         capture_output=True, 
-                         check=True)
-            logging.info("LibreOffice 检测成功")
-        except (subprocess.CalledProcessError, FileNotFoundError):
+        if check_libreoffice and not self.probe_libreoffice():
             logging.error("未检测到LibreOffice，请确保已安装并添加到环境变量")
             sys.exit(1)
         
@@ -107,6 +156,8 @@ class PDFConverter:
             str(self.input_pdf),
             '--outdir', str(temp_dir_path)
         ]
+        if self.user_installation:
+            cmd.insert(1, f"-env:UserInstallation={Path(self.user_installation).resolve().as_uri()}")
         
         try:
             subprocess.run(cmd, check=True, capture_output=True)
@@ -138,13 +189,45 @@ class PDFConverter:
         # 使用PyMuPDF提取样式
         self.pdf_doc = fitz.open(self.input_pdf)
         
+        # 第一遍：登记每页顶部/底部区域的文本块，统计跨页重复
+        detector = HeaderFooterDetector()
+        fingerprinter = PageFingerprinter(self.pdf_doc) if PageFingerprinter else None
+        blocks_by_fingerprint: Dict[str, List[Dict]] = {}
+        page_blocks = []
+        shared = 0
         for page_num in range(len(self.pdf_doc)):
             page = self.pdf_doc[page_num]
-            
-            # 提取文本块信息
-            blocks = page.get_text("dict")["blocks"]
-            for block in blocks:
+            fingerprint = None
+            if fingerprinter:
+                try:
+                    fingerprint = fingerprinter.fingerprint(page)
+                except Exception as e:
+                    # 字体或XObject损坏时只是不做去重，不影响转换
+                    logging.debug(f"页面指纹计算失败 (第{page_num + 1}页): {e}")
+            blocks = blocks_by_fingerprint.get(fingerprint)
+            if blocks is None:
+                blocks = page.get_text("dict")["blocks"]
+                # 两遍之间保留所有页的块：图片块只留第二遍用到的位置与尺寸，不保留图片数据
+                for block in blocks:
+                    if block["type"] == 1:
+                        block.pop("image", None)
+                        block.pop("mask", None)
+                if fingerprint:
+                    blocks_by_fingerprint[fingerprint] = blocks
+            else:
+                shared += 1
+            detector.add_page(page_num, page.rect, blocks)
+            page_blocks.append(blocks)
+        styles['headers'], styles['footers'] = detector.detect()
+        
+        # 第二遍：页眉页脚块不再计入正文
+        skipped = 0
+        for page_num, blocks in enumerate(page_blocks):
+            for index, block in enumerate(blocks):
                 if block["type"] == 0:  # 文本块
+                    if detector.is_repeated(page_num, index):
+                        skipped += 1
+                        continue
                     for line in block["lines"]:
                         for span in line["spans"]:
                             styles['paragraphs'].append({
@@ -163,26 +246,16 @@ class PDFConverter:
                     })
         
         logging.info(f"样式分析完成: {len(styles['paragraphs'])} 段落, "
-                    f"{len(styles['images'])} 图片")
+                    f"{len(styles['images'])} 图片, "
+                    f"{len(styles['headers'])} 页眉, {len(styles['footers'])} 页脚 "
+                    f"(正文中移除 {skipped} 个重复块, {shared} 页与前面的页面相同)")
         return styles
     
-    def _apply_paragraph_styles(self, paragraph, style_info: Dict) -> None:
+    def _apply_paragraph_styles(self, paragraph, style_info: Dict, character_styles: CharacterStyles) -> None:
         """应用段落样式"""
-        # 设置字体
+        # 字体、字号、颜色、粗斜体由共享的命名字符样式提供
         run = paragraph.runs[0] if paragraph.runs else paragraph.add_run()
-        font = run.font
-        font.name = style_info.get('font', 'Microsoft YaHei')
-        font.size = Pt(style_info.get('size', 12))
-        
-        # 设置颜色
-        if 'color' in style_info:
-            rgb = style_info['color']
-            font.color.rgb = RGBColor(rgb[0], rgb[1], rgb[2])
-        
-        # 设置粗体和斜体
-        flags = style_info.get('flags', 0)
-        font.bold = bool(flags & 2)  # 粗体
-        font.italic = bool(flags & 1)  # 斜体
+        apply_character_style(run, character_styles.style_for(style_info))
         
         # 设置段落格式
         paragraph_format = paragraph.paragraph_format
@@ -221,23 +294,66 @@ class PDFConverter:
             except Exception as e:
                 logging.warning(f"处理图片时出错: {e}")
     
+    def _remove_repeated_paragraphs(self, doc: Document, styles: Dict) -> int:
+        """
+        从正文中删除与页眉页脚相同的段落（初步转换会把它们逐页写进正文）
+        
+        Returns:
+            删除的段落数
+        """
+        # 每个模板最多删除其出现的页数次，避免误删恰好相同的正文（如只有数字的段落）
+        budget = {}
+        for record in styles['headers'] + styles['footers']:
+            budget[record['template']] = budget.get(record['template'], 0) + record['pages']
+        removed = 0
+        for paragraph in list(doc.paragraphs):
+            if not budget or not paragraph.text.strip():
+                continue
+            template = mask_digits(paragraph.text)
+            if budget.get(template, 0) > 0:
+                paragraph._element.getparent().remove(paragraph._element)
+                budget[template] -= 1
+                removed += 1
+        return removed
+    
+    def _fill_header_footer(self, container, records: List[Dict]) -> None:
+        """写入页眉或页脚；页码部分写为 PAGE 域，随页面自动变化"""
+        alignments = {
+            'left': WD_ALIGN_PARAGRAPH.LEFT,
+            'center': WD_ALIGN_PARAGRAPH.CENTER,
+            'right': WD_ALIGN_PARAGRAPH.RIGHT,
+        }
+        for i, record in enumerate(records):
+            paragraph = container.paragraphs[0] if i == 0 else container.add_paragraph()
+            paragraph.text = ''
+            paragraph.alignment = alignments[record['align']]
+            for kind, value in record['parts']:
+                if kind == 'page':
+                    paragraph._p.append(parse_xml(
+                        f'<w:fldSimple {nsdecls("w")} w:instr="PAGE"><w:r><w:t>{value}</w:t></w:r></w:fldSimple>'
+                    ))
+                else:
+                    run = paragraph.add_run(value)
+                    run.font.size = Pt(record['size'])
+    
     def _handle_headers_footers(self, doc: Document, styles: Dict) -> None:
         """处理页眉页脚"""
         logging.info("正在处理页眉页脚...")
+        removed = self._remove_repeated_paragraphs(doc, styles)
+        if removed:
+            logging.info(f"正文中移除 {removed} 个页眉页脚段落")
         for section in doc.sections:
             # 处理页眉
             header = section.header
             header.is_linked_to_previous = False
             if styles['headers']:
-                header_text = styles['headers'][0].get('text', '')
-                header.paragraphs[0].text = header_text
+                self._fill_header_footer(header, styles['headers'])
             
             # 处理页脚
             footer = section.footer
             footer.is_linked_to_previous = False
             if styles['footers']:
-                footer_text = styles['footers'][0].get('text', '')
-                footer.paragraphs[0].text = footer_text
+                self._fill_header_footer(footer, styles['footers'])
     
     def convert(self) -> Path:
         """
@@ -251,31 +367,41 @@ class PDFConverter:
         
         try:
             # 1. 初步转换
-            initial_docx = self._initial_conversion()
+            with span("pdf2word.initial_conversion", input=str(self.input_pdf)):
+                initial_docx = self._initial_conversion()
             
             # 2. 提取PDF样式
-            styles = self._extract_pdf_styles()
+            with span("pdf2word.extract_pdf_styles"):
+                styles = self._extract_pdf_styles()
             
             # 3. 打开初步转换的文档
-            doc = Document(initial_docx)
+            with span("pdf2word.load_docx"):
+                doc = Document(initial_docx)
             
             # 4. 应用样式
-            for i, paragraph in enumerate(doc.paragraphs):
-                if i < len(styles['paragraphs']):
-                    self._apply_paragraph_styles(paragraph, styles['paragraphs'][i])
+            with span("pdf2word.apply_paragraph_styles", spans=len(styles['paragraphs'])):
+                character_styles = CharacterStyles(doc)
+                for i, paragraph in enumerate(doc.paragraphs):
+                    if i < len(styles['paragraphs']):
+                        self._apply_paragraph_styles(paragraph, styles['paragraphs'][i], character_styles)
+                logging.info(f"共使用 {character_styles.count} 个字符样式")
             
             # 5. 处理表格
-            self._handle_tables(doc, styles)
+            with span("pdf2word.handle_tables"):
+                self._handle_tables(doc, styles)
             
             # 6. 处理图片
-            self._handle_images(doc, styles)
+            with span("pdf2word.handle_images", images=len(styles['images'])):
+                self._handle_images(doc, styles)
             
             # 7. 处理页眉页脚
-            self._handle_headers_footers(doc, styles)
+            with span("pdf2word.handle_headers_footers"):
+                self._handle_headers_footers(doc, styles)
             
             # 8. 保存结果
             output_file = self.output_dir / f"{self.input_pdf.stem}_converted.docx"
-            doc.save(str(output_file))
+            with span("pdf2word.save"):
+                doc.save(str(output_file))
             
             # 记录完成信息
             end_time = datetime.now()
@@ -296,10 +422,239 @@ class PDFConverter:
                 import shutil
                 shutil.rmtree(self.temp_dir)
 
+BATCH_MANIFEST = ".pdf2word_manifest.json"
+
+# 批量模式下每个工作进程独立的LibreOffice配置目录
+_worker_profile: Optional[str] = None
+
+
+def _file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _init_batch_worker(profile_root: str, log_level: int) -> None:
+    """工作进程初始化：降低日志级别（避免打乱进度条），创建独立的soffice配置目录"""
+    global _worker_profile
+    logging.getLogger().setLevel(log_level)
+    _worker_profile = os.path.join(profile_root, f"worker_{os.getpid()}")
+    os.makedirs(_worker_profile, exist_ok=True)
+
+
+def _batch_convert_one(input_pdf: str, output_dir: str, trace: Optional[Dict] = None) -> Dict:
+    """在工作进程中转换单个文件，返回写入清单的结果（trace 为批次的追踪上下文）"""
+    start = time.perf_counter()
+    result = {'sha256': _file_sha256(Path(input_pdf)), 'pages': 0}
+    try:
+        with attach(trace), span("batch.file", file=os.path.basename(input_pdf)):
+            with fitz.open(input_pdf) as pdf_doc:
+                result['pages'] = pdf_doc.page_count
+            converter = PDFConverter(input_pdf, output_dir, check_libreoffice=False,
+                                     user_installation=_worker_profile)
+            result['output'] = str(converter.convert())
+        result['status'] = 'success'
+    except (Exception, SystemExit) as e:
+        # PDFConverter 在输入异常时调用 sys.exit，这里按失败记录而不终止整个批次
+        result['status'] = 'failed'
+        result['error'] = f"{type(e).__name__}: {e}"
+    result['seconds'] = round(time.perf_counter() - start, 3)
+    return result
+
+
+def _broken_entry(error: BaseException) -> Dict:
+    """进程池崩溃时正在转换的文件的清单记录"""
+    return {'status': 'failed', 'pages': 0, 'error': f"工作进程异常退出: {error}"}
+
+
+class BatchConverter:
+    """目录批量转换：递归查找PDF，多进程并行转换，基于清单跳过已是最新的输出并支持中断后续跑"""
+    
+    def __init__(self, input_dir: str, output_dir: str, jobs: int = 1, force: bool = False):
+        """
+        Args:
+            input_dir: 输入目录（递归查找 *.pdf）
+            output_dir: 输出目录（保持输入的子目录结构）
+            jobs: 并行工作进程数
+            force: 忽略清单，全部重新转换
+        """
+        self.input_dir = Path(input_dir).resolve()
+        self.output_dir = Path(output_dir).resolve()
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.jobs = max(1, jobs)
+        self.force = force
+        self.manifest_path = self.output_dir / BATCH_MANIFEST
+        self.manifest = self._load_manifest()
+    
+    def _load_manifest(self) -> Dict[str, Dict]:
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                return json.load(f).get('files', {})
+        except (OSError, ValueError):
+            return {}
+    
+    def _save_manifest(self) -> None:
+        """原子写入清单：每完成一个文件保存一次，进程崩溃后最多重做正在转换的文件"""
+        temp_path = self.manifest_path.with_suffix('.tmp')
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': 1, 'files': self.manifest}, f, ensure_ascii=False, indent=2)
+        os.replace(temp_path, self.manifest_path)
+    
+    def discover(self) -> List[Path]:
+        """递归查找输入PDF（跳过位于输入目录内的输出目录）"""
+        files = []
+        for path in self.input_dir.rglob('*'):
+            if path.suffix.lower() != '.pdf' or not path.is_file():
+                continue
+            if self.output_dir in path.parents:
+                continue
+            files.append(path)
+        return sorted(files)
+    
+    def _is_up_to_date(self, rel: str, path: Path) -> bool:
+        """大小与mtime一致即视为未变；mtime变化但内容哈希相同时同样跳过并刷新清单"""
+        entry = self.manifest.get(rel)
+        if self.force or not entry or entry.get('status') != 'success':
+            return False
+        if not entry.get('output') or not Path(entry['output']).exists():
+            return False
+        stat = path.stat()
+        if entry.get('size') != stat.st_size:
+            return False
+        if entry.get('mtime_ns') == stat.st_mtime_ns:
+            return True
+        if entry.get('sha256') == _file_sha256(path):
+            entry['mtime_ns'] = stat.st_mtime_ns
+            return True
+        return False
+    
+    def _record(self, rel: str, path: Path, entry: Dict, summary: Dict, progress) -> None:
+        """把单个文件的结果写入清单并更新汇总"""
+        stat = path.stat()
+        entry.update(size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+        self.manifest[rel] = entry
+        self._save_manifest()
+        
+        if entry['status'] == 'success':
+            summary['succeeded'] += 1
+            summary['pages'] += entry['pages']
+            summary['bytes'] += stat.st_size
+        else:
+            summary['failed'] += 1
+            progress.write(f"失败: {rel} ({entry.get('error')})")
+        progress.update(1)
+    
+    def run(self) -> Dict:
+        """
+        执行批量转换
+        
+        Returns:
+            汇总信息（文件数、页数、耗时、吞吐量）
+        """
+        if not PDFConverter.probe_libreoffice():
+            logging.error("未检测到LibreOffice，请确保已安装并添加到环境变量")
+            sys.exit(1)
+        
+        files = self.discover()
+        pending = []
+        skipped = 0
+        for path in files:
+            rel = path.relative_to(self.input_dir).as_posix()
+            if self._is_up_to_date(rel, path):
+                skipped += 1
+            else:
+                pending.append((rel, path))
+        
+        summary = {'total': len(files), 'skipped': skipped, 'succeeded': 0, 'failed': 0,
+                   'pages': 0, 'bytes': 0}
+        start = time.perf_counter()
+        profile_root = tempfile.mkdtemp(prefix='pdf2word_profiles_')
+        waiting = deque(pending)
+        pool = None
+        try:
+            with span("batch.run", files=len(pending), jobs=self.jobs), \
+                    tqdm(total=len(pending), unit='file', desc='转换') as progress:
+                trace = get_context()
+                futures = {}
+                while waiting or futures:
+                    if pool is None:
+                        pool = ProcessPoolExecutor(max_workers=self.jobs, initializer=_init_batch_worker,
+                                                   initargs=(profile_root, logging.WARNING))
+                    # 提交数不超过工作进程数：进程池崩溃时未完成的都是正在转换的文件
+                    while waiting and len(futures) < self.jobs:
+                        rel, path = waiting.popleft()
+                        target_dir = self.output_dir / Path(rel).parent
+                        future = pool.submit(_batch_convert_one, str(path), str(target_dir), trace)
+                        futures[future] = (rel, path)
+                    
+                    done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                    broken = None
+                    for future in done:
+                        rel, path = futures.pop(future)
+                        try:
+                            entry = future.result()
+                        except BrokenProcessPool as e:
+                            broken = e
+                            entry = _broken_entry(e)
+                        self._record(rel, path, entry, summary, progress)
+                    if broken is not None:
+                        # 工作进程被杀（OOM、段错误）：同批在转换的文件记为失败，重建进程池继续
+                        for rel, path in futures.values():
+                            self._record(rel, path, _broken_entry(broken), summary, progress)
+                        futures.clear()
+                        pool.shutdown(wait=False)
+                        pool = None
+        finally:
+            if pool is not None:
+                pool.shutdown()
+            import shutil
+            shutil.rmtree(profile_root, ignore_errors=True)
+        
+        self._save_manifest()
+        elapsed = time.perf_counter() - start
+        summary['seconds'] = round(elapsed, 2)
+        summary['files_per_second'] = round(summary['succeeded'] / elapsed, 3) if elapsed else 0.0
+        summary['pages_per_second'] = round(summary['pages'] / elapsed, 3) if elapsed else 0.0
+        summary['mb_per_second'] = round(summary['bytes'] / 1024 / 1024 / elapsed, 3) if elapsed else 0.0
+        return summary
+
+
+def batch_main(argv: List[str]) -> None:
+    """批量模式: pdf2word.py batch <输入目录> <输出目录> [--jobs N] [--force]"""
+    parser = argparse.ArgumentParser(prog='pdf2word.py batch', description='批量转换目录中的PDF文件')
+    parser.add_argument('input_dir', help='输入目录（递归查找PDF）')
+    parser.add_argument('output_dir', help='输出目录')
+    parser.add_argument('-j', '--jobs', type=int, default=min(4, os.cpu_count() or 1),
+                        help='并行工作进程数（每个进程独立运行soffice）')
+    parser.add_argument('--force', action='store_true', help='忽略清单，全部重新转换')
+    args = parser.parse_args(argv)
+    
+    if not Path(args.input_dir).is_dir():
+        print(f"输入目录不存在: {args.input_dir}")
+        sys.exit(1)
+    
+    logging.getLogger().setLevel(logging.WARNING)
+    summary = BatchConverter(args.input_dir, args.output_dir, args.jobs, args.force).run()
+    
+    print(f"\n批量转换完成: 共 {summary['total']} 个文件，成功 {summary['succeeded']}，"
+          f"跳过 {summary['skipped']}，失败 {summary['failed']}")
+    print(f"耗时 {summary['seconds']:.2f}秒，{summary['files_per_second']:.2f} 文件/秒，"
+          f"{summary['pages_per_second']:.2f} 页/秒，{summary['mb_per_second']:.2f} MB/秒")
+    if summary['failed']:
+        sys.exit(1)
+
+
 def main():
     """主函数"""
+    if len(sys.argv) > 1 and sys.argv[1] == 'batch':
+        batch_main(sys.argv[2:])
+        return
+    
     if len(sys.argv) < 2:
         print("使用方法: python pdf2word.py <pdf文件路径> [输出目录]")
+        print("      或: python pdf2word.py batch <输入目录> <输出目录> [--jobs N]")
         sys.exit(1)
     
     input_pdf = sys.argv[1]
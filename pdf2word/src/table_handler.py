@@ -15,6 +15,11 @@ from docx.shared import Pt, Inches, Twips
 from docx.enum.table import WD_ALIGN_VERTICAL
 from docx.table import _Cell, Table
 
+try:
+    from api.page_cache import PageFingerprinter
+except ImportError:
+    PageFingerprinter = None
+
 class TableHandler:
     """表格处理器"""
     
@@ -139,9 +144,23 @@ class TableHandler:
         """
         logging.info("开始处理表格...")
         
+        # 内容相同的页面只做一次表格检测
+        fingerprinter = PageFingerprinter(self.pdf_doc) if PageFingerprinter else None
+        detected: Dict[str, List[Dict]] = {}
         for page_num in range(len(self.pdf_doc)):
             page = self.pdf_doc[page_num]
-            tables = self._detect_tables(page)
+            fingerprint = None
+            if fingerprinter:
+                try:
+                    fingerprint = fingerprinter.fingerprint(page)
+                except Exception as e:
+                    # 字体或XObject损坏时只是不做去重，不影响转换
+                    logging.debug(f"页面指纹计算失败 (第{page_num + 1}页): {e}")
+            tables = detected.get(fingerprint)
+            if tables is None:
+                tables = self._detect_tables(page)
+                if fingerprint:
+                    detected[fingerprint] = tables
             
             for table_info in tables:
                 try:
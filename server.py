@@ -1,12 +1,36 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException, Form
-from fastapi.responses import FileResponse, HTMLResponse
+from fastapi import FastAPI, UploadFile, File, HTTPException, Form, Request
+from fastapi.responses import HTMLResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
-import tempfile
+from starlette.concurrency import iterate_in_threadpool, run_in_threadpool
+import asyncio
+import json
+import shutil
 import os
+import zipfile
+from functools import partial
 from pathlib import Path
 import logging
-from datetime import datetime
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from api.lazy_imports import start_prewarm
+from api.conversion_pool import get_pool
+from api.file_response import RangeFileResponse
+from api.result_store import ResultStore
+from api.staging import StagingArea, StagingJob
+from api.zip_stream import ZipStream
+from api import (metrics, tracing, mock_engine, result_store, job_api, chunked_upload, incremental_convert, preview,
+                 style_dedup, tabular_export)
+from api.job_api import client_key
+from api.job_queue import get_queue
+from api.prescan import estimate_cost
+from api.raster import get_raster_service
+from api.conversion_worker import Pdf2DocxEngine
+from api.incremental_convert import FastTextEngine
+from api.ocr_engine import OcrEngine, should_ocr
+from api.sandbox import SandboxedEngine
 
 # 配置日志
 logging.basicConfig(level=logging.INFO)
@@ -23,6 +47,48 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 压测模式：PDF2WORD_MOCK_ENGINE=1 时用模拟引擎替换pdf2docx
+MOCK_CONVERTER = mock_engine.MockConverter() if mock_engine.is_enabled() else None
+
+# pdf2docx 在内存受限的子进程中执行（api/sandbox.py），超出预算时改用逐页处理的快速文本引擎
+PDF2DOCX = SandboxedEngine(Pdf2DocxEngine(), fallback=FastTextEngine(), name="pdf2docx")
+
+# 扫描件（大部分页面没有文本层）改用本地Tesseract OCR，pdf2docx只能输出整页图片
+OCR = OcrEngine()
+
+DOCX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+
+def _check_output_format(output_format: str) -> None:
+    """校验输出格式：docx 或 api/tabular_export.py 支持的表格格式（parquet/arrow 需要 pyarrow）"""
+    if output_format == "docx" or tabular_export.is_available(output_format):
+        return
+    if output_format in tabular_export.FORMATS:
+        message = f"服务器未安装 {output_format} 输出所需的库"
+    else:
+        message = f"只支持 docx、{'、'.join(tabular_export.FORMATS)} 格式"
+    raise HTTPException(status_code=400, detail={"error": "INVALID_FORMAT", "message": message})
+
+def _output_name(filename: str, output_format: str) -> str:
+    """下载文件名（csv 导出为 ZIP 包）"""
+    extension = "docx" if output_format == "docx" else tabular_export.FORMATS[output_format][0]
+    return f"{Path(filename).stem}.{extension}"
+
+# 单文件大小上限(MB)与单次批量请求的文件数上限
+MAX_FILE_MB = 50
+BATCH_MAX_FILES = int(os.getenv("BATCH_MAX_FILES", "100"))
+
+# 转换结果存储（按内容哈希寻址）；磁盘暂存目录放在其下，保证结果交付只需重命名
+OUTPUT_DIR = Path(os.getenv("PDF2WORD_RESULT_DIR", "converted_files"))
+RESULTS = ResultStore(OUTPUT_DIR)
+STAGING = StagingArea(disk_root=OUTPUT_DIR / ".staging")
+UPLOADS = chunked_upload.UploadStore(OUTPUT_DIR / ".uploads", max_bytes=MAX_FILE_MB * 1024 * 1024)
+
+# 指标: /metrics 路由与响应写出计时
+metrics.install(app)
+tracing.install(app)
+result_store.install(app, RESULTS)
+job_api.install(app, "mock" if MOCK_CONVERTER else "pdf2docx", store=RESULTS)
+
 # 创建静态文件目录
 static_dir = Path("static")
 static_dir.mkdir(exist_ok=True)
@@ -30,6 +96,11 @@ static_dir.mkdir(exist_ok=True)
 # 挂载静态文件
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
+@app.on_event("startup")
+async def prewarm_converters():
+    """端口绑定后在后台预热pdf2docx/openpyxl等重型库，首个转换请求不再承担导入开销"""
+    start_prewarm(("pdf2docx", "fitz", "openpyxl", "docx"))
+
 @app.get("/")
 async def read_root():
     """主页"""
@@ -59,13 +130,19 @@ async def get_system_status():
             "pdf_to_word": "✅ 正常工作",
             "pdf_to_excel": "✅ 正常工作", 
             "file_upload": "✅ 正常工作",
+            "batch_conversion": "✅ 已启用",
             "real_conversion": "✅ 已启用"
         },
-        "conversion_engine": "pdf2docx + pandas"
+        "conversion_engine": "pdf2docx + openpyxl",
+        "table_formats": [fmt for fmt in tabular_export.FORMATS if tabular_export.is_available(fmt)],
+        "conversion_pool": get_pool().stats(),
+        "job_queue": get_queue().stats(),
+        "raster_cache": get_raster_service().stats()
     }
 
 @app.post("/api/convert")
 async def convert_pdf(
+    request: Request,
     file: UploadFile = File(...),
     output_format: str = Form(default="docx")
 ):
@@ -80,67 +157,28 @@ async def convert_pdf(
         )
     
     # 验证输出格式
-    if output_format not in ["docx", "xlsx"]:
-        raise HTTPException(
-            status_code=400,
-            detail={"error": "INVALID_FORMAT", "message": "只支持docx和xlsx格式"}
-        )
+    _check_output_format(output_format)
     
     try:
-        # 读取文件内容
-        content = await file.read()
-        file_size_mb = len(content) / (1024 * 1024)
-        
-        # 文件大小限制
-        if file_size_mb > 50:
-            raise HTTPException(
-                status_code=400,
-                detail={"error": "FILE_TOO_LARGE", "message": f"文件过大({file_size_mb:.1f}MB)，请上传小于50MB的文件"}
-            )
-        
-        logger.info(f"文件大小: {file_size_mb:.2f}MB")
-        
-        # 使用临时目录进行转换
-        with tempfile.TemporaryDirectory() as temp_dir:
-            # 保存上传的PDF文件
-            pdf_path = Path(temp_dir) / "input.pdf"
-            with pdf_path.open("wb") as buffer:
-                buffer.write(content)
-            
-            # 执行真实转换
-            if output_format == "docx":
-                result_file = await convert_pdf_to_word(pdf_path, temp_dir)
-            else:
-                result_file = await convert_pdf_to_excel(pdf_path, temp_dir)
-            
-            # 生成下载文件名
-            output_filename = file.filename.replace('.pdf', f'.{output_format}')
-            
-            # 创建输出目录并复制文件到持久位置
-            output_dir = Path("converted_files")
-            output_dir.mkdir(exist_ok=True)
+        # 暂存目录：内存充足时位于 /dev/shm，否则位于输出目录所在的文件系统
+        with STAGING.job(file.size or 0) as job:
+            # 上传内容分块写入暂存区，不在内存中保留完整文件
+            with tracing.span("upload.spool"), metrics.stage_timer(metrics.STAGE_UPLOAD):
+                try:
+                    pdf_path = await run_in_threadpool(
+                        job.spool, "input.pdf", file.file, MAX_FILE_MB * 1024 * 1024
+                    )
+                except ValueError:
+                    file_size_mb = (file.size or 0) / (1024 * 1024)
+                    raise HTTPException(
+                        status_code=400,
+                        detail={"error": "FILE_TOO_LARGE", "message": f"文件过大({file_size_mb:.1f}MB)，请上传小于50MB的文件"}
+                    )
             
-            # 生成唯一的文件名
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            final_output_path = output_dir / f"{timestamp}_{output_filename}"
+            logger.info(f"文件大小: {pdf_path.stat().st_size / (1024 * 1024):.2f}MB")
             
-            # 复制文件到持久位置
-            import shutil
-            shutil.copy2(result_file, final_output_path)
-            
-            logger.info(f"文件已复制到: {final_output_path}")
-            
-            # 返回转换后的文件
-            media_type = (
-                "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
-                if output_format == "docx"
-                else "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-            )
-            
-            return FileResponse(
-                path=str(final_output_path),
-                filename=output_filename,
-                media_type=media_type
+            return await _convert_and_respond(
+                pdf_path, file.filename, output_format, job.path, client_key(request)
             )
             
     except HTTPException:
@@ -154,10 +192,293 @@ async def convert_pdf(
             detail={"error": "CONVERSION_FAILED", "message": f"转换失败: {str(e)}"}
         )
 
-async def convert_pdf_to_word(pdf_path: Path, temp_dir: str) -> Path:
+async def _convert_and_respond(pdf_path: Path, filename: str, output_format: str, work_dir: Path,
+                               client: Optional[str]) -> RangeFileResponse:
+    """转换已落盘的PDF（普通上传或分块上传），结果移入结果存储并返回"""
+    # 按页数与图片密度估计成本，小文件不会排在大文件后面
+    with tracing.span("prescan"):
+        cost = await run_in_threadpool(estimate_cost, pdf_path)
+
+    # 在共享转换线程池中执行真实转换，不阻塞事件循环
+    result_file, engine = await get_pool().run(
+        _convert_one, pdf_path, output_format, str(work_dir), cost=cost, client=client
+    )
+
+    # 生成下载文件名
+    output_filename = _output_name(filename, output_format)
+
+    # 移入结果存储：同一文件系统内重命名，跨文件系统（内存盘）时才复制
+    media_type = DOCX_MEDIA_TYPE if output_format == "docx" else tabular_export.FORMATS[output_format][1]
+    with tracing.span("output.publish"), metrics.stage_timer(metrics.STAGE_POSTPROCESS, engine):
+        entry = await run_in_threadpool(RESULTS.put, result_file, output_filename, media_type)
+
+    logger.info(f"结果已保存: {entry.path} ({entry.id})")
+
+    # 返回转换后的文件（支持Range续传，之后也可通过 /api/download/{id} 下载）
+    return RangeFileResponse.from_result(
+        entry, headers={"X-Result-Id": entry.id, "Content-Location": entry.download_url}
+    )
+
+async def _convert_upload(upload, sha256: str, request: Request) -> RangeFileResponse:
+    """分块上传完成后直接转换上传目录中的文件，不再复制（output_format 通过查询参数传入）"""
+    output_format = request.query_params.get("output_format", "docx")
+    _check_output_format(output_format)
+    logger.info(f"分块上传完成: {upload.filename} ({upload.length} bytes, sha256={sha256[:12]})")
+    try:
+        with STAGING.job(0) as job:
+            if output_format == "docx" and incremental_convert.IncrementalRegistry.wants(upload):
+                # 快速文本引擎：复用上传期间已转换的页面
+                output_path = job.path_for("output.docx")
+                success, message = await incremental_convert.convert_in_pool(
+                    partial(incremental_convert.get_registry().convert, upload), output_path, upload.path,
+                    upload.client
+                )
+                if not success:
+                    raise HTTPException(status_code=500, detail={"error": "CONVERSION_FAILED", "message": message})
+                logger.info(f"边上传边转换: {message}")
+                entry = await run_in_threadpool(RESULTS.put, output_path, f"{Path(upload.filename).stem}.docx")
+                return RangeFileResponse.from_result(
+                    entry, headers={"X-Result-Id": entry.id, "Content-Location": entry.download_url}
+                )
+            return await _convert_and_respond(upload.path, upload.filename, output_format, job.path, upload.client)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"转换失败: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail={"error": "CONVERSION_FAILED", "message": f"转换失败: {str(e)}"}
+        )
+
+# 上传文件的缩略图预览：/api/preview/{upload_id}
+PREVIEWS = preview.install(app, UPLOADS)
+
+def _upload_progress(upload, offset: int) -> None:
+    """分块提交后：线性化PDF提前转换；上传完成时预先渲染首页缩略图"""
+    incremental_convert.get_registry().progress(upload, offset)
+    PREVIEWS.prerender(upload, offset)
+
+# 分块断点续传上传：/api/uploads，完成后直接转换；engine=fast 时上传期间提前转换线性化PDF
+chunked_upload.install(app, _convert_upload, store=UPLOADS,
+                       on_progress=_upload_progress,
+                       on_discard=incremental_convert.get_registry().discard)
+incremental_convert.install(app, store=RESULTS, max_bytes=MAX_FILE_MB * 1024 * 1024)
+
+@app.post("/api/convert/batch")
+async def convert_batch(
+    request: Request,
+    files: List[UploadFile] = File(...),
+    output_format: str = Form(default="docx")
+):
+    """
+    批量转换API：接收多个PDF（或包含PDF的ZIP），在转换线程池中并行转换，
+    每完成一个文件就写入响应ZIP，最后附上 manifest.json
+    """
+    logger.info(f"收到批量转换请求: {len(files)} 个上传文件 -> {output_format}")
+
+    _check_output_format(output_format)
+
+    job = STAGING.job(sum(upload.size or 0 for upload in files), prefix="pdf2word_batch_")
+    try:
+        with tracing.span("upload.spool", files=len(files)), metrics.stage_timer(metrics.STAGE_UPLOAD):
+            items = await run_in_threadpool(_spool_batch_inputs, files, job.path)
+        if not any(item["path"] for item in items):
+            raise HTTPException(
+                status_code=400,
+                detail={"error": "NO_PDF_FILES", "message": "未找到可转换的PDF文件"}
+            )
+    except Exception:
+        job.cleanup()
+        raise
+
+    return StreamingResponse(
+        _stream_batch(items, output_format, job, client_key(request)),
+        media_type="application/zip",
+        headers={"Content-Disposition": 'attachment; filename="converted.zip"'}
+    )
+
+def _spool_batch_inputs(files: List[UploadFile], work_dir: Path) -> List[Dict[str, Any]]:
+    """把上传的PDF（含ZIP中的PDF）逐个落盘，不支持的文件记录为跳过"""
+    items: List[Dict[str, Any]] = []
+    limit = MAX_FILE_MB * 1024 * 1024
+
+    def add(name: str, source, size: int) -> None:
+        if len(items) >= BATCH_MAX_FILES:
+            raise HTTPException(
+                status_code=400,
+                detail={"error": "TOO_MANY_FILES", "message": f"单次最多转换{BATCH_MAX_FILES}个文件"}
+            )
+        item = {"index": len(items), "file": name, "path": None, "bytes_in": size, "error": None}
+        items.append(item)
+        if size > limit:
+            item["error"] = f"文件过大({size / 1024 / 1024:.1f}MB)"
+            return
+        path = work_dir / f"input_{item['index']}.pdf"
+        with path.open("wb") as target:
+            shutil.copyfileobj(source, target, 1024 * 1024)
+        item["path"] = path
+        item["cost"] = estimate_cost(path)
+
+    for upload in files:
+        name = os.path.basename(upload.filename or "")
+        lower = name.lower()
+        if lower.endswith(".pdf"):
+            upload.file.seek(0, os.SEEK_END)
+            size = upload.file.tell()
+            upload.file.seek(0)
+            add(name, upload.file, size)
+        elif lower.endswith(".zip"):
+            try:
+                archive = zipfile.ZipFile(upload.file)
+            except zipfile.BadZipFile:
+                items.append({"index": len(items), "file": name, "path": None, "bytes_in": 0,
+                              "error": "无效的ZIP文件"})
+                continue
+            with archive:
+                for info in archive.infolist():
+                    member = os.path.basename(info.filename)
+                    if info.is_dir() or not member.lower().endswith(".pdf"):
+                        continue
+                    with archive.open(info) as source:
+                        add(member, source, info.file_size)
+        else:
+            items.append({"index": len(items), "file": name, "path": None, "bytes_in": 0,
+                          "error": "只支持PDF文件"})
+    return items
+
+def _convert_batch_item(item: Dict[str, Any], output_format: str, work_dir: Path) -> Dict[str, Any]:
+    """转换批量请求中的单个文件，失败时记录错误而不中断整个批次"""
+    item_dir = work_dir / f"job_{item['index']}"
+    item_dir.mkdir()
+    start = time.perf_counter()
+    try:
+        result_file, engine = _convert_one(item["path"], output_format, str(item_dir))
+        item.update(status="success", engine=engine, result=result_file,
+                    bytes_out=result_file.stat().st_size)
+    except Exception as e:
+        logger.error(f"批量转换失败 {item['file']}: {str(e)}")
+        item.update(status="failed", error=str(e))
+    item["seconds"] = round(time.perf_counter() - start, 3)
+    return item
+
+async def _stream_batch(items: List[Dict[str, Any]], output_format: str, job: StagingJob,
+                        client: Optional[str] = None):
+    """按完成顺序把转换结果写入流式ZIP"""
+    pool = get_pool()
+    stream = ZipStream()
+    # 同一批次的文件计入同一客户端的配额，不会占满线程池
+    futures = [pool.submit(_convert_batch_item, item, output_format, job.path, cost=item["cost"], client=client)
+               for item in items if item["path"]]
+    manifest = []
+    try:
+        for item in items:
+            if not item["path"]:
+                item["status"] = "skipped"
+        for completed in asyncio.as_completed([asyncio.wrap_future(future) for future in futures]):
+            item = await completed
+            if item["status"] != "success":
+                continue
+            with metrics.stage_timer(metrics.STAGE_RESPONSE, item["engine"]):
+                async for chunk in iterate_in_threadpool(
+                    stream.write_file(_output_name(item["file"], output_format), str(item["result"]))
+                ):
+                    yield chunk
+            # 同名文件在压缩包中被改名，清单记录实际的条目名
+            item["output"] = stream.last_arcname
+            item["result"].unlink()
+
+        for item in items:
+            manifest.append({key: item.get(key) for key in
+                             ("file", "output", "status", "engine", "seconds", "bytes_in", "bytes_out", "error")})
+        summary = {
+            "total": len(items),
+            "succeeded": sum(1 for item in items if item["status"] == "success"),
+            "output_format": output_format,
+            "files": manifest,
+        }
+        yield stream.write_bytes("manifest.json", json.dumps(summary, ensure_ascii=False, indent=2).encode("utf-8"))
+        yield stream.close()
+        logger.info(f"批量转换完成: {summary['succeeded']}/{summary['total']}")
+    finally:
+        # 客户端中途断开时取消尚未开始的任务；已在运行的任务无法取消，
+        # 它们还在使用暂存目录，等全部结束后再删除
+        running = [future for future in futures if not future.cancel() and not future.done()]
+        if running:
+            remaining = [len(running)]
+            lock = threading.Lock()
+
+            def release(_future) -> None:
+                with lock:
+                    remaining[0] -= 1
+                    last = remaining[0] == 0
+                if last:
+                    job.cleanup()
+
+            for future in running:
+                future.add_done_callback(release)
+        else:
+            job.cleanup()
+
+def _convert_one(pdf_path: Path, output_format: str, work_dir: str) -> Tuple[Path, str]:
+    """
+    在转换线程池中执行单个文件的转换并记录指标
+
+    Returns:
+        (输出文件路径, 引擎名)
+    """
+    if MOCK_CONVERTER is not None:
+        engine = "mock"
+    elif output_format == "docx" and should_ocr(str(pdf_path)):
+        engine = "ocr"
+    else:
+        engine = "pdf2docx" if output_format == "docx" else (
+            "table_inference" if tabular_export.infers_tables() else "pdf2docx_excel")
+    bytes_in = pdf_path.stat().st_size
+    start = time.perf_counter()
+    success = False
+    result_file = None
+    try:
+        with tracing.span(f"engine.{engine}", bytes_in=bytes_in), \
+                metrics.INFLIGHT_JOBS.track(engine=engine), \
+                metrics.stage_timer(metrics.STAGE_CONVERSION, engine):
+            if MOCK_CONVERTER is not None:
+                result_file = Path(work_dir) / _output_name("output", output_format)
+                MOCK_CONVERTER.convert_file(str(pdf_path), str(result_file))
+            elif engine == "ocr":
+                result_file = Path(work_dir) / "output.docx"
+                ocr_success, message = OCR.convert_file(str(pdf_path), str(result_file))
+                if not ocr_success:
+                    raise Exception(message)
+                logger.info(message)
+            elif output_format == "docx":
+                result_file = convert_pdf_to_word(pdf_path, work_dir)
+            else:
+                result_file = convert_pdf_to_tables(pdf_path, work_dir, output_format)
+        if output_format == "docx" and engine != "mock":
+            style_dedup.postprocess(str(result_file), engine)
+        success = True
+        return result_file, engine
+    finally:
+        metrics.record_conversion(
+            engine, success, time.perf_counter() - start,
+            bytes_in=bytes_in,
+            bytes_out=result_file.stat().st_size if success else 0,
+            pages=_count_pages(pdf_path) if success else None
+        )
+
+def _count_pages(pdf_path: Path) -> Optional[int]:
+    """读取页数用于吞吐量指标（PyMuPDF只解析页树，开销很小）"""
+    try:
+        import fitz
+        with fitz.open(str(pdf_path)) as pdf_doc:
+            return pdf_doc.page_count
+    except Exception:
+        return None
+
+def convert_pdf_to_word(pdf_path: Path, temp_dir: str) -> Path:
     """使用pdf2docx将PDF转换为Word"""
     try:
-        from pdf2docx import Converter
+        import pdf2docx  # noqa: F401  未安装时给出安装提示
         
         output_path = Path(temp_dir) / "output.docx"
         
@@ -165,12 +486,12 @@ async def convert_pdf_to_word(pdf_path: Path, temp_dir: str) -> Path:
         logger.info(f"输入文件: {pdf_path}")
         logger.info(f"输出路径: {output_path}")
         
-        # 执行转换
-        cv = Converter(str(pdf_path))
-        cv.convert(str(output_path), start=0, end=None)
-        cv.close()
+        # 执行转换（沙箱子进程）
+        success, message = PDF2DOCX.convert_file(str(pdf_path), str(output_path))
+        if not success:
+            raise Exception(message)
         
-        logger.info("PDF转Word转换完成")
+        logger.info(f"PDF转Word转换完成: {message}")
         
         # 检查文件是否存在
         if output_path.exists():
@@ -197,93 +518,47 @@ async def convert_pdf_to_word(pdf_path: Path, temp_dir: str) -> Path:
         logger.error(f"PDF转Word转换失败: {str(e)}")
         raise Exception(f"PDF转Word转换失败: {str(e)}")
 
-async def convert_pdf_to_excel(pdf_path: Path, temp_dir: str) -> Path:
-    """将PDF转换为Excel（提取表格数据）"""
+def convert_pdf_to_tables(pdf_path: Path, temp_dir: str, output_format: str = "xlsx") -> Path:
+    """将PDF中的表格导出为 xlsx / csv(zip) / parquet / arrow（api/tabular_export.py，逐个表格流式写出）"""
+    output_path = Path(temp_dir) / f"output.{tabular_export.FORMATS[output_format][0]}"
     try:
-        import pandas as pd
-        from pdf2docx import Converter
-        
-        output_path = Path(temp_dir) / "output.xlsx"
+        logger.info(f"开始PDF转表格转换 ({output_format})...")
         
-        logger.info("开始PDF转Excel转换...")
-        
-        # 先转换为Word以提取文本
-        temp_docx = Path(temp_dir) / "temp.docx"
-        cv = Converter(str(pdf_path))
-        cv.convert(str(temp_docx), start=0, end=None)
-        cv.close()
-        
-        # 从Word文档提取文本
-        try:
-            from docx import Document
-            doc = Document(str(temp_docx))
-            full_text = []
-            
-            for paragraph in doc.paragraphs:
-                if paragraph.text.strip():
-                    full_text.append(paragraph.text.strip())
-            
-            # 处理表格
-            tables_data = []
-            for table in doc.tables:
-                table_data = []
-                for row in table.rows:
-                    row_data = []
-                    for cell in row.cells:
-                        row_data.append(cell.text.strip())
-                    if any(row_data):  # 只添加非空行
-                        table_data.append(row_data)
-                if table_data:
-                    tables_data.append(table_data)
-            
-            # 创建Excel文件
-            with pd.ExcelWriter(str(output_path), engine='openpyxl') as writer:
-                # 如果有表格数据，写入表格
-                if tables_data:
-                    for i, table_data in enumerate(tables_data):
-                        if len(table_data) > 1:  # 确保有数据
-                            df = pd.DataFrame(table_data[1:], columns=table_data[0])
-                            sheet_name = f'表格{i+1}' if len(tables_data) > 1 else '表格数据'
-                            df.to_excel(writer, sheet_name=sheet_name, index=False)
-                
-                # 写入全部文本内容
-                if full_text:
-                    text_df = pd.DataFrame({'内容': full_text})
-                    text_df.to_excel(writer, sheet_name='文本内容', index=False)
-                
-                # 如果没有任何内容，创建一个默认表
-                if not tables_data and not full_text:
-                    default_df = pd.DataFrame({
-                        '说明': ['PDF转换完成'],
-                        '文件名': [pdf_path.name],
-                        '转换时间': [datetime.now().strftime('%Y-%m-%d %H:%M:%S')]
-                    })
-                    default_df.to_excel(writer, sheet_name='转换信息', index=False)
-            
-            logger.info("PDF转Excel转换完成")
-            return output_path
+        temp_docx = None
+        if tabular_export.infers_tables():
+            # 直接按单词坐标推断各页表格（含无框线表格）
+            items = tabular_export.pdf_content(str(pdf_path))
+        else:
+            import pdf2docx  # noqa: F401
             
-        except ImportError:
-            logger.error("python-docx库未安装")
-            raise Exception("转换库未安装，请执行: pip install python-docx")
+            # 先转换为Word，再流式读取其中的表格与文本
+            temp_docx = Path(temp_dir) / "temp.docx"
+            success, message = PDF2DOCX.convert_file(str(pdf_path), str(temp_docx))
+            if not success:
+                raise Exception(message)
+            items = tabular_export.docx_content(str(temp_docx))
+        
+        summary = tabular_export.export(items, str(output_path), output_format, source_name=pdf_path.name)
+        if temp_docx is not None:
+            temp_docx.unlink()
+        logger.info(f"PDF转表格转换完成: {summary.tables} 个表格, {summary.rows} 行")
+        return output_path
             
     except Exception as e:
-        logger.error(f"PDF转Excel转换失败: {str(e)}")
+        logger.error(f"PDF转表格转换失败: {str(e)}")
+        if output_format != "xlsx":
+            raise
         # 创建一个包含错误信息的Excel文件
         try:
-            import pandas as pd
-            output_path = Path(temp_dir) / "output.xlsx"
-            error_df = pd.DataFrame({
-                '转换状态': ['转换遇到问题'],
-                '文件名': [pdf_path.name],
-                '错误信息': [str(e)],
-                '建议': ['请尝试PDF转Word格式，或检查PDF文件是否完整']
-            })
-            error_df.to_excel(str(output_path), sheet_name='转换信息', index=False)
+            import openpyxl
+            workbook = openpyxl.Workbook(write_only=True)
+            sheet = workbook.create_sheet('转换信息')
+            sheet.append(['转换状态', '文件名', '错误信息', '建议'])
+            sheet.append(['转换遇到问题', pdf_path.name, str(e), '请尝试PDF转Word格式，或检查PDF文件是否完整'])
+            workbook.save(str(output_path))
             return output_path
         except ImportError:
-            # 如果pandas也导入失败，创建一个简单的文本文件作为Excel
-            output_path = Path(temp_dir) / "output.xlsx"
+            # 如果openpyxl也导入失败，创建一个简单的文本文件作为Excel
             with open(output_path, 'w', encoding='utf-8') as f:
                 f.write(f"转换失败: {str(e)}\n")
             return output_path
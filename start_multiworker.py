@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+多进程部署启动脚本
+N 个 uvicorn Web worker 负责HTTP，M 个独立的转换进程从共享的SQLite队列领取作业，
+两者可以分别扩展；结果写入共享的结果存储，任意Web worker都能提供下载。
+PDF2WORD_RESULT_DIR / PDF2WORD_QUEUE_DIR 统一为绝对路径传给所有子进程
+
+用法:
+    python start_multiworker.py --web-workers 4 --conversion-workers 2
+    python start_multiworker.py --app server:app --port 3001
+"""
+
+import argparse
+import logging
+import os
+import signal
+import subprocess
+import sys
+import time
+
+from api.job_queue import QUEUE_DIR
+from api.result_store import RESULT_DIR
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+
+
+class WorkerSupervisor:
+    """启动转换进程，异常退出时自动重启"""
+
+    def __init__(self, count: int):
+        self.count = count
+        self.processes = []
+        self._stopping = False
+
+    def _spawn(self) -> subprocess.Popen:
+        return subprocess.Popen([sys.executable, "-m", "api.conversion_worker"], cwd=current_dir)
+
+    def start(self) -> None:
+        self.processes = [self._spawn() for _ in range(self.count)]
+        logger.info(f"✅ 已启动 {self.count} 个转换进程")
+
+    def check(self) -> None:
+        for index, process in enumerate(self.processes):
+            if process.poll() is not None and not self._stopping:
+                logger.warning(f"转换进程 {process.pid} 退出（{process.returncode}），重新启动")
+                self.processes[index] = self._spawn()
+
+    def stop(self) -> None:
+        self._stopping = True
+        for process in self.processes:
+            process.terminate()
+        for process in self.processes:
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="多进程部署：Web worker + 转换进程 + 共享队列")
+    parser.add_argument("--app", default="api.render_app_libreoffice:app", help="ASGI应用导入路径")
+    parser.add_argument("--web-workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", 2)))
+    parser.add_argument("--conversion-workers", type=int,
+                        default=int(os.getenv("CONVERSION_PROCESSES", max(1, (os.cpu_count() or 2) // 2))))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", 8000)))
+    args = parser.parse_args()
+
+    # Web进程只入队，不在进程内转换
+    os.environ["PDF2WORD_EMBEDDED_WORKERS"] = "0"
+
+    # Web进程与转换进程必须使用同一个结果目录和队列：各应用的默认目录不同（server.py 为
+    # converted_files），这里统一为绝对路径后传给所有子进程
+    os.environ["PDF2WORD_RESULT_DIR"] = os.path.abspath(RESULT_DIR)
+    os.environ["PDF2WORD_QUEUE_DIR"] = os.path.abspath(QUEUE_DIR)
+    logger.info(f"结果目录: {os.environ['PDF2WORD_RESULT_DIR']}，队列目录: {os.environ['PDF2WORD_QUEUE_DIR']}")
+
+    supervisor = WorkerSupervisor(args.conversion_workers)
+    supervisor.start()
+
+    # 由独立进程运行uvicorn，主进程负责监督转换进程
+    web = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", args.app, "--host", "0.0.0.0", "--port", str(args.port),
+         "--workers", str(args.web_workers), "--log-level", "info"],
+        cwd=current_dir
+    )
+    logger.info(f"🚀 Web服务: {args.app}，{args.web_workers} 个worker，端口 {args.port}")
+
+    def shutdown(signum, frame):
+        raise KeyboardInterrupt
+
+    signal.signal(signal.SIGTERM, shutdown)
+    try:
+        while web.poll() is None:
+            supervisor.check()
+            time.sleep(1)
+    except KeyboardInterrupt:
+        logger.info("正在停止...")
+    finally:
+        web.terminate()
+        try:
+            web.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            web.kill()
+        supervisor.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -7,6 +7,7 @@
 """
 
 import os
+import importlib.util
 import uvicorn
 import logging
 
@@ -25,15 +26,12 @@ def main():
         # 导入应用
         from server import app
         
-        # 验证关键依赖
-        try:
-            import PyPDF2
-            from docx import Document
-            from pdf2docx import Converter
-            logger.info("✅ 核心依赖验证通过")
-        except ImportError as e:
-            logger.error(f"❌ 依赖验证失败: {e}")
-            raise
+        # 验证关键依赖（只检查是否安装，真正的导入延迟到首次使用或启动后预热）
+        missing = [name for name in ("PyPDF2", "docx", "pdf2docx") if importlib.util.find_spec(name) is None]
+        if missing:
+            logger.error(f"❌ 依赖验证失败: 缺少 {', '.join(missing)}")
+            raise ImportError(f"缺少依赖: {', '.join(missing)}")
+        logger.info("✅ 核心依赖验证通过")
         
         # 启动服务
         uvicorn.run(
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+批量转换测试脚本
+工作进程被杀死（进程池损坏）时，正在转换的文件记为失败，重建进程池后继续转换其余文件
+（pdf2word/src/pdf2word.py BatchConverter）
+"""
+
+import json
+import os
+import sys
+
+import pytest
+
+pytest.importorskip("fitz")
+pytest.importorskip("docx")
+pytest.importorskip("tqdm")
+pytest.importorskip("PIL")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "pdf2word", "src"))
+
+import pdf2word  # noqa: E402
+
+
+def _convert_or_crash(input_pdf: str, output_dir: str, trace=None):
+    """文件名含 crash 时模拟工作进程被OOM killer杀掉"""
+    if "crash" in os.path.basename(input_pdf):
+        os._exit(9)
+    output = os.path.join(output_dir, os.path.basename(input_pdf)[:-4] + ".docx")
+    with open(output, "wb") as f:
+        f.write(b"docx")
+    return {"sha256": "", "pages": 1, "output": output, "status": "success", "seconds": 0.0}
+
+
+def test_broken_pool_is_recovered(monkeypatch, tmp_path):
+    input_dir, output_dir = tmp_path / "in", tmp_path / "out"
+    input_dir.mkdir()
+    for name in ["a.pdf", "crash.pdf", "b.pdf", "c.pdf"]:
+        (input_dir / name).write_bytes(b"%PDF-1.4")
+    monkeypatch.setattr(pdf2word.PDFConverter, "probe_libreoffice", staticmethod(lambda: True))
+    monkeypatch.setattr(pdf2word, "_batch_convert_one", _convert_or_crash)
+
+    summary = pdf2word.BatchConverter(str(input_dir), str(output_dir), jobs=1).run()
+
+    assert summary["succeeded"] == 3 and summary["failed"] == 1
+    with open(output_dir / pdf2word.BATCH_MANIFEST, "r", encoding="utf-8") as f:
+        files = json.load(f)["files"]
+    assert files["crash.pdf"]["status"] == "failed"
+    assert all(files[name]["status"] == "success" for name in ["a.pdf", "b.pdf", "c.pdf"])
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
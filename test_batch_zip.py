@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+批量转换ZIP测试脚本
+同名文件在压缩包中被改名时清单记录实际的条目名，客户端断开后正在转换的文件结束前
+不删除暂存目录（server.py /api/convert/batch）
+"""
+
+import asyncio
+import io
+import json
+import sys
+import threading
+import zipfile
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("fastapi")
+
+import server  # noqa: E402
+from api.staging import StagingArea  # noqa: E402
+
+
+def _fake_convert(pdf_path: Path, output_format: str, work_dir: str):
+    result = Path(work_dir) / f"out.{output_format}"
+    result.write_bytes(b"converted " + pdf_path.name.encode())
+    return result, "mock"
+
+
+def _items(job, names):
+    items = []
+    for index, name in enumerate(names):
+        path = job.path_for(f"input_{index}.pdf")
+        path.write_bytes(b"%PDF-1.4")
+        items.append({"index": index, "file": name, "path": path, "bytes_in": 8, "error": None, "cost": 1.0})
+    return items
+
+
+async def _collect(stream) -> bytes:
+    return b"".join([chunk async for chunk in stream])
+
+
+def test_manifest_records_renamed_entries(monkeypatch, tmp_path):
+    monkeypatch.setattr(server, "_convert_one", _fake_convert)
+    job = StagingArea(ram_root="", disk_root=str(tmp_path)).job(0)
+    items = _items(job, ["a.pdf", "a.pdf", "b.pdf"])
+    data = asyncio.run(_collect(server._stream_batch(items, "docx", job)))
+
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        names = set(archive.namelist())
+        manifest = json.loads(archive.read("manifest.json"))
+    outputs = [entry["output"] for entry in manifest["files"]]
+    assert sorted(outputs) == ["a (1).docx", "a.docx", "b.docx"]
+    assert set(outputs) <= names
+
+
+def test_disconnect_waits_for_running_items(monkeypatch, tmp_path):
+    """客户端断开时正在运行的转换仍能写入暂存目录，结束后才清理"""
+    started, release = threading.Event(), threading.Event()
+    written = []
+
+    def slow_convert(pdf_path, output_format, work_dir):
+        started.set()
+        release.wait(10)
+        result, engine = _fake_convert(pdf_path, output_format, work_dir)
+        written.append(result.exists())
+        return result, engine
+
+    monkeypatch.setattr(server, "_convert_one", slow_convert)
+    job = StagingArea(ram_root="", disk_root=str(tmp_path)).job(0)
+    items = _items(job, ["slow.pdf"])
+
+    async def disconnect():
+        stream = server._stream_batch(items, "docx", job)
+        first = asyncio.ensure_future(stream.__anext__())
+        await asyncio.get_running_loop().run_in_executor(None, started.wait, 10)
+        # 与断开连接时一样取消正在等待结果的响应任务
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+
+    asyncio.run(disconnect())
+    assert job.path.exists()
+    release.set()
+    for _ in range(100):
+        if not job.path.exists():
+            break
+        threading.Event().wait(0.05)
+    assert written == [True]
+    assert not job.path.exists()
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
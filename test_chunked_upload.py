@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+分块上传测试脚本
+校验失败的分块应返回460并截断回原偏移量（api/chunked_upload.py）
+"""
+
+import base64
+import hashlib
+import tempfile
+import time
+
+import pytest
+
+from api.chunked_upload import UploadError, UploadStore, install
+
+
+def _bad_checksum() -> str:
+    return "sha256 " + base64.b64encode(hashlib.sha256(b"other").digest()).decode()
+
+
+def test_bad_checksum_writer():
+    """commit 校验失败后 abort 不再操作已关闭的文件描述符"""
+    store = UploadStore(tempfile.mkdtemp(prefix="uploads_"))
+    session = store.create("a.pdf", 10)
+    writer = store.open_chunk(session, 0, ("sha256", hashlib.sha256(b"other").digest()))
+    writer.write(b"12345")
+    with pytest.raises(UploadError) as exc_info:
+        writer.commit()
+    assert exc_info.value.status == 460
+    assert writer.abort() == 0
+    assert session.offset == 0
+
+
+def test_bad_checksum_patch():
+    """PATCH 携带错误的 Upload-Checksum 时返回460，偏移量不变"""
+    fastapi = pytest.importorskip("fastapi")
+    from fastapi.testclient import TestClient
+
+    progress = []
+    app = fastapi.FastAPI()
+
+    async def on_finalize(upload, sha256, request):
+        return None
+
+    install(app, on_finalize, store=UploadStore(tempfile.mkdtemp(prefix="uploads_")),
+            on_progress=lambda upload, offset: progress.append(offset))
+    client = TestClient(app)
+
+    response = client.post("/api/uploads", headers={
+        "Upload-Length": "10", "Upload-Metadata": "filename " + base64.b64encode(b"a.pdf").decode()})
+    assert response.status_code == 201
+    url = response.headers["location"]
+
+    headers = {"Content-Type": "application/offset+octet-stream", "Tus-Resumable": "1.0.0"}
+    response = client.patch(url, content=b"12345",
+                            headers={**headers, "Upload-Offset": "0", "Upload-Checksum": _bad_checksum()})
+    assert response.status_code == 460
+    assert client.head(url).headers["upload-offset"] == "0"
+    assert progress == [0]
+
+    # 重新发送正确的分块可以继续
+    response = client.patch(url, content=b"12345", headers={**headers, "Upload-Offset": "0"})
+    assert response.status_code == 204
+    assert response.headers["upload-offset"] == "5"
+
+
+def test_purge_calls_on_discard():
+    """过期清理删除的上传同样通知 on_discard（释放提前转换线程）"""
+    discarded = []
+    store = UploadStore(tempfile.mkdtemp(prefix="uploads_"), ttl=0.01, on_discard=discarded.append)
+    session = store.create("a.pdf", 10)
+    time.sleep(0.05)
+    store._last_purge = 0.0
+    store._maybe_purge()
+    assert discarded == [session.id]
+    assert not session.path.exists()
+
+
+if __name__ == "__main__":
+    test_bad_checksum_writer()
+    test_bad_checksum_patch()
+    test_purge_calls_on_discard()
+    print("✅ 分块上传测试通过")
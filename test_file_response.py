@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+断点续传文件响应测试脚本
+Range请求返回206/416，ETag与Last-Modified条件请求返回304（api/file_response.py）
+"""
+
+import os
+import sys
+import tempfile
+from email.utils import formatdate
+
+import pytest
+
+fastapi = pytest.importorskip("fastapi")
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from api.file_response import RangeFileResponse  # noqa: E402
+
+DATA = bytes(range(256)) * 40     # 10240 字节
+ETAG = '"0123abcd"'
+
+
+@pytest.fixture(scope="module")
+def client():
+    path = os.path.join(tempfile.mkdtemp(), "result.docx")
+    with open(path, "wb") as f:
+        f.write(DATA)
+    app = fastapi.FastAPI()
+
+    @app.api_route("/file", methods=["GET", "HEAD"])
+    async def download():
+        return RangeFileResponse(path, etag=ETAG, filename="结果.docx")
+
+    @app.get("/untagged")
+    async def untagged():
+        return RangeFileResponse(path)
+
+    return TestClient(app)
+
+
+def test_full_response(client):
+    response = client.get("/file")
+    assert response.status_code == 200
+    assert response.content == DATA
+    assert response.headers["etag"] == ETAG
+    assert response.headers["accept-ranges"] == "bytes"
+    assert response.headers["content-disposition"] == "attachment; filename*=utf-8''%E7%BB%93%E6%9E%9C.docx"
+
+
+@pytest.mark.parametrize("header, start, end", [
+    ("bytes=0-99", 0, 99),
+    ("bytes=100-", 100, len(DATA) - 1),
+    ("bytes=-500", len(DATA) - 500, len(DATA) - 1),
+    ("bytes=10000-99999", 10000, len(DATA) - 1),
+])
+def test_range(client, header, start, end):
+    response = client.get("/file", headers={"Range": header})
+    assert response.status_code == 206
+    assert response.content == DATA[start:end + 1]
+    assert response.headers["content-range"] == f"bytes {start}-{end}/{len(DATA)}"
+    assert response.headers["content-length"] == str(end - start + 1)
+
+
+@pytest.mark.parametrize("header", ["bytes=20000-", "bytes=-0"])
+def test_unsatisfiable_range(client, header):
+    response = client.get("/file", headers={"Range": header})
+    assert response.status_code == 416
+    assert response.headers["content-range"] == f"bytes */{len(DATA)}"
+
+
+@pytest.mark.parametrize("header", ["bytes=0-9,20-29", "items=0-9", "bytes=50-10"])
+def test_ignored_range(client, header):
+    """多范围与无法解析的Range按完整文件返回"""
+    response = client.get("/file", headers={"Range": header})
+    assert response.status_code == 200
+    assert response.content == DATA
+
+
+def test_if_none_match(client):
+    assert client.get("/file", headers={"If-None-Match": ETAG}).status_code == 304
+    assert client.get("/file", headers={"If-None-Match": f'W/{ETAG}'}).status_code == 304
+    assert client.get("/file", headers={"If-None-Match": '"other"'}).status_code == 200
+
+
+def test_if_modified_since(client):
+    last_modified = client.get("/untagged").headers["last-modified"]
+    assert client.get("/untagged", headers={"If-Modified-Since": last_modified}).status_code == 304
+    assert client.get("/untagged", headers={"If-Modified-Since": formatdate(0, usegmt=True)}).status_code == 200
+
+
+def test_if_range(client):
+    """If-Range 匹配时按Range返回，不匹配（文件已变）时返回完整文件"""
+    response = client.get("/file", headers={"Range": "bytes=0-9", "If-Range": ETAG})
+    assert response.status_code == 206 and response.content == DATA[:10]
+    response = client.get("/file", headers={"Range": "bytes=0-9", "If-Range": '"stale"'})
+    assert response.status_code == 200 and response.content == DATA
+
+
+def test_head(client):
+    response = client.head("/file", headers={"Range": "bytes=0-9"})
+    assert response.status_code == 206
+    assert response.headers["content-length"] == "10"
+    assert response.content == b""
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+字体解析测试脚本
+真实PDF中的PostScript字体名应映射到正确的Word字体（pdf2word/src/font_resolver.py）
+"""
+
+import os
+import sys
+
+import pytest
+
+pytest.importorskip("docx")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "pdf2word", "src"))
+
+from font_resolver import FontResolver, split_style  # noqa: E402
+
+
+@pytest.mark.parametrize("pdf_font, expected", [
+    ("DengXian-Regular", ("DengXian", False, False)),
+    ("ABCDEF+SourceHanSansSC-Medium", ("SourceHanSansSC", False, False)),
+    ("STSongStd-Light", ("STSongStd", False, False)),
+    ("Times-Roman", ("Times", False, False)),
+    ("TimesNewRomanPS-BoldItalicMT", ("TimesNewRoman", True, True)),
+    ("Helvetica-LightOblique", ("Helvetica", False, True)),
+    ("Arial,Bold", ("Arial", True, False)),
+    ("ArialMT", ("Arial", False, False)),
+])
+def test_split_style(pdf_font, expected):
+    """样式与字重后缀被去掉，粗体斜体被识别"""
+    assert split_style(pdf_font) == expected
+
+
+@pytest.mark.parametrize("pdf_font, name, east_asia", [
+    ("DengXian-Regular", "DengXian", "DengXian"),
+    ("ABCDEF+SimSun-Bold", "SimSun", "SimSun"),
+    ("NotoSansCJKsc-Light", "Microsoft YaHei", "Microsoft YaHei"),
+    ("STSongStd-Light", "SimSun", "SimSun"),
+    ("TimesNewRomanPSMT", "Times New Roman", None),
+    ("Times-Roman", "Times New Roman", None),
+])
+def test_resolve_postscript_names(pdf_font, name, east_asia):
+    """中文字体带字重后缀时仍设置东亚字体"""
+    resolved = FontResolver(installed=frozenset()).resolve(pdf_font)
+    assert (resolved.name, resolved.east_asia) == (name, east_asia)
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+边上传边转换测试脚本
+/api/convert/incremental 经转换线程池执行，无效PDF返回结构化的 CONVERSION_FAILED 错误（api/incremental_convert.py）
+"""
+
+import sys
+
+import pytest
+
+fastapi = pytest.importorskip("fastapi")
+fitz = pytest.importorskip("fitz")
+pytest.importorskip("docx")
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from api import incremental_convert  # noqa: E402
+
+
+def _client() -> TestClient:
+    app = fastapi.FastAPI()
+    incremental_convert.install(app)
+    return TestClient(app)
+
+
+def test_invalid_pdf():
+    """请求体不是PDF：422 + 结构化错误，而不是裸的500"""
+    response = _client().post("/api/convert/incremental", content=b"not a pdf" * 100,
+                              headers={"X-Filename": "a.pdf"})
+    assert response.status_code == 422
+    assert response.json()["detail"]["error"] == "CONVERSION_FAILED"
+
+
+def test_convert():
+    with fitz.open() as doc:
+        doc.new_page().insert_text((72, 72), "Hello incremental")
+        data = doc.tobytes()
+    response = _client().post("/api/convert/incremental", content=data, headers={"X-Filename": "a.pdf"})
+    assert response.status_code == 200
+    assert response.content[:2] == b"PK"
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
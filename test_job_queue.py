@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+作业队列测试脚本
+领取顺序按入队时保存的估计成本做WSJF排序，并考虑等待时间与客户端公平（api/job_queue.py）
+"""
+
+import sys
+import tempfile
+import time
+
+import pytest
+
+from api.job_queue import SQLiteJobQueue, new_job_id, pick_next
+
+
+def _enqueue(queue: SQLiteJobQueue, cost: float, client: str = "a") -> str:
+    job_id = new_job_id()
+    queue.enqueue(job_id, "fast", f"{job_id}.pdf", queue.input_path_for(job_id), client=client, cost=cost)
+    return job_id
+
+
+def test_small_job_claimed_first():
+    """900页的大文件先入队，1页的小文件仍先被领取"""
+    queue = SQLiteJobQueue(tempfile.mkdtemp())
+    large = _enqueue(queue, 900)
+    small = _enqueue(queue, 1)
+    assert queue.claim("w1").id == small
+    claimed = queue.claim("w2")
+    assert claimed.id == large and claimed.cost == 900
+
+
+def test_running_client_is_deprioritized():
+    """同一客户端已有作业在运行时，其他客户端的同成本作业优先"""
+    queue = SQLiteJobQueue(tempfile.mkdtemp())
+    _enqueue(queue, 1, "a")
+    second_a = _enqueue(queue, 1, "a")
+    b = _enqueue(queue, 1, "b")
+    queue.claim("w1")
+    assert queue.claim("w2").id == b
+    assert queue.claim("w3").id == second_a
+
+
+def test_aging():
+    """等待足够久的大作业优先于刚入队的小作业"""
+    now = time.time()
+    assert pick_next([("old", now - 3600, 100, "a"), ("new", now, 1, "b")], {}, now) == "old"
+    assert pick_next([("old", now - 1, 100, "a"), ("new", now, 1, "b")], {}, now) == "new"
+
+
+def test_empty_queue():
+    assert SQLiteJobQueue(tempfile.mkdtemp()).claim("w1") is None
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
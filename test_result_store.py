@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+结果存储测试脚本
+跨文件系统复制时目标路径上不出现不完整的文件，相同内容的下载文件名互不影响（api/result_store.py）
+"""
+
+import errno
+import os
+import sys
+import tempfile
+
+import pytest
+
+from api import staging
+from api.result_store import ResultStore
+
+
+def _write(directory: str, name: str, data: bytes) -> str:
+    path = os.path.join(directory, name)
+    with open(path, "wb") as f:
+        f.write(data)
+    return path
+
+
+def test_copy_publishes_atomically(monkeypatch):
+    """无法重命名时先复制到目标目录的临时文件，复制完成后才出现在目标路径"""
+    src_dir, dest_dir = tempfile.mkdtemp(), tempfile.mkdtemp()
+    src = _write(src_dir, "output.docx", b"x" * 4096)
+    dest = os.path.join(dest_dir, "result")
+    replace, copyfile = os.replace, staging.shutil.copyfile
+
+    def cross_device(a, b):
+        if str(a) == src:
+            raise OSError(errno.EXDEV, "Invalid cross-device link")
+        return replace(a, b)
+
+    def checked_copy(a, b):
+        # 复制过程中目标路径尚不存在，临时文件位于目标目录
+        assert not os.path.exists(dest)
+        assert os.path.dirname(str(b)) == dest_dir
+        return copyfile(a, b)
+
+    monkeypatch.setattr(staging.os, "replace", cross_device)
+    monkeypatch.setattr(staging.shutil, "copyfile", checked_copy)
+
+    assert staging.publish(src, dest) == "copy"
+    assert not os.path.exists(src)
+    assert os.listdir(dest_dir) == ["result"]
+    with open(dest, "rb") as f:
+        assert f.read() == b"x" * 4096
+
+
+def test_filename_is_per_request():
+    """相同内容的第二次写入不改变第一次的下载文件名"""
+    work = tempfile.mkdtemp()
+    store = ResultStore(os.path.join(work, "results"))
+    first = store.put(_write(work, "a.docx", b"same"), "alice-salary.docx")
+    second = store.put(_write(work, "b.docx", b"same"), "bob.docx")
+    assert first.id == second.id
+    assert second.filename == "bob.docx"
+    assert store.get(first.id, "alice-salary.docx").filename == "alice-salary.docx"
+    assert store.get(first.id).filename == f"{first.id}.docx"
+    assert second.download_url.endswith("?filename=bob.docx")
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+调度器测试脚本
+WSJF排序、老化、客户端配额与交互通道（api/scheduler.py）
+"""
+
+import sys
+
+import pytest
+
+from api.scheduler import LANE_BATCH, LANE_INTERACTIVE, FairShareScheduler
+
+
+def test_smallest_cost_first():
+    sched = FairShareScheduler(workers=4)
+    sched.push("large", cost=900)
+    sched.push("medium", cost=20)
+    sched.push("small", cost=1)
+    assert [sched.pop().payload for _ in range(3)] == ["small", "medium", "large"]
+
+
+def test_equal_priority_is_fifo():
+    sched = FairShareScheduler(workers=4)
+    for name in ["a", "b", "c"]:
+        sched.push(name, cost=1)
+    assert [sched.pop().payload for _ in range(3)] == ["a", "b", "c"]
+
+
+def test_aging():
+    """等待足够久的大任务优先于新到的小任务"""
+    sched = FairShareScheduler(workers=4, aging_rate=0.5)
+    large = sched.push("large", cost=50)
+    large.enqueued -= 200        # 已等待200秒：优先级 (1 + 100) / 50 ≈ 2.0
+    sched.push("small", cost=1)  # 优先级约 1.0
+    assert sched.pop().payload == "large"
+
+
+def test_client_quota():
+    """有其他客户端排队时，达到配额的客户端暂停调度"""
+    sched = FairShareScheduler(workers=4, client_share=0.5)
+    assert sched.client_quota == 2
+    for index in range(4):
+        sched.push(f"a{index}", cost=1, client="a")
+    sched.push("b0", cost=5, client="b")
+    assert [sched.pop().payload for _ in range(2)] == ["a0", "a1"]
+    # a 已达到配额，即使成本更低也先调度 b
+    assert sched.pop().payload == "b0"
+
+
+def test_quota_not_applied_when_alone():
+    """没有其他客户端排队时不受配额限制"""
+    sched = FairShareScheduler(workers=4, client_share=0.25)
+    for index in range(3):
+        sched.push(f"a{index}", cost=1, client="a")
+    assert [sched.pop().payload for _ in range(3)] == ["a0", "a1", "a2"]
+
+
+def test_finish_releases_quota():
+    sched = FairShareScheduler(workers=2, client_share=0.5)
+    first = (sched.push("a0", cost=1, client="a"), sched.push("a1", cost=1, client="a"))[0]
+    sched.push("b0", cost=1, client="b")
+    assert sched.pop() is first
+    assert sched.pop().payload == "b0"
+    sched.finish(first)
+    assert sched.pop().payload == "a1"
+    assert sched.stats()["clients"] == 2
+
+
+def test_batch_lane_keeps_reserved_worker():
+    """批量任务最多占用 总线程数 - 预留线程数，小任务总有线程可用"""
+    sched = FairShareScheduler(workers=2, interactive_cost=10, reserved=1)
+    big = [sched.push(f"big{index}", cost=100) for index in range(2)]
+    assert big[0].lane == LANE_BATCH
+    assert sched.pop() is big[0]
+    assert sched.pop() is None
+    small = sched.push("small", cost=1)
+    assert small.lane == LANE_INTERACTIVE
+    assert sched.pop() is small
+    sched.finish(big[0])
+    assert sched.pop() is big[1]
+
+
+def test_remove_pending():
+    sched = FairShareScheduler(workers=1)
+    task = sched.push("cancelled", cost=1)
+    assert sched.remove(task)
+    assert not sched.remove(task)
+    assert sched.pop() is None and len(sched) == 0
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+样式去重测试脚本
+去重后正文文字与每个字符的实际格式（直接格式 + 字符样式 + 段落样式）不变（api/style_dedup.py）
+"""
+
+import os
+import sys
+import tempfile
+
+import pytest
+
+docx = pytest.importorskip("docx")
+pytest.importorskip("lxml")
+
+from docx.shared import Pt, RGBColor  # noqa: E402
+
+from api.style_dedup import dedupe_styles  # noqa: E402
+
+
+def _build(path: str) -> None:
+    document = docx.Document()
+    for index in range(20):
+        paragraph = document.add_paragraph()
+        paragraph.paragraph_format.space_after = Pt(6)
+        for part, (size, color, bold) in enumerate([(11, "333333", False), (11, "333333", False),
+                                                    (14, "C00000", True), (9, "333333", False)]):
+            run = paragraph.add_run(f"p{index}r{part} ")
+            run.font.name = "Arial"
+            run.font.size = Pt(size)
+            run.font.color.rgb = RGBColor.from_string(color)
+            run.bold = bold
+            if part == 3 and index % 2:
+                run.italic = True
+    document.save(path)
+
+
+def _lookup(style, attribute: str):
+    while style is not None:
+        value = getattr(style.font, attribute)
+        if value is not None:
+            return value
+        style = style.base_style
+    return None
+
+
+def _font_value(run, paragraph, attribute: str):
+    value = getattr(run.font, attribute)
+    if value is None:
+        value = _lookup(run.style, attribute)
+    if value is None:
+        value = _lookup(paragraph.style, attribute)
+    return value
+
+
+def _effective(path: str):
+    """每个字符的文字与实际格式"""
+    chars = []
+    for paragraph in docx.Document(path).paragraphs:
+        space_after = paragraph.paragraph_format.space_after
+        if space_after is None:
+            space_after = paragraph.style.paragraph_format.space_after
+        for run in paragraph.runs:
+            color = run.font.color.rgb if run.font.color.type is not None else None
+            if color is None:
+                style = run.style
+                while style is not None and color is None:
+                    color = style.font.color.rgb if style.font.color.type is not None else None
+                    style = style.base_style
+            fmt = (_font_value(run, paragraph, "name"), _font_value(run, paragraph, "size"), str(color),
+                   run.bold, run.italic, space_after)
+            chars.extend((char, fmt) for char in run.text)
+        chars.append(("\n", None))
+    return chars
+
+
+def test_text_and_formatting_preserved():
+    path = os.path.join(tempfile.mkdtemp(), "styled.docx")
+    _build(path)
+    before = _effective(path)
+    report = dedupe_styles(path, min_count=3)
+    assert report is not None
+    assert report.character_styles >= 1 and report.runs_merged >= 1
+    assert report.document_bytes_after < report.document_bytes_before
+    assert _effective(path) == before
+
+
+def test_nothing_to_dedupe():
+    """没有重复的属性集合时返回None，文件不变"""
+    path = os.path.join(tempfile.mkdtemp(), "plain.docx")
+    document = docx.Document()
+    document.add_paragraph("plain text")
+    document.save(path)
+    with open(path, "rb") as f:
+        original = f.read()
+    assert dedupe_styles(path) is None
+    with open(path, "rb") as f:
+        assert f.read() == original
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+无框线表格推断测试脚本
+合成的单词坐标应推断出正确的行列（api/table_inference.py），
+含表格的页面经混合转换器的本地回退输出DOCX
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from api.table_inference import TableGrid, analyze_words  # noqa: E402
+
+CHAR_WIDTH = 5
+SPACE = 3
+LINE_HEIGHT = 10
+
+
+def _line(boxes, words, y, items):
+    """items: [(x, 文字)]；同一项中的多个单词按普通词间距排开"""
+    for x, text in items:
+        for word in text.split():
+            width = len(word) * CHAR_WIDTH
+            boxes.append((x, y, x + width, y + LINE_HEIGHT))
+            words.append(word)
+            x += width + SPACE
+
+
+def _sample_page():
+    boxes, words = [], []
+    _line(boxes, words, 50, [(50, "Annual report 2023")])
+    _line(boxes, words, 70, [(50, "This is a paragraph of text.")])
+    _line(boxes, words, 100, [(50, "Item"), (200, "Q1"), (260, "Q2"), (320, "Total")])
+    for i in range(8):
+        _line(boxes, words, 115 + i * 14, [(50, f"Row {i}"), (200, f"{i}.5"), (260, str(i * 7)),
+                                           (320, f"{i},000")])
+    _line(boxes, words, 240, [(50, "Footer note")])
+    return np.array(boxes, dtype=np.float32), words
+
+
+def test_borderless_table():
+    """表格前后的普通行保持为文本，表格按列间隙分列"""
+    blocks = analyze_words(*_sample_page())
+    assert blocks[0] == "Annual report 2023"
+    assert blocks[1] == "This is a paragraph of text."
+    assert blocks[-1] == "Footer note"
+    tables = [block for block in blocks if isinstance(block, TableGrid)]
+    assert len(tables) == 1
+    table = tables[0]
+    assert table.cells[0] == ["Item", "Q1", "Q2", "Total"]
+    assert table.cells[1] == ["Row 0", "0.5", "0", "0,000"]
+    assert len(table.cells) == 9
+
+
+def test_many_columns():
+    """不再限制列数"""
+    boxes, words = [], []
+    for row in range(5):
+        _line(boxes, words, row * 14, [(col * 60, f"v{row}{col}") for col in range(12)])
+    blocks = analyze_words(np.array(boxes, dtype=np.float32), words)
+    assert len(blocks) == 1 and blocks[0].columns == 12
+
+
+def test_prose_is_not_a_table():
+    """没有列间隙的正文不推断为表格"""
+    boxes, words = [], []
+    for row in range(6):
+        _line(boxes, words, row * 14, [(50, "plain text line with several words in it")])
+    blocks = analyze_words(np.array(boxes, dtype=np.float32), words)
+    assert all(isinstance(block, str) for block in blocks)
+
+
+def test_empty():
+    assert analyze_words(np.empty((0, 4), dtype=np.float32), []) == []
+
+
+def test_hybrid_local_conversion_with_table():
+    """标题 + 表格的页面：本地回退转换成功且输出表格"""
+    fitz = pytest.importorskip("fitz")
+    pytest.importorskip("PyPDF2")
+    docx = pytest.importorskip("docx")
+    from api.hybrid_converter import HybridConverter
+
+    work_dir = tempfile.mkdtemp(prefix="hybrid_")
+    pdf_path = os.path.join(work_dir, "table.pdf")
+    with fitz.open() as doc:
+        page = doc.new_page()
+        page.insert_text((72, 72), "Summary", fontsize=14)
+        for row in range(6):
+            y = 120 + row * 18
+            for col, text in enumerate(["Item", "Q1", "Q2", "Total"] if row == 0 else
+                                       [f"Row{row}", str(row), str(row * 2), str(row * 3)]):
+                page.insert_text((72 + col * 110, y), text, fontsize=10)
+        doc.save(pdf_path)
+
+    output_path = os.path.join(work_dir, "out.docx")
+    converter = HybridConverter.__new__(HybridConverter)
+    assert asyncio.run(converter._convert_pdf_to_word_nopillow(pdf_path, output_path))
+    tables = docx.Document(output_path).tables
+    assert tables and [cell.text for cell in tables[0].rows[0].cells] == ["Item", "Q1", "Q2", "Total"]
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
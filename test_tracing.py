@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+追踪测试脚本
+只沿用格式合法的 X-Trace-Id 请求头，追踪上下文跨进程传递（api/tracing.py）
+"""
+
+import json
+import os
+import re
+import sys
+import tempfile
+
+import pytest
+
+from api import sandbox, tracing
+from api.job_queue import SQLiteJobQueue, new_job_id
+
+
+def _client():
+    fastapi = pytest.importorskip("fastapi")
+    from fastapi.testclient import TestClient
+
+    app = fastapi.FastAPI()
+    tracing.install(app)
+
+    @app.get("/trace")
+    async def current():
+        return {"trace_id": tracing.current_trace_id()}
+
+    return TestClient(app)
+
+
+def test_valid_trace_id_is_kept():
+    trace_id = "0123456789abcdef0123456789abcdef"
+    response = _client().get("/trace", headers={"X-Trace-Id": trace_id})
+    assert response.headers["x-trace-id"] == trace_id
+    assert response.json()["trace_id"] == trace_id
+
+
+@pytest.mark.parametrize("value", ["short", "0123456789ABCDEF0123456789ABCDEF", "x" * 200, "é" * 32])
+def test_invalid_trace_id_is_replaced(value):
+    """非法的请求头不会原样写入日志和响应头"""
+    response = _client().get("/trace", headers={"X-Trace-Id": value.encode("utf-8")})
+    trace_id = response.headers["x-trace-id"]
+    assert re.fullmatch(r"[0-9a-f]{32}", trace_id)
+    assert response.json()["trace_id"] == trace_id
+
+
+def _child_span() -> int:
+    with tracing.span("child.work"):
+        return os.getpid()
+
+
+def test_sandbox_child_joins_trace(monkeypatch):
+    """沙箱子进程中的span归入父进程的trace"""
+    if not sandbox.is_supported():
+        pytest.skip("沙箱不可用")
+    path = os.path.join(tempfile.mkdtemp(), "traces.jsonl")
+    # 子进程按环境变量配置导出
+    monkeypatch.setenv("PDF2WORD_TRACE", f"jsonl:{path}")
+    tracing.configure(f"jsonl:{path}")
+    try:
+        with tracing.span("parent") as parent:
+            pid = sandbox.run_in_sandbox(_child_span, timeout=60)
+    finally:
+        tracing.configure(None)
+    with open(path, "r", encoding="utf-8") as f:
+        records = [json.loads(line) for line in f]
+    child = next(record for record in records if record["name"] == "child.work")
+    assert child["pid"] == pid != os.getpid()
+    assert child["trace_id"] == parent.trace_id
+    assert child["parent_id"] == parent.span_id
+
+
+def test_job_keeps_trace_context():
+    """入队时的追踪上下文随作业保存，工作进程领取后可恢复"""
+    queue = SQLiteJobQueue(tempfile.mkdtemp())
+    context = {"trace_id": tracing.new_trace_id(), "parent_id": "0123456789abcdef"}
+    job_id = new_job_id()
+    queue.enqueue(job_id, "fast", "a.pdf", queue.input_path_for(job_id), trace=context)
+    job = queue.claim("worker")
+    assert job.trace_context == context
+    assert "trace_parent" not in job.to_dict()
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))